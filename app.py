@@ -32,7 +32,7 @@ except:
 # ================= LAZY IMPORTS FOR HEAVY DEPENDENCIES =================
 # Import heavy dependencies only after health check
 try:
-    import pandas as pd, numpy as np, yfinance as yf, requests
+    import pandas as pd, yfinance as yf
     import psycopg2
     from psycopg2.extras import RealDictCursor
     import psycopg2.extensions
@@ -41,7 +41,6 @@ try:
     from typing import List, Tuple, Optional, Dict, Any
     from datetime import timezone
     from dateutil import tz
-    from math import floor
     import io
     import json
     import qrcode
@@ -54,6 +53,31 @@ try:
     import secrets
     import string
     import time
+    from market_scanner import (
+        get_ohlcv, compute_features,
+        TOP_100_EQUITIES, MID_CAP_STOCKS, SMALL_CAP_STOCKS,
+        TOP_100_CRYPTO, CRYPTO_100_300, COMMODITIES, UNIVERSES,
+    )
+    from market_scanner import scan_universe as _scan_universe
+    from market_scanner import scan_large_universe as _scan_large_universe
+    from market_scanner import scan_multi_asset as _scan_multi_asset
+    from market_scanner import DEFAULT_MULTI_ASSET_WORKERS, split_by_asset_class
+    from market_scanner import run_backtest_vectorized, run_backtest_cached
+    from market_scanner import submit_backtest, get_job, cancel_job, list_jobs
+    from market_scanner import PAYLOAD_FORMAT, pack_results, unpack_results
+    from market_scanner import evaluate_alerts
+    from market_scanner import (
+        INDICATOR_FIELDS, CONDITION_OPS, ALERT_TIMEFRAMES, INDICATOR_ALERTS_SCHEMA, describe_condition,
+    )
+    from market_scanner import QUOTE_BOARD, QUOTE_FEED, REST_QUOTES, make_feed, start_quote_feed
+    from market_scanner import HTTP, StaleWhileRevalidateCache
+    from market_scanner import ACCOUNT_MEMO, Uncacheable
+    from market_scanner import monte_carlo, trades_seed
+    from market_scanner import collect_signals, enqueue_digest, start_alert_sender
+    from market_scanner import LOWER_TIMEFRAMES, IntrabarResolver, history_gap
+    from market_scanner import parameter_grid, random_configs, run_sweep
+    from market_scanner import walk_forward, OBJECTIVES as WALK_FORWARD_OBJECTIVES
+    from market_scanner import scan_confluence as _scan_confluence
 except ImportError as e:
     st.error(f"❌ Failed to import required packages: {e}")
     st.info("🔧 Please check the deployment environment and package installation.")
@@ -1426,25 +1450,6 @@ CFG = ScanConfig(
 
 SYD = tz.gettz("Australia/Sydney")
 
-# ================= Utilities =================
-def _yf_interval_period(tf: str) -> Tuple[str, str]:
-    t = tf.lower().strip()
-    if t in ("1d","1day","d"):       return ("1d","2y")
-    if t in ("1h","60m"):            return ("60m","730d")
-    if t in ("30m","15m","5m","1m"): return (t, "60d")  # yfinance limit
-    return ("1d","2y")
-
-def min_bars_required(tf: str) -> int:
-    t = tf.lower()
-    if t in ("1d","d"):    return 210
-    if t in ("1h","60m"):  return 350
-    if t in ("30m","15m"): return 500
-    if t in ("5m","1m"):   return 700
-    return 210
-
-def dollar_volume(df: pd.DataFrame) -> float:
-    return float((df["close"] * df["volume"]).tail(20).mean())
-
 # ================= Database Connection =================
 @st.cache_resource
 def get_connection_pool():
@@ -1694,6 +1699,7 @@ def register_device(workspace_id: str, device_fingerprint: str, platform: str, d
         DO UPDATE SET last_seen = NOW(), revoked_at = NULL
     """
     result = execute_db_write(query, (workspace_id, device_fingerprint, platform, device_name))
+    ACCOUNT_MEMO.invalidate(workspace_id)
     return result is not None and result >= 0
 
 def create_pairing_token(workspace_id: str) -> Optional[str]:
@@ -1739,6 +1745,7 @@ def consume_pairing_token(token: str, device_fingerprint: str, platform: str, de
 
 # ================= Admin Authentication System =================
 
+@ACCOUNT_MEMO.memoize
 def is_admin_session_valid(workspace_id: str, device_fingerprint: str) -> bool:
     """Check if current device has valid admin session"""
     query = """
@@ -1748,7 +1755,9 @@ def is_admin_session_valid(workspace_id: str, device_fingerprint: str) -> bool:
         LIMIT 1
     """
     result = execute_db_query(query, (workspace_id, device_fingerprint))
-    return result is not None and len(result) > 0
+    if result is None:
+        raise Uncacheable(False)   # query failed: deny for now, but don't remember it
+    return len(result) > 0
 
 def create_admin_session(workspace_id: str, device_fingerprint: str) -> bool:
     """Create admin session for device (30 day expiry)"""
@@ -1760,6 +1769,7 @@ def create_admin_session(workspace_id: str, device_fingerprint: str) -> bool:
         DO UPDATE SET expires_at = %s, created_at = NOW()
     """
     result = execute_db_write(query, (workspace_id, device_fingerprint, expires_at, expires_at))
+    ACCOUNT_MEMO.invalidate(workspace_id)
     return result is not None and result >= 0
 
 def verify_admin_pin(pin: str, workspace_id: str, device_fingerprint: str) -> tuple[bool, str]:
@@ -1815,16 +1825,22 @@ def verify_admin_pin(pin: str, workspace_id: str, device_fingerprint: str) -> tu
         return False, "Invalid PIN"
 
 def set_subscription_override(workspace_id: str, tier: str, set_by: str, expires_at: Optional[datetime] = None) -> bool:
-    """Set subscription tier override for workspace with optional expiry"""
+    """Set subscription tier override for workspace with optional expiry (no write when it is already set)"""
     query = """
         INSERT INTO subscription_overrides (workspace_id, tier, set_by, expires_at)
         VALUES (%s, %s, %s, %s)
         ON CONFLICT (workspace_id) 
         DO UPDATE SET tier = %s, set_by = %s, expires_at = %s, updated_at = NOW()
+        WHERE (subscription_overrides.tier, subscription_overrides.set_by, subscription_overrides.expires_at)
+              IS DISTINCT FROM (EXCLUDED.tier, EXCLUDED.set_by, EXCLUDED.expires_at)
     """
     result = execute_db_write(query, (workspace_id, tier, set_by, expires_at, tier, set_by, expires_at))
+    if result:
+        # Only a changed row can make the memoised lookups stale
+        ACCOUNT_MEMO.invalidate(workspace_id)
     return result is not None and result >= 0
 
+@ACCOUNT_MEMO.memoize
 def get_subscription_override(workspace_id: str) -> Optional[str]:
     """Get subscription tier override for workspace (only if not expired)"""
     query = """
@@ -1834,7 +1850,9 @@ def get_subscription_override(workspace_id: str) -> Optional[str]:
         LIMIT 1
     """
     result = execute_db_query(query, (workspace_id,))
-    if result and len(result) > 0:
+    if result is None:
+        raise Uncacheable(None)
+    if len(result) > 0:
         return result[0]['tier']
     return None
 
@@ -1842,6 +1860,7 @@ def clear_subscription_override(workspace_id: str) -> bool:
     """Clear subscription tier override for workspace"""
     query = "DELETE FROM subscription_overrides WHERE workspace_id = %s"
     result = execute_db_write(query, (workspace_id,))
+    ACCOUNT_MEMO.invalidate(workspace_id)
     return result is not None and result >= 0
 
 # ================= Friend Access Code System =================
@@ -2047,6 +2066,7 @@ def delete_workspace_data(workspace_id: str, data_type: str, item_key: str) -> b
     result = execute_db_write(query, (workspace_id, data_type, item_key))
     return result is not None and result > 0
 
+@ACCOUNT_MEMO.memoize
 def get_workspace_devices(workspace_id: str) -> List[Dict]:
     """Get all devices in a workspace"""
     query = """
@@ -2056,7 +2076,9 @@ def get_workspace_devices(workspace_id: str) -> List[Dict]:
         ORDER BY created_at DESC
     """
     result = execute_db_query(query, (workspace_id,))
-    return result if result else []
+    if result is None:
+        raise Uncacheable([])
+    return result
 
 def revoke_device(workspace_id: str, device_fingerprint: str) -> bool:
     """Revoke a device from workspace"""
@@ -2066,6 +2088,7 @@ def revoke_device(workspace_id: str, device_fingerprint: str) -> bool:
         WHERE workspace_id = %s AND device_fingerprint = %s
     """
     result = execute_db_write(query, (workspace_id, device_fingerprint))
+    ACCOUNT_MEMO.invalidate(workspace_id)
     return result is not None and result > 0
 
 def generate_qr_code(data: str) -> str:
@@ -2082,6 +2105,21 @@ def generate_qr_code(data: str) -> str:
     img_base64 = base64.b64encode(buffer.getvalue()).decode()
     return f"data:image/png;base64,{img_base64}"
 
+# ================= Streaming Quotes =================
+# A push feed (QUOTE_FEED: "yahoo" WebSocket, "simulated" for testing, "none")
+# keeps the latest price per symbol in QUOTE_BOARD; price lookups read it first
+# and only fall back to REST calls for symbols without a current tick.
+@st.cache_resource
+def start_streaming_quotes():
+    """Start this process's quote feed thread (once per process)"""
+    feed = make_feed(QUOTE_FEED)
+    return start_quote_feed(feed, QUOTE_BOARD) if feed else None
+
+try:
+    start_streaming_quotes()
+except Exception as e:
+    print(f"Quote feed failed to start: {e}")
+
 # ================= Price Alerts Management =================
 def create_price_alert(symbol: str, alert_type: str, target_price: float, notification_method: str = 'in_app') -> bool:
     """Create a new price alert with proper workspace ownership"""
@@ -2162,6 +2200,26 @@ def trigger_alert(alert_id: int, current_price: float, workspace_id: Optional[st
     result = execute_db_write(query, (current_price, alert_id, workspace_id))
     return result is not None and result > 0
 
+def trigger_alerts(prices_by_id: Dict[int, float], workspace_id: Optional[str] = None) -> List[int]:
+    """Mark many alerts triggered in one UPDATE; returns the ids this call actually flipped"""
+    if not workspace_id:
+        workspace_id = st.session_state.get('workspace_id')
+    
+    if not workspace_id or not prices_by_id:
+        return []  # No workspace = no triggering (prevents cross-tenant access)
+    
+    # Same guards as trigger_alert, so an alert fired concurrently elsewhere isn't returned twice
+    query = """
+        UPDATE price_alerts AS a
+        SET is_triggered = TRUE, triggered_at = NOW(), current_price = t.price, is_active = FALSE
+        FROM unnest(%s::bigint[], %s::float8[]) AS t(id, price)
+        WHERE a.id = t.id AND a.workspace_id = %s AND a.is_active = TRUE AND a.is_triggered = FALSE
+        RETURNING a.id
+    """
+    ids = list(prices_by_id)
+    result = execute_db_write_returning(query, (ids, [float(prices_by_id[i]) for i in ids], workspace_id))
+    return [r['id'] for r in result] if result else []
+
 def delete_alert(alert_id: int, workspace_id: Optional[str] = None) -> bool:
     """Delete a price alert with workspace validation (tenant-isolated)"""
     if not workspace_id:
@@ -2174,8 +2232,98 @@ def delete_alert(alert_id: int, workspace_id: Optional[str] = None) -> bool:
     result = execute_db_write(query, (alert_id, workspace_id))
     return result is not None and result > 0
 
+# ================= Indicator Alerts =================
+# Conditions on indicators ("RSI crosses below 30", "close crosses above prior_high",
+# "score crosses above 40"), evaluated by the alert daemon on incremental per-symbol state
+INDICATOR_ALERT_LABELS = {
+    'close': 'Close', 'rsi': 'RSI', 'score': 'Score', 'macd_hist': 'MACD Histogram', 'ema8': 'EMA 8',
+    'ema21': 'EMA 21', 'ema50': 'EMA 50', 'ema200': 'EMA 200', 'atr': 'ATR', 'bb_width': 'BB Width',
+    'vol_z': 'Volume Z', 'prior_high': '20-bar High (prior)', 'prior_low': '20-bar Low (prior)',
+}
+
+def init_indicator_alerts_table():
+    """Create indicator_alerts table if it doesn't exist"""
+    execute_db_write(INDICATOR_ALERTS_SCHEMA)
+
+def create_indicator_alert(symbol: str, timeframe: str, indicator: str, condition: str,
+                           target_value: Optional[float] = None, target_field: Optional[str] = None,
+                           notification_method: str = 'in_app') -> bool:
+    """Create an indicator-condition alert for the current workspace"""
+    user_email = st.session_state.get('user_email', '') or 'anonymous'
+    workspace_id = st.session_state.get('workspace_id')
+    
+    if not workspace_id:
+        st.error("Error: No workspace found. Please log in again.")
+        return False
+    if not symbol or not symbol.strip():
+        st.error("Error: Symbol is required.")
+        return False
+    if timeframe not in ALERT_TIMEFRAMES or indicator not in INDICATOR_FIELDS or condition not in CONDITION_OPS:
+        st.error("Error: Invalid indicator condition.")
+        return False
+    if (target_field is None and target_value is None) or (target_field is not None and target_field not in INDICATOR_FIELDS):
+        st.error("Error: Choose a value or an indicator to compare against.")
+        return False
+    if notification_method not in ['in_app', 'email', 'both', 'none']:
+        st.error("Error: Invalid notification method.")
+        return False
+    
+    query = """
+        INSERT INTO indicator_alerts (workspace_id, user_email, symbol, timeframe, indicator, condition,
+                                      target_value, target_field, notification_method)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    try:
+        result = execute_db_write(query, (workspace_id, user_email, symbol.strip().upper(), timeframe, indicator,
+                                          condition, target_value, target_field, notification_method))
+        return result is not None and result > 0
+    except Exception as e:
+        st.error(f"Database error: {str(e)}")
+        return False
+
+def get_indicator_alerts(workspace_id: Optional[str] = None, active_only: bool = False) -> List[Dict[str, Any]]:
+    """Indicator alerts for the current workspace only (tenant-isolated)"""
+    if not workspace_id:
+        workspace_id = st.session_state.get('workspace_id')
+    
+    if not workspace_id:
+        return []
+    
+    query = "SELECT * FROM indicator_alerts WHERE workspace_id = %s"
+    if active_only:
+        query += " AND is_active = TRUE"
+    result = execute_db_query(query + " ORDER BY created_at DESC", (workspace_id,))
+    return result if result else []
+
+def delete_indicator_alert(alert_id: int, workspace_id: Optional[str] = None) -> bool:
+    """Delete an indicator alert with workspace validation (tenant-isolated)"""
+    if not workspace_id:
+        workspace_id = st.session_state.get('workspace_id')
+    
+    if not workspace_id:
+        return False
+    
+    result = execute_db_write("DELETE FROM indicator_alerts WHERE id = %s AND workspace_id = %s", (alert_id, workspace_id))
+    return result is not None and result > 0
+
+# Initialize indicator alerts table on startup
+try:
+    init_indicator_alerts_table()
+except:
+    pass
+
 def get_current_price(symbol: str) -> Optional[float]:
     """Get current price for a symbol with fallback methods"""
+    price = QUOTE_BOARD.get(symbol)
+    if price is not None:
+        return price
+    # Not streamed yet (or stale): subscribe for next time, then fetch over REST
+    # (cached briefly, but never published on the board as a live tick)
+    QUOTE_BOARD.watch([symbol])
+    return REST_QUOTES.get(symbol, _fetch_current_price)
+
+def _fetch_current_price(symbol: str) -> Optional[float]:
+    """Quote lookup over REST: fast_info, then 1m history, then info"""
     try:
         # Try fast_info first
         ticker = yf.Ticker(symbol)
@@ -2211,28 +2359,22 @@ def check_price_alerts():
     if not active_alerts:
         return 0
     
-    triggered_count = 0
-    for alert in active_alerts:
-        try:
-            current_price = get_current_price(alert['symbol'])
-            
-            if current_price:
-                # Check if alert condition is met
-                should_trigger = False
-                if alert['alert_type'] == 'above' and current_price >= alert['target_price']:
-                    should_trigger = True
-                elif alert['alert_type'] == 'below' and current_price <= alert['target_price']:
-                    should_trigger = True
-                
-                if should_trigger:
-                    if trigger_alert(alert['id'], current_price, workspace_id):
-                        triggered_count += 1
-                        # Send notification (alert already has workspace_id)
-                        send_alert_notification(alert, current_price)
-        except Exception as e:
-            print(f"Error checking alert for {alert['symbol']}: {e}")
+    # One quote per unique symbol, every threshold on that symbol checked against it
+    try:
+        triggered = evaluate_alerts(active_alerts, fallback=get_current_price, board=QUOTE_BOARD)
+    except Exception as e:
+        print(f"Error checking price alerts: {e}")
+        return 0
+    if not triggered:
+        return 0
+    
+    fired = set(trigger_alerts({alert['id']: price for alert, price in triggered}, workspace_id))
+    for alert, price in triggered:
+        if alert['id'] in fired:
+            # Send notification (alert already has workspace_id)
+            send_alert_notification(alert, price)
     
-    return triggered_count
+    return len(fired)
 
 def send_alert_notification(alert: Dict[str, Any], current_price: float):
     """Send notification for triggered alert with 100% reliable persistence"""
@@ -2252,28 +2394,93 @@ Target Price: ${target:.2f}
 The price target you set has been reached.
 """
     
-    # UNCONDITIONAL PERSISTENCE - Store notification FIRST for 100% reliable delivery
     workspace_id = alert.get('workspace_id')
     user_email = alert.get('user_email', 'system')  # Use alert's user_email or fallback
     
-    if workspace_id:
-        # Always store notification regardless of any other conditions
-        store_notification(subject, message, user_email, workspace_id)
-    else:
+    if not workspace_id:
         # Quarantine alerts without workspace_id (should not happen with NOT NULL constraint)
-        st.error(f"⚠️ Alert processing error: Missing workspace context for {alert['symbol']}")
-        st.info("Please recreate this alert to ensure proper delivery.")
+        print(f"⚠️ Alert processing error: Missing workspace context for {alert['symbol']} (alert {alert.get('id')})")
+        return
     
-    # Send email notification if email method selected
-    if alert.get('notification_method') in ['email', 'both'] and user_email and user_email != 'system':
-        try:
-            email_sent = send_email_to_user(subject, message, user_email)
-            if email_sent:
-                print(f"✅ Email alert sent to {user_email} for {symbol}")
-        except Exception as e:
-            print(f"❌ Email notification failed for {user_email}: {e}")
+    wants_email = alert.get('notification_method') in ['email', 'both'] and bool(user_email) and user_email != 'system'
+    queue_alert_notification(subject, message, user_email, workspace_id, wants_email, f"price-alert-{alert['id']}")
+
+def send_indicator_alert_notification(alert: Dict[str, Any], value: float):
+    """Notify a triggered indicator alert (in-app always, email when selected)"""
+    symbol = alert['symbol']
+    condition = describe_condition(alert)
+    subject = f"🚨 Indicator Alert Triggered: {symbol} {condition}"
+    message = f"""
+Indicator Alert Triggered!
+
+Symbol: {symbol} ({alert.get('timeframe', '1D')})
+Condition: {condition}
+{INDICATOR_ALERT_LABELS.get(alert['indicator'], alert['indicator'])}: {value:,.2f}
+
+The indicator condition you set has been met on the latest bar.
+"""
+    workspace_id = alert.get('workspace_id')
+    user_email = alert.get('user_email') or 'system'
+    if not workspace_id:
+        return
     
-    # Note: "Both" method already stores in-app notification above + sends email above
+    wants_email = alert.get('notification_method') in ['email', 'both'] and user_email != 'system'
+    queue_alert_notification(subject, message, user_email, workspace_id, wants_email, f"indicator-alert-{alert['id']}")
+
+# Server-side evaluation (market_scanner.alertdaemon): every workspace's alerts are
+# checked each PRICE_ALERT_INTERVAL seconds whether or not anyone has the page open;
+# open tabs only poll the alerts table for what has fired.
+PRICE_ALERT_DAEMON = os.getenv("PRICE_ALERT_DAEMON", "true").lower() == "true"
+PRICE_ALERT_INTERVAL = int(os.getenv("PRICE_ALERT_INTERVAL", "60"))
+
+@st.cache_resource
+def start_price_alert_daemon():
+    """Start this process's background alert evaluator (once per process)"""
+    import threading
+    from market_scanner.alertdaemon import alert_daemon_loop
+    stop_event = threading.Event()
+    daemon = threading.Thread(target=alert_daemon_loop, name="price-alert-daemon", daemon=True,
+                              kwargs={'notify': send_alert_notification, 'fallback': get_current_price,
+                                      'stop_event': stop_event, 'interval': PRICE_ALERT_INTERVAL,
+                                      'notify_indicator': send_indicator_alert_notification})
+    daemon.start()
+    return stop_event
+
+@st.fragment(run_every=30)
+def price_alert_watch(workspace_id: str) -> None:
+    """Toast alerts as they trigger, without reloading the page"""
+    if not PRICE_ALERT_DAEMON:
+        # No server-side evaluator in this deployment: check from the open tab every 5 minutes
+        now = time.time()
+        if now - st.session_state.get('last_auto_check', 0) >= 300:
+            check_price_alerts()
+            st.session_state.last_auto_check = now
+    
+    triggered = {a['id']: a for a in get_all_alerts(workspace_id) if a.get('is_triggered')}
+    seen = st.session_state.get('seen_triggered_alerts')
+    if seen is not None:
+        for alert_id in triggered.keys() - seen:
+            alert = triggered[alert_id]
+            st.toast(f"🚨 {alert['symbol']} {alert['alert_type']} ${float(alert['target_price']):.2f} "
+                     f"triggered at ${float(alert['current_price'] or 0):.2f}")
+    st.session_state.seen_triggered_alerts = set(triggered)
+    
+    fired = {a['id']: a for a in get_indicator_alerts(workspace_id) if a.get('is_triggered')}
+    seen = st.session_state.get('seen_triggered_indicator_alerts')
+    if seen is not None:
+        for alert_id in fired.keys() - seen:
+            alert = fired[alert_id]
+            st.toast(f"🚨 {alert['symbol']} {describe_condition(alert)} ({float(alert['triggered_value'] or 0):,.2f})")
+    st.session_state.seen_triggered_indicator_alerts = set(fired)
+    
+    source = f"on the server every {PRICE_ALERT_INTERVAL}s" if PRICE_ALERT_DAEMON else "from this tab every 5 minutes"
+    st.caption(f"Alerts are checked {source} · last updated {time.strftime('%H:%M:%S')}")
+
+if PRICE_ALERT_DAEMON:
+    try:
+        start_price_alert_daemon()
+    except Exception as e:
+        print(f"Price alert daemon failed to start: {e}")
 
 # ================= Watchlist Management =================
 def create_watchlist(name: str, description: str, symbols: List[str]) -> bool:
@@ -2347,219 +2554,87 @@ def delete_watchlist(watchlist_id: int) -> bool:
     
     return result is not None
 
-# ================= Data Source (yfinance) =================
-def get_ohlcv_yf(symbol: str, timeframe: str, period: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
-    interval, default_period = _yf_interval_period(timeframe)
-    
-    # Use custom period or date range if provided
-    if start and end:
-        data = yf.Ticker(symbol.upper()).history(start=start, end=end, interval=interval, auto_adjust=False)
-    elif period:
-        data = yf.Ticker(symbol.upper()).history(period=period, interval=interval, auto_adjust=False)
-    else:
-        data = yf.Ticker(symbol.upper()).history(period=default_period, interval=interval, auto_adjust=False)
-    
-    if data is None or data.empty:
-        raise ValueError(f"No yfinance data for {symbol} @ {interval}/{period or 'date range'}")
-    data.index = pd.to_datetime(data.index, utc=True)
-    out = pd.DataFrame({
-        "open":   data["Open"].astype(float),
-        "high":   data["High"].astype(float),
-        "low":    data["Low"].astype(float),
-        "close":  data["Close"].astype(float),
-        "volume": data["Volume"].astype(float).fillna(0.0),
-    }, index=data.index).dropna()
-    return out
-
-def get_ohlcv(symbol: str, timeframe: str, period: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
-    return get_ohlcv_yf(symbol, timeframe, period, start, end)
-
-# ================= Indicators (pure pandas) =================
-def _ema(s, n):    return s.ewm(span=n, adjust=False).mean()
-def _rsi(s, n=14):
-    d = s.diff()
-    up = d.clip(lower=0).ewm(alpha=1/n, adjust=False).mean()
-    dn = (-d.clip(upper=0)).ewm(alpha=1/n, adjust=False).mean()
-    rs = up / dn
-    return 100 - (100 / (1 + rs))
-def _atr(h, l, c, n=14):
-    tr = pd.concat([h - l, (h - c.shift()).abs(), (l - c.shift()).abs()], axis=1).max(axis=1)
-    return tr.ewm(alpha=1/n, adjust=False).mean()
-def _bb_width(c, n=20, k=2.0):
-    ma = c.rolling(n).mean(); sd = c.rolling(n).std()
-    upper, lower = ma + k*sd, ma - k*sd
-    return (upper - lower) / c
-
-def compute_features(df: pd.DataFrame, custom_settings=None) -> pd.DataFrame:
-    out = df.copy()
-    
-    # Get custom periods or use defaults
-    if custom_settings and custom_settings.get('enabled'):
-        periods = custom_settings.get('periods', {})
-        rsi_period = periods.get('rsi', 14)
-        ema_long = periods.get('ema_long', 200)
-        bb_period = periods.get('bb', 20)
-        breakout_period = periods.get('breakout', 20)
-    else:
-        rsi_period = 14
-        ema_long = 200
-        bb_period = 20
-        breakout_period = 20
-    
-    out["ema8"]   = _ema(out["close"], 8)
-    out["ema21"]  = _ema(out["close"], 21)
-    out["ema50"]  = _ema(out["close"], 50)
-    out["ema200"] = _ema(out["close"], ema_long)
-    out["rsi"]    = _rsi(out["close"], rsi_period)
-
-    macd_fast = _ema(out["close"], 12); macd_slow = _ema(out["close"], 26)
-    macd_line = macd_fast - macd_slow
-    signal    = macd_line.ewm(span=9, adjust=False).mean()
-    out["macd_hist"] = macd_line - signal
-
-    out["atr"]        = _atr(out["high"], out["low"], out["close"], 14)
-    out["bb_width"]   = _bb_width(out["close"], bb_period, 2.0)
-    out["vol_ma20"]   = out["volume"].rolling(bb_period).mean()
-    out["vol_z"]      = (out["volume"] - out["vol_ma20"]) / out["vol_ma20"].replace(0, np.nan)
-    out["close_20_max"] = out["close"].rolling(breakout_period).max()
-    out["close_20_min"] = out["close"].rolling(breakout_period).min()
-    out["bb_width_ma"]  = out["bb_width"].rolling(bb_period).mean()
-    return out
-
-# ================= Scoring =================
-def score_row(r, custom_settings=None) -> float:
-    # Get custom weights and thresholds or use defaults
-    if custom_settings and custom_settings.get('enabled'):
-        weights = custom_settings.get('weights', {})
-        thresholds = custom_settings.get('thresholds', {})
-        
-        regime_weight = weights.get('regime', 25)
-        structure_weight = weights.get('structure', 25)
-        rsi_weight = weights.get('rsi', 10)
-        macd_weight = weights.get('macd', 10)
-        volume_weight = weights.get('volume', 8)
-        volatility_weight = weights.get('volatility', 7)
-        tradability_weight = weights.get('tradability', 5)
-        overextension_penalty = weights.get('overextension_penalty', 10)
-        
-        rsi_bull = thresholds.get('rsi_bull', 50)
-        rsi_overbought = thresholds.get('rsi_overbought', 80)
-        rsi_oversold = thresholds.get('rsi_oversold', 20)
-        volume_z = thresholds.get('volume_z', 0.5)
-        atr_pct_max = thresholds.get('atr_pct', 0.04)
-    else:
-        # Default weights
-        regime_weight = 25
-        structure_weight = 25
-        rsi_weight = 10
-        macd_weight = 10
-        volume_weight = 8
-        volatility_weight = 7
-        tradability_weight = 5
-        overextension_penalty = 10
-        
-        # Default thresholds
-        rsi_bull = 50
-        rsi_overbought = 80
-        rsi_oversold = 20
-        volume_z = 0.5
-        atr_pct_max = 0.04
-    
-    s = 0.0
-    # Market Regime
-    s += regime_weight if r.close > r.ema200 else -regime_weight
-    # Price Structure
-    s += structure_weight if r.close > r["close_20_max"] else 0
-    s -= structure_weight if r.close < r["close_20_min"] else 0
-    # RSI Momentum
-    s += rsi_weight if (pd.notna(r.rsi) and r.rsi > rsi_bull) else -rsi_weight
-    # MACD
-    s += macd_weight if (pd.notna(r.macd_hist) and r.macd_hist > 0) else -macd_weight
-    # Volume Expansion
-    s += volume_weight if (pd.notna(r.vol_z) and r.vol_z > volume_z) else 0
-    # Volatility Expansion
-    s += volatility_weight if (pd.notna(r.bb_width) and pd.notna(r.bb_width_ma) and r.bb_width > r.bb_width_ma) else 0
-    # Tradability
-    atr_pct = (r.atr / r.close) if (pd.notna(r.atr) and r.close) else np.nan
-    s += tradability_weight if (pd.notna(atr_pct) and atr_pct < atr_pct_max) else 0
-    # Overextension Penalties/Rewards
-    s -= overextension_penalty if (pd.notna(r.rsi) and r.rsi > rsi_overbought) else 0
-    s += overextension_penalty if (pd.notna(r.rsi) and r.rsi < rsi_oversold) else 0
-    return float(s)
-
-# ================= Position sizing =================
-def position_sizing(last, direction: str, account_equity: float, risk_pct: float, stop_mult: float):
-    """
-    Returns (size_units, risk_$, notional_$, stop_price)
-    """
-    # Handle NaN or zero ATR - use 1% of price as fallback
-    atr_value = last.atr if pd.notna(last.atr) and last.atr > 0 else (last.close * 0.01)
-    
-    stop_price = last.close - stop_mult*atr_value if direction=="Bullish" else last.close + stop_mult*atr_value
-    per_unit_risk = abs(last.close - stop_price)
-    risk_dollars  = account_equity * risk_pct
-    size_units = 0 if per_unit_risk <= 0 else floor(risk_dollars / per_unit_risk)
-    notional = size_units * last.close
-    return size_units, risk_dollars, notional, stop_price
-
 # ================= Scanner =================
+# Data -> features -> scoring -> sizing lives in the headless market_scanner package;
+# the UI only adds Streamlit's result cache on top.
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "1"))
+
 @st.cache_data(show_spinner=False, ttl=300)
 def scan_universe(symbols: List[str], timeframe: str, is_crypto: bool,
                   account_equity: float, risk_pct: float, stop_mult: float, min_vol: float, 
                   custom_settings: dict = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    rows, errs = [], []
-    for sym in symbols:
-        try:
-            df = get_ohlcv(sym, timeframe)
-            if len(df) < min_bars_required(timeframe):
-                raise ValueError(f"Not enough history ({len(df)}) for {timeframe}")
-            
-            # Skip dollar volume check for forex (=X) and commodities (=F)
-            is_forex = sym.endswith("=X")
-            is_commodity = sym.endswith("=F")
-            
-            if not is_crypto and not is_forex and not is_commodity and dollar_volume(df) < min_vol:
-                raise ValueError(f"Below min dollar vol ({min_vol:,.0f})")
-
-            f = compute_features(df, custom_settings).dropna()
-            if f.empty:
-                raise ValueError("Features empty after dropna()")
-            last = f.iloc[-1]
-            sc = score_row(last, custom_settings)
-            direction = "Bullish" if sc >= 0 else "Bearish"
-
-            size, risk_usd, notional, stop = position_sizing(
-                last, direction, account_equity, risk_pct, stop_mult
-            )
+    return _scan_universe(symbols, timeframe, is_crypto, account_equity, risk_pct, stop_mult,
+                          min_vol, custom_settings, workers=SCAN_WORKERS)
 
-            rows.append({
-                "symbol": sym,
-                "timeframe": timeframe,
-                "close": round(float(last.close), 6),
-                "score": round(sc, 2),
-                "direction": direction,
-                "rsi": round(float(last.rsi), 2),
-                "atr": round(float(last.atr), 6),
-                "ema50_gt_200": bool(last.ema50 > last.ema200),
-                "bb_width": round(float(last.bb_width), 6) if pd.notna(last.bb_width) else None,
-                "vol_z": round(float(last.vol_z), 2) if pd.notna(last.vol_z) else None,
-                "stop": round(float(stop), 6),
-                "size": int(size),
-                "risk_$": round(float(risk_usd), 2),
-                "notional_$": round(float(notional), 2)
-            })
-        except Exception as e:
-            errs.append({"symbol": sym, "timeframe": timeframe, "error": str(e)})
-    df_rows = pd.DataFrame(rows)
-    if not df_rows.empty and "score" in df_rows.columns:
-        df_rows = df_rows.sort_values("score", ascending=False)
-    df_errs = pd.DataFrame(errs)
-    return df_rows, df_errs
+@st.cache_data(show_spinner=False, ttl=300)
+def scan_confluence(symbols: List[str], timeframes: List[str], is_crypto: bool,
+                    account_equity: float, risk_pct: float, stop_mult: float, min_vol: float,
+                    custom_settings: dict = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Multi-timeframe confluence scan (one download per symbol, higher timeframes resampled)"""
+    return _scan_confluence(symbols, timeframes, is_crypto, account_equity, risk_pct, stop_mult,
+                            min_vol, custom_settings, workers=SCAN_WORKERS)
+
+@st.cache_data(show_spinner=False, ttl=300)
+def scan_large_universe(symbols: List[str], timeframe: str, is_crypto: bool,
+                        account_equity: float, risk_pct: float, stop_mult: float, min_vol: float,
+                        custom_settings: dict = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Large-universe scan (on-disk bar store, batched downloads, panel features, vectorized scoring)"""
+    return _scan_large_universe(symbols, timeframe, is_crypto, account_equity, risk_pct, stop_mult,
+                                min_vol, custom_settings)
+
+@st.cache_data(show_spinner=False, ttl=300)
+def scan_multi_asset(items: List[Tuple[str, str, str]], account_equity: float, risk_pct: float,
+                     stop_mult: float, min_vol: float,
+                     custom_settings: dict = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Equities, commodities and crypto in one pass through a shared worker pool, tagged by asset_class"""
+    return _scan_multi_asset(items, account_equity, risk_pct, stop_mult, min_vol, custom_settings,
+                             workers=max(SCAN_WORKERS, DEFAULT_MULTI_ASSET_WORKERS))
+
+# ================= Distributed Scan Queue =================
+# With SCAN_QUEUE_ENABLED=true scans are split into symbol shards on a Postgres
+# queue; every instance runs a background worker that claims shards, so one
+# large scan spreads across all running Cloud Run instances.
+SCAN_QUEUE_ENABLED = os.getenv("SCAN_QUEUE_ENABLED", "false").lower() == "true"
+
+@st.cache_resource
+def start_scan_queue_worker():
+    """Start this instance's background shard worker (once per process)"""
+    import threading
+    from market_scanner.jobqueue import worker_loop
+    stop_event = threading.Event()
+    worker = threading.Thread(target=worker_loop, name="scan-queue-worker", daemon=True,
+                              kwargs={'stop_event': stop_event, 'scan_workers': max(SCAN_WORKERS, 4)})
+    worker.start()
+    return stop_event
+
+def run_queued_scan(symbols: List[str], mode: str, timeframe, is_crypto: bool,
+                    account_equity: float, risk_pct: float, stop_mult: float, min_vol: float,
+                    custom_settings: dict = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Run a scan through the shard queue and show shard progress while waiting"""
+    from market_scanner.jobqueue import run_sharded_scan, scan_params
+    params = scan_params(mode, timeframe, is_crypto, account_equity, risk_pct, stop_mult, min_vol, custom_settings)
+    progress_bar = st.progress(0.0, text=f"Queued {len(symbols)} symbols...")
+    
+    def show_progress(counts):
+        done = counts['finished'] / max(counts['total'], 1)
+        progress_bar.progress(done, text=f"Scanned {counts['finished']}/{counts['total']} shards")
+    
+    try:
+        return run_sharded_scan(symbols, params, workspace_id=st.session_state.get('workspace_id'),
+                                scan_workers=max(SCAN_WORKERS, 4), progress=show_progress)
+    finally:
+        progress_bar.empty()
+
+if SCAN_QUEUE_ENABLED:
+    try:
+        start_scan_queue_worker()
+    except Exception as e:
+        print(f"Scan queue worker failed to start: {e}")
 
 # ================= Notifications =================
 def push_slack(text: str):
     if not CFG.slack_webhook: return
-    try: requests.post(CFG.slack_webhook, json={"text": text}, timeout=10)
+    try: HTTP.post(CFG.slack_webhook, json={"text": text}, timeout=10)
     except Exception as e: print("Slack error:", e)
 
 # Legacy SMTP function removed - now using user-specific SendGrid system
@@ -2589,7 +2664,7 @@ def get_user_notifications(user_email: str, workspace_id: str, limit: int = 10):
     """Fetch notifications for user in their workspace"""
     try:
         query = """
-        SELECT id, subject, message, created_at, is_read
+        SELECT id, subject, message, created_at, is_read, delivery_status
         FROM notifications 
         WHERE workspace_id = %s AND user_email = %s 
         ORDER BY created_at DESC 
@@ -2627,144 +2702,88 @@ def mark_notification_read(notification_id: int, workspace_id: str, user_email:
         print(f"Error marking notification as read: {e}")
         return False
 
-def send_email_to_user(subject: str, body: str, to_email: str) -> bool:
-    """Send email via Resend connector - direct integration"""
-    try:
-        api_key = None
-        from_email = 'onboarding@resend.dev'
-        
-        # First, try to get API key from Secrets (user-added)
-        api_key = os.getenv('RESEND_API_KEY') or os.getenv('Resend')
-        
-        # If not in secrets, try Resend connector
-        if not api_key:
-            hostname = os.getenv('REPLIT_CONNECTORS_HOSTNAME')
-            x_replit_token = os.getenv('REPL_IDENTITY')
-            
-            if hostname and x_replit_token:
-                # Fetch Resend credentials from connector
-                connector_response = requests.get(
-                    f'https://{hostname}/api/v2/connection?include_secrets=true&connector_names=resend',
-                    headers={
-                        'Accept': 'application/json',
-                        'X_REPLIT_TOKEN': f'repl {x_replit_token}'
-                    },
-                    timeout=10
-                )
-                
-                if connector_response.status_code == 200:
-                    connector_data = connector_response.json()
-                    resend_settings = connector_data.get('items', [{}])[0].get('settings', {})
-                    api_key = resend_settings.get('api_key')
-                    from_email = resend_settings.get('from_email', 'onboarding@resend.dev')
-        
-        # If we have an API key from either source, send the email
-        if api_key:
-                    # Send email directly using Resend API
-                    html_body = f"""
-                    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                        <div style="background: linear-gradient(135deg, #0F172A 0%, #1E293B 100%); padding: 20px; color: white; border-radius: 8px 8px 0 0;">
-                            <h2 style="margin: 0; color: #10B981;">📈 Market Scanner Alert</h2>
-                        </div>
-                        <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 8px 8px;">
-                            <h3 style="color: #0F172A; margin-top: 0;">{subject}</h3>
-                            <div style="white-space: pre-line; color: #374151; line-height: 1.6;">
-{body}
-                            </div>
-                            <hr style="margin: 20px 0; border: none; border-top: 1px solid #e5e7eb;">
-                            <p style="color: #6b7280; font-size: 14px; margin: 0;">
-                                This alert was sent by MarketScanner Pro<br>
-                                <a href="https://marketscannerpros.app" style="color: #10B981;">Visit Dashboard</a> | 
-                                <a href="https://app.marketscannerpros.app" style="color: #10B981;">Open Scanner</a>
-                            </p>
-                        </div>
-                    </div>
-                    """
-                    
-                    resend_response = requests.post(
-                        'https://api.resend.com/emails',
-                        headers={
-                            'Authorization': f'Bearer {api_key}',
-                            'Content-Type': 'application/json'
-                        },
-                        json={
-                            'from': from_email,
-                            'to': [to_email],
-                            'subject': subject,
-                            'html': html_body
-                        },
-                        timeout=10
-                    )
-                    
-                    if resend_response.status_code == 200:
-                        # Email sent successfully
-                        workspace_id = st.session_state.get('workspace_id')
-                        if workspace_id:
-                            store_notification(subject, f"✅ Email sent to {to_email}\n\n{body}", to_email, workspace_id)
-                        return True
-                    else:
-                        # Email failed - store as in-app notification instead
-                        workspace_id = st.session_state.get('workspace_id')
-                        if workspace_id:
-                            # Store the notification without error details (clean display)
-                            store_notification(f"📧 {subject}", f"Alert for {to_email}:\n\n{body}\n\n💡 Note: Email delivery temporarily unavailable. Update Resend API key in Connectors to enable email.", to_email, workspace_id)
-                        return True  # Return True so alerts continue working
-        
-        # Fallback: store in database as notification
-        workspace_id = st.session_state.get('workspace_id')
-        if workspace_id:
-            store_notification(f"📧 {subject}", f"Alert for {to_email}:\n\n{body}\n\n💡 Note: Email delivery temporarily unavailable. Update Resend API key in Connectors to enable email.", to_email, workspace_id)
-        return True
-            
-    except Exception as e:
-        # Fallback to database storage on any error
+def send_email_to_user(subject: str, body: str, to_email: str, workspace_id: Optional[str] = None,
+                       idempotency_key: Optional[str] = None) -> bool:
+    """
+    Queue an email on the notification outbox (pass workspace_id when calling off the script thread).
+
+    One INSERT records the in-app notification and the outbox row; the
+    notification worker sends it through Resend and marks the notification
+    sent or failed. Reusing an idempotency_key (e.g. per alert) queues it once.
+    """
+    from market_scanner.outbox import ENQUEUE_SQL, enqueue_params
+    if workspace_id is None:
         workspace_id = st.session_state.get('workspace_id')
-        if workspace_id:
-            store_notification(f"📧 {subject}", f"Alert for {to_email}:\n\n{body}\n\n💡 Note: Email delivery temporarily unavailable. Update Resend API key in Connectors to enable email.", to_email, workspace_id)
-        else:
-            # Show immediate notification if no workspace
-            st.info(f"📧 Alert created (email temporarily unavailable)")
-            st.info(f"**{subject}**")
-            with st.expander("📄 View Message", expanded=True):
-                st.write(body)
-        return True  # Return True so alerts continue working
-
-def send_backtesting_signal_alert(signal_type: str, symbol: str, price: float, details: Dict[str, Any], user_email: str) -> bool:
-    """Send email alert when backtesting generates a buy or sell signal (Pro Trader exclusive)"""
-    try:
-        # Format signal details
-        signal_emoji = "🟢 BUY" if signal_type.lower() == "buy" else "🔴 SELL"
-        
-        subject = f"{signal_emoji} Signal: {symbol} @ ${price:.2f}"
-        
-        body = f"""
-{signal_emoji} SIGNAL ALERT
+    result = execute_db_write_returning(ENQUEUE_SQL, enqueue_params(to_email, subject, body, workspace_id, idempotency_key))
+    if result is None:
+        print(f"❌ Could not queue email to {to_email}: {subject}")
+        return False
+    return True
 
-Symbol: {symbol}
-Signal Type: {signal_type.upper()}
-Price: ${price:.2f}
-Date: {details.get('date', 'N/A')}
-
-Strategy Details:
-• Entry Price: ${details.get('entry_price', price):.2f}
-• Stop Loss: ${details.get('stop_price', 'N/A')}
-• Position Size: {details.get('position_size', 'N/A')} shares
-• Score: {details.get('score', 'N/A')}
-
-Risk Management:
-• Risk Amount: ${details.get('risk_amount', 'N/A')}
-• Position Value: ${details.get('position_value', 'N/A')}
-
-This signal was generated by your backtesting strategy.
-Log into the dashboard to review the full analysis.
-        """
-        
-        # Send email
-        return send_email_to_user(subject, body.strip(), user_email)
-            
+def queue_alert_notification(subject: str, body: str, to_email: str, workspace_id: str, email: bool,
+                             idempotency_key: str) -> bool:
+    """
+    Hold an alert notification for the outbox's digest stage: alerts a user
+    gets within NOTIFY_DIGEST_WINDOW seconds become one in-app summary and at
+    most one email. With the window at 0 each alert is delivered on its own.
+    """
+    from market_scanner.outbox import DIGEST_ENQUEUE_SQL, DIGEST_WINDOW, enqueue_params
+    if DIGEST_WINDOW <= 0:
+        if email:
+            return send_email_to_user(subject, body, to_email, workspace_id, idempotency_key)
+        return store_notification(subject, body, to_email, workspace_id)
+    result = execute_db_write_returning(DIGEST_ENQUEUE_SQL,
+                                        enqueue_params(to_email, subject, body, workspace_id, idempotency_key, email))
+    if result is None:
+        # Outbox unavailable: don't lose the alert
+        return store_notification(subject, body, to_email, workspace_id)
+    return True
+
+@st.cache_resource
+def start_backtest_alert_sender():
+    """Start this process's background digest sender (once); returns its job queue"""
+    jobs, _ = start_alert_sender(send_email_to_user)
+    return jobs
+
+def queue_backtest_alert_digest(signals: List[Dict[str, Any]], user_email: str, title: str = "Backtest") -> int:
+    """Hand a finished run's collected signals to the background sender; returns emails queued"""
+    return enqueue_digest(start_backtest_alert_sender(), signals, user_email,
+                          st.session_state.get('workspace_id'), title)
+
+# Emails are delivered from the notification outbox (market_scanner.outbox) by
+# `python -m market_scanner notify-worker` and, unless NOTIFICATION_WORKER=false,
+# a worker thread in every app instance; SKIP LOCKED claims keep workers from
+# sending the same email twice. The same workers fold held alert notifications
+# into per-user digests (queue_alert_notification), so with no worker running
+# alerts are not delivered.
+NOTIFICATION_WORKER = os.getenv("NOTIFICATION_WORKER", "true").lower() == "true"
+EMAIL_STATUS_LABELS = {'pending': " · 📧 sending", 'sent': " · 📧 emailed", 'failed': " · 📧 email failed"}
+
+def init_notification_outbox():
+    """Create the outbox table and notification delivery columns if they don't exist"""
+    from market_scanner.outbox import SCHEMA_SQL
+    execute_db_write(SCHEMA_SQL)
+
+@st.cache_resource
+def start_notification_worker():
+    """Start this process's background outbox worker (once per process)"""
+    import threading
+    from market_scanner.outbox import outbox_worker_loop
+    stop_event = threading.Event()
+    threading.Thread(target=outbox_worker_loop, name="notification-worker", daemon=True,
+                     kwargs={'stop_event': stop_event}).start()
+    return stop_event
+
+try:
+    init_notification_outbox()
+except:
+    pass
+
+if NOTIFICATION_WORKER:
+    try:
+        start_notification_worker()
     except Exception as e:
-        print(f"Error sending backtesting alert: {e}")
-        return False
+        print(f"Notification worker failed to start: {e}")
 
 def save_user_notification_preferences(user_email: str, method: str) -> bool:
     """Save user notification preferences to database"""
@@ -3343,328 +3362,45 @@ except:
     pass
 
 # ================= Backtesting Engine =================
+# Backtests run on the array engine in market_scanner.backtest
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", str(os.cpu_count() or 1)))
+# Reuse downloaded bars, per-symbol scores and finished results across runs (market_scanner.btcache)
+BACKTEST_CACHE = os.getenv("BACKTEST_CACHE", "1") == "1"
+MONTE_CARLO_SIMULATIONS = int(os.getenv("MONTE_CARLO_SIMULATIONS", "10000"))
+
+def parse_sweep_values(text: str, cast=float) -> List[Any]:
+    """Parse a comma-separated list of sweep values ("5, 10, 15")"""
+    return [cast(v.strip()) for v in text.split(",") if v.strip()]
+
 def run_backtest(symbols: List[str], start_date: str, end_date: str, timeframe: str = "1D", 
                 initial_equity: float = 10000, risk_per_trade: float = 0.01, 
                 stop_atr_mult: float = 1.5, min_score: float = 10, 
-                enable_alerts: bool = False, user_email: Optional[str] = None) -> Dict[str, Any]:
+                enable_alerts: bool = False, user_email: Optional[str] = None,
+                use_cache: bool = BACKTEST_CACHE,
+                fill_resolution: bool = False) -> Dict[str, Any]:
     """Run historical backtest on scoring methodology with robust risk management"""
-    try:
-        # Validate date range
-        start_dt = pd.to_datetime(start_date)
-        end_dt = pd.to_datetime(end_date)
-        days_diff = (end_dt - start_dt).days
-        
-        # Check for invalid date range
-        if days_diff <= 0:
-            return {'error': f'Invalid date range: Start date ({start_date}) must be before end date ({end_date})', 
-                   'trades': [], 'metrics': {}, 'symbol_performance': {}}
-        
-        # Check minimum period
-        if days_diff < 30:
-            return {'error': 'Backtest period must be at least 30 days for meaningful results', 
-                   'trades': [], 'metrics': {}, 'symbol_performance': {}}
-        
-        # yfinance limitations for intraday data
-        if timeframe in ['1m', '5m', '15m', '30m', '1h'] and days_diff > 60:
-            return {'error': 'Intraday backtests limited to 60 days max due to data provider constraints', 
-                   'trades': [], 'metrics': {}, 'symbol_performance': {}}
-        
-        results = {
-            'trades': [],
-            'equity_curve': [],
-            'metrics': {},
-            'symbol_performance': {},
-            'errors': []
+    # Signals are only collected during the run; a digest is emailed in the background afterwards
+    signals: List[Dict[str, Any]] = []
+    on_signal = collect_signals(signals) if enable_alerts and user_email else None
+    if use_cache:
+        config = {
+            'symbols': symbols, 'start_date': start_date, 'end_date': end_date, 'timeframe': timeframe,
+            'initial_equity': initial_equity, 'risk_per_trade': risk_per_trade,
+            'stop_atr_mult': stop_atr_mult, 'min_score': min_score,
         }
-        
-        # Portfolio state tracking
-        current_equity = initial_equity
-        total_trades = 0
-        winning_trades = 0
-        max_equity = initial_equity
-        max_drawdown = 0
-        active_positions = {}  # symbol -> position dict
-        max_positions = 5  # Portfolio risk management
-        
-        # Create combined date index for equity curve
-        all_dates = set()
-        symbol_data = {}
-        
-        # Pre-load and validate all symbol data
-        for symbol in symbols:
-            try:
-                df = get_ohlcv(symbol, timeframe, start=start_date, end=end_date)
-                if df.empty or len(df) < 50:
-                    results['errors'].append(f"{symbol}: Insufficient data ({len(df)} bars)")
-                    continue
-                
-                df_features = compute_features(df).dropna()
-                if df_features.empty:
-                    results['errors'].append(f"{symbol}: Features calculation failed")
-                    continue
-                
-                # Calculate scores
-                scores = [score_row(row) for _, row in df_features.iterrows()]
-                df_features['score'] = scores
-                
-                symbol_data[symbol] = df_features
-                all_dates.update(df_features.index)
-                
-            except Exception as e:
-                results['errors'].append(f"{symbol}: Data loading failed - {str(e)}")
-                continue
-        
-        if not symbol_data:
-            return {'error': 'No valid symbol data loaded', 'trades': [], 'metrics': {}, 'symbol_performance': {}}
-        
-        # Create unified timeline
-        date_index = sorted(all_dates)
-        
-        # Initialize daily equity tracking
-        daily_equity = []
-        daily_returns = []
-        
-        # Main backtesting loop
-        for current_date in date_index:
-            day_start_equity = current_equity
-            
-            # Process each symbol for this date
-            for symbol, df_features in symbol_data.items():
-                if current_date not in df_features.index:
-                    continue
-                
-                row = df_features.loc[current_date]
-                
-                # Check existing positions for exits (stops, targets, time)
-                if symbol in active_positions:
-                    position = active_positions[symbol]
-                    exit_triggered = False
-                    exit_reason = ""
-                    exit_price = row['close']
-                    
-                    # Intrabar stop checking using OHLC
-                    if position['direction'] == "long":
-                        if row['low'] <= position['stop_price']:
-                            exit_triggered = True
-                            exit_reason = "stop_loss"
-                            exit_price = position['stop_price']  # Use stop price
-                        elif row['score'] < min_score / 2:
-                            exit_triggered = True
-                            exit_reason = "score_exit"
-                            exit_price = row['close']
-                    else:  # short position
-                        if row['high'] >= position['stop_price']:
-                            exit_triggered = True
-                            exit_reason = "stop_loss"
-                            exit_price = position['stop_price']  # Use stop price
-                        elif row['score'] < min_score / 2:
-                            exit_triggered = True
-                            exit_reason = "score_exit"
-                            exit_price = row['close']
-                    
-                    # Time-based exit
-                    if (current_date - position['entry_date']).days >= 20:
-                        exit_triggered = True
-                        exit_reason = "time_exit"
-                        exit_price = row['close']
-                    
-                    if exit_triggered:
-                        # Execute exit
-                        if position['direction'] == "long":
-                            trade_return = (exit_price - position['entry_price']) / position['entry_price']
-                        else:
-                            trade_return = (position['entry_price'] - exit_price) / position['entry_price']
-                        
-                        trade_pnl = trade_return * position['position_value']
-                        current_equity += trade_pnl
-                        
-                        trade_record = {
-                            'symbol': symbol,
-                            'direction': position['direction'],
-                            'entry_date': position['entry_date'],
-                            'exit_date': current_date,
-                            'entry_price': position['entry_price'],
-                            'exit_price': exit_price,
-                            'position_size': position['position_size'],
-                            'trade_return': trade_return,
-                            'trade_pnl': trade_pnl,
-                            'exit_reason': exit_reason,
-                            'holding_days': (current_date - position['entry_date']).days
-                        }
-                        
-                        results['trades'].append(trade_record)
-                        total_trades += 1
-                        
-                        if trade_pnl > 0:
-                            winning_trades += 1
-                        
-                        # Send SELL signal alert (Pro Trader feature)
-                        if enable_alerts and user_email:
-                            alert_details = {
-                                'date': str(current_date),
-                                'entry_price': position['entry_price'],
-                                'exit_price': exit_price,
-                                'stop_price': position['stop_price'],
-                                'position_size': position['position_size'],
-                                'position_value': position['position_value'],
-                                'trade_pnl': trade_pnl,
-                                'trade_return': trade_return * 100,  # As percentage
-                                'exit_reason': exit_reason,
-                                'holding_days': (current_date - position['entry_date']).days
-                            }
-                            send_backtesting_signal_alert("SELL", symbol, exit_price, alert_details, user_email)
-                        
-                        # Remove position
-                        del active_positions[symbol]
-                
-                # Check for new entries (if not already in position and portfolio capacity available)
-                if (symbol not in active_positions and 
-                    len(active_positions) < max_positions and 
-                    row['score'] >= min_score and
-                    current_equity > 0):
-                    
-                    # Enter position
-                    entry_price = row['close']
-                    direction = "long" if row['score'] > 0 else "short"
-                    
-                    # ATR-based position sizing with current equity
-                    atr = row['atr']
-                    stop_distance = stop_atr_mult * atr
-                    stop_price = entry_price - stop_distance if direction == "long" else entry_price + stop_distance
-                    
-                    # Risk management: use current equity for sizing
-                    risk_amount = current_equity * risk_per_trade
-                    position_size = risk_amount / abs(entry_price - stop_price)
-                    position_value = position_size * entry_price
-                    
-                    # Don't risk more than available equity
-                    if position_value > current_equity * 0.2:  # Max 20% per position
-                        position_value = current_equity * 0.2
-                        position_size = position_value / entry_price
-                    
-                    active_positions[symbol] = {
-                        'symbol': symbol,
-                        'direction': direction,
-                        'entry_price': entry_price,
-                        'entry_date': current_date,
-                        'stop_price': stop_price,
-                        'position_size': position_size,
-                        'position_value': position_value
-                    }
-                    
-                    # Send BUY signal alert (Pro Trader feature)
-                    if enable_alerts and user_email:
-                        alert_details = {
-                            'date': str(current_date),
-                            'entry_price': entry_price,
-                            'stop_price': stop_price,
-                            'position_size': position_size,
-                            'position_value': position_value,
-                            'score': row['score'],
-                            'risk_amount': risk_amount
-                        }
-                        send_backtesting_signal_alert("BUY", symbol, entry_price, alert_details, user_email)
-            
-            # Update equity curve and drawdown tracking
-            if current_equity != day_start_equity:
-                daily_pnl = current_equity - day_start_equity
-                daily_return = daily_pnl / day_start_equity if day_start_equity > 0 else 0
-                daily_returns.append(daily_return)
-                
-                results['equity_curve'].append({
-                    'date': current_date,
-                    'equity': current_equity,
-                    'trade_pnl': daily_pnl
-                })
-                
-                # Update max drawdown
-                if current_equity > max_equity:
-                    max_equity = current_equity
-                else:
-                    drawdown = (max_equity - current_equity) / max_equity
-                    max_drawdown = max(max_drawdown, drawdown)
-        
-        # Calculate symbol performance
-        for symbol in symbols:
-            symbol_trades = [t for t in results['trades'] if t['symbol'] == symbol]
-            if symbol_trades:
-                symbol_returns = [t['trade_return'] for t in symbol_trades]
-                symbol_pnl = sum([t['trade_pnl'] for t in symbol_trades])
-                
-                results['symbol_performance'][symbol] = {
-                    'total_trades': len(symbol_trades),
-                    'winning_trades': len([t for t in symbol_trades if t['trade_pnl'] > 0]),
-                    'total_pnl': symbol_pnl,
-                    'avg_return': np.mean(symbol_returns),
-                    'win_rate': len([t for t in symbol_trades if t['trade_pnl'] > 0]) / len(symbol_trades)
-                }
-        
-        # Calculate robust performance metrics
-        if results['trades']:
-            total_return = (current_equity - initial_equity) / initial_equity
-            
-            # Annualized Sharpe ratio based on actual timeframe
-            if len(daily_returns) > 1:
-                returns_std = np.std(daily_returns)
-                avg_return = np.mean(daily_returns)
-                
-                # Annualization factor based on timeframe
-                if timeframe == "1D":
-                    periods_per_year = 252
-                elif timeframe == "1h":
-                    periods_per_year = 252 * 6.5  # Trading hours
-                else:
-                    periods_per_year = 252  # Default
-                
-                sharpe_ratio = (avg_return / returns_std) * np.sqrt(periods_per_year) if returns_std > 0 else 0
-            else:
-                sharpe_ratio = 0
-            
-            win_rate = winning_trades / total_trades
-            avg_win = np.mean([t['trade_pnl'] for t in results['trades'] if t['trade_pnl'] > 0]) if winning_trades > 0 else 0
-            avg_loss = np.mean([t['trade_pnl'] for t in results['trades'] if t['trade_pnl'] < 0]) if (total_trades - winning_trades) > 0 else 0
-            profit_factor = abs(avg_win * winning_trades / (abs(avg_loss) * (total_trades - winning_trades))) if avg_loss != 0 and (total_trades - winning_trades) > 0 else float('inf')
-            
-            results['metrics'] = {
-                'initial_equity': initial_equity,
-                'final_equity': current_equity,
-                'total_return': total_return,
-                'total_trades': total_trades,
-                'winning_trades': winning_trades,
-                'losing_trades': total_trades - winning_trades,
-                'win_rate': win_rate,
-                'avg_win': avg_win,
-                'avg_loss': avg_loss,
-                'profit_factor': profit_factor,
-                'max_drawdown': max_drawdown,
-                'sharpe_ratio': sharpe_ratio,
-                'avg_holding_days': np.mean([t['holding_days'] for t in results['trades']]),
-                'max_concurrent_positions': max_positions,
-                'symbols_tested': len(symbol_data)
-            }
-        else:
-            results['metrics'] = {
-                'initial_equity': initial_equity,
-                'final_equity': current_equity,
-                'total_return': 0,
-                'total_trades': 0,
-                'winning_trades': 0,
-                'losing_trades': 0,
-                'win_rate': 0,
-                'avg_win': 0,
-                'avg_loss': 0,
-                'profit_factor': 0,
-                'max_drawdown': 0,
-                'sharpe_ratio': 0,
-                'avg_holding_days': 0,
-                'max_concurrent_positions': max_positions,
-                'symbols_tested': len(symbol_data)
-            }
-        
-        return results
-        
-    except Exception as e:
-        return {'error': str(e), 'trades': [], 'metrics': {}, 'symbol_performance': {}}
+        if fill_resolution:
+            config['fill_resolution'] = True
+        results = run_backtest_cached(config, on_signal=on_signal)
+    else:
+        resolve_fill = IntrabarResolver(timeframe, start_date, end_date) if fill_resolution else None
+        results = run_backtest_vectorized(symbols, start_date, end_date, timeframe, initial_equity,
+                                          risk_per_trade, stop_atr_mult, min_score, on_signal=on_signal,
+                                          resolve_fill=resolve_fill)
+    if signals:
+        results['alert_signals'] = len(signals)
+        results['alert_email'] = user_email
+        results['alert_emails_queued'] = queue_backtest_alert_digest(signals, user_email)
+    return results
 
 def convert_numpy_types(obj):
     """Convert numpy types to native Python types for JSON serialization"""
@@ -3681,82 +3417,139 @@ def convert_numpy_types(obj):
         return [convert_numpy_types(item) for item in obj]
     return obj
 
-def save_backtest_result(name: str, config: Dict[str, Any], results: Dict[str, Any]) -> bool:
-    """Save backtest results to database"""
-    try:
-        # Convert numpy types to native Python types
-        config = convert_numpy_types(config)  # type: ignore
-        results = convert_numpy_types(results)  # type: ignore
-        
-        # Extract metrics from results
-        metrics = results.get('metrics', {})
-        
-        query = """
+# Saved backtests: the backtesting_results row holds the summary (metrics, per-symbol
+# stats) and backtest_result_details the compressed columnar trades / equity curves
+# (market_scanner.btstore), so the history list never loads or parses those.
+BACKTEST_SUMMARY_COLUMNS = """
+    id, backtest_name, start_date, end_date, symbols, total_trades, winning_trades,
+    losing_trades, total_return, sharpe_ratio, max_drawdown, parameters, created_at
+"""
+
+def init_backtest_details_table():
+    """Create backtest_result_details table if it doesn't exist"""
+    execute_db_write("""
+    CREATE TABLE IF NOT EXISTS backtest_result_details (
+        backtest_id INTEGER PRIMARY KEY,
+        payload_format SMALLINT NOT NULL,
+        payload BYTEA NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+def _parse_json_field(value: Any) -> Dict[str, Any]:
+    """JSON column as a dict (handles both string and already-parsed values)"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+def store_backtest_result(name: str, config: Dict[str, Any], results: Dict[str, Any]) -> bool:
+    """Save backtest results to database; raises on errors (no Streamlit calls, so job threads can use it)"""
+    # Trades and equity curves go to the compressed payload, the rest to results_data
+    summary, payload = pack_results(results)
+    
+    # Convert numpy types to native Python types
+    config = convert_numpy_types(config)  # type: ignore
+    summary = convert_numpy_types(summary)  # type: ignore
+    
+    # Extract metrics from results
+    metrics = summary.get('metrics', {})
+    
+    # One statement, so the summary row and its payload are saved together
+    query = """
+        WITH saved AS (
             INSERT INTO backtesting_results (
                 backtest_name, start_date, end_date, symbols, total_trades, 
                 winning_trades, losing_trades, total_return, sharpe_ratio, 
                 max_drawdown, parameters, results_data, created_at
             ) 
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
-        """
-        
-        params = (
-            name,
-            config.get('start_date'),
-            config.get('end_date'), 
-            config.get('symbols', []),
-            int(metrics.get('total_trades', 0)),
-            int(metrics.get('winning_trades', 0)),
-            int(metrics.get('losing_trades', 0)),
-            float(metrics.get('total_return', 0)),
-            float(metrics.get('sharpe_ratio', 0)) if metrics.get('sharpe_ratio') is not None else None,
-            float(metrics.get('max_drawdown', 0)),
-            json.dumps(config, default=str),
-            json.dumps(results, default=str)
+            RETURNING id
         )
-        
-        result = execute_db_write(query, params)
-        return result is not None and result > 0
+        INSERT INTO backtest_result_details (backtest_id, payload_format, payload)
+        SELECT id, %s, %s FROM saved
+        RETURNING backtest_id
+    """
+    
+    params = (
+        name,
+        config.get('start_date'),
+        config.get('end_date'), 
+        config.get('symbols', []),
+        int(metrics.get('total_trades', 0)),
+        int(metrics.get('winning_trades', 0)),
+        int(metrics.get('losing_trades', 0)),
+        float(metrics.get('total_return', 0)),
+        float(metrics.get('sharpe_ratio', 0)) if metrics.get('sharpe_ratio') is not None else None,
+        float(metrics.get('max_drawdown', 0)),
+        json.dumps(config, default=str),
+        json.dumps(summary, default=str),
+        PAYLOAD_FORMAT,
+        psycopg2.Binary(payload)
+    )
+    
+    result = execute_db_write_returning(query, params)
+    return bool(result)
+
+def save_backtest_result(name: str, config: Dict[str, Any], results: Dict[str, Any]) -> bool:
+    """Save backtest results to database"""
+    try:
+        return store_backtest_result(name, config, results)
     except Exception as e:
         st.error(f"Error saving backtest result: {str(e)}")
         return False
 
-def get_backtest_results() -> List[Dict[str, Any]]:
-    """Get all saved backtest results"""
-    query = "SELECT * FROM backtesting_results ORDER BY created_at DESC"
-    result = execute_db_query(query)
+def get_backtest_results(limit: int = 10) -> List[Dict[str, Any]]:
+    """Most recent saved backtests - summary columns only (see get_backtest_details)"""
+    query = f"SELECT {BACKTEST_SUMMARY_COLUMNS} FROM backtesting_results ORDER BY created_at DESC LIMIT %s"
+    result = execute_db_query(query, (limit,))
     if result:
         for r in result:
-            # Parse JSON fields safely (handle both string and already-parsed dict)
-            if r['parameters']:
-                if isinstance(r['parameters'], str):
-                    try:
-                        r['parameters'] = json.loads(r['parameters'])
-                    except json.JSONDecodeError:
-                        r['parameters'] = {}
-                elif not isinstance(r['parameters'], dict):
-                    r['parameters'] = {}
-            else:
-                r['parameters'] = {}
-            
-            if r['results_data']:
-                if isinstance(r['results_data'], str):
-                    try:
-                        r['results_data'] = json.loads(r['results_data'])
-                    except json.JSONDecodeError:
-                        r['results_data'] = {}
-                elif not isinstance(r['results_data'], dict):
-                    r['results_data'] = {}
-            else:
-                r['results_data'] = {}
+            r['parameters'] = _parse_json_field(r['parameters'])
+            total_trades = r['total_trades'] or 0
             
             # Keep config and results for backward compatibility
             r['config'] = r['parameters']
-            r['results'] = r['results_data']
+            r['results'] = {'metrics': {
+                'total_trades': total_trades,
+                'winning_trades': r['winning_trades'] or 0,
+                'losing_trades': r['losing_trades'] or 0,
+                'win_rate': (r['winning_trades'] or 0) / total_trades if total_trades else 0,
+                'total_return': float(r['total_return'] or 0),
+                'sharpe_ratio': float(r['sharpe_ratio'] or 0),
+                'max_drawdown': float(r['max_drawdown'] or 0),
+            }}
     return result if result else []
 
-def create_backtest_chart(results: Dict[str, Any]) -> Optional[go.Figure]:
-    """Create backtest performance chart"""
+@st.cache_data(show_spinner=False, ttl=3600)
+def get_backtest_details(backtest_id: int) -> Dict[str, Any]:
+    """Full saved result (trades, equity curves, metrics) of one backtest, loaded on demand"""
+    query = """
+        SELECT r.results_data, d.payload
+        FROM backtesting_results r
+        LEFT JOIN backtest_result_details d ON d.backtest_id = r.id
+        WHERE r.id = %s
+    """
+    result = execute_db_query(query, (backtest_id,))
+    if not result:
+        return {}
+    row = result[0]
+    summary = _parse_json_field(row['results_data'])
+    if row['payload'] is None:
+        # Saved before the columnar payload: results_data is the whole result
+        return summary
+    return unpack_results(summary, bytes(row['payload']))
+
+# Initialize backtest details table on startup
+try:
+    init_backtest_details_table()
+except:
+    pass
+
+def create_backtest_chart(results: Dict[str, Any], mc: Optional[Dict[str, Any]] = None) -> Optional[go.Figure]:
+    """Create backtest performance chart (with Monte Carlo percentile bands when mc is given)"""
     if not results.get('equity_curve'):
         return None
     
@@ -3783,6 +3576,25 @@ def create_backtest_chart(results: Dict[str, Any]) -> Optional[go.Figure]:
         row=1, col=1
     )
     
+    # Mark-to-market equity (open positions valued every bar), when the engine provides it
+    mtm = results.get('mark_to_market')
+    if mtm and mtm.get('equity_curve'):
+        mtm_df = pd.DataFrame(mtm['equity_curve'])
+        fig.add_trace(go.Scatter(x=mtm_df['date'], y=mtm_df['equity'], mode='lines', name='Mark-to-Market Equity',
+                                 line=dict(color='#FBBF24', width=1)), row=1, col=1)
+    
+    # Monte Carlo equity bands (5-95% and 25-75%) plus the median path, drawn after each trade's exit
+    if mc and not mc.get('error'):
+        bands = mc['bands']
+        for low, high, label, opacity in (('p5', 'p95', 'MC 5-95%', 0.12), ('p25', 'p75', 'MC 25-75%', 0.22)):
+            fig.add_trace(go.Scatter(x=bands['date'], y=bands[high], mode='lines', line=dict(width=0),
+                                     showlegend=False, hoverinfo='skip'), row=1, col=1)
+            fig.add_trace(go.Scatter(x=bands['date'], y=bands[low], mode='lines', line=dict(width=0),
+                                     fill='tonexty', fillcolor=f'rgba(99, 102, 241, {opacity})', name=label),
+                          row=1, col=1)
+        fig.add_trace(go.Scatter(x=bands['date'], y=bands['p50'], mode='lines', name='MC Median',
+                                 line=dict(color='#818CF8', width=1, dash='dash')), row=1, col=1)
+    
     # Trade P&L bars
     colors = ['green' if pnl >= 0 else 'red' for pnl in equity_df['trade_pnl']]
     fig.add_trace(
@@ -3811,6 +3623,233 @@ def create_backtest_chart(results: Dict[str, Any]) -> Optional[go.Figure]:
     
     return fig
 
+def render_backtest_results(results: Dict[str, Any]) -> None:
+    """Metrics, charts, Monte Carlo, breakdowns and trade log of a finished backtest"""
+    if results.get('cache_hit'):
+        st.caption("⚡ Same config and data as an earlier run - results loaded from the backtest cache")
+    if results.get('alert_emails_queued'):
+        st.info(f"📧 {results['alert_signals']} BUY/SELL signals queued - "
+                f"{results['alert_emails_queued']} digest email(s) will be sent to {results.get('alert_email', '')} "
+                f"in the background")
+    fills = results.get('fill_resolution')
+    if fills:
+        st.caption(f"🔬 Intrabar fills: drilled {fills['drilled_bars']} ambiguous bars into "
+                   f"{fills['lower_timeframe']} data ({fills['stop_first']} stop filled first, "
+                   f"{fills['stop_not_reached']} stop not reached, "
+                   f"{fills.get('gapped_through', fills.get('gap_fills', 0))} gapped through the stop (filled at the stop), "
+                   f"{fills['unresolved']} unresolved)")
+        outside = fills.get('outside_history', 0)
+        if outside:
+            st.warning(f"🔬 {outside} of the {fills['unresolved']} unresolved bars predate {fills['history_start']}: "
+                       f"{fills['lower_timeframe']} history isn't available that far back, so they kept the "
+                       f"bar-level rule (stop before score/time exit)")
+        if fills['unresolved'] > outside:
+            st.caption(f"🔬 {fills['unresolved'] - outside} unresolved bars had no {fills['lower_timeframe']} data "
+                       f"(fetch failed or no finer bars inside the bar)")
+
+    # Display results
+    metrics = results['metrics']
+
+    # Performance metrics
+    col1, col2, col3, col4, col5 = st.columns(5)
+
+    with col1:
+        total_return = metrics.get('total_return', 0) * 100
+        delta_color = "normal" if total_return >= 0 else "inverse"
+        st.metric("Total Return", f"{total_return:.1f}%", delta_color=delta_color)
+
+    with col2:
+        win_rate = metrics.get('win_rate', 0) * 100
+        st.metric("Win Rate", f"{win_rate:.1f}%")
+
+    with col3:
+        sharpe = metrics.get('sharpe_ratio', 0)
+        st.metric("Sharpe Ratio", f"{sharpe:.2f}")
+
+    with col4:
+        max_dd = metrics.get('max_drawdown', 0) * 100
+        st.metric("Max Drawdown", f"{max_dd:.1f}%")
+
+    with col5:
+        total_trades = metrics.get('total_trades', 0)
+        st.metric("Total Trades", total_trades)
+
+    # Mark-to-market metrics - every bar, open positions at their closing price
+    mtm_metrics = results.get('mark_to_market', {}).get('metrics')
+    if mtm_metrics:
+        st.caption("Mark-to-market (every bar, open positions valued at the close):")
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            st.metric("Sharpe (MTM)", f"{mtm_metrics['sharpe_ratio']:.2f}")
+        with col2:
+            st.metric("Sortino (MTM)", f"{mtm_metrics['sortino_ratio']:.2f}")
+        with col3:
+            st.metric("Max Drawdown (MTM)", f"{mtm_metrics['max_drawdown']*100:.1f}%")
+        with col4:
+            st.metric("Avg Exposure", f"{mtm_metrics['avg_exposure']*100:.0f}%",
+                      help=f"Time in market: {mtm_metrics['time_in_market']*100:.0f}%")
+        with col5:
+            st.metric("Turnover (x/yr)", f"{mtm_metrics['turnover']:.1f}")
+
+    # Performance chart (Monte Carlo seeded from the trades, so reruns show the same bands)
+    mc_equity = metrics.get('initial_equity', 10000)
+    mc = monte_carlo(results['trades'], mc_equity, MONTE_CARLO_SIMULATIONS,
+                     seed=trades_seed(results['trades'], mc_equity))
+    chart_fig = create_backtest_chart(results, mc)
+    if chart_fig:
+        st.plotly_chart(chart_fig, width='stretch')
+
+    # Monte Carlo robustness - how much of the result depends on the trade order / luck
+    with st.expander("🎲 Monte Carlo Robustness", expanded=False):
+        mc_summary = mc['summary']
+        st.caption(f"{mc_summary['simulations']:,} bootstrap resamples of the "
+                   f"{mc_summary['trades']} trades (drawn with replacement, compounded)")
+        mc_col1, mc_col2, mc_col3, mc_col4 = st.columns(4)
+        with mc_col1:
+            st.metric("Median Return", f"{mc_summary['return_p50']*100:.1f}%")
+            st.caption(f"5-95%: {mc_summary['return_p5']*100:.1f}% to {mc_summary['return_p95']*100:.1f}%")
+        with mc_col2:
+            st.metric("95th pct Max DD", f"{mc_summary['max_drawdown_p95']*100:.1f}%")
+            st.caption(f"Median: {mc_summary['max_drawdown_p50']*100:.1f}%")
+        with mc_col3:
+            st.metric("Probability of Loss", f"{mc_summary['prob_loss']*100:.1f}%")
+        with mc_col4:
+            st.metric("Risk of 50% DD", f"{mc_summary['prob_ruin']*100:.2f}%")
+        mc_fig = make_subplots(rows=1, cols=2, subplot_titles=['Final Return (%)', 'Max Drawdown (%)'])
+        mc_fig.add_trace(go.Histogram(x=mc['final_returns'] * 100, nbinsx=60, name='Return',
+                                      marker_color='#00D4AA'), row=1, col=1)
+        mc_fig.add_trace(go.Histogram(x=mc['max_drawdowns'] * 100, nbinsx=60, name='Max DD',
+                                      marker_color='#F87171'), row=1, col=2)
+        mc_fig.update_layout(height=300, showlegend=False, template="plotly_dark",
+                             paper_bgcolor='#1E293B', plot_bgcolor='#1E293B')
+        st.plotly_chart(mc_fig, width='stretch')
+
+    # Detailed metrics
+    with st.expander("📈 Detailed Performance Metrics", expanded=False):
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown("**Trade Statistics:**")
+            st.write(f"• Total Trades: {metrics.get('total_trades', 0)}")
+            st.write(f"• Winning Trades: {metrics.get('winning_trades', 0)}")
+            st.write(f"• Losing Trades: {metrics.get('losing_trades', 0)}")
+            st.write(f"• Win Rate: {metrics.get('win_rate', 0)*100:.1f}%")
+            st.write(f"• Average Holding Days: {metrics.get('avg_holding_days', 0):.1f}")
+
+        with col2:
+            st.markdown("**Financial Metrics:**")
+            st.write(f"• Initial Equity: ${metrics.get('initial_equity', 0):,.2f}")
+            st.write(f"• Final Equity: ${metrics.get('final_equity', 0):,.2f}")
+            st.write(f"• Average Win: ${metrics.get('avg_win', 0):,.2f}")
+            st.write(f"• Average Loss: ${metrics.get('avg_loss', 0):,.2f}")
+            st.write(f"• Profit Factor: {metrics.get('profit_factor', 0):.2f}")
+
+    # Symbol performance breakdown
+    symbol_perf = results.get('symbol_performance', {})
+    if symbol_perf and len(symbol_perf) > 0:
+        with st.expander("📊 Symbol Performance Breakdown", expanded=True):
+            symbol_perf_data = []
+            for symbol, perf in symbol_perf.items():
+                symbol_perf_data.append({
+                    'Symbol': symbol,
+                    'Trades': perf.get('total_trades', 0),
+                    'Win Rate': f"{perf.get('win_rate', 0)*100:.1f}%",
+                    'Total P&L': f"${perf.get('total_pnl', 0):,.2f}",
+                    'Avg Return': f"{perf.get('avg_return', 0)*100:.2f}%"
+                })
+
+            if symbol_perf_data:
+                symbol_df = pd.DataFrame(symbol_perf_data)
+                st.table(symbol_df)
+
+    # Trade log
+    trades_list = results.get('trades', [])
+    if trades_list and len(trades_list) > 0:
+        with st.expander("📋 Trade Log", expanded=True):
+            trades_df = pd.DataFrame(trades_list)
+
+            if 'entry_date' in trades_df.columns:
+                trades_df['entry_date'] = pd.to_datetime(trades_df['entry_date']).dt.strftime('%Y-%m-%d')
+            if 'exit_date' in trades_df.columns:
+                trades_df['exit_date'] = pd.to_datetime(trades_df['exit_date']).dt.strftime('%Y-%m-%d')
+            if 'trade_return' in trades_df.columns:
+                trades_df['trade_return'] = (trades_df['trade_return'] * 100).round(2)
+            if 'trade_pnl' in trades_df.columns:
+                trades_df['trade_pnl'] = trades_df['trade_pnl'].round(2)
+
+            display_cols = ['symbol', 'direction', 'entry_date', 'exit_date', 'entry_price', 'exit_price', 'trade_return', 'trade_pnl', 'exit_reason']
+            available_cols = [col for col in display_cols if col in trades_df.columns]
+            st.table(trades_df[available_cols])
+
+    # Errors if any
+    if results.get('errors'):
+        with st.expander("⚠️ Backtest Errors", expanded=False):
+            for error in results['errors']:
+                st.write(f"• {error}")
+
+BACKTEST_PHASE_LABELS = {
+    "queued": "Waiting for a worker", "loading": "Loading bars", "featurizing": "Computing features",
+    "simulating": "Simulating", "saving": "Saving results",
+}
+
+def submit_backtest_job(name: str, config: Dict[str, Any], alert_email: Optional[str] = None):
+    """
+    Run a backtest as a background job (see market_scanner.btjobs).
+
+    The finished result is saved with store_backtest_result - so it shows up in
+    the history from any session - and its signals, if alerts are enabled,
+    are queued as a digest for the background sender.
+    """
+    # Session state isn't available on the worker thread; capture what on_finish needs now
+    workspace_id = st.session_state.get('workspace_id')
+    alert_jobs = start_backtest_alert_sender() if alert_email else None
+    signals: List[Dict[str, Any]] = []
+
+    def on_finish(job) -> Optional[bool]:
+        results = job.result
+        if signals:
+            results['alert_signals'] = len(signals)
+            results['alert_email'] = alert_email
+            results['alert_emails_queued'] = enqueue_digest(alert_jobs, signals, alert_email, workspace_id, name)
+        if not results.get('trades'):
+            return None
+        # Worker thread: no st.* calls here - a raised error comes back as job.save_error
+        return store_backtest_result(name, config, results)
+
+    return submit_backtest(name, config, on_finish, owner=workspace_id,
+                           on_signal=collect_signals(signals) if alert_email else None,
+                           reuse_results=BACKTEST_CACHE)
+
+@st.fragment(run_every=1)
+def backtest_job_progress(job_id: str) -> None:
+    """Live phase progress of a running job; reruns the page once it finishes"""
+    job = get_job(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    label = BACKTEST_PHASE_LABELS.get(job.phase, job.phase)
+    counts = f" ({job.done}/{job.total})" if job.total else ""
+    st.progress(job.fraction, text=f"⏳ {job.name}: {label}{counts}")
+    if st.button("✖ Cancel Backtest", key=f"cancel_backtest_{job.id}"):
+        cancel_job(job.id)
+
+def show_backtest_job(job) -> None:
+    """Outcome of a finished backtest job"""
+    results = job.result or {}
+    if job.status == "cancelled":
+        st.warning(f"Backtest '{job.name}' was cancelled")
+    elif job.status == "failed":
+        st.error(f"Backtest failed: {job.error}")
+    elif not results.get('trades'):
+        st.warning("No trades generated. Try lowering the minimum score threshold or adjusting the date range.")
+    else:
+        if job.saved:
+            st.success(f"Backtest '{job.name}' completed and saved!")
+        elif job.save_error:
+            st.warning(f"Backtest completed but failed to save to database: {job.save_error}")
+        else:
+            st.warning("Backtest completed but failed to save to database")
+        render_backtest_results(results)
+
 # ================= Portfolio Management =================
 
 def add_portfolio_position(symbol: str, quantity: float, price: float, transaction_type: str = "BUY", notes: str = "") -> bool:
@@ -4018,7 +4057,7 @@ def fetch_all_coingecko_prices() -> dict:
         # Batch all coin IDs into one request
         all_coin_ids = ','.join(COINGECKO_SYMBOL_MAP.values())
         url = f"https://api.coingecko.com/api/v3/simple/price?ids={all_coin_ids}&vs_currencies=usd"
-        response = requests.get(url, timeout=15)
+        response = HTTP.get(url, timeout=15)
         
         if response.status_code == 200:
             data = response.json()
@@ -4058,7 +4097,7 @@ def get_price_from_coingecko(symbol: str) -> Optional[float]:
             coin_id = base.lower()
         
         url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=usd"
-        response = requests.get(url, timeout=10)
+        response = HTTP.get(url, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -4074,6 +4113,12 @@ def get_price_from_coingecko(symbol: str) -> Optional[float]:
 def get_current_price_portfolio(symbol: str) -> Optional[float]:
     """Get current price for portfolio calculations with robust fallbacks - returns USD normalized price"""
     
+    # Streamed quote when there is a current one (native currency, so AUD pairs still convert)
+    streamed = QUOTE_BOARD.get(symbol)
+    if streamed is not None:
+        return streamed * get_aud_to_usd_rate() if symbol.endswith('-AUD') else streamed
+    QUOTE_BOARD.watch([symbol])
+    
     # Determine if this is a crypto symbol (contains dash like BTC-USD, JUP-USD, etc.)
     is_crypto = '-' in symbol and symbol.split('-')[1] in ['USD', 'AUD', 'USDT', 'BUSD']
     
@@ -4476,6 +4521,7 @@ def get_subscription_plans():
         st.error(f"Error fetching subscription plans: {str(e)}")
         return []
 
+@ACCOUNT_MEMO.memoize
 def get_workspace_subscription(workspace_id: str):
     """Get active subscription for a workspace (includes cancelled subs still in billing period)"""
     try:
@@ -4490,10 +4536,12 @@ def get_workspace_subscription(workspace_id: str):
             LIMIT 1
         """
         result = execute_db_query(query, (workspace_id,))
-        return result[0] if result and len(result) > 0 else None
     except Exception as e:
         st.error(f"Error fetching subscription: {str(e)}")
-        return None
+        raise Uncacheable(None)
+    if result is None:
+        raise Uncacheable(None)   # query failed: show no subscription now, retry next rerun
+    return result[0] if len(result) > 0 else None
 
 def create_subscription(workspace_id: str, plan_code: str, platform: str, billing_period: str = 'monthly'):
     """Create a new subscription for a workspace (DEMO ONLY - requires payment integration)"""
@@ -4528,6 +4576,7 @@ def create_subscription(workspace_id: str, plan_code: str, platform: str, billin
         """
         
         result = execute_db_write_returning(insert_query, (workspace_id, plan_id, platform, billing_period))
+        ACCOUNT_MEMO.invalidate(workspace_id)
         if not result or len(result) == 0:
             return False, "Failed to create subscription"
         
@@ -4557,6 +4606,7 @@ def cancel_subscription(workspace_id: str):
         """
         
         result = execute_db_write_returning(update_query, (workspace_id,))
+        ACCOUNT_MEMO.invalidate(workspace_id)
         
         if result and len(result) > 0:
             subscription_id = result[0]['id']
@@ -4600,7 +4650,6 @@ def validate_apple_iap_receipt(receipt_data: str, product_id: str, transaction_i
     """Validate Apple IAP receipt with Apple's servers"""
     try:
         import base64
-        import requests
         
         # Apple IAP Receipt Validation Endpoint
         # Use sandbox for development, production for live app
@@ -4613,7 +4662,7 @@ def validate_apple_iap_receipt(receipt_data: str, product_id: str, transaction_i
             "exclude-old-transactions": True
         }
         
-        response = requests.post(apple_endpoint, json=receipt_payload, timeout=30)
+        response = HTTP.post(apple_endpoint, json=receipt_payload, timeout=30)
         
         if response.status_code != 200:
             return False, "Apple server error"
@@ -4716,6 +4765,28 @@ if 'workspace_id' not in st.session_state:
 
 # ================= CROSS-SYSTEM AUTHENTICATION =================
 # Check Next.js auth cookie and sync with Streamlit
+# Session lookups are cached per cookie (stale-while-revalidate), so reruns don't call the API
+@st.cache_resource
+def get_nextjs_session_cache() -> StaleWhileRevalidateCache:
+    """Process-wide session cache (a plain module global would be rebuilt empty on every rerun)"""
+    return StaleWhileRevalidateCache("nextjs-session", ttl=float(os.getenv("SESSION_AUTH_TTL", "120")), first_wait=3.0)
+
+def _fetch_nextjs_session(ms_auth: str) -> Tuple[Optional[str], Optional[str]]:
+    """(workspace_id, tier) from the Next.js session API; raises on timeouts and server errors"""
+    response = HTTP.get(
+        'https://www.marketscannerpros.app/api/auth/session',
+        headers={'Cookie': f'ms_auth={ms_auth}'},
+        timeout=3
+    )
+    
+    if response.status_code == 200:
+        data = response.json()
+        if data.get('authenticated'):
+            return data.get('workspaceId'), data.get('tier')
+    elif response.status_code >= 500 or response.status_code == 429:
+        raise RuntimeError(f"Session API HTTP {response.status_code}")
+    return None, None
+
 def check_nextjs_auth():
     """Check if user is authenticated via Next.js (marketscannerpros.app)"""
     try:
@@ -4728,18 +4799,7 @@ def check_nextjs_auth():
             for cookie in cookie_header.split(';'):
                 if 'ms_auth=' in cookie:
                     ms_auth = cookie.split('ms_auth=')[1].strip()
-                    
-                    # Call Next.js API to verify and get user info
-                    response = requests.get(
-                        'https://www.marketscannerpros.app/api/auth/session',
-                        headers={'Cookie': f'ms_auth={ms_auth}'},
-                        timeout=3
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data.get('authenticated'):
-                            return data.get('workspaceId'), data.get('tier')
+                    return get_nextjs_session_cache().get(ms_auth, lambda: _fetch_nextjs_session(ms_auth), default=(None, None))
         
         return None, None
     except Exception:
@@ -4752,8 +4812,8 @@ if nextjs_workspace_id and nextjs_tier:
     st.session_state.workspace_id = nextjs_workspace_id
     st.session_state.device_fingerprint = nextjs_workspace_id
     
-    # Set subscription override
-    if nextjs_tier != 'free':
+    # Set subscription override (reruns find it already in place and skip the write)
+    if nextjs_tier != 'free' and get_subscription_override(nextjs_workspace_id) != nextjs_tier:
         set_subscription_override(nextjs_workspace_id, nextjs_tier, "nextjs_auth", None)
     
     # Update URL
@@ -4765,6 +4825,9 @@ if workspace_id_for_tier and isinstance(workspace_id_for_tier, str):
     current_tier = get_user_tier_from_subscription(workspace_id_for_tier)
     if current_tier and current_tier != st.session_state.user_tier:
         st.session_state.user_tier = current_tier
+        # Tier changed: drop the cached entitlements so the next lookup sees it
+        if hasattr(auth, 'refresh'):
+            auth.refresh()
         # Optional: Show upgrade success message
         if current_tier in ['pro', 'pro_trader']:
             st.success(f"🎉 {current_tier.replace('_', ' ').title()} subscription active!")
@@ -5491,40 +5554,6 @@ elif current_tier == 'pro_trader':
             
             st.caption("Questions? Contact support@marketscannerpros.app")
 
-# Top 100 Equities by market cap
-TOP_100_EQUITIES = [
-    "AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "TSLA", "BRK-B", "LLY", "V",
-    "UNH", "XOM", "JPM", "JNJ", "WMT", "MA", "PG", "AVGO", "HD", "ORCL",
-    "COST", "ABBV", "MRK", "KO", "PEP", "CSCO", "NFLX", "ACN", "CRM", "AMD",
-    "ADBE", "TMO", "LIN", "MCD", "INTC", "ABT", "DIS", "NKE", "DHR", "VZ",
-    "TXN", "QCOM", "CMCSA", "PM", "INTU", "UNP", "AMGN", "NEE", "AMAT", "HON",
-    "RTX", "LOW", "SPGI", "UPS", "CAT", "ISRG", "ELV", "IBM", "GE", "BA",
-    "SBUX", "PLD", "CVX", "DE", "GILD", "BLK", "MDT", "TJX", "BKNG", "ADI",
-    "AXP", "SYK", "MDLZ", "VRTX", "MMC", "PGR", "LRCX", "REGN", "AMT", "CI",
-    "SCHW", "ADP", "NOW", "TMUS", "PANW", "MO", "C", "PYPL", "CB", "ZTS",
-    "GS", "SO", "BSX", "ETN", "FI", "MS", "ABNB", "DUK", "MU", "ANET"
-]
-
-# Mid-Cap Stocks ($2B - $10B market cap)
-MID_CAP_STOCKS = [
-    "PLTR", "DDOG", "CRWD", "SNOW", "NET", "ZS", "DKNG", "RIVN", "LCID", "RBLX",
-    "DASH", "COIN", "MELI", "TEAM", "ZM", "OKTA", "DOCU", "TWLO", "SQ", "SHOP",
-    "ROKU", "LYFT", "UBER", "PINS", "SNAP", "SPOT", "MRNA", "BILL", "CPNG", "ABNB",
-    "FTNT", "WDAY", "VEEV", "SPLK", "MDB", "HUBS", "FSLY", "CFLT", "ESTC", "DELL",
-    "HPE", "WDC", "SMCI", "HPQ", "GLW", "ON", "KEYS", "ANSS", "SNPS", "CDNS",
-    "EXPE", "EBAY", "ETSY", "W", "BABA", "JD", "PDD", "BIDU", "NIO", "LI"
-]
-
-# Small-Cap Stocks ($250M - $2B market cap)
-SMALL_CAP_STOCKS = [
-    "UPST", "OPEN", "SOFI", "HOOD", "AFRM", "BROS", "CAVA", "FVRR", "ASAN", "PATH",
-    "SOUN", "AI", "BBAI", "IONQ", "RGTI", "QUBT", "DNA", "PACB", "CRSP", "NTLA",
-    "BEAM", "EDIT", "VERV", "BLUE", "FATE", "RPTX", "CMPS", "MNDY", "S", "GTLB",
-    "PCOR", "NCNO", "JAMF", "FROG", "ALKT", "AUR", "FOUR", "BL", "YOU", "RPD",
-    "MTTR", "WK", "RAMP", "TOST", "CVNA", "VSCO", "FSLR", "ENPH", "SEDG", "RUN",
-    "NOVA", "CASY", "JAZZ", "INCY", "EXAS", "TECH", "NTRA", "RGEN", "SRPT", "VRTX"
-]
-
 # Quick scan options for equities
 scan_option = st.sidebar.radio(
     "📊 Equity Scan Options:",
@@ -5562,41 +5591,6 @@ eq_input = st.sidebar.text_area("Enter symbols (one per line):",
 
 st.sidebar.header("Crypto Symbols (BTC-USD style)")
 
-# Top 100 Crypto by market cap
-TOP_100_CRYPTO = [
-    "BTC-USD", "ETH-USD", "USDT-USD", "BNB-USD", "SOL-USD", "USDC-USD", "XRP-USD", 
-    "DOGE-USD", "ADA-USD", "TRX-USD", "AVAX-USD", "SHIB-USD", "DOT-USD", "LINK-USD",
-    "BCH-USD", "NEAR-USD", "MATIC-USD", "LTC-USD", "UNI-USD", "PEPE-USD",
-    "ICP-USD", "APT-USD", "FET-USD", "STX-USD", "ARB-USD", "ATOM-USD", "FIL-USD",
-    "ETC-USD", "HBAR-USD", "VET-USD", "MNT-USD", "IMX-USD", "OP-USD", "RNDR-USD",
-    "INJ-USD", "SUI-USD", "GRT-USD", "RUNE-USD", "SEI-USD", "ALGO-USD", "SAND-USD",
-    "AAVE-USD", "FLR-USD", "TIA-USD", "XLM-USD", "THETA-USD", "AXS-USD", "MANA-USD",
-    "KAS-USD", "FTM-USD", "FLOW-USD", "XTZ-USD", "CHZ-USD", "EGLD-USD", "KAVA-USD",
-    "GALA-USD", "NEO-USD", "EOS-USD", "MINA-USD", "ROSE-USD", "QNT-USD", "MASK-USD",
-    "1INCH-USD", "CRV-USD", "ZIL-USD", "ENJ-USD", "BAT-USD", "COMP-USD", "ZRX-USD",
-    "SUSHI-USD", "SNX-USD", "YFI-USD", "UMA-USD", "BAL-USD", "REN-USD", "KNC-USD",
-    "LRC-USD", "OCEAN-USD", "STORJ-USD", "ANKR-USD", "NKN-USD", "CVC-USD", "SKL-USD",
-    "OMG-USD", "BAND-USD", "COTI-USD", "REQ-USD", "RLC-USD", "NMR-USD", "GNO-USD",
-    "AMP-USD", "POLY-USD", "MLN-USD", "BNT-USD", "FORTH-USD", "CTSI-USD", "API3-USD"
-]
-
-# Crypto Coins Ranked 100-300 by Market Cap (Mid & Small Cap Alts)
-CRYPTO_100_300 = [
-    "STRK-USD", "ORDI-USD", "BONK-USD", "WIF-USD", "BRETT-USD", "FLOKI-USD", "JASMY-USD", "PENDLE-USD",
-    "PYTH-USD", "NEXO-USD", "AIOZ-USD", "BLUR-USD", "DYDX-USD", "GMT-USD", "CFX-USD", "XEC-USD",
-    "ONDO-USD", "SUPER-USD", "CAKE-USD", "KLAY-USD", "WOO-USD", "LDO-USD", "AGIX-USD", "LUNC-USD",
-    "C98-USD", "GMX-USD", "AUDIO-USD", "GLM-USD", "SPELL-USD", "HOT-USD", "SLP-USD", "QTUM-USD",
-    "RSR-USD", "GLMR-USD", "IOTX-USD", "HIVE-USD", "WIN-USD", "IOST-USD", "ACH-USD", "PAXG-USD",
-    "TFUEL-USD", "SFP-USD", "LEVER-USD", "ONT-USD", "SYN-USD", "LSK-USD", "DENT-USD", "SC-USD",
-    "SCRT-USD", "ARDR-USD", "STEEM-USD", "XEM-USD", "BORA-USD", "LPT-USD", "HIGH-USD", "MXC-USD",
-    "DOCK-USD", "POWR-USD", "SYS-USD", "TROY-USD", "VOXEL-USD", "ALICE-USD", "OGN-USD", "ACA-USD",
-    "MDX-USD", "PERP-USD", "RAY-USD", "RARE-USD", "POLS-USD", "VGX-USD", "BICO-USD", "ALPHA-USD",
-    "MOVR-USD", "ORN-USD", "PYR-USD", "TLM-USD", "IRIS-USD", "VITE-USD", "BURGER-USD", "ILV-USD",
-    "HARD-USD", "QUICK-USD", "FIDA-USD", "FIS-USD", "STMX-USD", "DATA-USD", "ADX-USD", "ERN-USD",
-    "GHST-USD", "PLA-USD", "BADGER-USD", "LOKA-USD", "CLV-USD", "TVK-USD", "FARM-USD", "PSG-USD",
-    "FORTH-USD", "DUSK-USD", "IDEX-USD", "MDT-USD", "SUN-USD", "AST-USD", "BETA-USD", "POND-USD"
-]
-
 # Crypto scan options
 crypto_scan_option = st.sidebar.radio(
     "📊 Crypto Scan Options:",
@@ -5630,32 +5624,24 @@ cx_input = st.sidebar.text_area("Enter symbols (one per line):",
 
 st.sidebar.header("🛢️ Commodities")
 
-# Commodities list
-COMMODITIES = [
-    "GC=F",    # Gold
-    "SI=F",    # Silver
-    "PL=F",    # Platinum
-    "PA=F",    # Palladium
-    "HG=F",    # Copper
-    "CL=F",    # Crude Oil WTI
-    "BZ=F",    # Brent Crude Oil
-    "NG=F",    # Natural Gas
-    "RB=F",    # Gasoline
-    "HO=F",    # Heating Oil
-    "ZC=F",    # Corn
-    "ZW=F",    # Wheat
-    "ZS=F",    # Soybeans
-    "KC=F",    # Coffee
-    "SB=F",    # Sugar
-    "CC=F",    # Cocoa
-    "CT=F",    # Cotton
-    "LBS=F",   # Lumber
-]
 
 # Commodities are always selected (controlled by top checkbox)
 selected_commodities = COMMODITIES
 st.sidebar.info(f"📊 {len(COMMODITIES)} commodities available")
 
+st.sidebar.header("⚡ Large-Universe Mode")
+use_large_universe = st.sidebar.checkbox("Enable Large-Universe Mode", value=False,
+                                         help="Scan large symbol lists (add .txt universes in MARKET_SCANNER_UNIVERSE_DIR) using the cached bar store, batched downloads and vectorized scoring")
+selected_universe_files = []
+if use_large_universe:
+    selected_universe_files = st.sidebar.multiselect(
+        "Add universes:",
+        options=sorted(UNIVERSES),
+        format_func=lambda name: f"{name} ({len(UNIVERSES[name][0])})",
+        key="large_universe_files"
+    )
+    st.sidebar.caption("Extra universes are loaded from .txt files in MARKET_SCANNER_UNIVERSE_DIR")
+
 # Show current symbol count for all users
 eq_text_count = len([s.strip() for s in eq_input.splitlines() if s.strip()])
 cx_text_count = len([s.strip() for s in cx_input.splitlines() if s.strip()])
@@ -5777,6 +5763,15 @@ with st.sidebar.expander("⚙️ Custom Scanner Settings", expanded=False):
 st.sidebar.header("Timeframes")
 tf_eq = st.sidebar.selectbox("Equity Timeframe:", ["1D","1h","30m","15m","5m"], index=0)
 tf_cx = st.sidebar.selectbox("Crypto Timeframe:", ["1h","4h","1D","15m","5m"], index=0)
+use_confluence = st.sidebar.checkbox("🧭 Multi-Timeframe Confluence", value=False,
+                                     help="Score every symbol on several timeframes from a single download and combine them")
+if use_confluence:
+    confluence_tfs = st.sidebar.multiselect("Confluence Timeframes:", ["15m", "30m", "1h", "4h", "1D"],
+                                            default=["1h", "4h", "1D"], key="confluence_tfs")
+    if len(confluence_tfs) < 2:
+        st.sidebar.warning("Pick at least two timeframes for confluence")
+    else:
+        st.sidebar.caption("Replaces the single timeframes above; fastest timeframe is downloaded, the rest are derived")
 
 st.sidebar.header("Filters")
 minvol = st.sidebar.number_input("Min Dollar Volume:", 0, 200_000_000, value=int(CFG.min_dollar_vol), step=100000)
@@ -5865,6 +5860,13 @@ workspace_id = st.session_state.get('workspace_id', '')
 if st.sidebar.checkbox("🐛 Debug Notifications", value=False):
     st.sidebar.write(f"User email: {user_email or 'Not set'}")
     st.sidebar.write(f"Workspace ID: {workspace_id[:8] if workspace_id else 'Not set'}...")
+    memo_stats = ACCOUNT_MEMO.stats
+    st.sidebar.caption(f"Account lookups: {ACCOUNT_MEMO.hit_rate():.0%} from memory "
+                       f"({memo_stats['hits']} hits, {memo_stats['misses']} DB reads, {memo_stats['invalidations']} invalidations)")
+    http_metrics = HTTP.metrics()
+    if http_metrics:
+        st.sidebar.caption("Outbound HTTP (this process)")
+        st.sidebar.dataframe(pd.DataFrame(http_metrics).T[['requests', 'errors', '4xx', '5xx', 'avg_ms', 'max_ms']].round(1))
 
 if user_email and workspace_id:
     # Fetch user's notifications ONLY for current workspace (secure)
@@ -5887,10 +5889,11 @@ if unread_notifications:
             col1, col2 = st.columns([3, 1])
             with col1:
                 st.write(f"**{subject}**")
+                email_status = EMAIL_STATUS_LABELS.get(notification.get('delivery_status'), "")
                 if hasattr(created_at, 'strftime'):
-                    st.caption(f"🕒 {created_at.strftime('%Y-%m-%d %H:%M')}")
+                    st.caption(f"🕒 {created_at.strftime('%Y-%m-%d %H:%M')}{email_status}")
                 else:
-                    st.caption(f"🕒 {created_at}")
+                    st.caption(f"🕒 {created_at}{email_status}")
                 
             with col2:
                 if st.button("✓", key=f"read_{notif_id}", help="Mark as read"):
@@ -6058,10 +6061,14 @@ if run_clicked:
         # Get symbols from inputs (merge text area + selected from dropdown)
         eq_syms_from_text = [s.strip().upper() for s in eq_input.splitlines() if s.strip()] if scan_equities else []
         eq_syms_from_list = [s.strip().upper() for s in selected_eq_from_list] if scan_equities else []
+        eq_syms_from_list += [s for name in selected_universe_files if not UNIVERSES[name][1]
+                              for s in UNIVERSES[name][0]] if scan_equities else []
         eq_syms = list(set(eq_syms_from_text + eq_syms_from_list))  # Combine and remove duplicates
         
         cx_syms_from_text = [s.strip().upper() for s in cx_input.splitlines() if s.strip()] if scan_crypto else []
         cx_syms_from_list = [s.strip().upper() for s in selected_cx_from_list] if scan_crypto else []
+        cx_syms_from_list += [s for name in selected_universe_files if UNIVERSES[name][1]
+                              for s in UNIVERSES[name][0]] if scan_crypto else []
         cx_syms = list(set(cx_syms_from_text + cx_syms_from_list))  # Combine and remove duplicates
         
         # Commodities controlled by checkbox
@@ -6077,32 +6084,40 @@ if run_clicked:
                 # Get custom scanner settings if enabled
                 custom_settings = st.session_state.get('custom_scanner_settings', {'enabled': False})
                 
-                # Scan equity markets only
-                if scan_equities and eq_syms:
-                    st.session_state.eq_results, st.session_state.eq_errors = scan_universe(
-                        eq_syms, tf_eq, False, acct, risk, stop_mult, minvol, custom_settings
-                    )
-                else:
-                    st.session_state.eq_results = pd.DataFrame()
-                    st.session_state.eq_errors = pd.DataFrame()
+                # Confluence mode replaces the single-timeframe scans for every market
+                confluence_mode = use_confluence and len(confluence_tfs) >= 2
                 
-                # Scan commodities markets (controlled by scan_commodities checkbox)
-                if scan_commodities and commodity_syms:
-                    st.session_state.commodity_results, st.session_state.commodity_errors = scan_universe(
-                        commodity_syms, tf_eq, False, acct, risk, stop_mult, minvol, custom_settings
-                    )
-                else:
-                    st.session_state.commodity_results = pd.DataFrame()
-                    st.session_state.commodity_errors = pd.DataFrame()
+                def run_market_scan(symbols, timeframe, is_crypto):
+                    if SCAN_QUEUE_ENABLED:
+                        mode, tfs = ('confluence', confluence_tfs) if confluence_mode else ('universe', timeframe)
+                        return run_queued_scan(symbols, mode, tfs, is_crypto, acct, risk, stop_mult, minvol, custom_settings)
+                    if confluence_mode:
+                        return scan_confluence(symbols, confluence_tfs, is_crypto, acct, risk, stop_mult, minvol, custom_settings)
+                    if use_large_universe:
+                        return scan_large_universe(symbols, timeframe, is_crypto, acct, risk, stop_mult, minvol, custom_settings)
+                    return scan_universe(symbols, timeframe, is_crypto, acct, risk, stop_mult, minvol, custom_settings)
                 
-                # Scan crypto markets (only if toggle is enabled)
-                if scan_crypto and cx_syms:
-                    st.session_state.cx_results, st.session_state.cx_errors = scan_universe(
-                        cx_syms, tf_cx, True, acct, risk, stop_mult, minvol, custom_settings
-                    )
+                markets = [
+                    ('eq', eq_syms if scan_equities else [], tf_eq, 'equity'),
+                    ('commodity', commodity_syms if scan_commodities else [], tf_eq, 'commodity'),
+                    ('cx', cx_syms if scan_crypto else [], tf_cx, 'crypto'),
+                ]
+                
+                if SCAN_QUEUE_ENABLED or confluence_mode or use_large_universe:
+                    for key, symbols, timeframe, asset_class in markets:
+                        if symbols:
+                            results, errors = run_market_scan(symbols, timeframe, asset_class == 'crypto')
+                        else:
+                            results, errors = pd.DataFrame(), pd.DataFrame()
+                        st.session_state[f'{key}_results'], st.session_state[f'{key}_errors'] = results, errors
                 else:
-                    st.session_state.cx_results = pd.DataFrame()
-                    st.session_state.cx_errors = pd.DataFrame()
+                    # Single-timeframe scans of every market share one concurrent pass
+                    items = [(sym, timeframe, asset_class)
+                             for _, symbols, timeframe, asset_class in markets for sym in symbols]
+                    all_results, all_errors = scan_multi_asset(items, acct, risk, stop_mult, minvol, custom_settings)
+                    for key, _, _, asset_class in markets:
+                        st.session_state[f'{key}_results'] = split_by_asset_class(all_results, asset_class)
+                        st.session_state[f'{key}_errors'] = split_by_asset_class(all_errors, asset_class)
     
     # Send email notifications if enabled
     if send_email_summary_toggle or send_email_toggle:
@@ -6126,7 +6141,7 @@ Happy trading! 📈
 """
                 success = send_email_to_user(email_subject, email_body, user_email)
                 if success:
-                    st.success("📧 Email sent successfully!")
+                    st.success("📧 Email queued - it will arrive shortly!")
                 else:
                     st.error("❌ Email failed to send")
 
@@ -6898,7 +6913,8 @@ if True:
     # Auto-refresh toggle and controls
     col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
     with col1:
-        auto_check = st.checkbox("Auto Check", help="Automatically check alerts every 5 minutes")
+        auto_check = st.checkbox("Auto Check", help="Show alerts on this page as they trigger - they are evaluated "
+                                                    "on the server even while the page is closed")
 
     with col2:
         if st.button("🔍 Check Now", help="Manually check all active alerts against current prices"):
@@ -6913,66 +6929,37 @@ if True:
         if st.button("➕ New Alert"):
             st.session_state.show_new_alert = True
 
-    # Auto-refresh implementation  
+    # Triggered alerts show up as toasts; evaluation itself runs server-side (start_price_alert_daemon)
     if auto_check:
-        import time
-    
-        # Initialize auto-check state
-        if 'last_auto_check' not in st.session_state:
-            st.session_state.last_auto_check = time.time()
-        if 'auto_check_interval' not in st.session_state:
-            st.session_state.auto_check_interval = 300  # 5 minutes
-    
-        current_time = time.time()
-        time_since_last_check = current_time - st.session_state.last_auto_check
-    
-        # Show countdown
-        remaining_time = max(0, st.session_state.auto_check_interval - time_since_last_check)
-        with col4:
-            if remaining_time > 0:
-                st.info(f"Next check in: {int(remaining_time)}s")
-            else:
-                st.info("Checking alerts...")
-    
-        # Check alerts if interval has passed
-        if time_since_last_check >= st.session_state.auto_check_interval:
-            triggered_count = check_price_alerts()
-            st.session_state.last_auto_check = current_time
-        
-            if triggered_count and triggered_count > 0:
-                st.warning(f"🚨 {triggered_count} new alert(s) triggered!")
-                st.balloons()  # Celebrate triggered alerts
-            else:
-                st.success("All alerts checked - no triggers")
-    
-        # Non-blocking auto-refresh using Streamlit's built-in mechanism
-        # This refreshes the page every 10 seconds without blocking the UI
-        st.markdown(
-            """
-            <script>
-            setTimeout(function() {
-                window.parent.location.reload();
-            }, 10000);
-            </script>
-            """,
-            unsafe_allow_html=True
-        )
-    else:
-        # Clear auto-check state when disabled
-        if 'last_auto_check' in st.session_state:
-            del st.session_state.last_auto_check
+        price_alert_watch(st.session_state.get('workspace_id'))
 
     # New alert form
     if st.session_state.get('show_new_alert', False):
         with st.expander("Create New Price Alert", expanded=True):
+            alert_kind = st.radio("Alert On:", ["Price", "Indicator"], horizontal=True, key="alert_kind",
+                                  help="Indicator alerts are evaluated by the server on each new bar")
             col1, col2 = st.columns(2)
         
             with col1:
                 alert_symbol = st.text_input("Symbol:", placeholder="e.g., AAPL, BTC-USD", key="alert_symbol")
-                alert_type = st.selectbox("Alert Type:", ["above", "below"], key="alert_type")
+                if alert_kind == "Price":
+                    alert_type = st.selectbox("Alert Type:", ["above", "below"], key="alert_type")
+                else:
+                    alert_type = st.selectbox("Condition:", list(CONDITION_OPS), key="indicator_alert_condition",
+                                              format_func=lambda op: op.replace('_', ' '))
+                    alert_indicator = st.selectbox("Indicator:", list(INDICATOR_ALERT_LABELS), key="indicator_alert_field",
+                                                   format_func=INDICATOR_ALERT_LABELS.get)
             
             with col2:
-                alert_price = st.number_input("Target Price ($):", min_value=0.01, step=0.01, key="alert_price")
+                if alert_kind == "Price":
+                    alert_price = st.number_input("Target Price ($):", min_value=0.01, step=0.01, key="alert_price")
+                else:
+                    alert_timeframe = st.selectbox("Timeframe:", list(ALERT_TIMEFRAMES), key="indicator_alert_tf")
+                    compare_to = st.selectbox("Compare To:", ["value"] + list(INDICATOR_ALERT_LABELS),
+                                              key="indicator_alert_compare",
+                                              format_func=lambda f: "A number" if f == "value" else INDICATOR_ALERT_LABELS[f])
+                    alert_price = st.number_input("Value:", value=30.0, step=1.0, key="indicator_alert_value",
+                                                  disabled=compare_to != "value")
                 alert_method = st.selectbox("Notification:", ["in_app", "email", "both"], key="alert_method_v2")
         
             col1, col2, col3 = st.columns(3)
@@ -6981,16 +6968,18 @@ if True:
                     # Input validation
                     if not alert_symbol or not alert_symbol.strip():
                         st.error("Symbol is required")
-                    elif alert_price <= 0:
+                    elif alert_kind == "Price" and alert_price <= 0:
                         st.error("Price must be positive")
-                    elif alert_type not in ['above', 'below']:
+                    elif alert_kind == "Indicator" and compare_to == alert_indicator:
+                        st.error("Compare the indicator against a number or a different indicator")
+                    elif alert_kind == "Price" and alert_type not in ['above', 'below']:
                         st.error("Invalid alert type")
                     else:
                         # Check tier limitations
                         current_tier = st.session_state.user_tier
                         tier_info = TIER_CONFIG[current_tier]
                         active_alerts = get_active_alerts()
-                        alert_count = len(active_alerts) if active_alerts else 0
+                        alert_count = (len(active_alerts) if active_alerts else 0) + len(get_indicator_alerts(active_only=True))
                     
                         # Check if free tier trying to create alerts
                         if current_tier == 'free':
@@ -7003,7 +6992,15 @@ if True:
                         else:
                             # Create the alert
                             symbol_clean = alert_symbol.strip().upper()
-                            if create_price_alert(symbol_clean, alert_type, alert_price, alert_method):
+                            if alert_kind == "Indicator":
+                                created = create_indicator_alert(
+                                    symbol_clean, alert_timeframe, alert_indicator, alert_type,
+                                    target_value=float(alert_price) if compare_to == "value" else None,
+                                    target_field=None if compare_to == "value" else compare_to,
+                                    notification_method=alert_method)
+                            else:
+                                created = create_price_alert(symbol_clean, alert_type, alert_price, alert_method)
+                            if created:
                                 st.success(f"Alert created for {symbol_clean}")
                                 st.session_state.show_new_alert = False
                                 st.rerun()
@@ -7043,6 +7040,23 @@ if True:
                             st.error("Failed to delete alert")
         else:
             st.info("No active alerts. Create one above to get notified when price targets are hit.")
+        
+        indicator_alerts = get_indicator_alerts(active_only=True)
+        if indicator_alerts:
+            st.write("**Indicator Alerts:**")
+            if not PRICE_ALERT_DAEMON:
+                st.caption("Indicator alerts are evaluated by the server-side alert daemon (PRICE_ALERT_DAEMON).")
+            for alert in indicator_alerts:
+                col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+                with col1:
+                    st.write(f"{alert['symbol']} ({alert['timeframe']}) - {describe_condition(alert)}")
+                with col4:
+                    if st.button("Delete", key=f"del_ind_alert_{alert['id']}"):
+                        if delete_indicator_alert(alert['id']):
+                            st.success("Alert deleted")
+                            st.rerun()
+                        else:
+                            st.error("Failed to delete alert")
 
     with tab2:
         all_alerts = get_all_alerts()
@@ -7054,7 +7068,17 @@ if True:
         
             display_cols = ['symbol', 'alert_type', 'target_price', 'current_price', 'triggered_at']
             st.dataframe(triggered_df[display_cols], width='stretch')
-        else:
+        
+        fired_indicator = [a for a in get_indicator_alerts() if a['is_triggered']]
+        if fired_indicator:
+            st.write("**Indicator Alerts:**")
+            st.dataframe(pd.DataFrame([{
+                'symbol': a['symbol'], 'timeframe': a['timeframe'], 'condition': describe_condition(a),
+                'value': a['triggered_value'],
+                'triggered_at': pd.to_datetime(a['triggered_at']).strftime('%Y-%m-%d %H:%M'),
+            } for a in fired_indicator]), width='stretch')
+        
+        if not triggered_alerts and not fired_indicator:
             st.info("No triggered alerts yet.")
 
 # ================= Trade Journal =================
@@ -7534,12 +7558,22 @@ if True:
             min_score_text = st.text_input("Min Score Threshold:", value="10", key="min_score")
             min_score = int(float(min_score_text)) if min_score_text else 10
 
+    fill_resolution = st.checkbox(
+        "🔬 Intrabar fill resolution", key="backtest_fill_resolution",
+        disabled=backtest_timeframe not in LOWER_TIMEFRAMES,
+        help="When a bar both touches the stop and triggers a score/time exit, check the finer bars inside it "
+             "(e.g. 1h within 1D) to see whether the stop really filled first (stops still fill at the stop price). "
+             "Only those bars are drilled, so the extra data is small.")
+    fill_history_gap = history_gap(backtest_timeframe, str(start_date)) if fill_resolution else None
+    if fill_history_gap:
+        st.caption(f"⚠️ {fill_history_gap}.")
+
     # Signal Alerts (Pro Trader exclusive feature)
     st.write("**📧 Backtesting Signal Alerts** (Get notified of BUY/SELL signals)")
     col1, col2 = st.columns([1, 3])
     with col1:
         enable_backtest_alerts = st.checkbox("Enable Alerts", key="enable_backtest_alerts", 
-                                             help="Get email notifications when backtesting generates buy or sell signals")
+                                             help="Collect the buy and sell signals a backtest generates and email them as one digest after the run")
     with col2:
         alert_email = st.text_input("Alert Email:", placeholder="your@email.com", key="backtest_alert_email", 
                                    disabled=not enable_backtest_alerts,
@@ -7591,142 +7625,27 @@ if True:
         if st.button("📊 View History", width='stretch', key="view_backtest_history"):
             st.session_state.show_backtest_history = True
 
-    # Run backtest
+    # Run backtest - the vectorized engine runs as a background job, so the page stays responsive
     if run_backtest_btn and all_backtest_symbols and backtest_name.strip():
-        with st.spinner(f"Running backtest on {len(all_backtest_symbols)} symbols..."):
-            try:
-                config = {
-                    'symbols': all_backtest_symbols,
-                    'start_date': str(start_date),
-                    'end_date': str(end_date),
-                    'timeframe': backtest_timeframe,
-                    'initial_equity': initial_equity,
-                    'risk_per_trade': risk_per_trade,
-                    'stop_atr_mult': stop_atr_mult,
-                    'min_score': min_score
-                }
-            
-                results = run_backtest(
-                    symbols=all_backtest_symbols,
-                    start_date=str(start_date),
-                    end_date=str(end_date),
-                    timeframe=backtest_timeframe,
-                    initial_equity=initial_equity,
-                    risk_per_trade=risk_per_trade,
-                    stop_atr_mult=stop_atr_mult,
-                    min_score=min_score,
-                    enable_alerts=enable_backtest_alerts and alert_email is not None and alert_email.strip() != "",
-                    user_email=alert_email.strip() if alert_email else None
-                )
-            
-                if results.get('error'):
-                    st.error(f"Backtest failed: {results['error']}")
-                elif not results.get('trades'):
-                    st.warning("No trades generated. Try lowering the minimum score threshold or adjusting the date range.")
-                else:
-                    # Save results to database
-                    if save_backtest_result(backtest_name.strip(), config, results):
-                        st.success(f"Backtest '{backtest_name}' completed and saved!")
-                    else:
-                        st.warning("Backtest completed but failed to save to database")
-                
-                    # Display results
-                    metrics = results['metrics']
-                
-                    # Performance metrics
-                    col1, col2, col3, col4, col5 = st.columns(5)
-                
-                    with col1:
-                        total_return = metrics.get('total_return', 0) * 100
-                        delta_color = "normal" if total_return >= 0 else "inverse"
-                        st.metric("Total Return", f"{total_return:.1f}%", delta_color=delta_color)
-                
-                    with col2:
-                        win_rate = metrics.get('win_rate', 0) * 100
-                        st.metric("Win Rate", f"{win_rate:.1f}%")
-                
-                    with col3:
-                        sharpe = metrics.get('sharpe_ratio', 0)
-                        st.metric("Sharpe Ratio", f"{sharpe:.2f}")
-                
-                    with col4:
-                        max_dd = metrics.get('max_drawdown', 0) * 100
-                        st.metric("Max Drawdown", f"{max_dd:.1f}%")
-                
-                    with col5:
-                        total_trades = metrics.get('total_trades', 0)
-                        st.metric("Total Trades", total_trades)
-                
-                    # Performance chart
-                    chart_fig = create_backtest_chart(results)
-                    if chart_fig:
-                        st.plotly_chart(chart_fig, width='stretch')
-                
-                    # Detailed metrics
-                    with st.expander("📈 Detailed Performance Metrics", expanded=False):
-                        col1, col2 = st.columns(2)
-                    
-                        with col1:
-                            st.markdown("**Trade Statistics:**")
-                            st.write(f"• Total Trades: {metrics.get('total_trades', 0)}")
-                            st.write(f"• Winning Trades: {metrics.get('winning_trades', 0)}")
-                            st.write(f"• Losing Trades: {metrics.get('losing_trades', 0)}")
-                            st.write(f"• Win Rate: {metrics.get('win_rate', 0)*100:.1f}%")
-                            st.write(f"• Average Holding Days: {metrics.get('avg_holding_days', 0):.1f}")
-                    
-                        with col2:
-                            st.markdown("**Financial Metrics:**")
-                            st.write(f"• Initial Equity: ${metrics.get('initial_equity', 0):,.2f}")
-                            st.write(f"• Final Equity: ${metrics.get('final_equity', 0):,.2f}")
-                            st.write(f"• Average Win: ${metrics.get('avg_win', 0):,.2f}")
-                            st.write(f"• Average Loss: ${metrics.get('avg_loss', 0):,.2f}")
-                            st.write(f"• Profit Factor: {metrics.get('profit_factor', 0):.2f}")
-                
-                    # Symbol performance breakdown
-                    symbol_perf = results.get('symbol_performance', {})
-                    if symbol_perf and len(symbol_perf) > 0:
-                        with st.expander("📊 Symbol Performance Breakdown", expanded=True):
-                            symbol_perf_data = []
-                            for symbol, perf in symbol_perf.items():
-                                symbol_perf_data.append({
-                                    'Symbol': symbol,
-                                    'Trades': perf.get('total_trades', 0),
-                                    'Win Rate': f"{perf.get('win_rate', 0)*100:.1f}%",
-                                    'Total P&L': f"${perf.get('total_pnl', 0):,.2f}",
-                                    'Avg Return': f"{perf.get('avg_return', 0)*100:.2f}%"
-                                })
-                        
-                            if symbol_perf_data:
-                                symbol_df = pd.DataFrame(symbol_perf_data)
-                                st.table(symbol_df)
-                
-                    # Trade log
-                    trades_list = results.get('trades', [])
-                    if trades_list and len(trades_list) > 0:
-                        with st.expander("📋 Trade Log", expanded=True):
-                            trades_df = pd.DataFrame(trades_list)
-                            
-                            if 'entry_date' in trades_df.columns:
-                                trades_df['entry_date'] = pd.to_datetime(trades_df['entry_date']).dt.strftime('%Y-%m-%d')
-                            if 'exit_date' in trades_df.columns:
-                                trades_df['exit_date'] = pd.to_datetime(trades_df['exit_date']).dt.strftime('%Y-%m-%d')
-                            if 'trade_return' in trades_df.columns:
-                                trades_df['trade_return'] = (trades_df['trade_return'] * 100).round(2)
-                            if 'trade_pnl' in trades_df.columns:
-                                trades_df['trade_pnl'] = trades_df['trade_pnl'].round(2)
-                        
-                            display_cols = ['symbol', 'direction', 'entry_date', 'exit_date', 'entry_price', 'exit_price', 'trade_return', 'trade_pnl', 'exit_reason']
-                            available_cols = [col for col in display_cols if col in trades_df.columns]
-                            st.table(trades_df[available_cols])
-                
-                    # Errors if any
-                    if results.get('errors'):
-                        with st.expander("⚠️ Backtest Errors", expanded=False):
-                            for error in results['errors']:
-                                st.write(f"• {error}")
-                
-            except Exception as e:
-                st.error(f"Backtest failed: {str(e)}")
+        config = {
+            'symbols': all_backtest_symbols,
+            'start_date': str(start_date),
+            'end_date': str(end_date),
+            'timeframe': backtest_timeframe,
+            'initial_equity': initial_equity,
+            'risk_per_trade': risk_per_trade,
+            'stop_atr_mult': stop_atr_mult,
+            'min_score': min_score
+        }
+        fill_resolution = fill_resolution and backtest_timeframe in LOWER_TIMEFRAMES
+        if fill_resolution:
+            config['fill_resolution'] = True
+        backtest_alert_email = alert_email.strip() if enable_backtest_alerts and alert_email else None
+
+        job = submit_backtest_job(backtest_name.strip(), config, backtest_alert_email)
+        st.session_state.backtest_job_id = job.id
+        # Keep the job id in the URL so a reload (or the shared link) picks the job back up
+        st.query_params['backtest_job'] = job.id
 
     elif run_backtest_btn:
         if not all_backtest_symbols:
@@ -7734,13 +7653,158 @@ if True:
         if not backtest_name.strip():
             st.error("Please enter a backtest name")
 
+    # Current background job: progress while it runs, results once it is done
+    backtest_job_id = st.session_state.get('backtest_job_id') or st.query_params.get('backtest_job')
+    current_job = get_job(backtest_job_id) if backtest_job_id else None
+    if current_job is not None:
+        if current_job.finished:
+            show_backtest_job(current_job)
+        else:
+            backtest_job_progress(current_job.id)
+
+    my_jobs = list_jobs(st.session_state.get('workspace_id'))
+    if len(my_jobs) > 1:
+        with st.expander(f"🗂️ Background Backtests ({len(my_jobs)})", expanded=False):
+            for listed_job in my_jobs:
+                job_col1, job_col2 = st.columns([3, 1])
+                with job_col1:
+                    phase = "" if listed_job.finished else f" - {BACKTEST_PHASE_LABELS.get(listed_job.phase, listed_job.phase)}"
+                    st.write(f"**{listed_job.name}** ({len(listed_job.config['symbols'])} symbols): "
+                             f"{listed_job.status}{phase}")
+                with job_col2:
+                    if listed_job.id != backtest_job_id and st.button("Show", key=f"show_backtest_job_{listed_job.id}"):
+                        st.session_state.backtest_job_id = listed_job.id
+                        st.query_params['backtest_job'] = listed_job.id
+                        st.rerun()
+
+    # Parameter sweep - every configuration runs on one data download
+    with st.expander("🧪 Parameter Sweep & Optimizer", expanded=False):
+        st.caption("Data is downloaded and scored once; every configuration is then simulated in parallel "
+                   "and ranked by Sharpe ratio. Press Streamlit's Stop button to cancel a running sweep.")
+        sweep_mode = st.radio("Search mode:", ["Grid", "Random search"], horizontal=True, key="sweep_mode")
+        sweep_col1, sweep_col2, sweep_col3 = st.columns(3)
+        if sweep_mode == "Grid":
+            with sweep_col1:
+                sweep_scores = st.text_input("Min Scores:", value="0, 10, 20, 30", key="sweep_min_scores")
+            with sweep_col2:
+                sweep_stops = st.text_input("Stop Loss (ATR x):", value="1.0, 1.5, 2.0, 3.0", key="sweep_stops")
+            with sweep_col3:
+                sweep_risks = st.text_input("Risk per Trade (%):", value="0.5, 1.0", key="sweep_risks")
+        else:
+            with sweep_col1:
+                sweep_score_range = st.slider("Min Score range:", -50, 100, (0, 40), key="sweep_score_range")
+            with sweep_col2:
+                sweep_stop_range = st.slider("Stop (ATR x) range:", 0.5, 5.0, (1.0, 3.0), step=0.1, key="sweep_stop_range")
+            with sweep_col3:
+                sweep_risk_range = st.slider("Risk (%) range:", 0.1, 5.0, (0.5, 2.0), step=0.1, key="sweep_risk_range")
+            sweep_samples = st.number_input("Configurations to try:", 5, 500, 50, key="sweep_samples")
+        
+        if st.button("🧪 Run Sweep", key="run_sweep"):
+            if not all_backtest_symbols:
+                st.error("Please select symbols for backtesting")
+            else:
+                try:
+                    if sweep_mode == "Grid":
+                        configs = parameter_grid({
+                            'min_score': parse_sweep_values(sweep_scores),
+                            'stop_atr_mult': parse_sweep_values(sweep_stops),
+                            'risk_per_trade': [v / 100 for v in parse_sweep_values(sweep_risks)],
+                        })
+                    else:
+                        configs = random_configs({
+                            'min_score': sweep_score_range,
+                            'stop_atr_mult': sweep_stop_range,
+                            'risk_per_trade': (sweep_risk_range[0] / 100, sweep_risk_range[1] / 100),
+                        }, int(sweep_samples))
+                except ValueError:
+                    st.error("Sweep values must be comma-separated numbers")
+                    configs = []
+                
+                if configs:
+                    sweep_progress = st.progress(0.0, text=f"Loading data for {len(all_backtest_symbols)} symbols...")
+                    sweep = run_sweep(
+                        all_backtest_symbols, str(start_date), str(end_date), configs,
+                        timeframe=backtest_timeframe, initial_equity=initial_equity, workers=SWEEP_WORKERS,
+                        progress=lambda done, total: sweep_progress.progress(
+                            done / total, text=f"Evaluated {done}/{total} configurations"),
+                    )
+                    sweep_progress.empty()
+                    if sweep.get('error'):
+                        st.error(f"Sweep failed: {sweep['error']}")
+                    else:
+                        st.session_state.sweep_results = sweep
+        
+        sweep = st.session_state.get('sweep_results')
+        if sweep and not sweep['results'].empty:
+            best = sweep['results'].iloc[0]
+            st.success(f"🏆 Best: Min Score {best['min_score']:g}, Stop {best['stop_atr_mult']:g}x ATR, "
+                       f"Risk {best['risk_per_trade']*100:.2f}% → Sharpe {best['sharpe_ratio']:.2f}, "
+                       f"Return {best['total_return']*100:.1f}%, Max DD {best['max_drawdown']*100:.1f}%")
+            display = sweep['results'].copy()
+            display['risk_per_trade'] = (display['risk_per_trade'] * 100).round(2)
+            for col in ('total_return', 'max_drawdown', 'win_rate'):
+                display[col] = (display[col] * 100).round(2)
+            st.dataframe(display.rename(columns={'risk_per_trade': 'risk_%', 'total_return': 'return_%',
+                                                 'max_drawdown': 'max_dd_%', 'win_rate': 'win_rate_%'}),
+                         width='stretch', hide_index=True)
+            if sweep.get('errors'):
+                st.caption("⚠️ " + "; ".join(sweep['errors']))
+
+    # Walk-forward optimization - scoring weights chosen in-sample, traded out-of-sample
+    with st.expander("🧭 Walk-Forward Optimization", expanded=False):
+        st.caption("Each rolling in-sample window picks the best scoring weights/thresholds from random "
+                   "candidates; the next out-of-sample window trades them. Only out-of-sample results are "
+                   "stitched into the equity curve. Uses the Min Score, Stop and Risk settings above.")
+        wf_col1, wf_col2, wf_col3, wf_col4 = st.columns(4)
+        with wf_col1:
+            wf_in_sample = st.number_input("In-sample days:", 60, 2000, 365, step=30, key="wf_in_sample")
+        with wf_col2:
+            wf_out_sample = st.number_input("Out-of-sample days:", 10, 730, 90, step=10, key="wf_out_sample")
+        with wf_col3:
+            wf_candidates = st.number_input("Candidates per window:", 5, 500, 50, key="wf_candidates")
+        with wf_col4:
+            wf_objective = st.selectbox("Objective:", list(WALK_FORWARD_OBJECTIVES), key="wf_objective")
+        
+        if st.button("🧭 Run Walk-Forward", key="run_walk_forward"):
+            if not all_backtest_symbols:
+                st.error("Please select symbols for backtesting")
+            else:
+                wf_progress = st.progress(0.0, text=f"Loading data for {len(all_backtest_symbols)} symbols...")
+                wf = walk_forward(
+                    all_backtest_symbols, str(start_date), str(end_date), timeframe=backtest_timeframe,
+                    in_sample_days=int(wf_in_sample), out_sample_days=int(wf_out_sample),
+                    n_candidates=int(wf_candidates), min_score=min_score, stop_atr_mult=stop_atr_mult,
+                    risk_per_trade=risk_per_trade, initial_equity=initial_equity, objective=wf_objective,
+                    workers=SWEEP_WORKERS,
+                    progress=lambda done, total: wf_progress.progress(
+                        done / total, text=f"Optimized {done}/{total} windows"),
+                )
+                wf_progress.empty()
+                if wf.get('error'):
+                    st.error(f"Walk-forward failed: {wf['error']}")
+                else:
+                    st.session_state.walk_forward_results = wf
+        
+        wf = st.session_state.get('walk_forward_results')
+        if wf and not wf['windows'].empty:
+            m = wf['metrics']
+            st.success(f"Out-of-sample over {len(wf['windows'])} windows: Return {m['total_return']*100:.1f}%, "
+                       f"Sharpe {m['sharpe_ratio']:.2f}, Max DD {m['max_drawdown']*100:.1f}%, "
+                       f"{m['total_trades']} trades")
+            st.line_chart(wf['equity_curve'].set_index('date')['equity'])
+            st.dataframe(wf['windows'], width='stretch', hide_index=True)
+            st.caption("Latest window's settings (same shape as Custom Scanner Settings):")
+            st.json(wf['window_settings'][-1])
+            if wf.get('errors'):
+                st.caption("⚠️ " + "; ".join(wf['errors']))
+
     # Show backtest history
     if st.session_state.get('show_backtest_history', False):
         with st.expander("📚 Backtest History", expanded=True):
             saved_backtests = get_backtest_results()
         
             if saved_backtests:
-                for i, backtest in enumerate(saved_backtests[:10]):  # Show last 10 backtests
+                for i, backtest in enumerate(saved_backtests):  # get_backtest_results returns the last 10
                     with st.container():
                         col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
                     
@@ -7767,13 +7831,20 @@ if True:
                         if st.button(f"View Details", key=f"view_backtest_{i}"):
                             st.session_state[f'show_backtest_details_{i}'] = True
                     
-                        # Show details if requested
+                        # Show details if requested - the trades and equity curve are only loaded now
                         if st.session_state.get(f'show_backtest_details_{i}', False):
                             config = backtest.get('config', {})
+                            details = get_backtest_details(backtest['id'])
                             st.json({
                                 'Configuration': config,
-                                'Results Summary': metrics
+                                'Results Summary': details.get('metrics', metrics)
                             })
+                            if details.get('equity_curve'):
+                                chart_fig = create_backtest_chart(details)
+                                if chart_fig:
+                                    st.plotly_chart(chart_fig, width='stretch', key=f"backtest_chart_{i}")
+                            if details.get('trades'):
+                                st.dataframe(pd.DataFrame(details['trades']), width='stretch', hide_index=True)
                     
                         st.divider()
             else:
@@ -1,8 +1,19 @@
 import streamlit as st
-import requests
 import os
 from typing import Dict, Optional
 
+from market_scanner.outbound import HTTP
+from market_scanner.swrcache import StaleWhileRevalidateCache
+
+# Entitlements per token, shared by every session of the process: reruns read the
+# cache, stale entries refresh in the background, and an unreachable entitlements
+# API keeps serving the last answer (up to ENTITLEMENT_MAX_STALE seconds).
+ENTITLEMENT_CACHE = StaleWhileRevalidateCache(
+    "entitlements",
+    ttl=float(os.getenv('ENTITLEMENT_TTL', '300')),
+    max_stale=float(os.getenv('ENTITLEMENT_MAX_STALE', '86400')),
+)
+
 class SubscriptionAuth:
     """
     Handles subscription authentication for Market Scanner Pro
@@ -52,28 +63,35 @@ class SubscriptionAuth:
         return self._call_entitlements_api(token)
     
     def _call_entitlements_api(self, token: Optional[str]) -> Dict[str, any]:
-        """Call the entitlements API to check subscription"""
-        try:
-            headers = {}
-            if token:
-                headers['Authorization'] = f'Bearer {token}'
-            
-            response = requests.get(
-                self.entitlements_url,
-                headers=headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                # If API fails, default to free
-                return {'tier': 'free', 'status': 'active', 'source': 'default'}
+        """Entitlements for token from the shared cache (free tier until the first lookup answers)"""
+        return ENTITLEMENT_CACHE.get(
+            (self.entitlements_url, token),
+            lambda: self._fetch_entitlements(token),
+            default={'tier': 'free', 'status': 'active', 'source': 'error'},
+        )
+    
+    def _fetch_entitlements(self, token: Optional[str]) -> Dict[str, any]:
+        """Call the entitlements API; raises on timeouts and server errors so a cached answer is kept"""
+        headers = {}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        
+        response = HTTP.get(
+            self.entitlements_url,
+            headers=headers,
+            timeout=10
+        )
         
-        except Exception as e:
-            # If any error, default to free tier
-            print(f"Error checking subscription: {e}")
-            return {'tier': 'free', 'status': 'active', 'source': 'error'}
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code >= 500 or response.status_code == 429:
+            raise RuntimeError(f"Entitlements API HTTP {response.status_code}")
+        # Rejected or unknown token: free tier
+        return {'tier': 'free', 'status': 'active', 'source': 'default'}
+    
+    def refresh(self) -> None:
+        """Drop this session's cached entitlements (e.g. right after an upgrade)"""
+        ENTITLEMENT_CACHE.invalidate((self.entitlements_url, st.session_state.get('auth_token')))
     
     def is_pro(self) -> bool:
         """Check if user has Pro subscription"""
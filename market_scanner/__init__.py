@@ -0,0 +1,53 @@
+# market_scanner
+# Importable scanning pipeline (data -> features -> scoring -> sizing) with no
+# Streamlit dependency, shared by app.py, the CLI and background workers.
+
+from .data import (
+    min_bars_required, dollar_volume, get_ohlcv_yf, get_ohlcv, yf_to_ohlcv,
+    TIMEFRAME_MINUTES, timeframe_minutes, resample_ohlcv,
+)
+from .features import compute_features, FEATURE_COLUMNS, compute_panel_features
+from .scoring import score_row, score_frame
+from .sizing import position_sizing
+from .scanner import scan_bars, scan_symbol, scan_universe, run_cancellable
+from .confluence import DEFAULT_CONFLUENCE_TFS, confluence_bars, scan_confluence
+from .multiasset import (
+    ASSET_CLASSES, DEFAULT_MULTI_ASSET_WORKERS, asset_class_for, scan_multi_asset, split_by_asset_class,
+)
+from .barstore import BAR_DIR, load_bars, save_bars, download_batch, load_universe_bars
+from .panel import build_panels, scan_frames, scan_large_universe
+from .universes import (
+    TOP_100_EQUITIES, MID_CAP_STOCKS, SMALL_CAP_STOCKS,
+    TOP_100_CRYPTO, CRYPTO_100_300, COMMODITIES, UNIVERSES, get_universe,
+    load_universe_file, discover_universes,
+)
+from .backtest import (
+    BacktestPanel, prepare_symbol_bars, load_backtest_data, align_frames, build_panel, slice_panel, simulate_panel,
+    summarize_backtest, mark_to_market, backtest_panel, run_backtest_vectorized,
+)
+from .sweep import SWEEP_PARAMS, parameter_grid, random_configs, evaluate_config, sweep_panel, run_sweep
+from .walkforward import (
+    OBJECTIVES, FeaturePanel, build_feature_panel, score_panel, default_settings, sample_settings,
+    walk_forward_windows, walk_forward,
+)
+from .btcache import (
+    BACKTEST_CACHE_DIR, data_version, config_key, cached_bars, load_backtest_data_cached, run_backtest_cached,
+    clear_backtest_cache, prune_backtest_cache,
+)
+from .intrabar import LOWER_TIMEFRAMES, IntrabarResolver, history_gap
+from .montecarlo import DEFAULT_SIMULATIONS, trade_returns, resample_returns, equity_paths, monte_carlo, trades_seed
+from .alerts import collect_signals, format_signal_digest, digest_messages, enqueue_digest, start_alert_sender
+from .btstore import PAYLOAD_FORMAT, pack_results, unpack_results
+from .quotes import (
+    QUOTE_FEED, QUOTE_MAX_AGE, QuoteBoard, QUOTE_BOARD, RestQuoteCache, REST_QUOTES, QuoteFeed, YahooStreamFeed,
+    SimulatedSocket, SimulatedFeed, FEEDS, make_feed, start_quote_feed,
+)
+from .pricealerts import latest_prices, alert_triggered, AlertIndex, evaluate_alerts
+from .indicatoralerts import (
+    INDICATOR_FIELDS, CONDITION_OPS, ALERT_TIMEFRAMES, INDICATOR_ALERTS_SCHEMA, IndicatorState, IndicatorEngine,
+    condition_met, describe_condition,
+)
+from .outbound import HTTP_POOL_SIZE, CREDENTIAL_TTL, HttpClient, HTTP, CredentialCache, CREDENTIALS
+from .swrcache import StaleWhileRevalidateCache
+from .memo import ACCOUNT_MEMO_TTL, Uncacheable, WorkspaceMemo, ACCOUNT_MEMO
+from .btjobs import BACKTEST_JOB_WORKERS, BacktestJob, submit_backtest, get_job, cancel_job, list_jobs
@@ -0,0 +1,186 @@
+# market_scanner/alertdaemon.py
+# Server-side price alert evaluation: on a schedule, every workspace's active
+# alerts are checked in one batched quote pass (pricealerts.evaluate_alerts),
+# so alerts fire without anyone keeping a tab open. Several app instances can
+# run the daemon; an advisory lock lets only one of them evaluate each pass.
+# The loop keeps an AlertIndex across passes and only applies the rows that
+# were created, edited or removed since the last one. Prices come from the
+# streaming quote board, and a tick that crosses an indexed alert starts the
+# next pass right away instead of waiting for the interval. Indicator alerts
+# (indicatoralerts.py) are checked on the interval schedule from the same loop.
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from .barstore import DEFAULT_MAX_AGE
+from .db import connect, transaction
+from .indicatoralerts import INDICATOR_ALERTS_SCHEMA, IndicatorEngine
+from .pricealerts import AlertIndex, QuoteFn, latest_prices
+from .quotes import QUOTE_BOARD, QuoteBoard
+
+ALERT_CHECK_INTERVAL = float(os.getenv("PRICE_ALERT_INTERVAL", "60"))   # seconds between passes
+ALERT_LOCK_KEY = 0x70726963   # pg_try_advisory_lock key ("pric")
+INDICATOR_LOCK_KEY = 0x696e6463   # same, for indicator alert passes ("indc")
+MIN_PASS_GAP = 2.0            # seconds between passes started early by crossing ticks
+# notify(alert row, trigger price), e.g. app.send_alert_notification
+NotifyFn = Callable[[Dict[str, Any], float], Any]
+
+@contextmanager
+def pass_lock(conn, key: int):
+    """
+    Session-level pg_try_advisory_lock held for one pass; yields whether it was taken.
+
+    Unlike the xact variant it needs no open transaction, so a pass can do its
+    network I/O (quotes, bar downloads) between short transactions. A lost
+    connection releases the lock with the session.
+    """
+    with transaction(conn) as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s) AS locked", (key,))
+        locked = cur.fetchone()['locked']
+    try:
+        yield locked
+    finally:
+        if locked and not conn.closed:
+            with transaction(conn) as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (key,))
+
+def check_all_alerts(conn, notify: NotifyFn, fallback: Optional[QuoteFn] = None,
+                     index: Optional[AlertIndex] = None, board: Optional[QuoteBoard] = QUOTE_BOARD) -> int:
+    """
+    One pass over the active alerts of every workspace; returns how many fired.
+
+    Quotes are fetched with no transaction open; alerts are then flipped with
+    one guarded UPDATE and notify runs after its commit, only for the rows that
+    UPDATE returned. A pass another instance is already running is skipped.
+    Pass the same index on every call to keep it in sync instead of rebuilding it.
+    """
+    index = index if index is not None else AlertIndex()
+    with pass_lock(conn, ALERT_LOCK_KEY) as locked:
+        if not locked:
+            return 0
+        with transaction(conn) as cur:
+            cur.execute("SELECT * FROM price_alerts WHERE is_active = TRUE AND is_triggered = FALSE")
+            index.sync(cur.fetchall())
+        triggered = index.evaluate(latest_prices(index.symbols(), fallback, board))
+        if not triggered:
+            return 0
+        ids = [alert['id'] for alert, _ in triggered]
+        with transaction(conn) as cur:
+            cur.execute("""
+                UPDATE price_alerts AS a
+                SET is_triggered = TRUE, triggered_at = NOW(), current_price = t.price, is_active = FALSE
+                FROM unnest(%s::bigint[], %s::float8[]) AS t(id, price)
+                WHERE a.id = t.id AND a.is_active = TRUE AND a.is_triggered = FALSE
+                RETURNING a.id
+            """, (ids, [float(price) for _, price in triggered]))
+            fired = {row['id'] for row in cur.fetchall()}
+    # Triggered here or concurrently elsewhere, these alerts are no longer active
+    for alert, _ in triggered:
+        index.remove(alert['id'])
+    for alert, price in triggered:
+        if alert['id'] in fired:
+            try:
+                notify(alert, price)
+            except Exception as e:
+                print(f"Alert notification failed for {alert['symbol']} (alert {alert['id']}): {e}")
+    return len(fired)
+
+def check_indicator_alerts(conn, notify: NotifyFn, engine: Optional[IndicatorEngine] = None,
+                           max_age: float = DEFAULT_MAX_AGE) -> int:
+    """
+    One pass over the active indicator alerts of every workspace; returns how many fired.
+
+    The engine's per-symbol states advance by the bars that arrived since the
+    last pass (pass the same engine every time), then every alert is checked
+    against its symbol's state. The bar downloads run with no transaction
+    open; flipping and notifying work like check_all_alerts.
+    """
+    engine = engine if engine is not None else IndicatorEngine()
+    with pass_lock(conn, INDICATOR_LOCK_KEY) as locked:
+        if not locked:
+            return 0
+        with transaction(conn) as cur:
+            cur.execute("SELECT * FROM indicator_alerts WHERE is_active = TRUE AND is_triggered = FALSE")
+            alerts = cur.fetchall()
+        engine.refresh(alerts, max_age=max_age)
+        triggered = engine.evaluate(alerts)
+        if not triggered:
+            return 0
+        with transaction(conn) as cur:
+            cur.execute("""
+                UPDATE indicator_alerts AS a
+                SET is_triggered = TRUE, triggered_at = NOW(), triggered_value = t.value, is_active = FALSE
+                FROM unnest(%s::bigint[], %s::float8[]) AS t(id, value)
+                WHERE a.id = t.id AND a.is_active = TRUE AND a.is_triggered = FALSE
+                RETURNING a.id
+            """, ([alert['id'] for alert, _ in triggered], [value for _, value in triggered]))
+            fired = {row['id'] for row in cur.fetchall()}
+    for alert, value in triggered:
+        if alert['id'] in fired:
+            try:
+                notify(alert, value)
+            except Exception as e:
+                print(f"Indicator alert notification failed for {alert['symbol']} (alert {alert['id']}): {e}")
+    return len(fired)
+
+def alert_daemon_loop(notify: NotifyFn, fallback: Optional[QuoteFn] = None,
+                      stop_event: Optional[threading.Event] = None,
+                      interval: float = ALERT_CHECK_INTERVAL, dsn: Optional[str] = None,
+                      board: Optional[QuoteBoard] = QUOTE_BOARD,
+                      notify_indicator: Optional[NotifyFn] = None) -> None:
+    """
+    Run check_all_alerts every interval seconds until stop_event is set,
+    reconnecting on database errors; with a board, ticks that cross an alert
+    start a pass early (at most one per MIN_PASS_GAP seconds). With
+    notify_indicator, check_indicator_alerts also runs once per interval.
+    """
+    stop_event = stop_event or threading.Event()
+    index = AlertIndex()
+    engine = IndicatorEngine()
+    schema_ready = False
+    indicator_due = 0.0
+    wake = threading.Event()
+
+    def on_tick(symbol: str, price: float) -> None:
+        if not wake.is_set() and index.crossed(symbol, price):
+            wake.set()
+
+    if board is not None:
+        board.add_listener(on_tick)
+    conn = None
+    try:
+        while not stop_event.is_set():
+            started = time.monotonic()
+            try:
+                if conn is None or conn.closed:
+                    conn = connect(dsn)
+                check_all_alerts(conn, notify, fallback, index, board)
+                if notify_indicator and started >= indicator_due:
+                    if not schema_ready:
+                        with transaction(conn) as cur:
+                            cur.execute(INDICATOR_ALERTS_SCHEMA)
+                        schema_ready = True
+                    indicator_due = started + interval
+                    check_indicator_alerts(conn, notify_indicator, engine)
+            except Exception as e:
+                print(f"Price alert daemon error: {e}")
+                try:
+                    if conn is not None:
+                        conn.close()
+                except Exception:
+                    pass
+                conn = None
+            wake.clear()
+            stop_event.wait(MIN_PASS_GAP - (time.monotonic() - started))
+            deadline = started + interval
+            while not stop_event.is_set() and time.monotonic() < deadline:
+                if wake.wait(min(0.5, deadline - time.monotonic())):
+                    break
+    finally:
+        if board is not None:
+            board.remove_listener(on_tick)
+        if conn is not None and not conn.closed:
+            conn.close()
@@ -0,0 +1,100 @@
+# market_scanner/alerts.py
+# Deferred delivery of backtest signal alerts: the backtest's on_signal hook
+# only appends to a list, and a background sender thread turns the collected
+# signals into one digest email (or a few rate-limited batches) after the run,
+# so no network call happens inside the simulation loop.
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .backtest import SignalHook
+
+DEFAULT_DIGEST_SIZE = 100    # signals per email; longer runs are split into numbered batches
+DEFAULT_MIN_INTERVAL = 2.0   # seconds between two emails from the sender
+# send(subject, body, to_email, workspace_id) -> bool, e.g. app.send_email_to_user
+SendFn = Callable[[str, str, str, Optional[str]], Any]
+
+def collect_signals(signals: List[Dict[str, Any]]) -> SignalHook:
+    """on_signal hook that records each BUY/SELL in `signals` instead of sending it"""
+    def hook(signal_type: str, symbol: str, price: float, details: Dict[str, Any]) -> None:
+        signals.append({'signal_type': signal_type, 'symbol': symbol, 'price': price, **details})
+    return hook
+
+# ================= Digest formatting =================
+def _signal_line(s: Dict[str, Any]) -> str:
+    date = str(s.get('date', ''))[:16]
+    if s['signal_type'].upper() == "BUY":
+        return (f"{date}  🟢 BUY  {s['symbol']} @ ${s['price']:.2f}  "
+                f"(score {s.get('score', 0):+.1f}, stop ${s.get('stop_price', 0):.2f})")
+    return (f"{date}  🔴 SELL {s['symbol']} @ ${s['price']:.2f}  "
+            f"({s.get('exit_reason', 'exit')}, P&L ${s.get('trade_pnl', 0):+,.2f}, {s.get('holding_days', 0)}d)")
+
+def format_signal_digest(signals: List[Dict[str, Any]], title: str = "Backtest",
+                         part: int = 1, parts: int = 1) -> Tuple[str, str]:
+    """(subject, body) summarising a list of collected signals"""
+    buys = sum(1 for s in signals if s['signal_type'].upper() == "BUY")
+    sells = len(signals) - buys
+    pnl = sum(s.get('trade_pnl', 0) for s in signals if s['signal_type'].upper() != "BUY")
+    subject = f"📊 {title} Signals: {buys} BUY / {sells} SELL"
+    if parts > 1:
+        subject += f" ({part}/{parts})"
+    body = "\n".join([
+        f"{title} generated {buys} buy and {sells} sell signals"
+        + (f" (part {part} of {parts})." if parts > 1 else "."),
+        f"Realised P&L of the exits below: ${pnl:+,.2f}",
+        "",
+        *(_signal_line(s) for s in signals),
+        "",
+        "Log into the dashboard to review the full analysis.",
+    ])
+    return subject, body
+
+def digest_messages(signals: List[Dict[str, Any]], title: str = "Backtest",
+                    digest_size: int = DEFAULT_DIGEST_SIZE) -> List[Tuple[str, str]]:
+    """One (subject, body) per batch of at most digest_size signals"""
+    size = max(digest_size, 1)
+    batches = [signals[i:i + size] for i in range(0, len(signals), size)]
+    return [format_signal_digest(batch, title, n, len(batches)) for n, batch in enumerate(batches, 1)]
+
+# ================= Background sender =================
+def enqueue_digest(jobs: "queue.Queue", signals: List[Dict[str, Any]], to_email: str,
+                   workspace_id: Optional[str] = None, title: str = "Backtest",
+                   digest_size: int = DEFAULT_DIGEST_SIZE) -> int:
+    """Queue the digest email(s) for a finished run; returns the number of messages queued"""
+    messages = digest_messages(signals, title, digest_size)
+    if messages:
+        jobs.put({'to_email': to_email, 'workspace_id': workspace_id, 'messages': messages})
+    return len(messages)
+
+def sender_loop(jobs: "queue.Queue", send: SendFn, stop_event: Optional[threading.Event] = None,
+                min_interval: float = DEFAULT_MIN_INTERVAL) -> None:
+    """Deliver queued digests one message at a time, at most one every min_interval seconds"""
+    stop_event = stop_event or threading.Event()
+    last_sent = 0.0
+    while not stop_event.is_set():
+        try:
+            job = jobs.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        try:
+            for subject, body in job['messages']:
+                wait = last_sent + min_interval - time.monotonic()
+                if wait > 0 and stop_event.wait(wait):
+                    break
+                try:
+                    send(subject, body, job['to_email'], job.get('workspace_id'))
+                except Exception as e:
+                    print(f"Alert sender error for {job['to_email']}: {e}")
+                last_sent = time.monotonic()
+        finally:
+            jobs.task_done()
+
+def start_alert_sender(send: SendFn, min_interval: float = DEFAULT_MIN_INTERVAL) -> Tuple["queue.Queue", threading.Event]:
+    """Start a daemon sender thread; returns (job queue, stop event)"""
+    jobs: "queue.Queue" = queue.Queue()
+    stop_event = threading.Event()
+    threading.Thread(target=sender_loop, name="alert-sender", daemon=True,
+                     args=(jobs, send, stop_event, min_interval)).start()
+    return jobs, stop_event
@@ -0,0 +1,505 @@
+# market_scanner/backtest.py
+# Array backtest engine: all symbols are aligned onto one date x symbol grid
+# with a validity mask, entry/exit signals are precomputed as masks, and only
+# the path-dependent portfolio logic (position cap, equity-based sizing) runs
+# in a tight loop. Trades and metrics match the original run_backtest loop.
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .data import get_ohlcv
+from .features import compute_features
+from .scanner import run_parallel
+from .scoring import score_frame
+
+MAX_POSITIONS = 5            # Portfolio risk management
+MAX_POSITION_FRACTION = 0.2  # Max 20% of equity per position
+MAX_HOLDING_DAYS = 20        # Time-based exit
+NS_PER_DAY = 86_400 * 10**9
+
+INTRADAY_TFS = ['1m', '5m', '15m', '30m', '1h']
+
+# on_signal(signal_type, symbol, price, details) - BUY/SELL hook (e.g. email alerts)
+SignalHook = Callable[[str, str, float, Dict[str, Any]], Any]
+# resolve_fill(symbol, bar_date, direction, stop_price) -> (stop_hit, fill_price), or None to keep the bar rule
+FillResolver = Callable[[str, pd.Timestamp, str, float], Optional[Tuple[bool, float]]]
+
+class BacktestCancelled(Exception):
+    """Raised by simulate_panel when its cancel_event is set mid-run"""
+
+@dataclass
+class BacktestPanel:
+    """Scored bars for a set of symbols on a shared date grid (arrays are dates x symbols, NaN where no bar)"""
+    dates: pd.DatetimeIndex
+    symbols: List[str]
+    close: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    atr: np.ndarray
+    score: np.ndarray
+    valid: np.ndarray
+
+def _error_result(message: str) -> Dict[str, Any]:
+    return {'error': message, 'trades': [], 'metrics': {}, 'symbol_performance': {}}
+
+def validate_backtest_range(start_date: str, end_date: str, timeframe: str) -> Optional[str]:
+    """Return an error message when the date range can't be backtested, else None"""
+    days_diff = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days
+    if days_diff <= 0:
+        return f'Invalid date range: Start date ({start_date}) must be before end date ({end_date})'
+    if days_diff < 30:
+        return 'Backtest period must be at least 30 days for meaningful results'
+    # yfinance limitations for intraday data
+    if timeframe in INTRADAY_TFS and days_diff > 60:
+        return 'Intraday backtests limited to 60 days max due to data provider constraints'
+    return None
+
+# ================= Data =================
+def score_bars(df: pd.DataFrame, custom_settings: Optional[dict] = None) -> pd.DataFrame:
+    """Feature rows (NaN-free) with a score column, as the backtest consumes them"""
+    df_features = compute_features(df, custom_settings).dropna()
+    df_features['score'] = score_frame(df_features, custom_settings)
+    return df_features
+
+def prepare_symbol_bars(symbol: str, df: pd.DataFrame,
+                        custom_settings: Optional[dict] = None) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """Score one symbol's raw bars; returns (feature frame, None) or (None, error message)"""
+    if df.empty or len(df) < 50:
+        return None, f"{symbol}: Insufficient data ({len(df)} bars)"
+
+    df_features = score_bars(df, custom_settings)
+    if df_features.empty:
+        return None, f"{symbol}: Features calculation failed"
+    return df_features, None
+
+def load_symbol_bars(symbol: str, timeframe: str, start_date: str, end_date: str,
+                     custom_settings: Optional[dict] = None) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """Fetch and score one symbol; returns (feature frame, None) or (None, error message)"""
+    try:
+        df = get_ohlcv(symbol, timeframe, start=start_date, end=end_date)
+        return prepare_symbol_bars(symbol, df, custom_settings)
+    except Exception as e:
+        return None, f"{symbol}: Data loading failed - {str(e)}"
+
+def load_backtest_data(symbols: List[str], timeframe: str, start_date: str, end_date: str,
+                       custom_settings: Optional[dict] = None,
+                       workers: int = 1) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+    """Scored bars per symbol (input order) plus per-symbol error messages"""
+    outcomes = run_parallel(load_symbol_bars, symbols, (timeframe, start_date, end_date, custom_settings), workers)
+    symbol_data: Dict[str, pd.DataFrame] = {}
+    errors: List[str] = []
+    for symbol, (df_features, err) in zip(symbols, outcomes):
+        if err is not None:
+            errors.append(err)
+        else:
+            symbol_data[symbol] = df_features
+    return symbol_data, errors
+
+def align_frames(frames: Dict[str, pd.DataFrame],
+                 columns: List[str]) -> Tuple[pd.DatetimeIndex, Dict[str, np.ndarray], np.ndarray]:
+    """Put each frame's columns on the sorted union of all timestamps: (dates, column -> array, valid mask)"""
+    symbols = list(frames)
+    dates = frames[symbols[0]].index
+    for df in list(frames.values())[1:]:
+        dates = dates.union(df.index)
+    dates = dates.sort_values()
+
+    shape = (len(dates), len(symbols))
+    arrays = {c: np.full(shape, np.nan) for c in columns}
+    valid = np.zeros(shape, dtype=bool)
+    for j, symbol in enumerate(symbols):
+        df = frames[symbol]
+        rows = dates.get_indexer(df.index)
+        valid[rows, j] = True
+        for c, arr in arrays.items():
+            arr[rows, j] = df[c].to_numpy(dtype=float)
+    return dates, arrays, valid
+
+def build_panel(symbol_data: Dict[str, pd.DataFrame]) -> BacktestPanel:
+    """Align every symbol onto the sorted union of their timestamps"""
+    dates, arrays, valid = align_frames(symbol_data, ["close", "high", "low", "atr", "score"])
+    return BacktestPanel(dates=dates, symbols=list(symbol_data), valid=valid, **arrays)
+
+def slice_panel(panel: BacktestPanel, start=None, end=None) -> BacktestPanel:
+    """Rows with start <= date < end (either bound may be None)"""
+    rows = np.ones(len(panel.dates), dtype=bool)
+    if start is not None:
+        rows &= panel.dates >= start
+    if end is not None:
+        rows &= panel.dates < end
+    return BacktestPanel(dates=panel.dates[rows], symbols=panel.symbols, close=panel.close[rows],
+                         high=panel.high[rows], low=panel.low[rows], atr=panel.atr[rows],
+                         score=panel.score[rows], valid=panel.valid[rows])
+
+# ================= Simulation =================
+def _date_ns(dates: pd.DatetimeIndex) -> np.ndarray:
+    naive = dates.tz_convert(None) if dates.tz is not None else dates
+    return np.asarray(naive, dtype="datetime64[ns]").astype(np.int64)
+
+def simulate_panel(panel: BacktestPanel, initial_equity: float = 10000, risk_per_trade: float = 0.01,
+                   stop_atr_mult: float = 1.5, min_score: float = 10,
+                   on_signal: Optional[SignalHook] = None,
+                   resolve_fill: Optional[FillResolver] = None, cancel_event=None,
+                   close_at_end: bool = False) -> Dict[str, Any]:
+    """
+    Run the portfolio over a scored panel.
+
+    Symbols are visited in panel order on every date (exits before entries),
+    equity changes immediately on each exit, and an equity point is recorded
+    only on dates where equity moved - the same event order as run_backtest.
+    Returns trades, equity_curve, daily_returns, final_equity, max_drawdown and
+    the positions still open at the end (open_positions).
+
+    With resolve_fill, bars that touch the stop *and* trigger a score or time
+    exit are settled from finer bars (see intrabar.IntrabarResolver) instead
+    of by the fixed stop / time-exit priority. Setting cancel_event stops the
+    run at the next date with BacktestCancelled. With close_at_end, positions
+    still open on a symbol's last bar in the panel exit there at the close
+    ("end_of_data") and no new ones are opened on it, e.g. for a window that
+    is evaluated on its own.
+    """
+    close, high, low, atr, score, valid = panel.close, panel.high, panel.low, panel.atr, panel.score, panel.valid
+    dates, symbols = panel.dates, panel.symbols
+    date_ns = _date_ns(dates)
+
+    # Signals that don't depend on portfolio state, computed once for the whole grid
+    with np.errstate(invalid="ignore"):
+        entry_mask = valid & (score >= min_score)
+        score_exit = valid & (score < min_score / 2)
+    entry_rows = entry_mask.any(axis=1)
+    # Row of each symbol's last bar, where close_at_end settles what is still open (-1: never)
+    last_row = np.full(len(symbols), -1)
+    if close_at_end:
+        last_row = np.where(valid.any(axis=0), len(dates) - 1 - np.argmax(valid[::-1], axis=0), -1)
+
+    trades: List[Dict[str, Any]] = []
+    equity_curve: List[Dict[str, Any]] = []
+    daily_returns: List[float] = []
+    current_equity = initial_equity
+    max_equity = initial_equity
+    max_drawdown = 0
+    positions: Dict[int, Dict[str, Any]] = {}  # column -> position
+    held = np.zeros(len(symbols), dtype=bool)
+
+    for t in range(len(dates)):
+        if cancel_event is not None and cancel_event.is_set():
+            raise BacktestCancelled()
+        if not positions and not entry_rows[t]:
+            continue
+        day_start_equity = current_equity
+        current_date = dates[t]
+
+        for j in np.flatnonzero(valid[t] & (held | entry_mask[t])):
+            symbol = symbols[j]
+            at_end = t == last_row[j]
+
+            # Check existing positions for exits (stops, score, time)
+            position = positions.get(j)
+            if position is not None:
+                exit_reason = None
+                exit_price = close[t, j]
+                stop_fill = position['stop_price']
+                if position['direction'] == "long":
+                    stop_hit = low[t, j] <= stop_fill
+                else:
+                    stop_hit = high[t, j] >= stop_fill
+                time_up = (date_ns[t] - position['entry_ns']) // NS_PER_DAY >= MAX_HOLDING_DAYS
+
+                resolved = None
+                if resolve_fill is not None and stop_hit and (score_exit[t, j] or time_up):
+                    resolved = resolve_fill(symbol, current_date, position['direction'], stop_fill)
+                    if resolved is not None:
+                        stop_hit, stop_fill = resolved
+
+                if stop_hit:
+                    exit_reason, exit_price = "stop_loss", stop_fill
+                elif score_exit[t, j]:
+                    exit_reason = "score_exit"
+
+                # Time exits go out at the close - unless finer bars showed the stop filled earlier in the bar
+                if time_up and not (resolved is not None and stop_hit):
+                    exit_reason, exit_price = "time_exit", close[t, j]
+                if exit_reason is None and at_end:
+                    exit_reason = "end_of_data"
+
+                if exit_reason is not None:
+                    if position['direction'] == "long":
+                        trade_return = (exit_price - position['entry_price']) / position['entry_price']
+                    else:
+                        trade_return = (position['entry_price'] - exit_price) / position['entry_price']
+                    trade_pnl = trade_return * position['position_value']
+                    current_equity += trade_pnl
+                    holding_days = (current_date - position['entry_date']).days
+
+                    trades.append({
+                        'symbol': symbol,
+                        'direction': position['direction'],
+                        'entry_date': position['entry_date'],
+                        'exit_date': current_date,
+                        'entry_price': position['entry_price'],
+                        'exit_price': exit_price,
+                        'position_size': position['position_size'],
+                        'trade_return': trade_return,
+                        'trade_pnl': trade_pnl,
+                        'exit_reason': exit_reason,
+                        'holding_days': holding_days
+                    })
+                    if on_signal:
+                        on_signal("SELL", symbol, exit_price, {
+                            'date': str(current_date),
+                            'entry_price': position['entry_price'],
+                            'exit_price': exit_price,
+                            'stop_price': position['stop_price'],
+                            'position_size': position['position_size'],
+                            'position_value': position['position_value'],
+                            'trade_pnl': trade_pnl,
+                            'trade_return': trade_return * 100,  # As percentage
+                            'exit_reason': exit_reason,
+                            'holding_days': holding_days
+                        })
+                    del positions[j]
+                    held[j] = False
+
+            # New entries (not already in position and portfolio capacity available)
+            if (j not in positions and len(positions) < MAX_POSITIONS
+                    and entry_mask[t, j] and current_equity > 0 and not at_end):
+                entry_price = close[t, j]
+                direction = "long" if score[t, j] > 0 else "short"
+
+                # ATR-based position sizing with current equity
+                stop_distance = stop_atr_mult * atr[t, j]
+                stop_price = entry_price - stop_distance if direction == "long" else entry_price + stop_distance
+                risk_amount = current_equity * risk_per_trade
+                with np.errstate(divide="ignore"):
+                    position_size = risk_amount / abs(entry_price - stop_price)
+                position_value = position_size * entry_price
+                if position_value > current_equity * MAX_POSITION_FRACTION:
+                    position_value = current_equity * MAX_POSITION_FRACTION
+                    position_size = position_value / entry_price
+
+                positions[j] = {
+                    'direction': direction,
+                    'entry_price': entry_price,
+                    'entry_date': current_date,
+                    'entry_ns': date_ns[t],
+                    'stop_price': stop_price,
+                    'position_size': position_size,
+                    'position_value': position_value
+                }
+                held[j] = True
+                if on_signal:
+                    on_signal("BUY", symbol, entry_price, {
+                        'date': str(current_date),
+                        'entry_price': entry_price,
+                        'stop_price': stop_price,
+                        'position_size': position_size,
+                        'position_value': position_value,
+                        'score': score[t, j],
+                        'risk_amount': risk_amount
+                    })
+
+        # Update equity curve and drawdown tracking
+        if current_equity != day_start_equity:
+            daily_pnl = current_equity - day_start_equity
+            daily_returns.append(daily_pnl / day_start_equity if day_start_equity > 0 else 0)
+            equity_curve.append({'date': current_date, 'equity': current_equity, 'trade_pnl': daily_pnl})
+            if current_equity > max_equity:
+                max_equity = current_equity
+            else:
+                max_drawdown = max(max_drawdown, (max_equity - current_equity) / max_equity)
+
+    open_positions = [{'symbol': symbols[j], 'direction': p['direction'], 'entry_date': p['entry_date'],
+                       'entry_price': p['entry_price'], 'position_size': p['position_size']}
+                      for j, p in positions.items()]
+    return {
+        'trades': trades,
+        'equity_curve': equity_curve,
+        'daily_returns': daily_returns,
+        'final_equity': current_equity,
+        'max_drawdown': max_drawdown,
+        'open_positions': open_positions,
+    }
+
+# ================= Metrics =================
+def periods_per_year(timeframe: str) -> float:
+    """Annualization factor for per-bar returns"""
+    if timeframe == "1D":
+        return 252
+    if timeframe == "1h":
+        return 252 * 6.5  # Trading hours
+    return 252  # Default
+
+def summarize_backtest(symbols: List[str], trades: List[Dict[str, Any]], daily_returns: List[float],
+                       initial_equity: float, final_equity: float, max_drawdown: float,
+                       timeframe: str, symbols_tested: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(metrics, symbol_performance) for a finished backtest"""
+    symbol_performance: Dict[str, Any] = {}
+    for symbol in symbols:
+        symbol_trades = [t for t in trades if t['symbol'] == symbol]
+        if symbol_trades:
+            wins = len([t for t in symbol_trades if t['trade_pnl'] > 0])
+            symbol_performance[symbol] = {
+                'total_trades': len(symbol_trades),
+                'winning_trades': wins,
+                'total_pnl': sum([t['trade_pnl'] for t in symbol_trades]),
+                'avg_return': np.mean([t['trade_return'] for t in symbol_trades]),
+                'win_rate': wins / len(symbol_trades)
+            }
+
+    if not trades:
+        metrics = {
+            'initial_equity': initial_equity, 'final_equity': final_equity, 'total_return': 0,
+            'total_trades': 0, 'winning_trades': 0, 'losing_trades': 0, 'win_rate': 0,
+            'avg_win': 0, 'avg_loss': 0, 'profit_factor': 0, 'max_drawdown': 0, 'sharpe_ratio': 0,
+            'avg_holding_days': 0, 'max_concurrent_positions': MAX_POSITIONS, 'symbols_tested': symbols_tested
+        }
+        return metrics, symbol_performance
+
+    total_trades = len(trades)
+    winning_trades = len([t for t in trades if t['trade_pnl'] > 0])
+    losing_trades = total_trades - winning_trades
+
+    if len(daily_returns) > 1:
+        returns_std = np.std(daily_returns)
+        avg_return = np.mean(daily_returns)
+        sharpe_ratio = (avg_return / returns_std) * np.sqrt(periods_per_year(timeframe)) if returns_std > 0 else 0
+    else:
+        sharpe_ratio = 0
+
+    avg_win = np.mean([t['trade_pnl'] for t in trades if t['trade_pnl'] > 0]) if winning_trades > 0 else 0
+    avg_loss = np.mean([t['trade_pnl'] for t in trades if t['trade_pnl'] < 0]) if losing_trades > 0 else 0
+    profit_factor = (abs(avg_win * winning_trades / (abs(avg_loss) * losing_trades))
+                     if avg_loss != 0 and losing_trades > 0 else float('inf'))
+
+    metrics = {
+        'initial_equity': initial_equity,
+        'final_equity': final_equity,
+        'total_return': (final_equity - initial_equity) / initial_equity,
+        'total_trades': total_trades,
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'win_rate': winning_trades / total_trades,
+        'avg_win': avg_win,
+        'avg_loss': avg_loss,
+        'profit_factor': profit_factor,
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe_ratio,
+        'avg_holding_days': np.mean([t['holding_days'] for t in trades]),
+        'max_concurrent_positions': MAX_POSITIONS,
+        'symbols_tested': symbols_tested
+    }
+    return metrics, symbol_performance
+
+def mark_to_market(panel: BacktestPanel, trades: List[Dict[str, Any]],
+                   open_positions: Optional[List[Dict[str, Any]]] = None,
+                   initial_equity: float = 10000, timeframe: str = "1D") -> Dict[str, Any]:
+    """
+    Equity on every bar of the panel: realised P&L plus open positions marked at that bar's close.
+
+    Signed share counts and cost basis are laid onto the date x symbol grid
+    with np.add.at at entry/exit rows and accumulated with cumsum, so the cost
+    is a few array passes regardless of the number of bars. Positions still
+    open at the end are marked through the last bar. Returns {'equity_curve':
+    [{date, equity, exposure}], 'metrics': {...}} with Sharpe, Sortino,
+    volatility, max drawdown, time in market, average exposure and annualised
+    turnover taken from the per-bar series (no flat days skipped).
+    """
+    n, k = panel.close.shape
+    close = pd.DataFrame(panel.close).ffill().to_numpy()  # carry marks over a symbol's missing bars
+    legs = list(trades) + list(open_positions or [])
+    column = {s: j for j, s in enumerate(panel.symbols)}
+
+    cols = np.array([column[t['symbol']] for t in legs], dtype=int)
+    entry_rows = panel.dates.get_indexer([t['entry_date'] for t in legs])
+    exit_rows = np.concatenate((panel.dates.get_indexer([t['exit_date'] for t in trades]),
+                                np.full(len(legs) - len(trades), n))).astype(int)
+    qty = np.array([(1.0 if t['direction'] == "long" else -1.0) * t['position_size'] for t in legs])
+    entry_price = np.array([t['entry_price'] for t in legs], dtype=float)
+
+    held = np.zeros((n + 1, k))
+    basis = np.zeros((n + 1, k))
+    is_open = np.zeros((n + 1, k), dtype=int)  # exact open flag - float share sums leave residue after exits
+    for grid, entry_value, exit_value in ((held, qty, -qty), (basis, qty * entry_price, -qty * entry_price),
+                                          (is_open, 1, -1)):
+        np.add.at(grid, (entry_rows, cols), entry_value)
+        np.add.at(grid, (exit_rows, cols), exit_value)
+    is_open = np.cumsum(is_open[:n], axis=0) > 0
+    held = np.where(is_open, np.cumsum(held[:n], axis=0), 0.0)
+    basis = np.where(is_open, np.cumsum(basis[:n], axis=0), 0.0)
+    market_value = np.where(is_open, held * close, 0.0)
+
+    realised = np.zeros(n + 1)
+    np.add.at(realised, exit_rows[:len(trades)], [t['trade_pnl'] for t in trades])
+    equity = initial_equity + np.cumsum(realised[:n]) + (market_value - basis).sum(axis=1)
+    gross = np.abs(market_value).sum(axis=1)
+    exposure = np.divide(gross, equity, out=np.zeros(n), where=equity > 0)
+
+    returns = np.diff(equity) / equity[:-1] if n > 1 else np.zeros(0)
+    scale = np.sqrt(periods_per_year(timeframe))
+    std = returns.std() if len(returns) else 0.0
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2)) if len(returns) else 0.0
+    peak = np.maximum.accumulate(equity) if n else equity
+    years = (panel.dates[-1] - panel.dates[0]).days / 365.25 if n > 1 else 0.0
+    traded = float(np.abs(qty) @ entry_price + sum(t['position_size'] * t['exit_price'] for t in trades))
+
+    metrics = {
+        'final_equity': float(equity[-1]) if n else initial_equity,
+        'total_return': float(equity[-1] / initial_equity - 1) if n else 0.0,
+        'sharpe_ratio': float(returns.mean() / std * scale) if std > 0 else 0.0,
+        'sortino_ratio': float(returns.mean() / downside * scale) if downside > 0 else 0.0,
+        'volatility': float(std * scale),
+        'max_drawdown': float(((peak - equity) / peak).max()) if n else 0.0,
+        'time_in_market': float((gross > 0).mean()) if n else 0.0,
+        'avg_exposure': float(exposure.mean()) if n else 0.0,
+        'turnover': float(traded / equity.mean() / years) if years > 0 else 0.0,
+        'open_positions': len(legs) - len(trades),
+    }
+    curve = [{'date': d, 'equity': e, 'exposure': x} for d, e, x in zip(panel.dates, equity.tolist(), exposure.tolist())]
+    return {'equity_curve': curve, 'metrics': metrics}
+
+# ================= Entry point =================
+def run_backtest_vectorized(symbols: List[str], start_date: str, end_date: str, timeframe: str = "1D",
+                            initial_equity: float = 10000, risk_per_trade: float = 0.01,
+                            stop_atr_mult: float = 1.5, min_score: float = 10,
+                            on_signal: Optional[SignalHook] = None, custom_settings: Optional[dict] = None,
+                            workers: int = 1, resolve_fill: Optional[FillResolver] = None) -> Dict[str, Any]:
+    """Drop-in replacement for run_backtest returning the same result dict"""
+    try:
+        error = validate_backtest_range(start_date, end_date, timeframe)
+        if error:
+            return _error_result(error)
+
+        symbol_data, errors = load_backtest_data(symbols, timeframe, start_date, end_date, custom_settings, workers)
+        if not symbol_data:
+            return _error_result('No valid symbol data loaded')
+        return backtest_panel(build_panel(symbol_data), symbols, timeframe, initial_equity, risk_per_trade,
+                              stop_atr_mult, min_score, on_signal, errors, resolve_fill)
+    except Exception as e:
+        return _error_result(str(e))
+
+def backtest_panel(panel: BacktestPanel, symbols: List[str], timeframe: str = "1D",
+                   initial_equity: float = 10000, risk_per_trade: float = 0.01,
+                   stop_atr_mult: float = 1.5, min_score: float = 10,
+                   on_signal: Optional[SignalHook] = None,
+                   errors: Optional[List[str]] = None,
+                   resolve_fill: Optional[FillResolver] = None, cancel_event=None) -> Dict[str, Any]:
+    """Simulate an already-loaded panel and assemble the run_backtest result dict"""
+    sim = simulate_panel(panel, initial_equity, risk_per_trade, stop_atr_mult, min_score, on_signal, resolve_fill,
+                         cancel_event)
+    metrics, symbol_performance = summarize_backtest(
+        symbols, sim['trades'], sim['daily_returns'], initial_equity, sim['final_equity'],
+        sim['max_drawdown'], timeframe, len(panel.symbols))
+    result = {
+        'trades': sim['trades'],
+        'equity_curve': sim['equity_curve'],
+        'metrics': metrics,
+        'symbol_performance': symbol_performance,
+        'errors': list(errors or []),
+        'mark_to_market': mark_to_market(panel, sim['trades'], sim['open_positions'], initial_equity, timeframe),
+    }
+    if resolve_fill is not None:
+        result['fill_resolution'] = dict(getattr(resolve_fill, 'stats', {}))
+    return result
@@ -0,0 +1,146 @@
+# market_scanner/barstore.py
+# On-disk OHLCV cache for large universes: one .npz file per (interval, symbol),
+# refreshed incrementally with batched yf.download calls instead of one
+# Ticker.history request per symbol.
+
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from .data import _yf_interval_period, yf_to_ohlcv
+
+BAR_DIR = os.getenv("MARKET_SCANNER_BAR_DIR",
+                    os.path.join(os.path.expanduser("~"), ".cache", "market_scanner", "bars"))
+DEFAULT_MAX_AGE = 300      # seconds a cached series counts as fresh (same as the app's scan cache TTL)
+DEFAULT_BATCH_SIZE = 100   # tickers per yf.download call
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# ================= Store files =================
+def bar_path(symbol: str, interval: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or BAR_DIR, interval, quote(symbol.upper(), safe="") + ".npz")
+
+def load_bars(symbol: str, interval: str, root: Optional[str] = None) -> Tuple[Optional[pd.DataFrame], float]:
+    """Return (bars, fetched_at) from the store, or (None, 0.0) when nothing usable is cached"""
+    try:
+        with np.load(bar_path(symbol, interval, root)) as z:
+            index = pd.DatetimeIndex(z["index"]).tz_localize("UTC")
+            bars = pd.DataFrame(z["values"], index=index, columns=OHLCV_COLUMNS)
+            return bars, float(z["fetched_at"])
+    except (OSError, KeyError, ValueError):
+        return None, 0.0
+
+def save_bars(symbol: str, interval: str, bars: pd.DataFrame, fetched_at: Optional[float] = None,
+              root: Optional[str] = None) -> None:
+    """Atomically write a symbol's bars (write to a temp file, then rename) so concurrent readers never see a partial file"""
+    path = bar_path(symbol, interval, root)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Each writer gets its own temp file (thread-pool fetches can save the same symbol at once)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=os.path.basename(path) + ".",
+                                     suffix=".tmp", delete=False) as f:
+        tmp = f.name
+        try:
+            np.savez(f,
+                     index=np.asarray(bars.index.tz_convert(None), dtype="datetime64[ns]"),
+                     values=bars[OHLCV_COLUMNS].to_numpy(dtype=float),
+                     fetched_at=np.float64(fetched_at if fetched_at is not None else time.time()))
+        except BaseException:
+            f.close()
+            os.unlink(tmp)
+            raise
+    os.replace(tmp, path)
+
+def _period_start(period: str, now: pd.Timestamp) -> pd.Timestamp:
+    """Earliest bar a fresh yfinance pull for `period` ('2y', '730d', '60d') would return"""
+    n, unit = int(period[:-1]), period[-1]
+    return now - (pd.DateOffset(years=n) if unit == "y" else pd.Timedelta(days=n))
+
+def merge_bars(cached: pd.DataFrame, fresh: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Append fresh bars (replacing overlaps, e.g. the still-forming last bar) and trim to the provider window"""
+    bars = pd.concat([cached, fresh])
+    bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+    return bars[bars.index >= _period_start(period, pd.Timestamp.now(tz="UTC"))]
+
+# ================= Batched fetching =================
+def download_batch(symbols: List[str], interval: str, period: Optional[str] = None,
+                   start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+    """One yf.download call for many tickers; returns symbol -> normalised bars (symbols with no data are omitted)"""
+    data = yf.download(symbols, period=None if start is not None else period, start=start,
+                       interval=interval, group_by="ticker", auto_adjust=False,
+                       threads=True, progress=False)
+    out: Dict[str, pd.DataFrame] = {}
+    if data is None or data.empty:
+        return out
+    multi = isinstance(data.columns, pd.MultiIndex)
+    tickers = set(data.columns.get_level_values(0)) if multi else set()
+    for sym in symbols:
+        if multi and sym not in tickers:
+            continue
+        bars = yf_to_ohlcv(data[sym].copy() if multi else data.copy())
+        if not bars.empty:
+            out[sym] = bars
+    return out
+
+def _batches(items: list, size: int):
+    for i in range(0, len(items), max(size, 1)):
+        yield items[i:i + size]
+
+def load_universe_bars(symbols: List[str], timeframe: str, root: Optional[str] = None,
+                       max_age: float = DEFAULT_MAX_AGE, batch_size: int = DEFAULT_BATCH_SIZE,
+                       progress=None) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+    """
+    Bars for every symbol, served from the store when fresh and refreshed in batches otherwise.
+
+    Symbols without a cached series get a full-period download; cached ones only
+    fetch from their last stored bar onwards. Returns (symbol -> bars, symbol -> error).
+    yf.download keeps per-call state in module globals, so batches run one after
+    another and rely on yfinance's own threads for concurrency.
+    """
+    interval, period = _yf_interval_period(timeframe)
+    now = time.time()
+    window_start = _period_start(period, pd.Timestamp.now(tz="UTC"))
+    frames: Dict[str, pd.DataFrame] = {}
+    errors: Dict[str, str] = {}
+    cached: Dict[str, pd.DataFrame] = {}
+    full: List[str] = []
+
+    for sym in symbols:
+        bars, fetched_at = load_bars(sym, interval, root)
+        if bars is not None and not bars.empty and now - fetched_at < max_age:
+            frames[sym] = bars
+        elif bars is not None and not bars.empty and bars.index[-1] > window_start:
+            cached[sym] = bars
+        else:
+            full.append(sym)
+
+    # Incremental refresh: group cached symbols by last bar so each batch starts close to its own data
+    incremental = sorted(cached, key=lambda s: cached[s].index[-1])
+    jobs = [(batch, None) for batch in _batches(full, batch_size)]
+    jobs += [(batch, min(cached[s].index[-1] for s in batch)) for batch in _batches(incremental, batch_size)]
+
+    for done, (batch, start) in enumerate(jobs, 1):
+        try:
+            fetched = download_batch(batch, interval, period=period, start=start)
+        except Exception as e:
+            fetched, batch_error = {}, str(e)
+        else:
+            batch_error = None
+        fetched_at = time.time()
+        for sym in batch:
+            if sym in fetched:
+                bars = merge_bars(cached[sym], fetched[sym], period) if sym in cached else fetched[sym]
+                save_bars(sym, interval, bars, fetched_at, root)
+                frames[sym] = bars
+            elif sym in cached:
+                frames[sym] = cached[sym]  # keep serving the stored series until a refresh succeeds
+            else:
+                errors[sym] = batch_error or f"No yfinance data for {sym} @ {interval}/{period}"
+        if progress:
+            progress(done, len(jobs))
+    return frames, errors
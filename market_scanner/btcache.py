@@ -0,0 +1,354 @@
+# market_scanner/btcache.py
+# Persistent backtest cache. Raw bars are kept per (timeframe, date range,
+# symbol), scored feature frames per (bar data version, scoring settings), and
+# finished results per hash of the backtest config plus every symbol's data
+# version - so an identical rerun skips downloads and simulation entirely and a
+# run that only adds symbols rescores just the new ones. Entries unused for
+# BACKTEST_CACHE_MAX_DAYS, or beyond BACKTEST_CACHE_MAX_MB (least recently used
+# first), are evicted by prune_backtest_cache().
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .backtest import (
+    BacktestCancelled, SignalHook, _error_result, backtest_panel, build_panel, prepare_symbol_bars, validate_backtest_range,
+)
+from .barstore import DEFAULT_MAX_AGE, bar_path, load_bars, save_bars
+from .data import get_ohlcv
+from .scanner import run_cancellable, run_parallel
+
+BACKTEST_CACHE_DIR = os.getenv("MARKET_SCANNER_BACKTEST_CACHE_DIR",
+                               os.path.join(os.path.expanduser("~"), ".cache", "market_scanner", "backtests"))
+CACHE_FORMAT = 2   # bump when features/scoring/simulation change so stale entries stop matching
+BACKTEST_CACHE_MAX_DAYS = float(os.getenv("BACKTEST_CACHE_MAX_DAYS", "30"))    # unused entries older than this are evicted
+BACKTEST_CACHE_MAX_MB = float(os.getenv("BACKTEST_CACHE_MAX_MB", "2048"))      # ... then least recently used until under this
+PRUNE_INTERVAL = 3600.0   # seconds between automatic prunes of one cache dir
+# progress(phase, done, total) with phase in loading / featurizing / simulating
+PhaseProgress = Callable[[str, int, int], Any]
+
+# ================= Keys =================
+def _json_default(o: Any) -> Any:
+    return o.item() if hasattr(o, "item") else str(o)
+
+def _digest(payload: Any) -> str:
+    text = json.dumps(payload, sort_keys=True, default=_json_default)
+    return hashlib.sha256(f"{CACHE_FORMAT}:{text}".encode()).hexdigest()[:32]
+
+def data_version(bars: pd.DataFrame) -> str:
+    """Content hash of a symbol's raw bars (timestamps and OHLCV values)"""
+    h = hashlib.sha256()
+    h.update(np.asarray(bars.index.tz_convert(None), dtype="datetime64[ns]").tobytes())
+    h.update(np.ascontiguousarray(bars.to_numpy(dtype=float)).tobytes())
+    return h.hexdigest()[:32]
+
+def settings_key(custom_settings: Optional[dict] = None) -> str:
+    """Disabled or missing custom settings score exactly like the defaults, so they share a key"""
+    if not (custom_settings and custom_settings.get('enabled')):
+        return "default"
+    return _digest(custom_settings)
+
+def config_key(config: Dict[str, Any], versions: Dict[str, str],
+               custom_settings: Optional[dict] = None) -> str:
+    """Result key: the backtest config dict (as saved with the result) plus each symbol's data version"""
+    return _digest({'config': config, 'versions': versions, 'settings': settings_key(custom_settings)})
+
+def range_is_closed(end_date: str) -> bool:
+    """Bars for a range that ended before today can no longer change"""
+    return pd.Timestamp(end_date).date() < pd.Timestamp.now(tz="UTC").date()
+
+# ================= Files =================
+def _bars_root(cache_dir: str, start_date: str, end_date: str) -> str:
+    return os.path.join(cache_dir, "bars", f"{start_date}_{end_date}")
+
+def _write_atomic(path: str, write) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # A temp file of its own per writer: threads saving the same key must not share one
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=os.path.basename(path) + ".",
+                                     suffix=".tmp", delete=False) as f:
+        tmp = f.name
+        try:
+            write(f)
+        except BaseException:
+            f.close()
+            os.unlink(tmp)
+            raise
+    os.replace(tmp, path)
+
+def _touch(path: str) -> None:
+    """Mark a cache file as used (eviction goes by modification time)"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def _scored_path(cache_dir: str, version: str, skey: str) -> str:
+    # Per-format directory: scored frames from an older CACHE_FORMAT never match (and are pruned)
+    return os.path.join(cache_dir, "scored", f"v{CACHE_FORMAT}", f"{version}_{skey}.npz")
+
+def load_scored(cache_dir: str, version: str, skey: str) -> Optional[pd.DataFrame]:
+    path = _scored_path(cache_dir, version, skey)
+    try:
+        with np.load(path) as z:
+            index = pd.DatetimeIndex(z["index"]).tz_localize("UTC")
+            df = pd.DataFrame(z["values"], index=index, columns=[str(c) for c in z["columns"]])
+    except (OSError, KeyError, ValueError):
+        return None
+    _touch(path)
+    return df
+
+def save_scored(cache_dir: str, version: str, skey: str, df: pd.DataFrame) -> None:
+    _write_atomic(_scored_path(cache_dir, version, skey), lambda f: np.savez(
+        f, index=np.asarray(df.index.tz_convert(None), dtype="datetime64[ns]"),
+        values=df.to_numpy(dtype=float), columns=np.array(df.columns, dtype=str)))
+
+def _result_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, "results", f"{key}.pkl")
+
+def load_result(cache_dir: str, key: str) -> Optional[Dict[str, Any]]:
+    path = _result_path(cache_dir, key)
+    try:
+        with open(path, 'rb') as f:
+            result = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    _touch(path)
+    return result
+
+def save_result(cache_dir: str, key: str, result: Dict[str, Any]) -> None:
+    _write_atomic(_result_path(cache_dir, key), lambda f: pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+def clear_backtest_cache(cache_dir: Optional[str] = None) -> None:
+    shutil.rmtree(cache_dir or BACKTEST_CACHE_DIR, ignore_errors=True)
+
+def prune_backtest_cache(cache_dir: Optional[str] = None, max_days: float = BACKTEST_CACHE_MAX_DAYS,
+                         max_mb: float = BACKTEST_CACHE_MAX_MB) -> Tuple[int, int]:
+    """
+    Evict cache files: scored frames from older CACHE_FORMATs, anything unused
+    for max_days, then the least recently used until the cache is under max_mb.
+    Returns (files removed, bytes freed).
+    """
+    cache_dir = cache_dir or BACKTEST_CACHE_DIR
+    now = time.time()
+    scored_root = os.path.join(cache_dir, "scored")
+    current_scored = os.path.join(scored_root, f"v{CACHE_FORMAT}")
+    files: List[Tuple[float, int, str]] = []
+    doomed: List[Tuple[int, str]] = []
+    for dirpath, _, names in os.walk(cache_dir):
+        outdated = dirpath.startswith(scored_root) and not dirpath.startswith(current_scored)
+        for name in names:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith(".tmp"):
+                if now - st.st_mtime > PRUNE_INTERVAL:   # left behind by a crashed writer
+                    doomed.append((st.st_size, path))
+            elif outdated or now - st.st_mtime > max_days * 86400:
+                doomed.append((st.st_size, path))
+            else:
+                files.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in files)
+    files.sort()
+    limit = max_mb * 1024 * 1024
+    while files and total > limit:
+        _, size, path = files.pop(0)
+        doomed.append((size, path))
+        total -= size
+    removed = freed = 0
+    for size, path in doomed:
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        removed += 1
+        freed += size
+    return removed, freed
+
+_last_prune: Dict[str, float] = {}
+_prune_lock = threading.Lock()
+
+def maybe_prune_backtest_cache(cache_dir: Optional[str] = None) -> None:
+    """prune_backtest_cache() at most once per PRUNE_INTERVAL per cache dir in this process"""
+    cache_dir = cache_dir or BACKTEST_CACHE_DIR
+    with _prune_lock:
+        if time.monotonic() - _last_prune.get(cache_dir, -PRUNE_INTERVAL) < PRUNE_INTERVAL:
+            return
+        _last_prune[cache_dir] = time.monotonic()
+    try:
+        prune_backtest_cache(cache_dir)
+    except Exception as e:
+        print(f"Backtest cache prune failed: {e}")
+
+# ================= Cached loading =================
+def cached_bars(symbol: str, timeframe: str, start_date: str, end_date: str,
+                cache_dir: Optional[str] = None, max_age: float = DEFAULT_MAX_AGE) -> pd.DataFrame:
+    """
+    Raw bars for a date range, fetched once and kept on disk.
+
+    Bars are reused forever once the range has closed, otherwise for max_age
+    seconds. Fetch errors propagate (nothing is cached for them).
+    """
+    root = _bars_root(cache_dir or BACKTEST_CACHE_DIR, start_date, end_date)
+    bars, fetched_at = load_bars(symbol, timeframe, root)
+    if bars is None or not (range_is_closed(end_date) or time.time() - fetched_at < max_age):
+        bars = get_ohlcv(symbol, timeframe, start=start_date, end=end_date)
+        save_bars(symbol, timeframe, bars, root=root)
+    else:
+        _touch(bar_path(symbol, timeframe, root))
+    return bars
+
+def fetch_symbol_bars(symbol: str, timeframe: str, start_date: str, end_date: str,
+                      cache_dir: Optional[str] = None,
+                      max_age: float = DEFAULT_MAX_AGE) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """cached_bars() returning (bars, None) or (None, error message) like load_symbol_bars"""
+    try:
+        return cached_bars(symbol, timeframe, start_date, end_date, cache_dir, max_age), None
+    except Exception as e:
+        return None, f"{symbol}: Data loading failed - {str(e)}"
+
+def featurize_symbol_bars(symbol: str, bars: pd.DataFrame, custom_settings: Optional[dict] = None,
+                          cache_dir: Optional[str] = None) -> Tuple[Optional[pd.DataFrame], Optional[str], str]:
+    """Scored feature frame for raw bars, from the score cache when this data version was seen before"""
+    cache_dir = cache_dir or BACKTEST_CACHE_DIR
+    version = data_version(bars)
+    skey = settings_key(custom_settings)
+    df_features = load_scored(cache_dir, version, skey)
+    if df_features is not None:
+        return df_features, None, version
+    try:
+        df_features, err = prepare_symbol_bars(symbol, bars, custom_settings)
+    except Exception as e:
+        return None, f"{symbol}: Data loading failed - {str(e)}", version
+    if df_features is not None:
+        save_scored(cache_dir, version, skey, df_features)
+    return df_features, err, version
+
+def cached_symbol_bars(symbol: str, timeframe: str, start_date: str, end_date: str,
+                       custom_settings: Optional[dict] = None, cache_dir: Optional[str] = None,
+                       max_age: float = DEFAULT_MAX_AGE) -> Tuple[Optional[pd.DataFrame], Optional[str], Optional[str]]:
+    """
+    load_symbol_bars() through the cache; returns (feature frame, error, data version).
+
+    The version is None when the fetch itself failed, so results depending on
+    that symbol are not cached.
+    """
+    bars, err = fetch_symbol_bars(symbol, timeframe, start_date, end_date, cache_dir, max_age)
+    if err is not None:
+        return None, err, None
+    return featurize_symbol_bars(symbol, bars, custom_settings, cache_dir)
+
+def load_backtest_data_cached(symbols: List[str], timeframe: str, start_date: str, end_date: str,
+                              custom_settings: Optional[dict] = None, workers: int = 1,
+                              cache_dir: Optional[str] = None, max_age: float = DEFAULT_MAX_AGE
+                              ) -> Tuple[Dict[str, pd.DataFrame], List[str], Dict[str, Optional[str]]]:
+    """load_backtest_data() plus each symbol's data version"""
+    outcomes = run_parallel(cached_symbol_bars, symbols,
+                            (timeframe, start_date, end_date, custom_settings, cache_dir, max_age), workers)
+    symbol_data: Dict[str, pd.DataFrame] = {}
+    errors: List[str] = []
+    versions: Dict[str, Optional[str]] = {}
+    for symbol, (df_features, err, version) in zip(symbols, outcomes):
+        versions[symbol] = version
+        if err is not None:
+            errors.append(err)
+        else:
+            symbol_data[symbol] = df_features
+    return symbol_data, errors, versions
+
+def _cancelled_result() -> Dict[str, Any]:
+    return {**_error_result('Backtest cancelled'), 'cancelled': True}
+
+def run_backtest_cached(config: Dict[str, Any], on_signal: Optional[SignalHook] = None,
+                        custom_settings: Optional[dict] = None, workers: int = 1,
+                        cache_dir: Optional[str] = None, max_age: float = DEFAULT_MAX_AGE,
+                        progress: Optional[PhaseProgress] = None, cancel_event=None,
+                        reuse_results: bool = True) -> Dict[str, Any]:
+    """
+    run_backtest_vectorized() for a config dict (symbols, start_date, end_date,
+    timeframe, initial_equity, risk_per_trade, stop_atr_mult, min_score and,
+    optionally, fill_resolution=True to settle ambiguous stop bars from finer
+    bars - see intrabar.IntrabarResolver).
+
+    The result carries 'cache_hit'. Runs with an on_signal hook always simulate
+    (the hook must see every signal) but still reuse cached bars and scores;
+    reuse_results=False does the same for every run. progress(phase, done,
+    total) reports the loading / featurizing / simulating phases, and setting
+    cancel_event stops the run between symbols or, while simulating, between
+    dates (the result has 'cancelled').
+    """
+    cache_dir = cache_dir or BACKTEST_CACHE_DIR
+    maybe_prune_backtest_cache(cache_dir)
+    def report(phase: str) -> Optional[Callable[[int, int], Any]]:
+        return (lambda done, total: progress(phase, done, total)) if progress else None
+    try:
+        symbols, start_date, end_date = config['symbols'], config['start_date'], config['end_date']
+        timeframe = config.get('timeframe', '1D')
+        error = validate_backtest_range(start_date, end_date, timeframe)
+        if error:
+            return _error_result(error)
+
+        fetched, cancelled = run_cancellable(
+            lambda sym: fetch_symbol_bars(sym, timeframe, start_date, end_date, cache_dir, max_age),
+            symbols, workers, "thread", progress=report("loading"), cancel_event=cancel_event)
+        if cancelled:
+            return _cancelled_result()
+        loaded = [(sym, bars) for sym, (bars, err) in zip(symbols, fetched) if err is None]
+        featurized, cancelled = run_cancellable(
+            lambda item: featurize_symbol_bars(item[0], item[1], custom_settings, cache_dir),
+            loaded, workers, "thread", progress=report("featurizing"), cancel_event=cancel_event)
+        if cancelled:
+            return _cancelled_result()
+
+        # Reassemble in symbol order: fetch errors (no version) and scoring errors alike
+        scored = {sym: out for (sym, _), out in zip(loaded, featurized)}
+        symbol_data: Dict[str, pd.DataFrame] = {}
+        errors: List[str] = []
+        versions: Dict[str, Optional[str]] = {}
+        for sym, (_, fetch_err) in zip(symbols, fetched):
+            df_features, err, version = scored.get(sym, (None, fetch_err, None))
+            versions[sym] = version
+            if err is not None:
+                errors.append(err)
+            else:
+                symbol_data[sym] = df_features
+
+        cacheable = all(v is not None for v in versions.values())
+        key = config_key(config, versions, custom_settings)
+        if cacheable and reuse_results and on_signal is None:
+            result = load_result(cache_dir, key)
+            if result is not None:
+                return {**result, 'cache_hit': True}
+
+        if not symbol_data:
+            return _error_result('No valid symbol data loaded')
+        resolve_fill = None
+        if config.get('fill_resolution'):
+            from .intrabar import IntrabarResolver
+            resolve_fill = IntrabarResolver(timeframe, start_date, end_date, cache_dir, max_age)
+        if progress:
+            progress("simulating", 0, 1)
+        try:
+            result = backtest_panel(build_panel(symbol_data), symbols, timeframe, config.get('initial_equity', 10000),
+                                    config.get('risk_per_trade', 0.01), config.get('stop_atr_mult', 1.5),
+                                    config.get('min_score', 10), on_signal, errors, resolve_fill, cancel_event)
+        except BacktestCancelled:
+            return _cancelled_result()
+        if progress:
+            progress("simulating", 1, 1)
+        if cacheable and reuse_results:
+            save_result(cache_dir, key, result)
+        return {**result, 'cache_hit': False}
+    except Exception as e:
+        return _error_result(str(e))
@@ -0,0 +1,144 @@
+# market_scanner/btjobs.py
+# Backtests as background jobs: submit_backtest() returns immediately with a
+# job id while a worker thread runs run_backtest_cached(), recording the
+# current phase (loading / featurizing / simulating / saving) and its progress
+# on the job. Jobs can be cancelled between symbols (or dates, while
+# simulating), and on_finish lets the
+# caller persist the result (e.g. save_backtest_result) so it outlives the
+# session that started it.
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from .backtest import SignalHook
+from .barstore import DEFAULT_MAX_AGE
+from .btcache import run_backtest_cached
+
+BACKTEST_JOB_WORKERS = int(os.getenv("BACKTEST_JOB_WORKERS", "2"))   # backtests running at once
+JOB_RETENTION = 3600   # seconds a finished job stays listed
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+
+@dataclass
+class BacktestJob:
+    """One submitted backtest; progress fields are updated in place by the worker thread"""
+    id: str
+    name: str
+    config: Dict[str, Any]
+    owner: Optional[str] = None
+    status: str = "queued"
+    phase: str = "queued"
+    done: int = 0
+    total: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    saved: Any = None   # whatever on_finish returned, e.g. the saved result's id
+    save_error: Optional[str] = None   # what on_finish raised, if it did
+    submitted_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def fraction(self) -> float:
+        """Progress through the current phase, 0..1"""
+        return self.done / self.total if self.total else 0.0
+
+_JOBS: Dict[str, BacktestJob] = {}
+_LOCK = threading.Lock()
+_POOL: Optional[ThreadPoolExecutor] = None
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=max(BACKTEST_JOB_WORKERS, 1), thread_name_prefix="backtest-job")
+        return _POOL
+
+def _prune(now: float) -> None:
+    for job_id in [j.id for j in _JOBS.values()
+                   if j.finished and j.finished_at is not None and now - j.finished_at > JOB_RETENTION]:
+        del _JOBS[job_id]
+
+def _finish(job: BacktestJob, status: str, error: Optional[str] = None) -> None:
+    """Publish a terminal status; finished_at goes first, so whoever sees job.finished can read it"""
+    job.finished_at = time.time()
+    if error is not None:
+        job.error = error
+    if status == "cancelled":
+        job.phase = status
+    job.status = status
+
+def _run(job: BacktestJob, on_finish: Optional[Callable[[BacktestJob], Any]], **kwargs) -> None:
+    if job.cancel_event.is_set():
+        _finish(job, "cancelled")
+        return
+
+    def progress(phase: str, done: int, total: int) -> None:
+        job.phase, job.done, job.total = phase, done, total
+
+    job.status = "running"
+    try:
+        result = run_backtest_cached(job.config, progress=progress, cancel_event=job.cancel_event, **kwargs)
+        job.result = result
+        if result.get('cancelled'):
+            _finish(job, "cancelled")
+        elif 'error' in result:
+            _finish(job, "failed", result['error'])
+        else:
+            if on_finish:
+                job.phase, job.done, job.total = "saving", 0, 1
+                try:
+                    job.saved = on_finish(job)
+                except Exception as e:
+                    job.save_error = str(e)
+                job.done = 1
+            _finish(job, "done")
+    except Exception as e:
+        _finish(job, "failed", str(e))
+
+def submit_backtest(name: str, config: Dict[str, Any], on_finish: Optional[Callable[[BacktestJob], Any]] = None,
+                    owner: Optional[str] = None, custom_settings: Optional[dict] = None,
+                    on_signal: Optional[SignalHook] = None, workers: int = 1, reuse_results: bool = True,
+                    cache_dir: Optional[str] = None, max_age: float = DEFAULT_MAX_AGE) -> BacktestJob:
+    """
+    Queue run_backtest_cached(config, ...) on the job pool and return its job.
+
+    on_finish(job) runs on the worker thread after a successful run (phase
+    "saving"); its return value is stored as job.saved. An exception in it is
+    recorded as job.save_error and the job still finishes "done" with its
+    result, so the caller can report the failed save from its own thread.
+    """
+    job = BacktestJob(id=uuid.uuid4().hex[:12], name=name, config=config, owner=owner)
+    with _LOCK:
+        _prune(time.time())
+        _JOBS[job.id] = job
+    _pool().submit(_run, job, on_finish, on_signal=on_signal, custom_settings=custom_settings,
+                   workers=workers, cache_dir=cache_dir, max_age=max_age, reuse_results=reuse_results)
+    return job
+
+def get_job(job_id: str) -> Optional[BacktestJob]:
+    with _LOCK:
+        return _JOBS.get(job_id)
+
+def cancel_job(job_id: str) -> bool:
+    """Ask a queued or running job to stop; False if it is unknown or already finished"""
+    job = get_job(job_id)
+    if job is None or job.finished:
+        return False
+    job.cancel_event.set()
+    return True
+
+def list_jobs(owner: Optional[str] = None) -> List[BacktestJob]:
+    """Jobs still held (running or finished within JOB_RETENTION), newest first"""
+    with _LOCK:
+        _prune(time.time())
+        jobs = [j for j in _JOBS.values() if owner is None or j.owner == owner]
+    return sorted(jobs, key=lambda j: j.submitted_at, reverse=True)
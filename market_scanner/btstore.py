@@ -0,0 +1,106 @@
+# market_scanner/btstore.py
+# Compact storage for saved backtest results. The list-shaped parts of a result
+# (trades, equity curve, mark-to-market curve) are written column by column to
+# a compressed .npz payload; the rest - metrics, per-symbol stats, errors - is
+# a small summary kept with the results row, so listing saved backtests never
+# touches the payload and it is only decoded when a result is opened.
+
+import io
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PAYLOAD_FORMAT = 1   # bump when the payload layout changes
+# Result entries stored as columns; dotted paths reach into nested dicts
+TABLES = ("trades", "equity_curve", "mark_to_market.equity_curve")
+
+def _pop_path(d: Dict[str, Any], path: str) -> Optional[Any]:
+    *parents, key = path.split(".")
+    for p in parents:
+        d = d.get(p)
+        if not isinstance(d, dict):
+            return None
+    return d.pop(key, None)
+
+def _set_path(d: Dict[str, Any], path: str, value: Any) -> None:
+    *parents, key = path.split(".")
+    for p in parents:
+        d = d.setdefault(p, {})
+    d[key] = value
+
+# ================= Column codecs =================
+def _encode_table(rows: List[Dict[str, Any]], name: str, arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Add one array per column of rows to `arrays`; returns the table's layout for the manifest"""
+    df = pd.DataFrame(rows)
+    columns = []
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        key = f"{name}/{i}"
+        if pd.api.types.is_datetime64_any_dtype(s):
+            tz = str(s.dt.tz) if s.dt.tz is not None else None
+            naive = s.dt.tz_convert(None) if tz else s
+            arrays[key] = np.asarray(naive, dtype="datetime64[ns]").view("int64")
+            kind = "datetime"
+        elif pd.api.types.is_bool_dtype(s) or pd.api.types.is_numeric_dtype(s):
+            arrays[key] = s.to_numpy()
+            kind, tz = "number", None
+        else:
+            missing = s.isna().to_numpy()
+            if missing.any():
+                arrays[f"{key}/missing"] = missing
+            arrays[key] = s.astype(str).to_numpy(dtype=str)
+            kind, tz = "text", None
+        columns.append({'name': str(col), 'kind': kind, 'tz': tz})
+    return {'path': name, 'rows': len(df), 'columns': columns}
+
+def _decode_table(layout: Dict[str, Any], arrays: Any) -> List[Dict[str, Any]]:
+    data = {}
+    for i, col in enumerate(layout['columns']):
+        key = f"{layout['path']}/{i}"
+        values = arrays[key]
+        if col['kind'] == "datetime":
+            values = pd.to_datetime(values, unit="ns")
+            if col['tz']:
+                values = values.tz_localize("UTC").tz_convert(col['tz'])
+        elif col['kind'] == "text":
+            values = pd.Series(values, dtype=object)
+            if f"{key}/missing" in arrays:
+                values[arrays[f"{key}/missing"]] = None
+        data[col['name']] = values
+    if not layout['rows']:
+        return []
+    return pd.DataFrame(data, columns=[c['name'] for c in layout['columns']]).to_dict("records")
+
+# ================= Pack / unpack =================
+def pack_results(results: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+    """
+    Split a backtest result into (summary, payload).
+
+    summary is the result without the TABLES entries (JSON-sized); payload is
+    the compressed columnar .npz holding them, restored by unpack_results.
+    """
+    summary = {k: dict(v) if isinstance(v, dict) else v for k, v in results.items()}
+    arrays: Dict[str, np.ndarray] = {}
+    layouts = []
+    for path in TABLES:
+        rows = _pop_path(summary, path)
+        if rows is not None:
+            layouts.append(_encode_table(rows, path, arrays))
+    manifest = {'format': PAYLOAD_FORMAT, 'tables': layouts}
+    arrays['manifest'] = np.frombuffer(json.dumps(manifest).encode(), dtype=np.uint8)
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **arrays)
+    return summary, buf.getvalue()
+
+def unpack_results(summary: Dict[str, Any], payload: bytes) -> Dict[str, Any]:
+    """The full result from pack_results' (summary, payload)"""
+    results = {k: dict(v) if isinstance(v, dict) else v for k, v in summary.items()}
+    with np.load(io.BytesIO(payload), allow_pickle=False) as arrays:
+        manifest = json.loads(arrays['manifest'].tobytes().decode())
+        if manifest['format'] != PAYLOAD_FORMAT:
+            raise ValueError(f"Unsupported backtest payload format {manifest['format']}")
+        for layout in manifest['tables']:
+            _set_path(results, layout['path'], _decode_table(layout, arrays))
+    return results
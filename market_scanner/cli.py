@@ -0,0 +1,415 @@
+# market_scanner/cli.py
+# Headless command line entry point:
+#   python -m market_scanner scan --universe top100 --tf 1h --out results.parquet
+#   python -m market_scanner scan --universe ~/universes/sp500.txt --large   (bar store + panel scoring)
+#     large lists (S&P 500, Russell 1000, exchange pairs) are not bundled: pass a universe file
+#     or put it in MARKET_SCANNER_UNIVERSE_DIR
+#   python -m market_scanner worker --processes 4      (drains the Postgres scan queue)
+#   python -m market_scanner notify-worker             (delivers queued notification emails)
+#   python -m market_scanner sweep --symbols AAPL,MSFT --start 2022-01-01 --end 2024-01-01 --min-score 0,10,20
+#   python -m market_scanner walkforward --universe top100 --start 2018-01-01 --end 2024-01-01 --candidates 100
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import List, Optional
+
+import pandas as pd
+
+from .barstore import DEFAULT_BATCH_SIZE, DEFAULT_MAX_AGE
+from .confluence import scan_confluence
+from .multiasset import asset_class_for, scan_multi_asset
+from .panel import scan_large_universe
+from .sweep import parameter_grid, random_configs, run_sweep
+from .scanner import EXECUTORS, scan_universe
+from .universes import UNIVERSES, get_universe
+from .walkforward import OBJECTIVES, walk_forward
+
+def write_frame(df: pd.DataFrame, path: str) -> None:
+    """Write a DataFrame to .parquet, .csv or .json based on the file extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        try:
+            df.to_parquet(path, index=False)
+        except ImportError as e:
+            raise SystemExit(f"Parquet output needs pyarrow or fastparquet installed ({e}); use a .csv path instead")
+    elif ext == ".csv":
+        df.to_csv(path, index=False)
+    elif ext == ".json":
+        df.to_json(path, orient="records", indent=2)
+    else:
+        raise SystemExit(f"Unsupported output format '{ext}' (use .parquet, .csv or .json)")
+
+def _load_settings(path: Optional[str]) -> dict:
+    """Load custom scanner settings (same shape as custom_scanner_settings in the app)"""
+    if not path:
+        return {'enabled': False}
+    with open(path, 'r') as f:
+        settings = json.load(f)
+    settings.setdefault('enabled', True)
+    return settings
+
+def _resolve_symbols(args) -> tuple:
+    symbols: List[str] = []
+    is_crypto = False
+    for name in args.universe or []:
+        try:
+            syms, crypto = get_universe(name)
+        except KeyError as e:
+            raise SystemExit(str(e).strip("'\""))
+        symbols.extend(syms)
+        is_crypto = is_crypto or crypto
+    if args.symbols:
+        symbols.extend(s.strip() for s in args.symbols.split(","))
+    if args.crypto is not None:
+        is_crypto = args.crypto
+    # Normalise and de-duplicate while keeping order
+    seen = set()
+    symbols = [s.upper() for s in symbols if s and not (s.upper() in seen or seen.add(s.upper()))]
+    return symbols, is_crypto
+
+def _resolve_items(args) -> List[tuple]:
+    """(symbol, timeframe, asset_class) items for --multi-asset, keeping each universe's own asset class"""
+    items = []
+    for name in args.universe or []:
+        try:
+            syms, crypto = get_universe(name)
+        except KeyError as e:
+            raise SystemExit(str(e).strip("'\""))
+        tf = args.crypto_tf if crypto and args.crypto_tf else args.tf
+        items.extend((s.upper(), tf, asset_class_for(s, crypto)) for s in syms)
+    if args.symbols:
+        for s in (s.strip().upper() for s in args.symbols.split(",") if s.strip()):
+            crypto = args.crypto if args.crypto is not None else s.endswith("-USD")
+            tf = args.crypto_tf if crypto and args.crypto_tf else args.tf
+            items.append((s, tf, asset_class_for(s, crypto)))
+    return items
+
+def cmd_scan(args) -> int:
+    if args.multi_asset:
+        return cmd_scan_multi_asset(args)
+    symbols, is_crypto = _resolve_symbols(args)
+    if not symbols:
+        print("No symbols to scan - pass --universe and/or --symbols", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    if args.queue:
+        # Sharded through the Postgres job queue; this process helps alongside any running workers
+        from .jobqueue import run_sharded_scan, scan_params
+        if args.confluence:
+            timeframes = [tf.strip() for tf in args.confluence.split(",") if tf.strip()]
+            params = scan_params('confluence', timeframes, is_crypto, args.account_equity, args.risk_pct,
+                                 args.stop_mult, args.min_vol, _load_settings(args.settings))
+            label = "/".join(timeframes)
+        else:
+            params = scan_params('universe', args.tf, is_crypto, args.account_equity, args.risk_pct,
+                                 args.stop_mult, args.min_vol, _load_settings(args.settings))
+            label = args.tf
+        progress = lambda c: print(f"  shards {c['finished']}/{c['total']}", file=sys.stderr)
+        results, errors = run_sharded_scan(symbols, params, shard_size=args.shard_size,
+                                           scan_workers=args.workers, progress=progress)
+    elif args.large:
+        progress = lambda done, total: print(f"  fetch batches {done}/{total}", file=sys.stderr)
+        results, errors = scan_large_universe(
+            symbols, args.tf, is_crypto, args.account_equity, args.risk_pct,
+            args.stop_mult, args.min_vol, _load_settings(args.settings),
+            store_dir=args.bar_dir, max_age=args.max_age, batch_size=args.batch_size,
+            progress=progress,
+        )
+        label = args.tf
+    elif args.confluence:
+        timeframes = [tf.strip() for tf in args.confluence.split(",") if tf.strip()]
+        results, errors = scan_confluence(
+            symbols, timeframes, is_crypto, args.account_equity, args.risk_pct,
+            args.stop_mult, args.min_vol, _load_settings(args.settings),
+            workers=args.workers, executor=args.executor,
+        )
+        label = "/".join(timeframes)
+    else:
+        results, errors = scan_universe(
+            symbols, args.tf, is_crypto, args.account_equity, args.risk_pct,
+            args.stop_mult, args.min_vol, _load_settings(args.settings),
+            workers=args.workers, executor=args.executor,
+        )
+        label = args.tf
+    elapsed = time.perf_counter() - started
+
+    if args.top and not results.empty:
+        results = results.head(args.top)
+    if args.out:
+        write_frame(results, args.out)
+    else:
+        print(results.to_string(index=False) if not results.empty else "(no candidates)")
+    if args.errors_out and not errors.empty:
+        write_frame(errors, args.errors_out)
+
+    print(f"Scanned {len(symbols)} symbols @ {label} in {elapsed:.1f}s: "
+          f"{len(results)} results, {len(errors)} errors", file=sys.stderr)
+    return 0
+
+def cmd_scan_multi_asset(args) -> int:
+    items = _resolve_items(args)
+    if not items:
+        print("No symbols to scan - pass --universe and/or --symbols", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    results, errors = scan_multi_asset(
+        items, args.account_equity, args.risk_pct, args.stop_mult, args.min_vol,
+        _load_settings(args.settings), workers=args.workers, executor=args.executor,
+    )
+    elapsed = time.perf_counter() - started
+
+    if args.top and not results.empty:
+        results = results.head(args.top)
+    if args.out:
+        write_frame(results, args.out)
+    else:
+        print(results.to_string(index=False) if not results.empty else "(no candidates)")
+    if args.errors_out and not errors.empty:
+        write_frame(errors, args.errors_out)
+
+    classes = ", ".join(f"{n} {c}" for c, n in pd.Series([i[2] for i in items]).value_counts().items())
+    print(f"Scanned {len(items)} symbols ({classes}) in {elapsed:.1f}s: "
+          f"{len(results)} results, {len(errors)} errors", file=sys.stderr)
+    return 0
+
+def _floats(text: str) -> List[float]:
+    return [float(v) for v in text.split(",") if v.strip()]
+
+def cmd_sweep(args) -> int:
+    symbols, _ = _resolve_symbols(args)
+    if not symbols:
+        print("No symbols to backtest - pass --universe and/or --symbols", file=sys.stderr)
+        return 2
+    if args.random:
+        ranges = {}
+        for key, text in (("min_score", args.min_score), ("stop_atr_mult", args.stop_mult), ("risk_per_trade", args.risk_pct)):
+            values = _floats(text)
+            if len(values) > 1:
+                ranges[key] = (min(values), max(values))
+        configs = random_configs(ranges, args.random, seed=args.seed)
+    else:
+        configs = parameter_grid({"min_score": _floats(args.min_score),
+                                  "stop_atr_mult": _floats(args.stop_mult),
+                                  "risk_per_trade": _floats(args.risk_pct)})
+
+    started = time.perf_counter()
+    progress = lambda done, total: print(f"  {done}/{total} configurations", file=sys.stderr)
+    try:
+        sweep = run_sweep(symbols, args.start, args.end, configs, args.tf, args.initial_equity,
+                          workers=args.workers, executor=args.executor, progress=progress)
+    except KeyboardInterrupt:
+        print("Sweep cancelled", file=sys.stderr)
+        return 130
+    if sweep.get('error'):
+        print(f"Sweep failed: {sweep['error']}", file=sys.stderr)
+        return 1
+
+    results = sweep['results'].head(args.top) if args.top else sweep['results']
+    if args.out:
+        write_frame(results, args.out)
+    else:
+        print(results.to_string(index=False) if not results.empty else "(no results)")
+    for err in sweep['errors']:
+        print(f"  {err}", file=sys.stderr)
+    print(f"Evaluated {len(sweep['results'])} configurations on {len(symbols)} symbols in "
+          f"{time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+def cmd_walkforward(args) -> int:
+    symbols, _ = _resolve_symbols(args)
+    if not symbols:
+        print("No symbols to backtest - pass --universe and/or --symbols", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    progress = lambda done, total: print(f"  {done}/{total} windows", file=sys.stderr)
+    try:
+        wf = walk_forward(symbols, args.start, args.end, args.tf, args.in_sample_days, args.out_sample_days,
+                          args.candidates, args.min_score, args.stop_mult, args.risk_pct, args.initial_equity,
+                          args.objective, seed=args.seed, workers=args.workers, executor=args.executor,
+                          progress=progress)
+    except KeyboardInterrupt:
+        print("Walk-forward cancelled", file=sys.stderr)
+        return 130
+    if wf.get('error'):
+        print(f"Walk-forward failed: {wf['error']}", file=sys.stderr)
+        return 1
+
+    if args.out:
+        write_frame(wf['windows'], args.out)
+    else:
+        print(wf['windows'].to_string(index=False))
+    if args.equity_out:
+        write_frame(wf['equity_curve'], args.equity_out)
+    if args.settings_out and wf['window_settings']:
+        with open(args.settings_out, "w") as f:
+            json.dump(wf['window_settings'][-1], f, indent=2)
+    for err in wf['errors']:
+        print(f"  {err}", file=sys.stderr)
+    m = wf['metrics']
+    print(f"Out-of-sample: return {m['total_return']*100:.1f}%, Sharpe {m['sharpe_ratio']:.2f}, "
+          f"max DD {m['max_drawdown']*100:.1f}%, {m['total_trades']} trades over {len(wf['windows'])} windows "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+def cmd_universes(args) -> int:
+    for name in sorted(UNIVERSES):
+        symbols, is_crypto = UNIVERSES[name]
+        print(f"{name:<20} {len(symbols):>5} symbols{'  (crypto)' if is_crypto else ''}")
+    return 0
+
+def _worker_process(scan_workers: int, poll: float) -> None:
+    from .jobqueue import worker_loop
+    try:
+        worker_loop(poll_interval=poll, scan_workers=scan_workers)
+    except KeyboardInterrupt:
+        pass
+
+def cmd_worker(args) -> int:
+    from .db import connect
+    from .jobqueue import ensure_schema
+    conn = connect()
+    ensure_schema(conn)
+    conn.close()
+
+    print(f"Starting {args.processes} scan worker process(es); Ctrl+C to stop", file=sys.stderr)
+    if args.processes <= 1:
+        _worker_process(args.scan_workers, args.poll)
+        return 0
+    procs = [multiprocessing.Process(target=_worker_process, args=(args.scan_workers, args.poll), daemon=True)
+             for _ in range(args.processes)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+    return 0
+
+def cmd_notify_worker(args) -> int:
+    from .db import connect
+    from .outbox import OUTBOX_BATCH_SIZE, ensure_schema, outbox_worker_loop
+    conn = connect()
+    ensure_schema(conn)
+    conn.close()
+
+    print("Starting notification outbox worker; Ctrl+C to stop", file=sys.stderr)
+    try:
+        outbox_worker_loop(poll_interval=args.poll, batch_size=args.batch_size or OUTBOX_BATCH_SIZE)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="market_scanner", description="Headless market scanner")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scan = sub.add_parser("scan", help="Scan a universe and write scored results")
+    scan.add_argument("--universe", action="append", metavar="NAME|FILE",
+                      help=f"Universe name ({', '.join(sorted(UNIVERSES))}) or path to a universe file (repeatable)")
+    scan.add_argument("--symbols", help="Comma-separated extra symbols, e.g. AAPL,MSFT,BTC-USD")
+    scan.add_argument("--tf", default="1D", help="Timeframe (1D, 1h, 30m, 15m, 5m)")
+    scan.add_argument("--confluence", metavar="TFS",
+                      help="Multi-timeframe confluence mode, e.g. 1h,4h,1D (fastest is downloaded, the rest resampled)")
+    scan.add_argument("--out", help="Output path (.parquet, .csv or .json); prints a table if omitted")
+    scan.add_argument("--errors-out", help="Optional path for per-symbol errors")
+    scan.add_argument("--top", type=int, default=0, help="Keep only the top N results by score")
+    crypto = scan.add_mutually_exclusive_group()
+    crypto.add_argument("--crypto", dest="crypto", action="store_true", default=None,
+                        help="Treat symbols as crypto (skips dollar-volume filter)")
+    crypto.add_argument("--no-crypto", dest="crypto", action="store_false")
+    scan.add_argument("--account-equity", type=float, default=10_000.0)
+    scan.add_argument("--risk-pct", type=float, default=0.01, help="Risk per trade as a fraction (0.01 = 1%%)")
+    scan.add_argument("--stop-mult", type=float, default=1.5, help="Stop distance in ATR multiples")
+    scan.add_argument("--min-vol", type=float, default=2_000_000, help="Minimum 20-bar dollar volume")
+    scan.add_argument("--settings", help="JSON file with custom scanner weights/thresholds/periods")
+    scan.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Parallel workers")
+    scan.add_argument("--executor", choices=EXECUTORS, default="thread",
+                      help="thread for network-bound scans, process for CPU-bound ones")
+    scan.add_argument("--queue", action="store_true",
+                      help="Split the scan into shards on the Postgres job queue so every worker can help")
+    scan.add_argument("--shard-size", type=int, default=25, help="Symbols per queue shard")
+    scan.add_argument("--multi-asset", action="store_true",
+                      help="One pass over every universe, keeping each one's asset class; results get an asset_class column")
+    scan.add_argument("--crypto-tf", help="Timeframe for crypto symbols in --multi-asset scans (defaults to --tf)")
+    scan.add_argument("--large", action="store_true",
+                      help="Large-universe mode: cached bar store, batched downloads, panel features and vectorized scoring")
+    scan.add_argument("--bar-dir", help="Bar store directory (default MARKET_SCANNER_BAR_DIR or ~/.cache/market_scanner/bars)")
+    scan.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE,
+                      help="Seconds cached bars count as fresh before an incremental refresh")
+    scan.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Tickers per batched download")
+    scan.set_defaults(func=cmd_scan)
+
+    sweep = sub.add_parser("sweep", help="Backtest parameter sweep ranked by Sharpe / return / drawdown")
+    sweep.add_argument("--universe", action="append", metavar="NAME|FILE", help="Universe name or file (repeatable)")
+    sweep.add_argument("--symbols", help="Comma-separated symbols")
+    sweep.add_argument("--crypto", dest="crypto", action="store_true", default=None)
+    sweep.add_argument("--start", required=True, help="Backtest start date (YYYY-MM-DD)")
+    sweep.add_argument("--end", required=True, help="Backtest end date (YYYY-MM-DD)")
+    sweep.add_argument("--tf", default="1D", help="Timeframe")
+    sweep.add_argument("--initial-equity", type=float, default=10_000.0)
+    sweep.add_argument("--min-score", default="0,10,20,30", help="Comma-separated min_score values (grid) or low,high (--random)")
+    sweep.add_argument("--stop-mult", default="1,1.5,2,3", help="Comma-separated stop ATR multiples")
+    sweep.add_argument("--risk-pct", default="0.01", help="Comma-separated risk per trade fractions")
+    sweep.add_argument("--random", type=int, default=0, metavar="N",
+                       help="Random search: draw N configurations from each option's min..max instead of a grid")
+    sweep.add_argument("--seed", type=int, help="Random search seed")
+    sweep.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Parallel workers")
+    sweep.add_argument("--executor", choices=EXECUTORS, default="process")
+    sweep.add_argument("--top", type=int, default=0, help="Keep only the top N configurations")
+    sweep.add_argument("--out", help="Output path (.parquet, .csv or .json); prints a table if omitted")
+    sweep.set_defaults(func=cmd_sweep)
+
+    wfo = sub.add_parser("walkforward", help="Walk-forward optimization of scoring weights/thresholds")
+    wfo.add_argument("--universe", action="append", metavar="NAME|FILE", help="Universe name or file (repeatable)")
+    wfo.add_argument("--symbols", help="Comma-separated symbols")
+    wfo.add_argument("--crypto", dest="crypto", action="store_true", default=None)
+    wfo.add_argument("--start", required=True, help="Backtest start date (YYYY-MM-DD)")
+    wfo.add_argument("--end", required=True, help="Backtest end date (YYYY-MM-DD)")
+    wfo.add_argument("--tf", default="1D", help="Timeframe")
+    wfo.add_argument("--in-sample-days", type=int, default=365)
+    wfo.add_argument("--out-sample-days", type=int, default=90)
+    wfo.add_argument("--candidates", type=int, default=50, help="Settings candidates scored per window")
+    wfo.add_argument("--objective", choices=OBJECTIVES, default="sharpe_ratio")
+    wfo.add_argument("--seed", type=int, help="Candidate sampling seed")
+    wfo.add_argument("--min-score", type=float, default=10)
+    wfo.add_argument("--stop-mult", type=float, default=1.5)
+    wfo.add_argument("--risk-pct", type=float, default=0.01, help="Risk per trade fraction")
+    wfo.add_argument("--initial-equity", type=float, default=10_000.0)
+    wfo.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Parallel workers")
+    wfo.add_argument("--executor", choices=EXECUTORS, default="process")
+    wfo.add_argument("--out", help="Per-window table path (.parquet, .csv or .json); prints a table if omitted")
+    wfo.add_argument("--equity-out", help="Stitched out-of-sample equity curve path")
+    wfo.add_argument("--settings-out", help="Write the latest window's settings as JSON (usable with scan --settings)")
+    wfo.set_defaults(func=cmd_walkforward)
+
+    universes = sub.add_parser("universes", help="List available universes (built-in and MARKET_SCANNER_UNIVERSE_DIR files)")
+    universes.set_defaults(func=cmd_universes)
+
+    worker = sub.add_parser("worker", help="Process scan shards from the Postgres job queue")
+    worker.add_argument("--processes", type=int, default=1, help="Worker processes to run on this machine")
+    worker.add_argument("--scan-workers", type=int, default=4, help="Fetch threads inside each worker")
+    worker.add_argument("--poll", type=float, default=2.0, help="Seconds between polls when the queue is empty")
+    worker.set_defaults(func=cmd_worker)
+
+    notify = sub.add_parser("notify-worker", help="Deliver queued notification emails from the Postgres outbox")
+    notify.add_argument("--batch-size", type=int, default=None,
+                        help="Emails claimed per batch (default NOTIFY_BATCH_SIZE or 50)")
+    notify.add_argument("--poll", type=float, default=2.0, help="Seconds between polls when nothing is due")
+    notify.set_defaults(func=cmd_notify_worker)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
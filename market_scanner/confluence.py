@@ -0,0 +1,88 @@
+# market_scanner/confluence.py
+# Multi-timeframe confluence scan: one base download per symbol, higher
+# timeframes resampled locally so extra timeframes cost CPU, not network.
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .data import get_ohlcv, resample_ohlcv, timeframe_minutes
+from .scanner import collect_outcomes, evaluate_bars, result_row, run_parallel
+
+DEFAULT_CONFLUENCE_TFS = ("1h", "4h", "1D")
+
+# Timeframes yfinance can serve directly (anything else must be derived)
+FETCHABLE_TFS = ("1m", "5m", "15m", "30m", "1h", "1D")
+
+def order_timeframes(timeframes: Sequence[str]) -> List[str]:
+    """De-duplicate and sort timeframes from fastest to slowest"""
+    seen = {}
+    for tf in timeframes:
+        seen.setdefault(timeframe_minutes(tf), tf)
+    return [seen[m] for m in sorted(seen)]
+
+def confluence_bars(sym: str, base_df: pd.DataFrame, timeframes: Sequence[str], is_crypto: bool,
+                    account_equity: float, risk_pct: float, stop_mult: float, min_vol: float,
+                    custom_settings: Optional[dict] = None,
+                    weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Score one symbol on every timeframe derived from base_df and combine them.
+
+    The confluence score is the weighted mean of the per-timeframe scores and
+    drives direction and sizing (taken from the base timeframe's last bar).
+    The dollar-volume filter is applied on the slowest timeframe only, so it
+    keeps the same meaning as a plain daily scan.
+    """
+    tfs = order_timeframes(timeframes)
+    base_tf = tfs[0]
+    scores: Dict[str, float] = {}
+    base_last = None
+    for tf in tfs:
+        bars = base_df if tf == base_tf else resample_ohlcv(base_df, tf)
+        tf_min_vol = min_vol if tf == tfs[-1] else 0.0
+        try:
+            last, sc = evaluate_bars(sym, bars, tf, is_crypto, tf_min_vol, custom_settings)
+        except ValueError as e:
+            raise ValueError(f"{tf}: {e}")
+        scores[tf] = sc
+        if tf == base_tf:
+            base_last = last
+
+    w = {tf: float((weights or {}).get(tf, 1.0)) for tf in tfs}
+    total_w = sum(w.values()) or 1.0
+    confluence = sum(scores[tf] * w[tf] for tf in tfs) / total_w
+
+    row = result_row(sym, "/".join(tfs), base_last, confluence, account_equity, risk_pct, stop_mult)
+    bullish = [scores[tf] >= 0 for tf in tfs]
+    aligned = sum(b == (confluence >= 0) for b in bullish)
+    row["agreement"] = all(bullish) or not any(bullish)
+    row["aligned"] = f"{aligned}/{len(tfs)}"
+    for tf in tfs:
+        row[f"score_{tf}"] = round(scores[tf], 2)
+    return row
+
+def confluence_symbol(sym: str, timeframes: Sequence[str], is_crypto: bool,
+                      account_equity: float, risk_pct: float, stop_mult: float, min_vol: float,
+                      custom_settings: Optional[dict] = None,
+                      weights: Optional[Dict[str, float]] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Fetch the base timeframe once and score the symbol across all timeframes"""
+    tfs = order_timeframes(timeframes)
+    try:
+        base_df = get_ohlcv(sym, tfs[0])
+        row = confluence_bars(sym, base_df, timeframes, is_crypto, account_equity, risk_pct,
+                              stop_mult, min_vol, custom_settings, weights)
+        return row, None
+    except Exception as e:
+        return None, {"symbol": sym, "timeframe": "/".join(tfs), "error": str(e)}
+
+def scan_confluence(symbols: List[str], timeframes: Sequence[str] = DEFAULT_CONFLUENCE_TFS,
+                    is_crypto: bool = False, account_equity: float = 10_000.0, risk_pct: float = 0.01,
+                    stop_mult: float = 1.5, min_vol: float = 2_000_000,
+                    custom_settings: dict = None, weights: Optional[Dict[str, float]] = None,
+                    workers: int = 1, executor: str = "thread") -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Confluence scan of a universe; returns (results, errors) like scan_universe"""
+    tfs = order_timeframes(timeframes)
+    if tfs[0].lower() not in [t.lower() for t in FETCHABLE_TFS]:
+        raise ValueError(f"Base timeframe '{tfs[0]}' can't be downloaded; include one of {', '.join(FETCHABLE_TFS)}")
+    args = (tfs, is_crypto, account_equity, risk_pct, stop_mult, min_vol, custom_settings, weights)
+    return collect_outcomes(run_parallel(confluence_symbol, symbols, args, workers, executor))
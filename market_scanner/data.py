@@ -0,0 +1,90 @@
+# market_scanner/data.py
+# OHLCV data source (yfinance) and timeframe helpers - no Streamlit dependency
+
+from typing import Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+# ================= Utilities =================
+def _yf_interval_period(tf: str) -> Tuple[str, str]:
+    t = tf.lower().strip()
+    if t in ("1d","1day","d"):       return ("1d","2y")
+    if t in ("1h","60m"):            return ("60m","730d")
+    if t in ("30m","15m","5m","1m"): return (t, "60d")  # yfinance limit
+    return ("1d","2y")
+
+def min_bars_required(tf: str) -> int:
+    t = tf.lower()
+    if t in ("1d","d"):    return 210
+    if t in ("1h","60m"):  return 350
+    if t in ("30m","15m"): return 500
+    if t in ("5m","1m"):   return 700
+    return 210
+
+def dollar_volume(df: pd.DataFrame) -> float:
+    return float((df["close"] * df["volume"]).tail(20).mean())
+
+# ================= Data Source (yfinance) =================
+def get_ohlcv_yf(symbol: str, timeframe: str, period: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    interval, default_period = _yf_interval_period(timeframe)
+
+    # Use custom period or date range if provided
+    if start and end:
+        data = yf.Ticker(symbol.upper()).history(start=start, end=end, interval=interval, auto_adjust=False)
+    elif period:
+        data = yf.Ticker(symbol.upper()).history(period=period, interval=interval, auto_adjust=False)
+    else:
+        data = yf.Ticker(symbol.upper()).history(period=default_period, interval=interval, auto_adjust=False)
+
+    if data is None or data.empty:
+        raise ValueError(f"No yfinance data for {symbol} @ {interval}/{period or 'date range'}")
+    return yf_to_ohlcv(data)
+
+def yf_to_ohlcv(data: pd.DataFrame) -> pd.DataFrame:
+    """Normalise a yfinance Open/High/Low/Close/Volume frame to lowercase float columns on a UTC index"""
+    data.index = pd.to_datetime(data.index, utc=True)
+    out = pd.DataFrame({
+        "open":   data["Open"].astype(float),
+        "high":   data["High"].astype(float),
+        "low":    data["Low"].astype(float),
+        "close":  data["Close"].astype(float),
+        "volume": data["Volume"].astype(float).fillna(0.0),
+    }, index=data.index).dropna()
+    return out
+
+def get_ohlcv(symbol: str, timeframe: str, period: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    return get_ohlcv_yf(symbol, timeframe, period, start, end)
+
+# ================= Resampling =================
+# Bar length in minutes for every timeframe the scanner understands
+TIMEFRAME_MINUTES = {
+    "1m": 1, "5m": 5, "15m": 15, "30m": 30,
+    "1h": 60, "60m": 60, "4h": 240,
+    "1d": 1440, "d": 1440, "1w": 10080,
+}
+
+# pandas resample rule for each derived timeframe
+_RESAMPLE_RULES = {
+    "1m": "1min", "5m": "5min", "15m": "15min", "30m": "30min",
+    "1h": "1h", "60m": "1h", "4h": "4h",
+    "1d": "1D", "d": "1D", "1w": "W-FRI",
+}
+
+def timeframe_minutes(tf: str) -> int:
+    t = tf.lower().strip()
+    if t not in TIMEFRAME_MINUTES:
+        raise ValueError(f"Unknown timeframe '{tf}'")
+    return TIMEFRAME_MINUTES[t]
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """Aggregate OHLCV bars up to a higher timeframe (first/max/min/last/sum), dropping empty buckets"""
+    rule = _RESAMPLE_RULES[timeframe.lower().strip()]
+    out = df.resample(rule).agg({
+        "open": "first",
+        "high": "max",
+        "low": "min",
+        "close": "last",
+        "volume": "sum",
+    })
+    return out.dropna(subset=["open", "high", "low", "close"])
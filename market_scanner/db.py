@@ -0,0 +1,26 @@
+# market_scanner/db.py
+# Plain psycopg2 connections for headless workers (app.py keeps its own
+# st.cache_resource pool). Connection settings come from DATABASE_URL or the
+# standard PGHOST/PGPORT/PGDATABASE/PGUSER/PGPASSWORD/PGSSLMODE variables.
+
+import os
+from contextlib import contextmanager
+from typing import Optional
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+def connect(dsn: Optional[str] = None):
+    """Open a new connection (libpq falls back to PG* environment variables when the DSN is empty)"""
+    return psycopg2.connect(
+        dsn or os.getenv("DATABASE_URL", ""),
+        connect_timeout=10,
+        options='-c statement_timeout=30000',  # 30 second query timeout
+    )
+
+@contextmanager
+def transaction(conn):
+    """Yield a RealDictCursor inside a transaction that commits on success and rolls back on error"""
+    with conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            yield cur
@@ -0,0 +1,101 @@
+# market_scanner/features.py
+# Technical indicators (pure pandas)
+
+import numpy as np
+import pandas as pd
+
+# ================= Indicators (pure pandas) =================
+def _ema(s, n):    return s.ewm(span=n, adjust=False).mean()
+def _rsi(s, n=14):
+    d = s.diff()
+    up = d.clip(lower=0).ewm(alpha=1/n, adjust=False).mean()
+    dn = (-d.clip(upper=0)).ewm(alpha=1/n, adjust=False).mean()
+    rs = up / dn
+    return 100 - (100 / (1 + rs))
+def _atr(h, l, c, n=14):
+    tr = pd.concat([h - l, (h - c.shift()).abs(), (l - c.shift()).abs()], axis=1).max(axis=1)
+    return tr.ewm(alpha=1/n, adjust=False).mean()
+def _bb_width(c, n=20, k=2.0):
+    ma = c.rolling(n).mean(); sd = c.rolling(n).std()
+    upper, lower = ma + k*sd, ma - k*sd
+    return (upper - lower) / c
+
+def _feature_periods(custom_settings=None):
+    """(rsi, ema_long, bb, breakout) periods from custom settings or the defaults"""
+    if custom_settings and custom_settings.get('enabled'):
+        periods = custom_settings.get('periods', {})
+        return (periods.get('rsi', 14), periods.get('ema_long', 200),
+                periods.get('bb', 20), periods.get('breakout', 20))
+    return 14, 200, 20, 20
+
+def compute_features(df: pd.DataFrame, custom_settings=None) -> pd.DataFrame:
+    out = df.copy()
+
+    # Get custom periods or use defaults
+    rsi_period, ema_long, bb_period, breakout_period = _feature_periods(custom_settings)
+
+    out["ema8"]   = _ema(out["close"], 8)
+    out["ema21"]  = _ema(out["close"], 21)
+    out["ema50"]  = _ema(out["close"], 50)
+    out["ema200"] = _ema(out["close"], ema_long)
+    out["rsi"]    = _rsi(out["close"], rsi_period)
+
+    macd_fast = _ema(out["close"], 12); macd_slow = _ema(out["close"], 26)
+    macd_line = macd_fast - macd_slow
+    signal    = macd_line.ewm(span=9, adjust=False).mean()
+    out["macd_hist"] = macd_line - signal
+
+    out["atr"]        = _atr(out["high"], out["low"], out["close"], 14)
+    out["bb_width"]   = _bb_width(out["close"], bb_period, 2.0)
+    out["vol_ma20"]   = out["volume"].rolling(bb_period).mean()
+    out["vol_z"]      = (out["volume"] - out["vol_ma20"]) / out["vol_ma20"].replace(0, np.nan)
+    out["close_20_max"] = out["close"].rolling(breakout_period).max()
+    out["close_20_min"] = out["close"].rolling(breakout_period).min()
+    out["bb_width_ma"]  = out["bb_width"].rolling(bb_period).mean()
+    return out
+
+# ================= Panel features (many symbols at once) =================
+# Column order of compute_features() output
+FEATURE_COLUMNS = [
+    "open", "high", "low", "close", "volume",
+    "ema8", "ema21", "ema50", "ema200", "rsi", "macd_hist", "atr", "bb_width",
+    "vol_ma20", "vol_z", "close_20_max", "close_20_min", "bb_width_ma",
+]
+
+def _atr_panel(h: pd.DataFrame, l: pd.DataFrame, c: pd.DataFrame, n=14) -> pd.DataFrame:
+    prev = c.shift()
+    # fmax skips NaN like the row-wise max in _atr, so the first bar's range is high - low
+    tr = np.fmax(np.fmax(h - l, (h - prev).abs()), (l - prev).abs())
+    return tr.ewm(alpha=1/n, adjust=False).mean()
+
+def compute_panel_features(panels: dict, custom_settings=None) -> dict:
+    """
+    compute_features() for a whole universe at once.
+
+    panels maps each OHLCV column to a DataFrame with one column per symbol.
+    Every indicator is an ewm/rolling/diff that pandas applies column by column,
+    so each symbol's values match compute_features() on its own bars as long as
+    panels are only padded with leading NaNs (see panel.build_panels).
+    """
+    rsi_period, ema_long, bb_period, breakout_period = _feature_periods(custom_settings)
+    close, volume = panels["close"], panels["volume"]
+    out = {col: panels[col] for col in ("open", "high", "low", "close", "volume")}
+
+    out["ema8"]   = _ema(close, 8)
+    out["ema21"]  = _ema(close, 21)
+    out["ema50"]  = _ema(close, 50)
+    out["ema200"] = _ema(close, ema_long)
+    out["rsi"]    = _rsi(close, rsi_period)
+
+    macd_line = _ema(close, 12) - _ema(close, 26)
+    signal    = macd_line.ewm(span=9, adjust=False).mean()
+    out["macd_hist"] = macd_line - signal
+
+    out["atr"]          = _atr_panel(panels["high"], panels["low"], close, 14)
+    out["bb_width"]     = _bb_width(close, bb_period, 2.0)
+    out["vol_ma20"]     = volume.rolling(bb_period).mean()
+    out["vol_z"]        = (volume - out["vol_ma20"]) / out["vol_ma20"].replace(0, np.nan)
+    out["close_20_max"] = close.rolling(breakout_period).max()
+    out["close_20_min"] = close.rolling(breakout_period).min()
+    out["bb_width_ma"]  = out["bb_width"].rolling(bb_period).mean()
+    return out
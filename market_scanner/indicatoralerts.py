@@ -0,0 +1,274 @@
+# market_scanner/indicatoralerts.py
+# Indicator-condition alerts ("RSI crosses below 30", "close breaks the 20-bar
+# high", "score crosses above 40"). IndicatorState carries compute_features()'
+# recurrences (EMAs, Wilder RSI/ATR, rolling windows) forward one bar at a
+# time, and IndicatorEngine keeps one state per (symbol, timeframe) shared by
+# every alert on it: a check feeds each symbol only its new bars, then tests
+# each alert with a couple of comparisons.
+
+import copy
+import math
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .barstore import DEFAULT_MAX_AGE, load_universe_bars
+from .features import FEATURE_COLUMNS, _feature_periods
+from .scoring import score_row
+
+# Values an alert can watch: compute_features() columns, the scanner score, and
+# the breakout levels as they stood before the latest bar ("close crosses above prior_high")
+INDICATOR_FIELDS = FEATURE_COLUMNS + ["score", "prior_high", "prior_low"]
+CONDITION_OPS = ("above", "below", "crosses_above", "crosses_below")
+ALERT_TIMEFRAMES = ("1D", "1h")
+
+INDICATOR_ALERTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS indicator_alerts (
+        id BIGSERIAL PRIMARY KEY,
+        workspace_id TEXT NOT NULL,
+        user_email TEXT,
+        symbol TEXT NOT NULL,
+        timeframe TEXT NOT NULL DEFAULT '1D',
+        indicator TEXT NOT NULL,
+        condition TEXT NOT NULL CHECK (condition IN ('above', 'below', 'crosses_above', 'crosses_below')),
+        target_value DOUBLE PRECISION,
+        target_field TEXT,
+        notification_method TEXT DEFAULT 'in_app',
+        is_active BOOLEAN NOT NULL DEFAULT TRUE,
+        is_triggered BOOLEAN NOT NULL DEFAULT FALSE,
+        triggered_at TIMESTAMPTZ,
+        triggered_value DOUBLE PRECISION,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        CHECK (target_value IS NOT NULL OR target_field IS NOT NULL)
+    );
+    CREATE INDEX IF NOT EXISTS idx_indicator_alerts_active ON indicator_alerts(symbol, timeframe) WHERE is_active;
+    CREATE INDEX IF NOT EXISTS idx_indicator_alerts_workspace ON indicator_alerts(workspace_id);
+"""
+
+class _Row(dict):
+    """Feature values with the attribute access score_row expects"""
+    def __getattr__(self, name: str) -> float:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+def _mean(values) -> float:
+    return math.fsum(values) / len(values)
+
+def _snapshot(core: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a state's core; values dicts are never mutated once built, so they are shared"""
+    out = dict(core)
+    out['ema'] = dict(core['ema'])
+    for key in ('closes', 'volumes', 'bb_widths'):
+        out[key] = copy.copy(core[key])
+    return out
+
+# ================= Incremental indicator state =================
+class IndicatorState:
+    """
+    compute_features() for one symbol, advanced a bar at a time.
+
+    update() takes one OHLCV bar and refreshes `values` (the latest bar's
+    features plus score / prior_high / prior_low); `prev` holds the bar
+    before it, so crossings compare prev against values. A bar with the same
+    timestamp as the latest one (a bar still forming) replaces it instead of
+    advancing the state, so polling an open bar is safe.
+    """
+
+    def __init__(self, custom_settings: Optional[dict] = None):
+        self.custom_settings = custom_settings
+        self.rsi_period, ema_long, self.bb_period, self.breakout_period = _feature_periods(custom_settings)
+        self.spans = {'ema8': 8, 'ema21': 21, 'ema50': 50, 'ema200': ema_long, 'macd_fast': 12, 'macd_slow': 26}
+        self.last_ts: Optional[pd.Timestamp] = None
+        self.bars = 0
+        self.values: Dict[str, float] = {}
+        self.prev: Dict[str, float] = {}
+        self._core = self._empty_core()
+        self._before_last: Optional[Dict[str, Any]] = None   # core as it was before the latest bar
+
+    def _empty_core(self) -> Dict[str, Any]:
+        return {
+            'ema': {}, 'signal': None, 'up': None, 'dn': None, 'atr': None, 'prev_close': None,
+            'closes': deque(maxlen=max(self.bb_period, self.breakout_period)),
+            'volumes': deque(maxlen=self.bb_period),
+            'bb_widths': deque(maxlen=self.bb_period),
+            'values': {},
+        }
+
+    def update(self, ts: pd.Timestamp, open_: float, high: float, low: float, close: float, volume: float) -> bool:
+        """Apply one bar; False (and no change) if it is older than the latest bar"""
+        if self.last_ts is not None and ts < self.last_ts:
+            return False
+        if ts == self.last_ts:
+            self._core = _snapshot(self._before_last)
+        else:
+            self._before_last = _snapshot(self._core)
+            self.bars += 1
+        self._apply(self._core, float(open_), float(high), float(low), float(close), float(volume))
+        self.last_ts = ts
+        self.prev = self._before_last['values']
+        self.values = self._core['values']
+        return True
+
+    def update_frame(self, bars: pd.DataFrame) -> int:
+        """Apply the bars of an OHLCV frame from the latest known timestamp on; returns how many were new"""
+        if self.last_ts is not None:
+            bars = bars[bars.index >= self.last_ts]
+        before = self.bars
+        for row in zip(bars.index, bars['open'], bars['high'], bars['low'], bars['close'], bars['volume']):
+            self.update(*row)
+        return self.bars - before
+
+    def _apply(self, core: Dict[str, Any], o: float, h: float, l: float, c: float, v: float) -> None:
+        nan = float('nan')
+        # EMAs (ewm adjust=False: seeded with the first close)
+        ema = core['ema']
+        for key, span in self.spans.items():
+            a = 2 / (span + 1)
+            ema[key] = c if key not in ema else a * c + (1 - a) * ema[key]
+        macd_line = ema['macd_fast'] - ema['macd_slow']
+        a = 2 / (9 + 1)
+        core['signal'] = macd_line if core['signal'] is None else a * macd_line + (1 - a) * core['signal']
+
+        # Wilder RSI / ATR
+        pc = core['prev_close']
+        if pc is not None:
+            d = c - pc
+            a = 1 / self.rsi_period
+            up, dn = max(d, 0.0), max(-d, 0.0)
+            core['up'] = up if core['up'] is None else a * up + (1 - a) * core['up']
+            core['dn'] = dn if core['dn'] is None else a * dn + (1 - a) * core['dn']
+        if core['up'] is None or (core['dn'] == 0 and core['up'] == 0):
+            rsi = nan
+        elif core['dn'] == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + core['up'] / core['dn'])
+        tr = h - l if pc is None else max(h - l, abs(h - pc), abs(l - pc))
+        core['atr'] = tr if core['atr'] is None else tr / 14 + (1 - 1 / 14) * core['atr']
+        core['prev_close'] = c
+
+        # Rolling windows
+        closes, volumes, widths = core['closes'], core['volumes'], core['bb_widths']
+        closes.append(c)
+        volumes.append(v)
+        n = self.bb_period
+        if len(closes) >= n:
+            window = list(closes)[-n:]
+            mean = _mean(window)
+            sd = math.sqrt(math.fsum((x - mean) ** 2 for x in window) / (n - 1)) if n > 1 else nan
+            bb_width = ((mean + 2 * sd) - (mean - 2 * sd)) / c if c else nan
+        else:
+            bb_width = nan
+        widths.append(bb_width)
+        vol_ma = _mean(volumes) if len(volumes) == n else nan
+        if len(closes) >= self.breakout_period:
+            window = list(closes)[-self.breakout_period:]
+            high_n, low_n = max(window), min(window)
+        else:
+            high_n = low_n = nan
+        width_ma = _mean(widths) if len(widths) == n and not any(math.isnan(w) for w in widths) else nan
+
+        prior = core['values']
+        values = _Row(
+            open=o, high=h, low=l, close=c, volume=v,
+            ema8=ema['ema8'], ema21=ema['ema21'], ema50=ema['ema50'], ema200=ema['ema200'],
+            rsi=rsi, macd_hist=macd_line - core['signal'], atr=core['atr'], bb_width=bb_width,
+            vol_ma20=vol_ma, vol_z=(v - vol_ma) / vol_ma if vol_ma else nan,
+            close_20_max=high_n, close_20_min=low_n, bb_width_ma=width_ma,
+            prior_high=prior.get('close_20_max', nan), prior_low=prior.get('close_20_min', nan),
+        )
+        values['score'] = float(score_row(values, self.custom_settings))
+        core['values'] = values
+
+# ================= Conditions =================
+def _operands(alert: Dict[str, Any], values: Dict[str, float]) -> Tuple[Optional[float], Optional[float]]:
+    left = values.get(alert['indicator'])
+    right = values.get(alert['target_field']) if alert.get('target_field') else alert.get('target_value')
+    if left is None or right is None or math.isnan(left) or math.isnan(float(right)):
+        return None, None
+    return float(left), float(right)
+
+def condition_met(alert: Dict[str, Any], values: Dict[str, float], prev: Dict[str, float]) -> bool:
+    """
+    Whether alert's condition holds on the latest bar. above/below compare
+    the latest values; crosses_* also need the previous bar on the other side.
+    """
+    left, right = _operands(alert, values)
+    if left is None:
+        return False
+    op = alert['condition']
+    if op == 'above':
+        return left > right
+    if op == 'below':
+        return left < right
+    left_prev, right_prev = _operands(alert, prev)
+    if left_prev is None:
+        return False
+    if op == 'crosses_above':
+        return left_prev <= right_prev and left > right
+    if op == 'crosses_below':
+        return left_prev >= right_prev and left < right
+    return False
+
+def describe_condition(alert: Dict[str, Any]) -> str:
+    """e.g. 'RSI crosses below 30' or 'CLOSE crosses above PRIOR_HIGH'"""
+    target = alert.get('target_field') or f"{float(alert['target_value']):g}"
+    return f"{alert['indicator'].upper()} {alert['condition'].replace('_', ' ')} {str(target).upper()}"
+
+# ================= Shared per-symbol engine =================
+class IndicatorEngine:
+    """
+    One IndicatorState per (symbol, timeframe) with active alerts.
+
+    refresh() loads bars for every watched symbol through the bar store
+    (incremental, batched downloads) and feeds each state only the bars after
+    the ones it has seen; the first refresh seeds a state from the full
+    history. evaluate() then checks each alert against its symbol's state, so
+    the per-alert cost is a couple of comparisons however many alerts share a
+    symbol.
+    """
+
+    def __init__(self, custom_settings: Optional[dict] = None):
+        self.custom_settings = custom_settings
+        self.states: Dict[Tuple[str, str], IndicatorState] = {}
+
+    @staticmethod
+    def _key(alert: Dict[str, Any]) -> Tuple[str, str]:
+        return alert['symbol'].upper(), alert.get('timeframe') or '1D'
+
+    def refresh(self, alerts: Iterable[Dict[str, Any]], max_age: float = DEFAULT_MAX_AGE,
+                bar_root: Optional[str] = None) -> Dict[str, str]:
+        """Bring the states of the alerts' symbols up to date (dropping unwatched ones); returns load errors"""
+        keys = {self._key(a) for a in alerts}
+        for key in [k for k in self.states if k not in keys]:
+            del self.states[key]
+        by_tf: Dict[str, List[str]] = {}
+        for sym, tf in keys:
+            by_tf.setdefault(tf, []).append(sym)
+        errors: Dict[str, str] = {}
+        for tf, symbols in by_tf.items():
+            frames, tf_errors = load_universe_bars(sorted(symbols), tf, root=bar_root, max_age=max_age)
+            errors.update(tf_errors)
+            for sym, bars in frames.items():
+                self.advance(sym, tf, bars)
+        return errors
+
+    def advance(self, symbol: str, timeframe: str, bars: pd.DataFrame) -> int:
+        """Feed one symbol's bars into its state; returns the number of new bars"""
+        key = (symbol.upper(), timeframe)
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = IndicatorState(self.custom_settings)
+        return state.update_frame(bars)
+
+    def evaluate(self, alerts: Iterable[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], float]]:
+        """(alert, indicator value) for every alert whose condition holds on its symbol's latest bar"""
+        out = []
+        for alert in alerts:
+            state = self.states.get(self._key(alert))
+            if state is not None and condition_met(alert, state.values, state.prev):
+                out.append((alert, float(state.values[alert['indicator']])))
+        return out
@@ -0,0 +1,121 @@
+# market_scanner/intrabar.py
+# Intrabar fill resolution for backtests. When a bar both touches a position's
+# stop and triggers a close-based exit (score or time), the bar alone can't say
+# whether the stop really traded first or at what price; the resolver looks at
+# that bar's lower-timeframe bars (e.g. 1h inside 1D), fetched once per symbol
+# through the backtest cache and only for symbols that hit such a bar.
+# Limitation: like every other stop exit in the engine, a resolved stop fills
+# at the stop price even when a sub-bar gapped through it (the panel carries
+# no opens to price plain stop bars the same way), so gap losses are
+# understated; stats['gapped_through'] counts how often that happened here.
+# yfinance only keeps so much intraday history (730 days of 1h bars), so bars
+# older than that can't be drilled; they are skipped and counted in
+# stats['outside_history'] rather than failing the whole symbol's fetch.
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .barstore import DEFAULT_MAX_AGE
+from .btcache import cached_bars
+from .data import timeframe_minutes
+
+# Finer timeframe drilled into for each backtest timeframe (within yfinance's intraday history limits)
+LOWER_TIMEFRAMES = {"1D": "1h", "1h": "5m", "30m": "5m", "15m": "5m"}
+# Days of history yfinance serves per lower timeframe (see data._yf_interval_period), less a day of margin
+LOWER_TIMEFRAME_HISTORY_DAYS = {"1h": 729, "5m": 59}
+
+def history_start(lower_timeframe: str, now: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    """Earliest (UTC, naive) date whose lower-timeframe bars can still be fetched"""
+    now = now if now is not None else pd.Timestamp.now(tz="UTC").tz_localize(None)
+    return (now - pd.Timedelta(days=LOWER_TIMEFRAME_HISTORY_DAYS[lower_timeframe])).normalize()
+
+def history_gap(timeframe: str, start_date: str, now: Optional[pd.Timestamp] = None) -> Optional[str]:
+    """Why part of a backtest range can't be drilled (None when all of it can)"""
+    lower = LOWER_TIMEFRAMES.get(timeframe)
+    if lower is None:
+        return None
+    first = history_start(lower, now)
+    if pd.Timestamp(start_date) >= first:
+        return None
+    return (f"{lower} data only goes back {LOWER_TIMEFRAME_HISTORY_DAYS[lower] + 1} days, so bars before "
+            f"{first.date()} stay on the bar-level rule")
+
+@dataclass
+class IntrabarResolver:
+    """
+    Fill resolver for simulate_panel(resolve_fill=...).
+
+    Called as resolver(symbol, bar_date, direction, stop_price); returns
+    (stop_hit, fill_price) from the lower-timeframe bars, or None when they
+    are unavailable (the engine then keeps its bar-level rule). fill_price
+    is always stop_price, the same rule as plain stop bars. Bars older than
+    the lower timeframe's history are not drilled (stats['outside_history']).
+    """
+    timeframe: str
+    start_date: str
+    end_date: str
+    cache_dir: Optional[str] = None
+    max_age: float = DEFAULT_MAX_AGE
+    lower_timeframe: Optional[str] = None
+    stats: Dict[str, Any] = field(default_factory=dict)
+    _bars: Dict[str, Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        self.lower_timeframe = self.lower_timeframe or LOWER_TIMEFRAMES.get(self.timeframe)
+        if self.lower_timeframe is None:
+            raise ValueError(f"No lower timeframe to resolve {self.timeframe} bars with "
+                             f"(supported: {', '.join(LOWER_TIMEFRAMES)})")
+        self._bar_ns = timeframe_minutes(self.timeframe) * 60 * 10**9
+        self._history_start = history_start(self.lower_timeframe)
+        self._fetch_start = str(max(pd.Timestamp(self.start_date), self._history_start).date())
+        # unresolved = outside_history (too old for the lower timeframe) + bars whose finer data was missing
+        self.stats = {'lower_timeframe': self.lower_timeframe, 'drilled_bars': 0, 'stop_first': 0,
+                      'stop_not_reached': 0, 'gapped_through': 0, 'unresolved': 0, 'outside_history': 0,
+                      'history_start': str(self._history_start.date()), 'symbols_fetched': 0}
+
+    def _load(self, symbol: str) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """(timestamps ns, open, high, low) of the symbol's lower-timeframe bars; None if they can't be fetched"""
+        if symbol not in self._bars:
+            try:
+                bars = cached_bars(symbol, self.lower_timeframe, self._fetch_start, self.end_date,
+                                   self.cache_dir, self.max_age)
+                ts = np.asarray(bars.index.tz_convert(None), dtype="datetime64[ns]").view("int64")
+                self._bars[symbol] = (ts, bars["open"].to_numpy(float), bars["high"].to_numpy(float),
+                                      bars["low"].to_numpy(float))
+            except Exception:
+                self._bars[symbol] = None
+            self.stats['symbols_fetched'] += 1
+        return self._bars[symbol]
+
+    def __call__(self, symbol: str, bar_date: pd.Timestamp, direction: str,
+                 stop_price: float) -> Optional[Tuple[bool, float]]:
+        self.stats['drilled_bars'] += 1
+        bar_start = pd.Timestamp(bar_date)
+        if (bar_start.tz_convert(None) if bar_start.tz is not None else bar_start) < self._history_start:
+            self.stats['outside_history'] += 1
+            self.stats['unresolved'] += 1
+            return None
+        bars = self._load(symbol)
+        if bars is None:
+            self.stats['unresolved'] += 1
+            return None
+        ts, open_, high, low = bars
+        start_ns = pd.Timestamp(bar_date).value
+        lo, hi = np.searchsorted(ts, [start_ns, start_ns + self._bar_ns])
+        if lo == hi:
+            self.stats['unresolved'] += 1
+            return None
+
+        breached = low[lo:hi] <= stop_price if direction == "long" else high[lo:hi] >= stop_price
+        if not breached.any():
+            self.stats['stop_not_reached'] += 1
+            return False, stop_price
+        self.stats['stop_first'] += 1
+        # Filled at the stop like plain stop bars; a gap through it is only counted
+        first_open = open_[lo + int(breached.argmax())]
+        if first_open < stop_price if direction == "long" else first_open > stop_price:
+            self.stats['gapped_through'] += 1
+        return True, stop_price
@@ -0,0 +1,360 @@
+# market_scanner/jobqueue.py
+# Postgres-backed scan queue: a scan request is split into symbol shards that
+# any instance's worker can claim with FOR UPDATE SKIP LOCKED. Results are
+# written back per shard and reassembled for the requesting session. Workers
+# renew the lease on the shard they are running, and finished jobs are deleted
+# after SCAN_JOB_RETENTION_HOURS.
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from psycopg2.extras import Json
+
+from .confluence import scan_confluence
+from .db import connect, transaction
+from .scanner import collect_outcomes, scan_universe
+
+DEFAULT_SHARD_SIZE = 25
+LEASE_SECONDS = 300     # a running shard whose worker went silent this long is re-queued
+HEARTBEAT_SECONDS = LEASE_SECONDS / 4   # how often a worker renews the lease on its running shard
+MAX_ATTEMPTS = 3
+SCAN_JOB_RETENTION_HOURS = float(os.getenv("SCAN_JOB_RETENTION_HOURS", "24"))   # finished jobs are deleted after this
+CLEANUP_INTERVAL = 3600.0   # seconds between a worker's retention cleanups
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS scan_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    workspace_id TEXT,
+    params JSONB NOT NULL,
+    total_shards INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'done')),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    completed_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS scan_shards (
+    id BIGSERIAL PRIMARY KEY,
+    job_id BIGINT NOT NULL REFERENCES scan_jobs(id) ON DELETE CASCADE,
+    shard_no INTEGER NOT NULL,
+    symbols TEXT[] NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    claimed_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    results JSONB,
+    errors JSONB,
+    UNIQUE (job_id, shard_no)
+);
+
+CREATE INDEX IF NOT EXISTS idx_scan_shards_claimable ON scan_shards(id) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_scan_shards_job ON scan_shards(job_id);
+"""
+
+_schema_ready = False
+
+def ensure_schema(conn) -> None:
+    """Create the queue tables if they don't exist yet"""
+    global _schema_ready
+    with transaction(conn) as cur:
+        cur.execute(SCHEMA_SQL)
+    _schema_ready = True
+
+def _ensure_schema_once(conn) -> None:
+    """ensure_schema() on the first call in this process only"""
+    if not _schema_ready:
+        ensure_schema(conn)
+
+def worker_name() -> str:
+    """Unique-enough worker id: host (Cloud Run instance) + pid + random suffix"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+def scan_params(mode: str, timeframe, is_crypto: bool, account_equity: float, risk_pct: float,
+                stop_mult: float, min_vol: float, custom_settings: Optional[dict] = None) -> Dict[str, Any]:
+    """Scan parameters stored on the job; mode is 'universe' (timeframe str) or 'confluence' (list of timeframes)"""
+    if mode not in ("universe", "confluence"):
+        raise ValueError(f"Unknown scan mode '{mode}'")
+    return {
+        'mode': mode,
+        'timeframe': timeframe,
+        'is_crypto': bool(is_crypto),
+        'account_equity': float(account_equity),
+        'risk_pct': float(risk_pct),
+        'stop_mult': float(stop_mult),
+        'min_vol': float(min_vol),
+        'custom_settings': custom_settings or {'enabled': False},
+    }
+
+# ================= Producer side =================
+def submit_scan(conn, symbols: List[str], params: Dict[str, Any], shard_size: int = DEFAULT_SHARD_SIZE,
+                workspace_id: Optional[str] = None) -> int:
+    """Create a job and its shards in one transaction; returns the job id"""
+    shards = [symbols[i:i + shard_size] for i in range(0, len(symbols), shard_size)] or [[]]
+    with transaction(conn) as cur:
+        cur.execute(
+            "INSERT INTO scan_jobs (workspace_id, params, total_shards) VALUES (%s, %s, %s) RETURNING id",
+            (workspace_id, Json(params), len(shards)),
+        )
+        job_id = cur.fetchone()['id']
+        cur.executemany(
+            "INSERT INTO scan_shards (job_id, shard_no, symbols) VALUES (%s, %s, %s)",
+            [(job_id, n, shard) for n, shard in enumerate(shards)],
+        )
+    return job_id
+
+def job_progress(conn, job_id: int) -> Dict[str, int]:
+    """Shard counts by status for a job"""
+    with transaction(conn) as cur:
+        cur.execute("SELECT status, COUNT(*) AS n FROM scan_shards WHERE job_id = %s GROUP BY status", (job_id,))
+        counts = {r['status']: int(r['n']) for r in cur.fetchall()}
+    counts['total'] = sum(counts.values())
+    counts['finished'] = counts.get('done', 0) + counts.get('failed', 0)
+    return counts
+
+def collect_job(conn, job_id: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Reassemble finished shards into (results, errors) frames, same shape as scan_universe"""
+    with transaction(conn) as cur:
+        cur.execute(
+            "SELECT status, symbols, results, errors FROM scan_shards WHERE job_id = %s ORDER BY shard_no",
+            (job_id,),
+        )
+        shards = cur.fetchall()
+    outcomes = []
+    for shard in shards:
+        outcomes.extend((row, None) for row in shard['results'] or [])
+        outcomes.extend((None, err) for err in shard['errors'] or [])
+        if shard['status'] not in ('done', 'failed'):
+            outcomes.extend((None, {"symbol": sym, "error": "shard not finished"}) for sym in shard['symbols'])
+    return collect_outcomes(outcomes)
+
+# ================= Worker side =================
+def claim_shard(conn, worker_id: str, job_id: Optional[int] = None,
+                lease_seconds: int = LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+    """
+    Atomically claim the next queued shard (or one whose lease expired).
+    SKIP LOCKED lets any number of workers poll concurrently without blocking
+    each other or double-claiming. Pass job_id to only help with one job.
+    """
+    with transaction(conn) as cur:
+        # Give up on shards that keep crashing their workers, and finish jobs that leaves complete
+        cur.execute("""
+            UPDATE scan_shards SET status = 'failed', finished_at = NOW(),
+                   errors = (SELECT jsonb_agg(jsonb_build_object('symbol', sym, 'error',
+                                                                 'shard abandoned after repeated worker failures'))
+                             FROM unnest(symbols) AS sym)
+            WHERE status = 'running' AND attempts >= %s
+              AND claimed_at < NOW() - make_interval(secs => %s)
+            RETURNING job_id
+        """, (MAX_ATTEMPTS, lease_seconds))
+        for abandoned_job in sorted({r['job_id'] for r in cur.fetchall()}):
+            _finish_job_if_complete(cur, abandoned_job)
+        cur.execute("""
+            UPDATE scan_shards s
+            SET status = 'running', attempts = s.attempts + 1, claimed_by = %s, claimed_at = NOW()
+            WHERE s.id = (
+                SELECT id FROM scan_shards
+                WHERE (status = 'queued'
+                       OR (status = 'running' AND claimed_at < NOW() - make_interval(secs => %s)))
+                  AND (%s::BIGINT IS NULL OR job_id = %s::BIGINT)
+                ORDER BY id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING s.id, s.job_id, s.shard_no, s.symbols,
+                      (SELECT params FROM scan_jobs j WHERE j.id = s.job_id) AS params
+        """, (worker_id, lease_seconds, job_id, job_id))
+        return cur.fetchone()
+
+def renew_lease(conn, shard: Dict[str, Any], worker_id: str) -> bool:
+    """Heartbeat: push claimed_at forward while this worker still holds the shard"""
+    with transaction(conn) as cur:
+        cur.execute("""
+            UPDATE scan_shards SET claimed_at = NOW()
+            WHERE id = %s AND claimed_by = %s AND status = 'running'
+        """, (shard['id'], worker_id))
+        return cur.rowcount > 0
+
+@contextmanager
+def lease_heartbeat(conn, shard: Dict[str, Any], worker_id: str, interval: float = HEARTBEAT_SECONDS):
+    """
+    Renew the shard's lease every interval seconds on a background thread
+    while the body runs, so long shards aren't re-queued mid-scan. The body
+    must not use conn (the heartbeat does); it is free again on exit.
+    """
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(interval):
+            try:
+                if not renew_lease(conn, shard, worker_id):
+                    return   # lease lost: complete_shard will be ignored anyway
+            except Exception as e:
+                print(f"Scan worker {worker_id} heartbeat failed for shard {shard['id']}: {e}")
+                return
+
+    thread = threading.Thread(target=beat, name=f"shard-heartbeat-{shard['id']}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+def cleanup_jobs(conn, retention_hours: float = SCAN_JOB_RETENTION_HOURS) -> int:
+    """Delete jobs (and, by cascade, their shards) older than retention_hours; returns jobs deleted"""
+    with transaction(conn) as cur:
+        cur.execute("""
+            DELETE FROM scan_jobs
+            WHERE COALESCE(completed_at, created_at) < NOW() - make_interval(secs => %s)
+        """, (retention_hours * 3600,))
+        return cur.rowcount
+
+def _finish_job_if_complete(cur, job_id: int) -> None:
+    cur.execute("""
+        UPDATE scan_jobs SET status = 'done', completed_at = NOW()
+        WHERE id = %s AND status = 'pending'
+          AND NOT EXISTS (SELECT 1 FROM scan_shards WHERE job_id = %s AND status IN ('queued', 'running'))
+    """, (job_id, job_id))
+
+def complete_shard(conn, shard: Dict[str, Any], worker_id: str,
+                   results: List[Dict[str, Any]], errors: List[Dict[str, Any]]) -> bool:
+    """Store shard output; ignored if the lease was lost and another worker re-claimed it"""
+    with transaction(conn) as cur:
+        cur.execute("""
+            UPDATE scan_shards SET status = 'done', finished_at = NOW(), results = %s, errors = %s
+            WHERE id = %s AND claimed_by = %s AND status = 'running'
+        """, (Json(results), Json(errors), shard['id'], worker_id))
+        stored = cur.rowcount > 0
+        _finish_job_if_complete(cur, shard['job_id'])
+    return stored
+
+def release_shard(conn, shard: Dict[str, Any], worker_id: str, error: str) -> None:
+    """Put a shard back on the queue after a worker-side failure (or fail it after MAX_ATTEMPTS)"""
+    with transaction(conn) as cur:
+        cur.execute("""
+            UPDATE scan_shards
+            SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+                finished_at = CASE WHEN attempts >= %s THEN NOW() END,
+                errors = CASE WHEN attempts >= %s THEN %s::jsonb END,
+                claimed_by = NULL
+            WHERE id = %s AND claimed_by = %s
+        """, (MAX_ATTEMPTS, MAX_ATTEMPTS, MAX_ATTEMPTS,
+              Json([{"symbol": sym, "error": error} for sym in shard['symbols']]),
+              shard['id'], worker_id))
+        _finish_job_if_complete(cur, shard['job_id'])
+
+def cancel_unfinished_shards(conn, job_id: int, error: str) -> int:
+    """
+    Fail a job's queued and running shards (e.g. after its requester timed
+    out) so no worker claims them again; a worker still running one finds its
+    lease gone and its result is ignored. Returns shards cancelled.
+    """
+    with transaction(conn) as cur:
+        cur.execute("""
+            UPDATE scan_shards SET status = 'failed', finished_at = NOW(), claimed_by = NULL,
+                   errors = (SELECT jsonb_agg(jsonb_build_object('symbol', sym, 'error', %s))
+                             FROM unnest(symbols) AS sym)
+            WHERE job_id = %s AND status IN ('queued', 'running')
+        """, (error, job_id))
+        cancelled = cur.rowcount
+        _finish_job_if_complete(cur, job_id)
+    return cancelled
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """DataFrame -> JSON-safe records (pandas' encoder turns numpy scalars and NaN into plain JSON)"""
+    return [] if df.empty else json.loads(df.to_json(orient="records"))
+
+def run_shard(shard: Dict[str, Any], scan_workers: int = 1) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Run the scan for one shard's symbols and return JSON-ready (results, errors) records"""
+    p = shard['params']
+    args = (p['is_crypto'], p['account_equity'], p['risk_pct'], p['stop_mult'], p['min_vol'], p['custom_settings'])
+    if p['mode'] == 'confluence':
+        results, errors = scan_confluence(list(shard['symbols']), p['timeframe'], *args, workers=scan_workers)
+    else:
+        results, errors = scan_universe(list(shard['symbols']), p['timeframe'], *args, workers=scan_workers)
+    return _records(results), _records(errors)
+
+def process_one(conn, worker_id: str, job_id: Optional[int] = None, scan_workers: int = 1) -> bool:
+    """Claim and process a single shard; returns False when there was nothing to do"""
+    shard = claim_shard(conn, worker_id, job_id)
+    if not shard:
+        return False
+    try:
+        with lease_heartbeat(conn, shard, worker_id):
+            results, errors = run_shard(shard, scan_workers)
+    except Exception as e:
+        release_shard(conn, shard, worker_id, str(e))
+        return True
+    complete_shard(conn, shard, worker_id, results, errors)
+    return True
+
+def worker_loop(stop_event: Optional[threading.Event] = None, poll_interval: float = 2.0,
+                scan_workers: int = 4, dsn: Optional[str] = None) -> None:
+    """
+    Long-running worker: claim shards until stop_event is set, reconnecting on
+    database errors. The schema is ensured once at start, and jobs past
+    retention are cleaned up every CLEANUP_INTERVAL seconds.
+    """
+    stop_event = stop_event or threading.Event()
+    worker_id = worker_name()
+    conn = None
+    cleanup_due = 0.0
+    while not stop_event.is_set():
+        try:
+            if conn is None or conn.closed:
+                conn = connect(dsn)
+                _ensure_schema_once(conn)
+            if time.monotonic() >= cleanup_due:
+                cleanup_due = time.monotonic() + CLEANUP_INTERVAL
+                cleanup_jobs(conn)
+            if not process_one(conn, worker_id, scan_workers=scan_workers):
+                stop_event.wait(poll_interval)
+        except Exception as e:
+            print(f"Scan worker {worker_id} error: {e}")
+            try:
+                if conn is not None:
+                    conn.close()
+            except Exception:
+                pass
+            conn = None
+            stop_event.wait(poll_interval * 5)
+    if conn is not None and not conn.closed:
+        conn.close()
+
+def run_sharded_scan(symbols: List[str], params: Dict[str, Any], shard_size: int = DEFAULT_SHARD_SIZE,
+                     workspace_id: Optional[str] = None, timeout: float = 600.0, poll_interval: float = 0.5,
+                     scan_workers: int = 1, progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                     dsn: Optional[str] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Submit a sharded scan, help process its shards from this process, and
+    return the assembled (results, errors) once every shard has finished.
+    Helping means the scan still completes when no other worker is running.
+    On timeout the unfinished shards are cancelled and reported as errors.
+    """
+    conn = connect(dsn)
+    try:
+        _ensure_schema_once(conn)
+        job_id = submit_scan(conn, symbols, params, shard_size, workspace_id)
+        worker_id = worker_name()
+        deadline = time.time() + timeout
+        while True:
+            counts = job_progress(conn, job_id)
+            if progress:
+                progress(counts)
+            if counts['finished'] >= counts['total']:
+                break
+            if time.time() > deadline:
+                cancel_unfinished_shards(conn, job_id, f"scan timed out after {timeout:.0f}s")
+                break
+            if not process_one(conn, worker_id, job_id, scan_workers):
+                time.sleep(poll_interval)
+        return collect_job(conn, job_id)
+    finally:
+        conn.close()
@@ -0,0 +1,108 @@
+# market_scanner/memo.py
+# Workspace-scoped memo for the small account lookups the app repeats on every
+# Streamlit rerun (subscription override, active subscription, admin session,
+# device list). Results are kept per workspace for a short TTL and dropped as
+# soon as anything writes to that workspace's account rows, so reruns read
+# from memory while changes still show up on the next rerun. Fallbacks for
+# failed queries are returned via Uncacheable and never memoised.
+
+import copy
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+ACCOUNT_MEMO_TTL = float(os.getenv("ACCOUNT_MEMO_TTL", "60"))   # seconds; bounds staleness from other processes and expiries
+
+class Uncacheable(Exception):
+    """Raised by a memoised function to return value without caching it (e.g. its fallback after a DB error)"""
+
+    def __init__(self, value: Any = None):
+        super().__init__(value)
+        self.value = value
+
+class WorkspaceMemo:
+    """
+    Memoises per-workspace lookups: memoize(fn) caches fn(workspace_id, *args)
+    under (workspace_id, fn name, args) for ttl seconds.
+
+    Every caller gets its own copy of a cached value, so sessions can't see
+    each other's edits to a returned dict or list. A function raising
+    Uncacheable(value) returns value and nothing is cached.
+    invalidate(workspace_id) drops everything cached for one workspace (call
+    it after writes); the TTL covers rows changed by other processes and
+    time-based expiry (overrides, billing periods, admin sessions). At most
+    max_workspaces workspaces are kept (least recently used are dropped).
+    Shared by all sessions in the process.
+    """
+
+    def __init__(self, ttl: float = ACCOUNT_MEMO_TTL, max_workspaces: int = 5000):
+        self.ttl = ttl
+        self.max_workspaces = max_workspaces
+        self._entries: "OrderedDict[str, Dict[Tuple, Tuple[Any, float]]]" = OrderedDict()
+        self._generation: Dict[str, int] = {}   # bumped by invalidate(), so in-flight loads can tell they raced a write
+        self._epoch = 0                          # ... and by invalidate() of everything
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, workspace_id: str, name: str, args: Tuple, loader: Callable[[], Any]) -> Any:
+        """Cached loader() result for (workspace_id, name, args)"""
+        key = (name,) + tuple(args)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(workspace_id)
+            if entries is not None:
+                self._entries.move_to_end(workspace_id)
+                entry = entries.get(key)
+                if entry is not None and now - entry[1] <= self.ttl:
+                    self.stats['hits'] += 1
+                    return copy.deepcopy(entry[0])
+            self.stats['misses'] += 1
+            generation = (self._epoch, self._generation.get(workspace_id, 0))
+        try:
+            value = loader()
+        except Uncacheable as e:
+            return e.value
+        with self._lock:
+            # An invalidate() while loader() ran means value may predate the write: don't keep it
+            if (self._epoch, self._generation.get(workspace_id, 0)) == generation:
+                self._entries.setdefault(workspace_id, {})[key] = (copy.deepcopy(value), time.monotonic())
+                self._entries.move_to_end(workspace_id)
+                while len(self._entries) > self.max_workspaces:
+                    self._entries.popitem(last=False)
+        return value
+
+    def memoize(self, fn: Callable) -> Callable:
+        """Decorator for functions whose first argument is the workspace id"""
+        @functools.wraps(fn)
+        def wrapper(workspace_id, *args):
+            if not workspace_id:
+                try:
+                    return fn(workspace_id, *args)
+                except Uncacheable as e:
+                    return e.value
+            return self.get(workspace_id, fn.__name__, args, lambda: fn(workspace_id, *args))
+        wrapper.uncached = fn
+        return wrapper
+
+    def invalidate(self, workspace_id: Optional[str] = None) -> None:
+        """Forget one workspace's lookups, or everything"""
+        with self._lock:
+            self.stats['invalidations'] += 1
+            if workspace_id is None:
+                self._entries.clear()
+                self._epoch += 1
+            else:
+                self._entries.pop(workspace_id, None)
+                self._generation[workspace_id] = self._generation.get(workspace_id, 0) + 1
+
+    def hit_rate(self) -> float:
+        """Share of lookups answered from memory"""
+        with self._lock:
+            total = self.stats['hits'] + self.stats['misses']
+            return self.stats['hits'] / total if total else 0.0
+
+# Process-wide memo for the app's account lookups
+ACCOUNT_MEMO = WorkspaceMemo()
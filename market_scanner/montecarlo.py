@@ -0,0 +1,111 @@
+# market_scanner/montecarlo.py
+# Monte Carlo robustness analysis of a backtest's trade list: thousands of
+# reshuffled / bootstrapped trade sequences are compounded at once as a
+# (simulations x trades) matrix, giving return and drawdown distributions and
+# percentile bands around the realised equity curve. Seeding from the trades
+# (trades_seed) keeps a result's figures stable from one render to the next.
+
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SIMULATIONS = 10_000
+BAND_PERCENTILES = (5, 25, 50, 75, 95)
+METHODS = ("bootstrap", "shuffle")
+
+def trade_returns(trades: List[Dict[str, Any]], initial_equity: float = 10000) -> np.ndarray:
+    """Each trade's P&L as a fraction of the equity it was realised on (trades in exit order)"""
+    pnl = np.array([t['trade_pnl'] for t in trades], dtype=float)
+    equity_before = initial_equity + np.concatenate(([0.0], np.cumsum(pnl)[:-1]))
+    return pnl / equity_before
+
+def trades_seed(trades: List[Dict[str, Any]], initial_equity: float = 10000) -> int:
+    """Seed derived from a trade list, so the same backtest always draws the same simulations"""
+    digest = hashlib.sha256(np.float64(initial_equity).tobytes())
+    for t in trades:
+        digest.update(f"{t['symbol']}|{t['entry_date']}|{t['exit_date']}|{float(t['trade_pnl'])!r}".encode())
+    return int.from_bytes(digest.digest()[:8], "little")
+
+def resample_returns(returns: np.ndarray, n_simulations: int = DEFAULT_SIMULATIONS,
+                     method: str = "bootstrap", seed: Optional[int] = None) -> np.ndarray:
+    """
+    (n_simulations x n_trades) matrix of resampled trade returns.
+
+    "bootstrap" draws trades with replacement (varies the outcome as well as
+    the path); "shuffle" permutes the actual trades (same final return, only
+    the ordering - and so the drawdown - changes).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}' (expected one of {', '.join(METHODS)})")
+    rng = np.random.default_rng(seed)
+    if method == "bootstrap":
+        return returns[rng.integers(0, len(returns), size=(n_simulations, len(returns)))]
+    return rng.permuted(np.tile(returns, (n_simulations, 1)), axis=1)
+
+def equity_paths(sampled: np.ndarray, initial_equity: float = 10000) -> np.ndarray:
+    """Compounded equity after each trade, with the starting equity as column 0"""
+    paths = np.empty((sampled.shape[0], sampled.shape[1] + 1))
+    paths[:, 0] = initial_equity
+    np.cumprod(1.0 + sampled, axis=1, out=paths[:, 1:])
+    paths[:, 1:] *= initial_equity
+    return paths
+
+def max_drawdowns(paths: np.ndarray) -> np.ndarray:
+    """Largest peak-to-trough decline of every path (as a fraction of the peak)"""
+    peak = np.maximum.accumulate(paths, axis=1)
+    return ((peak - paths) / peak).max(axis=1)
+
+def profit_factors(sampled: np.ndarray) -> np.ndarray:
+    """Gross gains over gross losses per path, on trade returns (inf when a path has no losers)"""
+    gains = np.clip(sampled, 0.0, None).sum(axis=1)
+    losses = gains - sampled.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(losses > 0, gains / np.where(losses > 0, losses, 1.0), np.inf)
+
+def monte_carlo(trades: List[Dict[str, Any]], initial_equity: float = 10000,
+                n_simulations: int = DEFAULT_SIMULATIONS, method: str = "bootstrap",
+                seed: Optional[int] = None, percentiles: Sequence[float] = BAND_PERCENTILES,
+                ruin_drawdown: float = 0.5) -> Dict[str, Any]:
+    """
+    Resample results['trades'] n_simulations times.
+
+    Returns {'final_returns', 'max_drawdowns', 'profit_factors'} arrays (one
+    value per simulation), 'bands' - a DataFrame of equity percentiles after
+    each trade, dated by the actual exit dates so it overlays the equity
+    curve - and a 'summary' dict, or {'error': message} without trades.
+    Pass seed=trades_seed(trades) for figures that don't change between calls.
+    """
+    if not trades:
+        return {'error': 'No trades to resample'}
+    returns = trade_returns(trades, initial_equity)
+    sampled = resample_returns(returns, n_simulations, method, seed)
+    paths = equity_paths(sampled, initial_equity)
+    final_returns = paths[:, -1] / initial_equity - 1
+    drawdowns = max_drawdowns(paths)
+
+    actual = equity_paths(returns[None, :], initial_equity)
+    actual_return = float(actual[0, -1] / initial_equity - 1)
+    actual_drawdown = float(max_drawdowns(actual)[0])
+
+    bands = pd.DataFrame(np.percentile(paths, percentiles, axis=0).T, columns=[f"p{p:g}" for p in percentiles])
+    bands.insert(0, 'date', [trades[0]['entry_date']] + [t['exit_date'] for t in trades])
+    bands.insert(0, 'trade', np.arange(len(trades) + 1))
+
+    ret_p = np.percentile(final_returns, [5, 50, 95])
+    dd_p = np.percentile(drawdowns, [50, 95, 99])
+    summary = {
+        'simulations': int(n_simulations), 'trades': len(trades), 'method': method,
+        'actual_return': actual_return, 'actual_max_drawdown': actual_drawdown,
+        'return_p5': float(ret_p[0]), 'return_p50': float(ret_p[1]), 'return_p95': float(ret_p[2]),
+        'max_drawdown_p50': float(dd_p[0]), 'max_drawdown_p95': float(dd_p[1]), 'max_drawdown_p99': float(dd_p[2]),
+        'prob_loss': float((final_returns < 0).mean()),
+        'prob_ruin': float((drawdowns >= ruin_drawdown).mean()),
+        # Share of simulated paths with a smaller drawdown than the one actually seen
+        'drawdown_rank': float((drawdowns < actual_drawdown).mean()),
+    }
+    return {
+        'final_returns': final_returns, 'max_drawdowns': drawdowns, 'profit_factors': profit_factors(sampled),
+        'bands': bands, 'summary': summary,
+    }
@@ -0,0 +1,60 @@
+# market_scanner/multiasset.py
+# One-pass scan across asset classes: (symbol, timeframe, asset_class) items
+# share a single worker pool, so wall time follows the slowest class instead
+# of the sum of one scan per class.
+
+from itertools import chain, zip_longest
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .scanner import collect_outcomes, run_parallel, scan_symbol
+
+ASSET_CLASSES = ("equity", "commodity", "crypto")
+DEFAULT_MULTI_ASSET_WORKERS = 8
+
+def asset_class_for(symbol: str, is_crypto: bool = False) -> str:
+    """Classify a symbol for tagging (crypto universes are flagged by the caller, futures end in =F)"""
+    if is_crypto:
+        return "crypto"
+    return "commodity" if symbol.upper().endswith("=F") else "equity"
+
+def interleave_items(items: Sequence[Tuple[str, str, str]]) -> List[Tuple[str, str, str]]:
+    """Round-robin items across asset classes so every class progresses from the first batch on"""
+    groups: Dict[str, List[Tuple[str, str, str]]] = {}
+    for item in dict.fromkeys(items):  # de-duplicate, keep order
+        groups.setdefault(item[2], []).append(item)
+    return [item for item in chain.from_iterable(zip_longest(*groups.values())) if item is not None]
+
+def scan_item(item: Tuple[str, str, str], account_equity: float, risk_pct: float, stop_mult: float,
+              min_vol: float, custom_settings: Optional[dict] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """scan_symbol() for one (symbol, timeframe, asset_class) item, tagging the row or error with its class"""
+    sym, timeframe, asset_class = item
+    if asset_class not in ASSET_CLASSES:
+        raise ValueError(f"Unknown asset class '{asset_class}' (expected one of {', '.join(ASSET_CLASSES)})")
+    row, err = scan_symbol(sym, timeframe, asset_class == "crypto", account_equity, risk_pct,
+                           stop_mult, min_vol, custom_settings)
+    for out in (row, err):
+        if out is not None:
+            out["asset_class"] = asset_class
+    return row, err
+
+def scan_multi_asset(items: Sequence[Tuple[str, str, str]], account_equity: float = 10_000.0,
+                     risk_pct: float = 0.01, stop_mult: float = 1.5, min_vol: float = 2_000_000,
+                     custom_settings: dict = None, workers: int = DEFAULT_MULTI_ASSET_WORKERS,
+                     executor: str = "thread") -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Scan equities, commodities and crypto in one pass.
+
+    items are (symbol, timeframe, asset_class) tuples; every fetch goes through
+    the same pool. Returns (results, errors) with an asset_class column; rows
+    for each class are the ones a separate scan_universe call would produce.
+    """
+    args = (account_equity, risk_pct, stop_mult, min_vol, custom_settings)
+    return collect_outcomes(run_parallel(scan_item, interleave_items(items), args, workers, executor))
+
+def split_by_asset_class(df: pd.DataFrame, asset_class: str) -> pd.DataFrame:
+    """Rows of a tagged result/error table for one asset class, without the tag column"""
+    if df.empty or "asset_class" not in df.columns:
+        return pd.DataFrame()
+    return df[df["asset_class"] == asset_class].drop(columns="asset_class").reset_index(drop=True)
@@ -0,0 +1,151 @@
+# market_scanner/outbound.py
+# Shared client for outbound HTTP integrations (Resend, the connector API,
+# entitlements, Next.js auth, Slack, CoinGecko, Apple receipts): one pooled
+# requests.Session per host, so repeat calls reuse a kept-alive TCP/TLS
+# connection instead of handshaking every time, default timeouts, and per-host
+# call metrics. CredentialCache keeps looked-up secrets for a TTL so they are
+# not re-fetched on every use.
+
+import os
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))             # kept-alive connections per host
+DEFAULT_TIMEOUT: Tuple[float, float] = (3.05, 10.0)                  # (connect, read) seconds
+CREDENTIAL_TTL = float(os.getenv("CREDENTIAL_TTL", "900"))           # seconds a looked-up credential is reused
+MISSING_CREDENTIAL_TTL = 60.0                                         # ... and how long a failed lookup is remembered
+
+Timeout = Union[float, Tuple[float, float]]
+
+class _NoCookies(DefaultCookiePolicy):
+    """Cookie policy that neither stores nor sends cookies"""
+
+    def set_ok(self, cookie, request) -> bool:
+        return False
+
+    def return_ok(self, cookie, request) -> bool:
+        return False
+
+# ================= Pooled HTTP client =================
+class HttpClient:
+    """
+    requests with one keep-alive Session per host.
+
+    request() fills in DEFAULT_TIMEOUT when no timeout is given and records
+    per-host counts, status classes, errors and latency (see metrics()).
+    Safe to share between threads. The sessions are shared by every user in
+    the process, so they keep no cookies: a Set-Cookie answering one user's
+    request must never ride along on another user's.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, timeout: Timeout = DEFAULT_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._sessions: Dict[str, requests.Session] = {}
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def session(self, host: str) -> requests.Session:
+        """The pooled session for a host (created on first use)"""
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.cookies.set_policy(_NoCookies())
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        host = urlsplit(url).netloc
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.session(host).request(method, url, **kwargs)
+        except Exception:
+            self._record(host, None, time.perf_counter() - started)
+            raise
+        self._record(host, response.status_code, time.perf_counter() - started)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, host: str, status: Optional[int], elapsed: float) -> None:
+        with self._lock:
+            m = self._metrics.setdefault(host, {'requests': 0, 'errors': 0, '2xx': 0, '3xx': 0, '4xx': 0, '5xx': 0,
+                                                'total_seconds': 0.0, 'max_seconds': 0.0})
+            m['requests'] += 1
+            if status is None:
+                m['errors'] += 1
+            else:
+                m[f"{min(max(status // 100, 2), 5)}xx"] += 1
+            m['total_seconds'] += elapsed
+            m['max_seconds'] = max(m['max_seconds'], elapsed)
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Per-host counters, with avg_ms / max_ms"""
+        with self._lock:
+            out = {}
+            for host, m in self._metrics.items():
+                out[host] = {**m, 'avg_ms': 1000 * m['total_seconds'] / m['requests'] if m['requests'] else 0.0,
+                             'max_ms': 1000 * m['max_seconds']}
+            return out
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+# Process-wide client used by the app, auth_helper and the outbox worker
+HTTP = HttpClient()
+
+# ================= Credential cache =================
+class CredentialCache:
+    """
+    Memoises credential lookups (connector API calls, secret reads) for a TTL.
+
+    get(name, loader) returns the cached value while it is fresh and calls
+    loader() otherwise; a None result is kept for MISSING_CREDENTIAL_TTL so
+    an unconfigured integration is not looked up on every call. invalidate()
+    drops an entry, e.g. after the provider rejects the key.
+    """
+
+    def __init__(self, ttl: float = CREDENTIAL_TTL, missing_ttl: float = MISSING_CREDENTIAL_TTL):
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self._entries: Dict[str, Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and time.monotonic() < entry[1]:
+                return entry[0]
+        value = loader()
+        life = (self.ttl if ttl is None else ttl) if value is not None else self.missing_ttl
+        with self._lock:
+            self._entries[name] = (value, time.monotonic() + life)
+        return value
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop one entry, or all of them"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+CREDENTIALS = CredentialCache()
@@ -0,0 +1,438 @@
+# market_scanner/outbox.py
+# Durable notification outbox: callers record a notification with one INSERT
+# (the in-app row plus an outbox row for the email) and return straight away.
+# Outbox workers - `python -m market_scanner notify-worker`, or the app's
+# background thread - claim pending emails in batches with FOR UPDATE SKIP
+# LOCKED, send them through Resend with the row's idempotency key, retry
+# failures with exponential backoff, and write each delivery status back to
+# the outbox row and its notification as soon as the send returns (renewing
+# the lease on the rest of the batch as they go). Requests and credential lookups go
+# through outbound.py's pooled client and credential cache. Bursty sources
+# (alerts) enqueue with a digest group instead: their rows wait up to
+# DIGEST_WINDOW seconds, then the worker folds each user's pending rows into
+# one in-app summary and at most one digest email, collapsing identical messages.
+
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .db import connect, transaction
+from .jobqueue import worker_name
+from .outbound import CREDENTIALS, HTTP, CredentialCache, HttpClient
+
+OUTBOX_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "50"))   # emails claimed per batch
+LEASE_SECONDS = 120      # a 'sending' row whose worker went silent this long is claimed again
+HEARTBEAT_SECONDS = LEASE_SECONDS / 4   # how often a worker renews the lease on the rows it is still sending
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 30.0      # seconds before the first retry; doubles per attempt
+BACKOFF_MAX = 3600.0
+DIGEST_WINDOW = float(os.getenv("NOTIFY_DIGEST_WINDOW", "60"))   # seconds alerts wait to be coalesced; 0 = off
+RESEND_URL = "https://api.resend.com/emails"
+DEFAULT_FROM_EMAIL = "onboarding@resend.dev"
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    notification_id BIGINT,
+    workspace_id TEXT,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'sending', 'sent', 'failed', 'coalesced')),
+    send_email BOOLEAN NOT NULL DEFAULT TRUE,
+    digest_group TEXT,              -- set: held for coalescing with the group's other rows
+    digest_id BIGINT,               -- coalesced rows: the digest row that carries them
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    claimed_by TEXT,
+    claimed_at TIMESTAMPTZ,
+    sent_at TIMESTAMPTZ,
+    provider_id TEXT,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_due ON notification_outbox(next_attempt_at, id)
+    WHERE status IN ('pending', 'sending') AND digest_group IS NULL;
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_digest ON notification_outbox(digest_group, created_at)
+    WHERE status = 'pending' AND digest_group IS NOT NULL;
+
+ALTER TABLE IF EXISTS notifications ADD COLUMN IF NOT EXISTS delivery_status TEXT;
+ALTER TABLE IF EXISTS notifications ADD COLUMN IF NOT EXISTS delivered_at TIMESTAMPTZ;
+"""
+
+# One statement: the in-app notification (when there is a workspace) and its outbox row.
+# A repeated idempotency key is a no-op - nothing is inserted and no id is returned.
+# Named parameters come from enqueue_params().
+ENQUEUE_SQL = """
+    WITH n AS (
+        INSERT INTO notifications (workspace_id, user_email, subject, message, is_read, created_at, delivery_status)
+        SELECT %(workspace_id)s, %(to_email)s, %(subject)s, %(body)s, FALSE, CURRENT_TIMESTAMP, 'pending'
+        WHERE %(workspace_id)s::text IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM notification_outbox WHERE idempotency_key = %(key)s)
+        RETURNING id
+    )
+    INSERT INTO notification_outbox (idempotency_key, notification_id, workspace_id, to_email, subject, body)
+    SELECT %(key)s, (SELECT id FROM n), %(workspace_id)s, %(to_email)s, %(subject)s, %(body)s
+    ON CONFLICT (idempotency_key) DO NOTHING
+    RETURNING id
+"""
+
+# Held row for coalescing: no notification yet, the digest stage writes the summary
+DIGEST_ENQUEUE_SQL = """
+    INSERT INTO notification_outbox (idempotency_key, workspace_id, to_email, subject, body, send_email, digest_group)
+    VALUES (%(key)s, %(workspace_id)s, %(to_email)s, %(subject)s, %(body)s, %(send_email)s, %(digest_group)s)
+    ON CONFLICT (idempotency_key) DO NOTHING
+    RETURNING id
+"""
+
+class PermanentDeliveryError(Exception):
+    """A send that will fail the same way on every retry (rejected address, bad request)"""
+
+# send(outbox row) -> provider message id; raise to retry, PermanentDeliveryError to give up
+SendFn = Callable[[Dict[str, Any]], Optional[str]]
+
+def ensure_schema(conn) -> None:
+    """Create the outbox table and the notification delivery columns if needed"""
+    with transaction(conn) as cur:
+        cur.execute(SCHEMA_SQL)
+
+def digest_group(to_email: str, workspace_id: Optional[str] = None) -> str:
+    """Rows coalesce per recipient within a workspace"""
+    return f"{workspace_id or ''}:{to_email}"
+
+def enqueue_params(to_email: str, subject: str, body: str, workspace_id: Optional[str] = None,
+                   idempotency_key: Optional[str] = None, send_email: bool = True) -> Dict[str, Any]:
+    """ENQUEUE_SQL / DIGEST_ENQUEUE_SQL parameters; without a key every call is a new message"""
+    return {'key': idempotency_key or f"notification-{uuid.uuid4().hex}", 'workspace_id': workspace_id,
+            'to_email': to_email, 'subject': subject, 'body': body, 'send_email': send_email,
+            'digest_group': digest_group(to_email, workspace_id)}
+
+def enqueue_email(conn, to_email: str, subject: str, body: str, workspace_id: Optional[str] = None,
+                  idempotency_key: Optional[str] = None, digest: bool = False,
+                  send_email: bool = True) -> Optional[int]:
+    """
+    Record a notification for delivery; returns the outbox id, or None for a
+    duplicate key. digest=True holds it for coalescing (send_email=False: in-app only).
+    """
+    sql = DIGEST_ENQUEUE_SQL if digest else ENQUEUE_SQL
+    with transaction(conn) as cur:
+        cur.execute(sql, enqueue_params(to_email, subject, body, workspace_id, idempotency_key, send_email))
+        row = cur.fetchone()
+    return row['id'] if row else None
+
+def backoff_delay(attempts: int) -> float:
+    """Seconds before retry number `attempts` (1-based): exponential with +/-20% jitter"""
+    delay = min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+# ================= Digests =================
+def format_digest(rows: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """
+    (subject, body) for a group of held rows. Identical messages are listed
+    once with a repeat count; a single distinct message keeps its own subject and body.
+    """
+    counts: Dict[Tuple[str, str], int] = {}
+    for row in sorted(rows, key=lambda r: r['id']):
+        key = (row['subject'], row['body'].strip())
+        counts[key] = counts.get(key, 0) + 1
+    if len(counts) == 1:
+        (subject, body), n = next(iter(counts.items()))
+        return (f"{subject} (x{n})" if n > 1 else subject), body
+    subject = f"🔔 {len(counts)} alerts: " + ", ".join(s for s, _ in list(counts)[:3])
+    if len(counts) > 3:
+        subject += f" +{len(counts) - 3} more"
+    sections = [f"{s}{f' (x{n})' if n > 1 else ''}\n{b}" for (s, b), n in counts.items()]
+    body = f"{len(rows)} notifications in the last few minutes:\n\n" + "\n\n---\n\n".join(sections)
+    return subject, body
+
+def coalesce_digests(conn, window: float = DIGEST_WINDOW, max_groups: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Fold every digest group whose oldest held row is at least `window`
+    seconds old into one in-app notification plus, if any row asked for email,
+    one regular outbox row (delivered like any other). The held rows become
+    'coalesced' and point at the digest row. Returns the number of groups folded.
+    """
+    with transaction(conn) as cur:
+        cur.execute("""
+            SELECT * FROM notification_outbox
+            WHERE status = 'pending' AND digest_group IN (
+                SELECT digest_group FROM notification_outbox
+                WHERE status = 'pending' AND digest_group IS NOT NULL
+                GROUP BY digest_group
+                HAVING MIN(created_at) <= NOW() - make_interval(secs => %s)
+                LIMIT %s
+            )
+            ORDER BY id
+            FOR UPDATE SKIP LOCKED
+        """, (window, max_groups))
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for row in cur.fetchall():
+            groups.setdefault(row['digest_group'], []).append(row)
+        for rows in groups.values():
+            subject, body = format_digest(rows)
+            first = rows[0]
+            email = any(r['send_email'] for r in rows)
+            notification_id = None
+            if first['workspace_id'] is not None:
+                cur.execute("""
+                    INSERT INTO notifications (workspace_id, user_email, subject, message, is_read, created_at, delivery_status)
+                    VALUES (%s, %s, %s, %s, FALSE, CURRENT_TIMESTAMP, %s)
+                    RETURNING id
+                """, (first['workspace_id'], first['to_email'], subject, body, 'pending' if email else None))
+                notification_id = cur.fetchone()['id']
+            digest_id = None
+            if email:
+                # Rows asking for email only: in-app-only messages stay out of the email
+                subject, body = format_digest([r for r in rows if r['send_email']])
+                cur.execute("""
+                    INSERT INTO notification_outbox (idempotency_key, notification_id, workspace_id, to_email, subject, body)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (idempotency_key) DO NOTHING
+                    RETURNING id
+                """, (f"digest-{first['idempotency_key']}", notification_id, first['workspace_id'],
+                      first['to_email'], subject, body))
+                created = cur.fetchone()
+                digest_id = created['id'] if created else None
+            cur.execute("""
+                UPDATE notification_outbox SET status = 'coalesced', digest_id = %s
+                WHERE id = ANY(%s)
+            """, (digest_id, [r['id'] for r in rows]))
+    return len(groups)
+
+# ================= Resend delivery =================
+def render_email_html(subject: str, body: str) -> str:
+    """Branded HTML wrapper for a plain-text notification body"""
+    return f"""
+    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+        <div style="background: linear-gradient(135deg, #0F172A 0%, #1E293B 100%); padding: 20px; color: white; border-radius: 8px 8px 0 0;">
+            <h2 style="margin: 0; color: #10B981;">📈 Market Scanner Alert</h2>
+        </div>
+        <div style="background: #f8f9fa; padding: 20px; border-radius: 0 0 8px 8px;">
+            <h3 style="color: #0F172A; margin-top: 0;">{subject}</h3>
+            <div style="white-space: pre-line; color: #374151; line-height: 1.6;">
+{body}
+            </div>
+            <hr style="margin: 20px 0; border: none; border-top: 1px solid #e5e7eb;">
+            <p style="color: #6b7280; font-size: 14px; margin: 0;">
+                This alert was sent by MarketScanner Pro<br>
+                <a href="https://marketscannerpros.app" style="color: #10B981;">Visit Dashboard</a> |
+                <a href="https://app.marketscannerpros.app" style="color: #10B981;">Open Scanner</a>
+            </p>
+        </div>
+    </div>
+    """
+
+def _lookup_resend_credentials(client: HttpClient) -> Optional[Tuple[str, str]]:
+    api_key = os.getenv('RESEND_API_KEY') or os.getenv('Resend')
+    if api_key:
+        return api_key, DEFAULT_FROM_EMAIL
+    hostname = os.getenv('REPLIT_CONNECTORS_HOSTNAME')
+    token = os.getenv('REPL_IDENTITY')
+    if not (hostname and token):
+        return None
+    response = client.get(
+        f'https://{hostname}/api/v2/connection?include_secrets=true&connector_names=resend',
+        headers={'Accept': 'application/json', 'X_REPLIT_TOKEN': f'repl {token}'},
+        timeout=10,
+    )
+    if response.status_code != 200:
+        return None
+    settings = (response.json().get('items') or [{}])[0].get('settings', {})
+    if not settings.get('api_key'):
+        return None
+    return settings['api_key'], settings.get('from_email', DEFAULT_FROM_EMAIL)
+
+def resend_credentials(client: HttpClient = HTTP, cache: CredentialCache = CREDENTIALS) -> Tuple[Optional[str], str]:
+    """
+    (api_key, from_email): RESEND_API_KEY / Resend secret first, then the
+    Replit Resend connector. Cached for CREDENTIAL_TTL, so the connector API
+    is called once per TTL rather than once per email.
+    """
+    found = cache.get('resend', lambda: _lookup_resend_credentials(client))
+    return found if found else (None, DEFAULT_FROM_EMAIL)
+
+class ResendSender:
+    """
+    SendFn for Resend over the shared pooled HTTP client. Credentials come from
+    the credential cache at the start of each batch (begin_batch); a 401/403
+    drops them so the next batch looks them up again. The outbox row's
+    idempotency key goes out as Resend's Idempotency-Key header, so a retry
+    after a lost response doesn't send the email twice.
+    """
+
+    def __init__(self, client: HttpClient = HTTP, cache: CredentialCache = CREDENTIALS):
+        self.client = client
+        self.cache = cache
+        self.api_key: Optional[str] = None
+        self.from_email = DEFAULT_FROM_EMAIL
+
+    def begin_batch(self) -> None:
+        self.api_key, self.from_email = resend_credentials(self.client, self.cache)
+
+    def __call__(self, row: Dict[str, Any]) -> Optional[str]:
+        if not self.api_key:
+            raise RuntimeError("No Resend API key configured (RESEND_API_KEY or the Resend connector)")
+        response = self.client.post(
+            RESEND_URL,
+            headers={'Authorization': f'Bearer {self.api_key}', 'Content-Type': 'application/json',
+                     'Idempotency-Key': row['idempotency_key']},
+            json={'from': self.from_email, 'to': [row['to_email']], 'subject': row['subject'],
+                  'html': render_email_html(row['subject'], row['body'])},
+            timeout=10,
+        )
+        if response.status_code in (200, 201):
+            return response.json().get('id')
+        if response.status_code in (401, 403):
+            # Key revoked or rotated: look it up again before the retry
+            self.cache.invalidate('resend')
+            self.api_key = None
+            raise RuntimeError(f"Resend rejected the API key (HTTP {response.status_code})")
+        # 429 / 5xx (and 409 for a concurrent request with the same key) are worth retrying
+        if response.status_code in (409, 429) or response.status_code >= 500:
+            raise RuntimeError(f"Resend HTTP {response.status_code}: {response.text[:200]}")
+        raise PermanentDeliveryError(f"Resend HTTP {response.status_code}: {response.text[:200]}")
+
+# ================= Worker side =================
+def claim_batch(conn, worker_id: str, batch_size: int = OUTBOX_BATCH_SIZE,
+                lease_seconds: int = LEASE_SECONDS) -> List[Dict[str, Any]]:
+    """Atomically claim up to batch_size due rows (pending and due, or 'sending' with an expired lease)"""
+    with transaction(conn) as cur:
+        cur.execute("""
+            UPDATE notification_outbox o
+            SET status = 'sending', attempts = o.attempts + 1, claimed_by = %s, claimed_at = NOW()
+            WHERE o.id IN (
+                SELECT id FROM notification_outbox
+                WHERE digest_group IS NULL
+                  AND ((status = 'pending' AND next_attempt_at <= NOW())
+                       OR (status = 'sending' AND claimed_at < NOW() - make_interval(secs => %s)))
+                ORDER BY id
+                FOR UPDATE SKIP LOCKED
+                LIMIT %s
+            )
+            RETURNING o.*
+        """, (worker_id, lease_seconds, batch_size))
+        return sorted(cur.fetchall(), key=lambda r: r['id'])
+
+def renew_lease(conn, worker_id: str, ids: List[int]) -> set:
+    """Heartbeat: push claimed_at forward on the rows this worker still holds; returns their ids"""
+    if not ids:
+        return set()
+    with transaction(conn) as cur:
+        cur.execute("""
+            UPDATE notification_outbox SET claimed_at = NOW()
+            WHERE id = ANY(%s::bigint[]) AND claimed_by = %s AND status = 'sending'
+            RETURNING id
+        """, (ids, worker_id))
+        return {row['id'] for row in cur.fetchall()}
+
+def send_batch(rows: List[Dict[str, Any]], send: SendFn) -> List[Tuple[int, str, Optional[str], Optional[str], float]]:
+    """(id, status, provider_id, error, retry delay) for each row after one send attempt"""
+    outcomes = []
+    for row in rows:
+        try:
+            provider_id = send(row)
+        except PermanentDeliveryError as e:
+            outcomes.append((row['id'], 'failed', None, str(e), 0.0))
+        except Exception as e:
+            if row['attempts'] >= MAX_ATTEMPTS:
+                outcomes.append((row['id'], 'failed', None, str(e), 0.0))
+            else:
+                outcomes.append((row['id'], 'pending', None, str(e), backoff_delay(row['attempts'])))
+        else:
+            outcomes.append((row['id'], 'sent', provider_id, None, 0.0))
+    return outcomes
+
+def record_results(conn, worker_id: str, outcomes: List[Tuple[int, str, Optional[str], Optional[str], float]]) -> int:
+    """
+    Write a batch's outcomes to the outbox rows (only those this worker still
+    holds) and mirror sent / failed onto their notifications; returns rows updated.
+    """
+    if not outcomes:
+        return 0
+    ids, statuses, provider_ids, errors, delays = (list(col) for col in zip(*outcomes))
+    with transaction(conn) as cur:
+        cur.execute("""
+            UPDATE notification_outbox AS o
+            SET status = r.status, provider_id = COALESCE(r.provider_id, o.provider_id), last_error = r.error,
+                sent_at = CASE WHEN r.status = 'sent' THEN NOW() END,
+                next_attempt_at = NOW() + make_interval(secs => r.delay), claimed_by = NULL
+            FROM unnest(%s::bigint[], %s::text[], %s::text[], %s::text[], %s::float8[])
+                 AS r(id, status, provider_id, error, delay)
+            WHERE o.id = r.id AND o.claimed_by = %s AND o.status = 'sending'
+            RETURNING o.notification_id, o.status
+        """, (ids, statuses, provider_ids, errors, delays, worker_id))
+        updated = cur.fetchall()
+        final = [(r['notification_id'], r['status']) for r in updated
+                 if r['notification_id'] is not None and r['status'] in ('sent', 'failed')]
+        if final:
+            cur.execute("""
+                UPDATE notifications AS n
+                SET delivery_status = r.status, delivered_at = CASE WHEN r.status = 'sent' THEN NOW() END
+                FROM unnest(%s::bigint[], %s::text[]) AS r(id, status)
+                WHERE n.id = r.id
+            """, ([n for n, _ in final], [s for _, s in final]))
+    return len(updated)
+
+def process_batch(conn, worker_id: str, send: SendFn, batch_size: int = OUTBOX_BATCH_SIZE,
+                  digest_window: float = DIGEST_WINDOW, lease_seconds: int = LEASE_SECONDS,
+                  heartbeat: float = HEARTBEAT_SECONDS) -> int:
+    """
+    Fold due digests, then claim and send one batch; returns the number of rows claimed.
+
+    Each row's outcome is recorded as soon as its send returns, and the lease
+    on the rows still to send is renewed every heartbeat seconds, so a slow
+    batch never outlives its lease. Rows another worker has taken over in the
+    meantime are skipped rather than sent twice.
+    """
+    coalesce_digests(conn, digest_window, batch_size)
+    rows = claim_batch(conn, worker_id, batch_size, lease_seconds)
+    if not rows:
+        return 0
+    begin = getattr(send, 'begin_batch', None)
+    if begin:
+        try:
+            begin()
+        except Exception as e:
+            print(f"Notification credentials lookup failed: {e}")
+    renewed_at = time.monotonic()
+    held = {row['id'] for row in rows}
+    for i, row in enumerate(rows):
+        if time.monotonic() - renewed_at >= heartbeat:
+            held = renew_lease(conn, worker_id, [r['id'] for r in rows[i:]])
+            renewed_at = time.monotonic()
+        if row['id'] in held:
+            record_results(conn, worker_id, send_batch([row], send))
+    return len(rows)
+
+def outbox_worker_loop(stop_event: Optional[threading.Event] = None, send: Optional[SendFn] = None,
+                       poll_interval: float = 2.0, batch_size: int = OUTBOX_BATCH_SIZE,
+                       dsn: Optional[str] = None) -> None:
+    """Long-running worker: deliver outbox batches until stop_event is set, reconnecting on database errors"""
+    stop_event = stop_event or threading.Event()
+    send = send or ResendSender()
+    worker_id = worker_name()
+    conn = None
+    while not stop_event.is_set():
+        try:
+            if conn is None or conn.closed:
+                conn = connect(dsn)
+                ensure_schema(conn)
+            if process_batch(conn, worker_id, send, batch_size) < batch_size:
+                stop_event.wait(poll_interval)
+        except Exception as e:
+            print(f"Notification worker {worker_id} error: {e}")
+            try:
+                if conn is not None:
+                    conn.close()
+            except Exception:
+                pass
+            conn = None
+            stop_event.wait(poll_interval * 5)
+    if conn is not None and not conn.closed:
+        conn.close()
@@ -0,0 +1,98 @@
+# market_scanner/panel.py
+# Large-universe scan (user-supplied lists of 1,000+ symbols): bar store -> bar-aligned panels ->
+# column-wise features -> vectorized scoring, instead of one fetch and one
+# feature pass per symbol.
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .barstore import DEFAULT_BATCH_SIZE, DEFAULT_MAX_AGE, OHLCV_COLUMNS, load_universe_bars
+from .data import dollar_volume, min_bars_required
+from .features import FEATURE_COLUMNS, compute_panel_features
+from .scanner import collect_outcomes, result_row
+from .scoring import score_frame
+
+DEFAULT_CHUNK_SIZE = 250   # symbols per panel; bounds memory on long intraday histories
+
+def build_panels(frames: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Stack per-symbol bars into one DataFrame per OHLCV column.
+
+    Rows are aligned by bar position counted back from each symbol's latest bar
+    (not by timestamp), so shorter histories are padded with leading NaNs only
+    and every column runs exactly the recursion it would on its own.
+    """
+    symbols = list(frames)
+    n = max(len(df) for df in frames.values())
+    panels = {}
+    for c in OHLCV_COLUMNS:
+        arr = np.full((n, len(symbols)), np.nan)
+        for j, sym in enumerate(symbols):
+            values = frames[sym][c].to_numpy(dtype=float)
+            arr[n - len(values):, j] = values
+        panels[c] = pd.DataFrame(arr, columns=symbols)
+    return panels
+
+def last_valid_rows(features: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Each symbol's latest bar with every feature present - compute_features(df).dropna().iloc[-1] for a panel"""
+    stack = np.stack([features[c].to_numpy(dtype=float) for c in FEATURE_COLUMNS])
+    valid = ~np.isnan(stack).any(axis=0)
+    has_valid = valid.any(axis=0)
+    n, k = valid.shape
+    pos = n - 1 - valid[::-1].argmax(axis=0)
+    last = pd.DataFrame(stack[:, pos, np.arange(k)].T, index=features["close"].columns, columns=FEATURE_COLUMNS)
+    return last[has_valid]
+
+def scan_frames(frames: Dict[str, pd.DataFrame], timeframe: str, is_crypto: bool,
+                account_equity: float, risk_pct: float, stop_mult: float, min_vol: float,
+                custom_settings: Optional[dict] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]:
+    """Score already-loaded bars in panels; returns symbol -> (row, error) with the same rows/errors as scan_bars"""
+    outcomes: Dict[str, Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]] = {}
+    err = lambda sym, msg: (None, {"symbol": sym, "timeframe": timeframe, "error": msg})
+
+    eligible: List[str] = []
+    for sym, df in frames.items():
+        if len(df) < min_bars_required(timeframe):
+            outcomes[sym] = err(sym, f"Not enough history ({len(df)}) for {timeframe}")
+        elif (not is_crypto and not sym.endswith("=X") and not sym.endswith("=F")
+              and dollar_volume(df) < min_vol):
+            outcomes[sym] = err(sym, f"Below min dollar vol ({min_vol:,.0f})")
+        else:
+            eligible.append(sym)
+
+    for i in range(0, len(eligible), max(chunk_size, 1)):
+        chunk = eligible[i:i + chunk_size]
+        features = compute_panel_features(build_panels({s: frames[s] for s in chunk}), custom_settings)
+        last = last_valid_rows(features)
+        scores = score_frame(last, custom_settings)
+        for (sym, row), sc in zip(last.iterrows(), scores):
+            outcomes[sym] = (result_row(sym, timeframe, row, float(sc), account_equity, risk_pct, stop_mult), None)
+        for sym in chunk:
+            if sym not in outcomes:
+                outcomes[sym] = err(sym, "Features empty after dropna()")
+    return outcomes
+
+def scan_large_universe(symbols: List[str], timeframe: str, is_crypto: bool,
+                        account_equity: float = 10_000.0, risk_pct: float = 0.01,
+                        stop_mult: float = 1.5, min_vol: float = 2_000_000,
+                        custom_settings: dict = None, store_dir: Optional[str] = None,
+                        max_age: float = DEFAULT_MAX_AGE, batch_size: int = DEFAULT_BATCH_SIZE,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        progress=None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Scan thousands of symbols; returns (results, errors) like scan_universe.
+
+    Bars come from the on-disk bar store (batched, incremental refresh), then
+    features and scores are computed a chunk of symbols at a time. On a warm
+    store (bars younger than max_age) no network calls are made.
+    """
+    symbols = list(dict.fromkeys(s.upper() for s in symbols))
+    frames, fetch_errors = load_universe_bars(symbols, timeframe, store_dir, max_age, batch_size, progress)
+    outcomes = scan_frames(frames, timeframe, is_crypto, account_equity, risk_pct, stop_mult,
+                           min_vol, custom_settings, chunk_size)
+    for sym, msg in fetch_errors.items():
+        outcomes[sym] = (None, {"symbol": sym, "timeframe": timeframe, "error": msg})
+    return collect_outcomes(outcomes[sym] for sym in symbols if sym in outcomes)
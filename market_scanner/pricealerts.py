@@ -0,0 +1,184 @@
+# market_scanner/pricealerts.py
+# Batch evaluation of price alerts: active alerts are grouped by symbol, every
+# unique symbol is quoted once (one yf.download call for the lot, per-symbol
+# lookups only for what the batch missed) and all of a symbol's thresholds are
+# checked against that one price. AlertIndex keeps each symbol's targets in
+# sorted arrays, so finding the crossed alerts for a price is two bisects.
+# Prices come from the streaming quote board (quotes.py) when it has them.
+
+import bisect
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .barstore import download_batch
+from .quotes import QuoteBoard
+
+# fallback(symbol) -> price or None, e.g. app.get_current_price
+QuoteFn = Callable[[str], Optional[float]]
+
+def latest_prices(symbols: List[str], fallback: Optional[QuoteFn] = None,
+                  board: Optional[QuoteBoard] = None) -> Dict[str, float]:
+    """
+    Last traded price per symbol: current ticks from the streaming quote
+    board first, then one batched 1m download for the rest.
+
+    Symbols the batch returns nothing for (closed markets, odd tickers) go
+    through fallback one by one; symbols without any price are omitted.
+    Symbols are added to the board's watch list so the feed streams them
+    from then on.
+    """
+    prices: Dict[str, float] = {}
+    if not symbols:
+        return prices
+    if board is not None:
+        board.watch(symbols)
+        prices.update(board.get_many(symbols))
+    missing = [sym for sym in symbols if sym not in prices]
+    if not missing:
+        return prices
+    try:
+        bars = download_batch(missing, "1m", period="1d")
+    except Exception as e:
+        print(f"Batch quote failed for {len(missing)} symbols: {e}")
+        bars = {}
+    for sym, df in bars.items():
+        prices[sym] = float(df['close'].iloc[-1])
+    if fallback:
+        for sym in symbols:
+            if sym not in prices:
+                price = fallback(sym)
+                if price:
+                    prices[sym] = float(price)
+    return prices
+
+def alert_triggered(alert: Dict[str, Any], price: float) -> bool:
+    target = float(alert['target_price'])
+    if alert['alert_type'] == 'above':
+        return price >= target
+    if alert['alert_type'] == 'below':
+        return price <= target
+    return False
+
+# ================= Threshold index =================
+@dataclass
+class AlertIndex:
+    """
+    Active alerts as per-symbol sorted target arrays, one for "above" and one for "below".
+
+    crossed(symbol, price) returns every alert the price triggers with one
+    bisect per side - "above" alerts are the prefix with target <= price,
+    "below" alerts the suffix with target >= price - so a price can be checked
+    against any number of alerts on every tick. add/remove keep the arrays
+    sorted as alerts are created and deleted. Safe to share between the
+    alert daemon and the quote feed's tick listener.
+    """
+    _books: Dict[Tuple[str, str], Tuple[List[float], List[int]]] = field(default_factory=dict, repr=False)
+    _alerts: Dict[int, Dict[str, Any]] = field(default_factory=dict, repr=False)
+    _lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+    @classmethod
+    def from_alerts(cls, alerts: Iterable[Dict[str, Any]]) -> "AlertIndex":
+        index = cls()
+        index.rebuild(alerts)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def __contains__(self, alert_id: int) -> bool:
+        return alert_id in self._alerts
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return sorted({sym for sym, _ in self._books})
+
+    def rebuild(self, alerts: Iterable[Dict[str, Any]]) -> None:
+        """Replace the contents with `alerts`, sorting each book once"""
+        with self._lock:
+            entries: Dict[Tuple[str, str], List[Tuple[float, int]]] = {}
+            self._alerts = {}
+            for alert in alerts:
+                if alert['alert_type'] in ('above', 'below'):
+                    entries.setdefault((alert['symbol'].upper(), alert['alert_type']), []).append(
+                        (float(alert['target_price']), alert['id']))
+                    self._alerts[alert['id']] = alert
+            self._books = {}
+            for key, pairs in entries.items():
+                pairs.sort()
+                self._books[key] = ([t for t, _ in pairs], [i for _, i in pairs])
+
+    def add(self, alert: Dict[str, Any]) -> None:
+        """Insert (or replace) one alert at its sorted position"""
+        with self._lock:
+            if alert['alert_type'] not in ('above', 'below'):
+                return
+            self.remove(alert['id'])
+            target = float(alert['target_price'])
+            targets, ids = self._books.setdefault((alert['symbol'].upper(), alert['alert_type']), ([], []))
+            i = bisect.bisect_right(targets, target)
+            targets.insert(i, target)
+            ids.insert(i, alert['id'])
+            self._alerts[alert['id']] = alert
+
+    def remove(self, alert_id: int) -> Optional[Dict[str, Any]]:
+        """Drop one alert; returns it, or None if it wasn't indexed"""
+        with self._lock:
+            alert = self._alerts.pop(alert_id, None)
+            if alert is None:
+                return None
+            key = (alert['symbol'].upper(), alert['alert_type'])
+            targets, ids = self._books[key]
+            i = bisect.bisect_left(targets, float(alert['target_price']))
+            while ids[i] != alert_id:
+                i += 1
+            del targets[i], ids[i]
+            if not ids:
+                del self._books[key]
+            return alert
+
+    def sync(self, alerts: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Make the index hold exactly `alerts` (e.g. the active rows just read)
+        by adding new or edited alerts (any changed column) and removing
+        missing ones; returns (added, removed).
+        """
+        with self._lock:
+            current = {a['id']: a for a in alerts}
+            if not self._alerts:
+                self.rebuild(current.values())
+                return len(self._alerts), 0
+            gone = [i for i in self._alerts if i not in current]
+            for alert_id in gone:
+                self.remove(alert_id)
+            # Whole-row comparison: edits to symbol, email or notification method must replace the held dict too
+            changed = [a for i, a in current.items() if self._alerts.get(i) != a]
+            for alert in changed:
+                self.add(alert)
+            return len(changed), len(gone)
+
+    def crossed(self, symbol: str, price: float) -> List[Dict[str, Any]]:
+        """Alerts on symbol that price triggers (above: target <= price, below: target >= price)"""
+        with self._lock:
+            sym = symbol.upper()
+            out: List[Dict[str, Any]] = []
+            book = self._books.get((sym, 'above'))
+            if book:
+                out.extend(self._alerts[i] for i in book[1][:bisect.bisect_right(book[0], price)])
+            book = self._books.get((sym, 'below'))
+            if book:
+                out.extend(self._alerts[i] for i in book[1][bisect.bisect_left(book[0], price):])
+            return out
+
+    def evaluate(self, prices: Dict[str, float]) -> List[Tuple[Dict[str, Any], float]]:
+        """(alert, price) for every alert crossed by its symbol's price"""
+        return [(alert, price) for sym, price in prices.items() for alert in self.crossed(sym, price)]
+
+def evaluate_alerts(alerts: List[Dict[str, Any]], fallback: Optional[QuoteFn] = None,
+                    prices: Optional[Dict[str, float]] = None,
+                    board: Optional[QuoteBoard] = None) -> List[Tuple[Dict[str, Any], float]]:
+    """(alert, price) for every alert whose threshold the current price has crossed"""
+    index = AlertIndex.from_alerts(alerts)
+    if prices is None:
+        prices = latest_prices(index.symbols(), fallback, board)
+    return index.evaluate(prices)
@@ -0,0 +1,262 @@
+# market_scanner/quotes.py
+# Streaming quote ingestion: a feed adapter pushes ticks into an in-memory
+# QuoteBoard (latest price per symbol, shared by every session and thread of
+# the process), so price lookups are a dict read instead of a REST call.
+# Adapters: "yahoo" (yfinance's streaming WebSocket) and "simulated", a local
+# stand-in that speaks the same subscribe / JSON-frame protocol for testing.
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+QUOTE_FEED = os.getenv("QUOTE_FEED", "yahoo")                    # adapter name, or "none"
+QUOTE_MAX_AGE = float(os.getenv("QUOTE_MAX_AGE", "60"))          # seconds a tick counts as current
+REST_QUOTE_TTL = float(os.getenv("REST_QUOTE_TTL", "15"))        # seconds a REST fallback price is reused
+# listener(symbol, price) called on every tick, on the feed's thread
+TickListener = Callable[[str, float], Any]
+
+# ================= Quote board =================
+class QuoteBoard:
+    """
+    Latest (price, timestamp) per symbol.
+
+    Reads are plain dict lookups (no lock); writes come from the feed thread
+    only (REST fallbacks go to RestQuoteCache). watch() records the symbols callers care about
+    so the feed can subscribe to them.
+    """
+
+    def __init__(self):
+        self._quotes: Dict[str, Tuple[float, float]] = {}
+        self._watched: Set[str] = set()
+        self._listeners: List[TickListener] = []
+        self._lock = threading.Lock()
+        self.watch_changed = threading.Event()   # set whenever new symbols are watched
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+    def get(self, symbol: str, max_age: float = QUOTE_MAX_AGE) -> Optional[float]:
+        """Latest price if it is at most max_age seconds old, else None"""
+        quote = self._quotes.get(symbol.upper())
+        if quote is None or time.time() - quote[1] > max_age:
+            return None
+        return quote[0]
+
+    def get_many(self, symbols: Iterable[str], max_age: float = QUOTE_MAX_AGE) -> Dict[str, float]:
+        """Current prices for the symbols that have one"""
+        prices = {}
+        for sym in symbols:
+            price = self.get(sym, max_age)
+            if price is not None:
+                prices[sym] = price
+        return prices
+
+    def update(self, symbol: str, price: float, ts: Optional[float] = None) -> None:
+        """Record a tick and pass it to the listeners"""
+        sym = symbol.upper()
+        self._quotes[sym] = (float(price), ts if ts is not None else time.time())
+        for listener in list(self._listeners):
+            try:
+                listener(sym, float(price))
+            except Exception as e:
+                print(f"Quote listener error for {sym}: {e}")
+
+    def watch(self, symbols: Iterable[str]) -> Set[str]:
+        """Ask the feed to stream these symbols; returns the ones not watched before"""
+        with self._lock:
+            new = {s.upper() for s in symbols} - self._watched
+            self._watched |= new
+        if new:
+            self.watch_changed.set()
+        return new
+
+    def watched(self) -> Set[str]:
+        with self._lock:
+            return set(self._watched)
+
+    def add_listener(self, listener: TickListener) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: TickListener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+# Process-wide board used by the app, the alert daemon and portfolio valuation
+QUOTE_BOARD = QuoteBoard()
+
+class RestQuoteCache:
+    """
+    Prices fetched over REST for symbols the board has no current tick for.
+
+    Kept apart from the board so a delayed or closed-market price never fires
+    tick listeners or passes for a streamed tick; entries last ttl seconds and
+    failed lookups (None) are not cached.
+    """
+
+    def __init__(self, ttl: float = REST_QUOTE_TTL):
+        self.ttl = ttl
+        self._quotes: Dict[str, Tuple[float, float]] = {}
+
+    def get(self, symbol: str, fetch: Callable[[str], Optional[float]]) -> Optional[float]:
+        """Cached price, or fetch(symbol) when there is none from the last ttl seconds"""
+        sym = symbol.upper()
+        quote = self._quotes.get(sym)
+        if quote is not None and time.time() - quote[1] <= self.ttl:
+            return quote[0]
+        price = fetch(symbol)
+        if price is not None:
+            self._quotes[sym] = (float(price), time.time())
+        return price
+
+REST_QUOTES = RestQuoteCache()
+
+# ================= Feed adapters =================
+class QuoteFeed:
+    """Adapter base: stream the board's watched symbols into it until stop_event is set (raise to reconnect)"""
+    name = "base"
+
+    def run(self, board: QuoteBoard, stop_event: threading.Event) -> None:
+        raise NotImplementedError
+
+def parse_tick(message: Dict[str, Any]) -> Optional[Tuple[str, float, float]]:
+    """(symbol, price, epoch seconds) from a Yahoo-style tick message ({'id', 'price', 'time' in ms})"""
+    symbol, price = message.get('id'), message.get('price')
+    if not symbol or price is None:
+        return None
+    stamp = message.get('time')
+    ts = int(stamp) / 1000 if stamp else time.time()
+    return symbol, float(price), ts
+
+class YahooStreamFeed(QuoteFeed):
+    """Yahoo Finance's streaming WebSocket through yfinance.WebSocket"""
+    name = "yahoo"
+
+    def run(self, board: QuoteBoard, stop_event: threading.Event) -> None:
+        import yfinance as yf
+        ws = yf.WebSocket(verbose=False)
+
+        def on_message(message: Dict[str, Any]) -> None:
+            tick = parse_tick(message)
+            if tick:
+                board.update(*tick)
+
+        listening = threading.Event()
+
+        def subscriber() -> None:
+            # listen() blocks, so newly watched symbols are subscribed from here; closing ends listen()
+            while listening.is_set() and not stop_event.is_set():
+                if board.watch_changed.wait(1.0):
+                    board.watch_changed.clear()
+                    ws.subscribe(sorted(board.watched()))
+            ws.close()
+
+        board.watch_changed.clear()
+        watched = sorted(board.watched())
+        if watched:
+            ws.subscribe(watched)
+        listening.set()
+        threading.Thread(target=subscriber, name="quote-subscriber", daemon=True).start()
+        try:
+            ws.listen(on_message)
+        finally:
+            listening.clear()
+
+class SimulatedSocket:
+    """
+    In-process stand-in for a quote WebSocket: accepts {"subscribe": [...]} /
+    {"unsubscribe": [...]} frames via send() and emits one JSON tick frame per
+    subscribed symbol every tick_interval seconds (a random walk) via recv().
+    """
+
+    def __init__(self, tick_interval: float = 0.5, volatility: float = 0.001, seed: Optional[int] = None,
+                 start_prices: Optional[Dict[str, float]] = None):
+        self.tick_interval = tick_interval
+        self.volatility = volatility
+        self._rng = random.Random(seed)
+        self._prices: Dict[str, float] = dict(start_prices or {})
+        self._subscribed: Set[str] = set()
+        self._frames: "queue.Queue[str]" = queue.Queue()
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._emit, name="simulated-quote-socket", daemon=True).start()
+
+    def _emit(self) -> None:
+        while not self._closed.wait(self.tick_interval):
+            with self._lock:
+                symbols = sorted(self._subscribed)
+            for sym in symbols:
+                price = self._prices.get(sym, 100.0) * (1 + self._rng.gauss(0, self.volatility))
+                self._prices[sym] = price
+                self._frames.put(json.dumps({'id': sym, 'price': price, 'time': str(int(time.time() * 1000))}))
+
+    def send(self, text: str) -> None:
+        message = json.loads(text)
+        with self._lock:
+            self._subscribed |= set(message.get('subscribe', []))
+            self._subscribed -= set(message.get('unsubscribe', []))
+
+    def recv(self, timeout: Optional[float] = None) -> str:
+        """Next frame; raises queue.Empty after timeout seconds"""
+        return self._frames.get(timeout=timeout)
+
+    def close(self) -> None:
+        self._closed.set()
+
+class SimulatedFeed(QuoteFeed):
+    """Local simulated feed for tests and offline development (prices are a random walk, not market data)"""
+    name = "simulated"
+
+    def __init__(self, **socket_kwargs):
+        self.socket_kwargs = socket_kwargs
+
+    def run(self, board: QuoteBoard, stop_event: threading.Event) -> None:
+        socket = SimulatedSocket(**self.socket_kwargs)
+        subscribed: Set[str] = set()
+        try:
+            while not stop_event.is_set():
+                watched = board.watched()
+                if watched - subscribed:
+                    socket.send(json.dumps({'subscribe': sorted(watched - subscribed)}))
+                    subscribed = watched
+                try:
+                    tick = parse_tick(json.loads(socket.recv(timeout=0.5)))
+                except queue.Empty:
+                    continue
+                if tick:
+                    board.update(*tick)
+        finally:
+            socket.close()
+
+FEEDS: Dict[str, Callable[..., QuoteFeed]] = {"yahoo": YahooStreamFeed, "simulated": SimulatedFeed}
+
+def make_feed(name: str = QUOTE_FEED, **kwargs) -> Optional[QuoteFeed]:
+    """Adapter by name (None for "none" / empty)"""
+    if not name or name == "none":
+        return None
+    if name not in FEEDS:
+        raise ValueError(f"Unknown quote feed '{name}' (expected one of {', '.join(FEEDS)} or none)")
+    return FEEDS[name](**kwargs)
+
+def feed_loop(feed: QuoteFeed, board: QuoteBoard = QUOTE_BOARD, stop_event: Optional[threading.Event] = None,
+              retry_delay: float = 5.0) -> None:
+    """Keep feed.run going until stop_event is set, reconnecting after errors"""
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        try:
+            feed.run(board, stop_event)
+        except Exception as e:
+            print(f"Quote feed '{feed.name}' error: {e}")
+        stop_event.wait(retry_delay)
+
+def start_quote_feed(feed: QuoteFeed, board: QuoteBoard = QUOTE_BOARD) -> threading.Event:
+    """Run feed_loop on a daemon thread; returns its stop event"""
+    stop_event = threading.Event()
+    threading.Thread(target=feed_loop, name=f"quote-feed-{feed.name}", daemon=True,
+                     args=(feed, board, stop_event)).start()
+    return stop_event
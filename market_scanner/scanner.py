@@ -0,0 +1,165 @@
+# market_scanner/scanner.py
+# Universe scanner: data -> features -> scoring -> sizing, optionally in parallel
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .data import dollar_volume, get_ohlcv, min_bars_required
+from .features import compute_features
+from .scoring import score_row
+from .sizing import position_sizing
+
+EXECUTORS = ("thread", "process")
+
+def evaluate_bars(sym: str, df: pd.DataFrame, timeframe: str, is_crypto: bool, min_vol: float,
+                  custom_settings: Optional[dict] = None) -> Tuple[pd.Series, float]:
+    """Validate bars and return (last feature row, score); raises ValueError when the symbol doesn't qualify"""
+    if len(df) < min_bars_required(timeframe):
+        raise ValueError(f"Not enough history ({len(df)}) for {timeframe}")
+
+    # Skip dollar volume check for forex (=X) and commodities (=F)
+    is_forex = sym.endswith("=X")
+    is_commodity = sym.endswith("=F")
+
+    if not is_crypto and not is_forex and not is_commodity and dollar_volume(df) < min_vol:
+        raise ValueError(f"Below min dollar vol ({min_vol:,.0f})")
+
+    f = compute_features(df, custom_settings).dropna()
+    if f.empty:
+        raise ValueError("Features empty after dropna()")
+    last = f.iloc[-1]
+    return last, score_row(last, custom_settings)
+
+def result_row(sym: str, timeframe: str, last: pd.Series, sc: float,
+               account_equity: float, risk_pct: float, stop_mult: float) -> Dict[str, Any]:
+    """Build the scanner result row (direction + sizing) for a scored bar"""
+    direction = "Bullish" if sc >= 0 else "Bearish"
+
+    size, risk_usd, notional, stop = position_sizing(
+        last, direction, account_equity, risk_pct, stop_mult
+    )
+
+    return {
+        "symbol": sym,
+        "timeframe": timeframe,
+        "close": round(float(last.close), 6),
+        "score": round(sc, 2),
+        "direction": direction,
+        "rsi": round(float(last.rsi), 2),
+        "atr": round(float(last.atr), 6),
+        "ema50_gt_200": bool(last.ema50 > last.ema200),
+        "bb_width": round(float(last.bb_width), 6) if pd.notna(last.bb_width) else None,
+        "vol_z": round(float(last.vol_z), 2) if pd.notna(last.vol_z) else None,
+        "stop": round(float(stop), 6),
+        "size": int(size),
+        "risk_$": round(float(risk_usd), 2),
+        "notional_$": round(float(notional), 2)
+    }
+
+def scan_bars(sym: str, df: pd.DataFrame, timeframe: str, is_crypto: bool,
+              account_equity: float, risk_pct: float, stop_mult: float, min_vol: float,
+              custom_settings: Optional[dict] = None) -> Dict[str, Any]:
+    """Score one symbol from already-loaded OHLCV bars (raises ValueError when it doesn't qualify)"""
+    last, sc = evaluate_bars(sym, df, timeframe, is_crypto, min_vol, custom_settings)
+    return result_row(sym, timeframe, last, sc, account_equity, risk_pct, stop_mult)
+
+def scan_symbol(sym: str, timeframe: str, is_crypto: bool,
+                account_equity: float, risk_pct: float, stop_mult: float, min_vol: float,
+                custom_settings: Optional[dict] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Fetch and score one symbol. Returns (row, None) on success or (None, error_row) on failure"""
+    try:
+        df = get_ohlcv(sym, timeframe)
+        row = scan_bars(sym, df, timeframe, is_crypto, account_equity, risk_pct, stop_mult, min_vol, custom_settings)
+        return row, None
+    except Exception as e:
+        return None, {"symbol": sym, "timeframe": timeframe, "error": str(e)}
+
+def collect_outcomes(outcomes) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Split (row, error) outcomes into sorted results and error frames"""
+    rows, errs = [], []
+    for row, err in outcomes:
+        if row is not None:
+            rows.append(row)
+        if err is not None:
+            errs.append(err)
+    df_rows = pd.DataFrame(rows)
+    if not df_rows.empty and "score" in df_rows.columns:
+        df_rows = df_rows.sort_values("score", ascending=False)
+    df_errs = pd.DataFrame(errs)
+    return df_rows, df_errs
+
+def run_parallel(fn, items: List[Any], args: tuple, workers: int = 1, executor: str = "thread") -> List[Any]:
+    """Apply fn(item, *args) to every item, preserving input order, on a thread or process pool"""
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}' (expected one of {', '.join(EXECUTORS)})")
+    if workers <= 1 or len(items) <= 1:
+        return [fn(item, *args) for item in items]
+
+    pool_cls = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+    with pool_cls(max_workers=min(workers, len(items))) as pool:
+        futures = [pool.submit(fn, item, *args) for item in items]
+        return [f.result() for f in futures]
+
+def run_cancellable(fn, items: List[Any], workers: int = 1, executor: str = "process",
+                    initializer: Optional[Callable] = None, initargs: tuple = (),
+                    progress: Optional[Callable[[int, int], Any]] = None,
+                    cancel_event=None) -> Tuple[List[Any], bool]:
+    """
+    Apply fn(item) to every item with progress callbacks and cancellation.
+
+    Returns (results in input order for the items that finished, cancelled).
+    cancel_event is any object with is_set() (e.g. threading.Event); when it is
+    set - or the caller is interrupted (Ctrl+C, Streamlit stop/rerun) - queued
+    items are dropped. initializer(*initargs) runs once per worker, so large
+    shared inputs are shipped to each process once instead of once per item.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}' (expected one of {', '.join(EXECUTORS)})")
+    total = len(items)
+    if workers <= 1 or total <= 1:
+        if initializer:
+            initializer(*initargs)
+        results = []
+        for item in items:
+            if cancel_event is not None and cancel_event.is_set():
+                return results, True
+            results.append(fn(item))
+            if progress:
+                progress(len(results), total)
+        return results, False
+
+    pool_cls = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+    pool = pool_cls(max_workers=min(workers, total), initializer=initializer, initargs=initargs)
+    finished: Dict[int, Any] = {}
+    cancelled = False
+    try:
+        futures = {pool.submit(fn, item): i for i, item in enumerate(items)}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for f in done:
+                finished[futures[f]] = f.result()
+            if done and progress:
+                progress(len(finished), total)
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return [finished[i] for i in sorted(finished)], cancelled
+
+def scan_universe(symbols: List[str], timeframe: str, is_crypto: bool,
+                  account_equity: float, risk_pct: float, stop_mult: float, min_vol: float,
+                  custom_settings: dict = None, workers: int = 1,
+                  executor: str = "thread") -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Scan a list of symbols and return (results, errors) DataFrames.
+
+    workers > 1 fans symbols out over a thread pool (network-bound fetches) or a
+    process pool (CPU-bound feature work on big universes). Output is identical
+    to the serial scan regardless of worker count.
+    """
+    args = (timeframe, is_crypto, account_equity, risk_pct, stop_mult, min_vol, custom_settings)
+    return collect_outcomes(run_parallel(scan_symbol, symbols, args, workers, executor))
@@ -0,0 +1,109 @@
+# market_scanner/scoring.py
+# Technical analysis scoring
+
+import numpy as np
+import pandas as pd
+
+# ================= Scoring =================
+def _score_params(custom_settings=None) -> dict:
+    """Scoring weights and thresholds from custom settings or the defaults"""
+    # Get custom weights and thresholds or use defaults
+    if custom_settings and custom_settings.get('enabled'):
+        weights = custom_settings.get('weights', {})
+        thresholds = custom_settings.get('thresholds', {})
+
+        regime_weight = weights.get('regime', 25)
+        structure_weight = weights.get('structure', 25)
+        rsi_weight = weights.get('rsi', 10)
+        macd_weight = weights.get('macd', 10)
+        volume_weight = weights.get('volume', 8)
+        volatility_weight = weights.get('volatility', 7)
+        tradability_weight = weights.get('tradability', 5)
+        overextension_penalty = weights.get('overextension_penalty', 10)
+
+        rsi_bull = thresholds.get('rsi_bull', 50)
+        rsi_overbought = thresholds.get('rsi_overbought', 80)
+        rsi_oversold = thresholds.get('rsi_oversold', 20)
+        volume_z = thresholds.get('volume_z', 0.5)
+        atr_pct_max = thresholds.get('atr_pct', 0.04)
+    else:
+        # Default weights
+        regime_weight = 25
+        structure_weight = 25
+        rsi_weight = 10
+        macd_weight = 10
+        volume_weight = 8
+        volatility_weight = 7
+        tradability_weight = 5
+        overextension_penalty = 10
+
+        # Default thresholds
+        rsi_bull = 50
+        rsi_overbought = 80
+        rsi_oversold = 20
+        volume_z = 0.5
+        atr_pct_max = 0.04
+
+    return {
+        'regime_weight': regime_weight, 'structure_weight': structure_weight,
+        'rsi_weight': rsi_weight, 'macd_weight': macd_weight, 'volume_weight': volume_weight,
+        'volatility_weight': volatility_weight, 'tradability_weight': tradability_weight,
+        'overextension_penalty': overextension_penalty,
+        'rsi_bull': rsi_bull, 'rsi_overbought': rsi_overbought, 'rsi_oversold': rsi_oversold,
+        'volume_z': volume_z, 'atr_pct_max': atr_pct_max,
+    }
+
+def score_row(r, custom_settings=None) -> float:
+    p = _score_params(custom_settings)
+
+    s = 0.0
+    # Market Regime
+    s += p['regime_weight'] if r.close > r.ema200 else -p['regime_weight']
+    # Price Structure
+    s += p['structure_weight'] if r.close > r["close_20_max"] else 0
+    s -= p['structure_weight'] if r.close < r["close_20_min"] else 0
+    # RSI Momentum
+    s += p['rsi_weight'] if (pd.notna(r.rsi) and r.rsi > p['rsi_bull']) else -p['rsi_weight']
+    # MACD
+    s += p['macd_weight'] if (pd.notna(r.macd_hist) and r.macd_hist > 0) else -p['macd_weight']
+    # Volume Expansion
+    s += p['volume_weight'] if (pd.notna(r.vol_z) and r.vol_z > p['volume_z']) else 0
+    # Volatility Expansion
+    s += p['volatility_weight'] if (pd.notna(r.bb_width) and pd.notna(r.bb_width_ma) and r.bb_width > r.bb_width_ma) else 0
+    # Tradability
+    atr_pct = (r.atr / r.close) if (pd.notna(r.atr) and r.close) else np.nan
+    s += p['tradability_weight'] if (pd.notna(atr_pct) and atr_pct < p['atr_pct_max']) else 0
+    # Overextension Penalties/Rewards
+    s -= p['overextension_penalty'] if (pd.notna(r.rsi) and r.rsi > p['rsi_overbought']) else 0
+    s += p['overextension_penalty'] if (pd.notna(r.rsi) and r.rsi < p['rsi_oversold']) else 0
+    return float(s)
+
+def score_frame(df: pd.DataFrame, custom_settings=None) -> np.ndarray:
+    """score_row() for every row of a feature frame at once (NaN comparisons are False, as in score_row)"""
+    p = _score_params(custom_settings)
+    col = lambda name: df[name].to_numpy(dtype=float)
+    close, ema200, rsi = col("close"), col("ema200"), col("rsi")
+    bb_width, bb_width_ma, atr = col("bb_width"), col("bb_width_ma"), col("atr")
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        atr_pct = np.where(~np.isnan(atr) & (close != 0), atr / close, np.nan)
+        s = np.zeros(len(df))
+        # Market Regime
+        s += np.where(close > ema200, p['regime_weight'], -p['regime_weight'])
+        # Price Structure
+        s += np.where(close > col("close_20_max"), p['structure_weight'], 0)
+        s -= np.where(close < col("close_20_min"), p['structure_weight'], 0)
+        # RSI Momentum
+        s += np.where(rsi > p['rsi_bull'], p['rsi_weight'], -p['rsi_weight'])
+        # MACD
+        s += np.where(col("macd_hist") > 0, p['macd_weight'], -p['macd_weight'])
+        # Volume Expansion
+        s += np.where(col("vol_z") > p['volume_z'], p['volume_weight'], 0)
+        # Volatility Expansion
+        s += np.where(bb_width > bb_width_ma, p['volatility_weight'], 0)
+        # Tradability
+        s += np.where(atr_pct < p['atr_pct_max'], p['tradability_weight'], 0)
+        # Overextension Penalties/Rewards
+        s -= np.where(rsi > p['rsi_overbought'], p['overextension_penalty'], 0)
+        s += np.where(rsi < p['rsi_oversold'], p['overextension_penalty'], 0)
+    return s.astype(float)
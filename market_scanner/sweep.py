@@ -0,0 +1,107 @@
+# market_scanner/sweep.py
+# Backtest parameter sweeps: data is loaded and scored once, then every
+# configuration (grid or random search) is simulated on the shared panel
+# across a process pool, with progress reporting and cancellation.
+
+import itertools
+import random
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .backtest import (
+    BacktestPanel, build_panel, load_backtest_data, simulate_panel, summarize_backtest, validate_backtest_range,
+)
+from .scanner import run_cancellable
+
+SWEEP_PARAMS = ("min_score", "stop_atr_mult", "risk_per_trade")
+SWEEP_DEFAULTS = {"min_score": 10, "stop_atr_mult": 1.5, "risk_per_trade": 0.01}
+RANK_COLUMNS = ["sharpe_ratio", "total_return", "max_drawdown", "total_trades", "win_rate",
+                "profit_factor", "final_equity"]
+
+def parameter_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Every combination of the listed values (unlisted parameters keep their defaults)"""
+    unknown = set(grid) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameter(s): {', '.join(sorted(unknown))}")
+    keys = list(grid)
+    return [{**SWEEP_DEFAULTS, **dict(zip(keys, values))} for values in itertools.product(*(grid[k] for k in keys))]
+
+def random_configs(ranges: Dict[str, Tuple[float, float]], n: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """n configurations drawn uniformly from (low, high) ranges; min_score is drawn as an integer"""
+    unknown = set(ranges) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameter(s): {', '.join(sorted(unknown))}")
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n):
+        config = dict(SWEEP_DEFAULTS)
+        for key, (low, high) in ranges.items():
+            config[key] = rng.randint(int(low), int(high)) if key == "min_score" else round(rng.uniform(low, high), 4)
+        configs.append(config)
+    return configs
+
+# ================= Workers =================
+# The panel is handed to each pool process once (initializer) instead of being pickled per config
+_PANEL: Optional[BacktestPanel] = None
+_SETTINGS: Dict[str, Any] = {}
+
+def _init_worker(panel: BacktestPanel, timeframe: str, initial_equity: float) -> None:
+    global _PANEL, _SETTINGS
+    _PANEL = panel
+    _SETTINGS = {"timeframe": timeframe, "initial_equity": initial_equity}
+
+def evaluate_config(panel: BacktestPanel, config: Dict[str, Any], timeframe: str = "1D",
+                    initial_equity: float = 10000) -> Dict[str, Any]:
+    """Simulate one configuration and return its parameters plus headline metrics"""
+    sim = simulate_panel(panel, initial_equity, config["risk_per_trade"], config["stop_atr_mult"], config["min_score"])
+    metrics, _ = summarize_backtest(panel.symbols, sim["trades"], sim["daily_returns"], initial_equity,
+                                    sim["final_equity"], sim["max_drawdown"], timeframe, len(panel.symbols))
+    return {**{k: config[k] for k in SWEEP_PARAMS}, **{k: metrics[k] for k in RANK_COLUMNS}}
+
+def _evaluate_in_worker(config: Dict[str, Any]) -> Dict[str, Any]:
+    return evaluate_config(_PANEL, config, **_SETTINGS)
+
+# ================= Sweep =================
+def rank_results(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Sort sweep rows best-first: Sharpe, then total return, then smaller drawdown"""
+    df = pd.DataFrame(rows, columns=list(SWEEP_PARAMS) + RANK_COLUMNS)
+    if df.empty:
+        return df
+    df = df.sort_values(["sharpe_ratio", "total_return", "max_drawdown"], ascending=[False, False, True],
+                        kind="mergesort")
+    df.insert(0, "rank", range(1, len(df) + 1))
+    return df.reset_index(drop=True)
+
+def sweep_panel(panel: BacktestPanel, configs: List[Dict[str, Any]], timeframe: str = "1D",
+                initial_equity: float = 10000, workers: int = 1, executor: str = "process",
+                progress: Optional[Callable[[int, int], Any]] = None,
+                cancel_event=None) -> Tuple[pd.DataFrame, bool]:
+    """
+    Evaluate configs on a loaded panel; returns (ranked table, cancelled).
+
+    Cancelling (see scanner.run_cancellable) returns the configs finished so far.
+    """
+    rows, cancelled = run_cancellable(_evaluate_in_worker, configs, workers, executor, _init_worker,
+                                      (panel, timeframe, initial_equity), progress, cancel_event)
+    return rank_results(rows), cancelled
+
+def run_sweep(symbols: List[str], start_date: str, end_date: str, configs: List[Dict[str, Any]],
+              timeframe: str = "1D", initial_equity: float = 10000, workers: int = 1,
+              executor: str = "process", progress: Optional[Callable[[int, int], Any]] = None,
+              cancel_event=None) -> Dict[str, Any]:
+    """
+    Load and score each symbol once, then sweep every configuration over it.
+
+    Returns {'results': ranked DataFrame, 'cancelled': bool, 'errors': [...]},
+    or {'error': message} when no symbol could be loaded.
+    """
+    error = validate_backtest_range(start_date, end_date, timeframe)
+    if error:
+        return {'error': error, 'errors': []}
+    symbol_data, errors = load_backtest_data(symbols, timeframe, start_date, end_date)
+    if not symbol_data:
+        return {'error': 'No valid symbol data loaded', 'errors': errors}
+    results, cancelled = sweep_panel(build_panel(symbol_data), configs, timeframe, initial_equity,
+                                     workers, executor, progress, cancel_event)
+    return {'results': results, 'cancelled': cancelled, 'errors': errors}
@@ -0,0 +1,114 @@
+# market_scanner/swrcache.py
+# Stale-while-revalidate cache for remote lookups made on every Streamlit rerun
+# (entitlements, session checks). A fresh entry is returned with no network
+# call; a stale one is returned immediately while one background thread
+# refreshes it; only a key never seen before waits for its lookup, and then
+# for at most first_wait seconds. Failed refreshes keep serving the last good
+# value until it is max_stale old.
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+class StaleWhileRevalidateCache:
+    """
+    get(key, loader, default) with per-key TTL and background refresh.
+
+    loader() should raise on transient failures (timeouts, 5xx) so the last
+    good value is kept; anything it returns is cached. Keys are stored hashed,
+    so bearer tokens and cookies can be used as keys directly. At most
+    max_entries keys are kept (least recently used are dropped).
+    """
+
+    def __init__(self, name: str, ttl: float = 300.0, max_stale: float = 86400.0, first_wait: float = 2.0,
+                 retry_after: float = 30.0, max_entries: int = 10000):
+        self.name = name
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.first_wait = first_wait
+        self.retry_after = retry_after          # seconds between refresh attempts after a failure
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()   # key -> (value, loaded_at)
+        self._inflight: Dict[str, threading.Event] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {'fresh': 0, 'stale': 0, 'miss': 0, 'refreshes': 0, 'errors': 0}
+
+    @staticmethod
+    def _hash(key: Any) -> str:
+        return hashlib.sha256(repr(key).encode()).hexdigest()
+
+    def get(self, key: Any, loader: Callable[[], Any], default: Any = None) -> Any:
+        """Cached value for key; default when a first lookup fails or takes longer than first_wait"""
+        k = self._hash(key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(k)
+            if entry is not None and now - entry[1] <= self.max_stale:
+                self._entries.move_to_end(k)
+                if now - entry[1] <= self.ttl:
+                    self.stats['fresh'] += 1
+                    return entry[0]
+                self.stats['stale'] += 1
+                if now - self._failed_at.get(k, -self.retry_after) >= self.retry_after:
+                    self._refresh_locked(k, loader)
+                return entry[0]
+            self.stats['miss'] += 1
+            if now - self._failed_at.get(k, -self.retry_after) < self.retry_after:
+                return default   # the lookup just failed: don't wait on it again every rerun
+            done = self._refresh_locked(k, loader)
+        done.wait(self.first_wait)
+        with self._lock:
+            entry = self._entries.get(k)
+        return entry[0] if entry is not None else default
+
+    def _refresh_locked(self, k: str, loader: Callable[[], Any]) -> threading.Event:
+        """Start (or join) the single background load for k; caller holds the lock"""
+        done = self._inflight.get(k)
+        if done is not None:
+            return done
+        done = self._inflight[k] = threading.Event()
+        self.stats['refreshes'] += 1
+        threading.Thread(target=self._load, args=(k, loader, done), name=f"{self.name}-refresh", daemon=True).start()
+        return done
+
+    def _load(self, k: str, loader: Callable[[], Any], done: threading.Event) -> None:
+        try:
+            value = loader()
+        except Exception as e:
+            print(f"{self.name} refresh failed: {e}")
+            with self._lock:
+                self.stats['errors'] += 1
+                if len(self._failed_at) >= self.max_entries:
+                    self._failed_at.clear()
+                self._failed_at[k] = time.monotonic()
+        else:
+            with self._lock:
+                self._entries[k] = (value, time.monotonic())
+                self._entries.move_to_end(k)
+                self._failed_at.pop(k, None)
+                while len(self._entries) > self.max_entries:
+                    old, _ = self._entries.popitem(last=False)
+                    self._failed_at.pop(old, None)
+        finally:
+            with self._lock:
+                self._inflight.pop(k, None)
+            done.set()
+
+    def invalidate(self, key: Any = None) -> None:
+        """Forget one key (e.g. after an upgrade or logout), or everything"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._failed_at.clear()
+            else:
+                self._entries.pop(self._hash(key), None)
+                self._failed_at.pop(self._hash(key), None)
+
+    def hit_rate(self) -> float:
+        """Share of gets answered from the cache (fresh or stale) without waiting"""
+        with self._lock:
+            total = self.stats['fresh'] + self.stats['stale'] + self.stats['miss']
+            return (self.stats['fresh'] + self.stats['stale']) / total if total else 0.0
@@ -0,0 +1,68 @@
+# market_scanner/universes.py
+# Symbol universes loaded from local text files: the built-in lists ship in
+# universe_data/, and extra directories (S&P 500, Russell 1000, exchange pair
+# lists, ...) can be added with MARKET_SCANNER_UNIVERSE_DIR.
+#
+# File format: one symbol per line, '#' starts a comment, and a
+# '# crypto: true' line marks the universe as crypto.
+
+import os
+from typing import Dict, List, Tuple
+
+BUILTIN_UNIVERSE_DIR = os.path.join(os.path.dirname(__file__), "universe_data")
+
+def universe_dirs() -> List[str]:
+    """Directories searched for <name>.txt universe files; later directories override earlier ones"""
+    extra = [d for d in os.getenv("MARKET_SCANNER_UNIVERSE_DIR", "").split(os.pathsep) if d]
+    return [BUILTIN_UNIVERSE_DIR] + extra
+
+def load_universe_file(path: str) -> Tuple[List[str], bool]:
+    """Parse a universe file into (symbols, is_crypto), keeping file order and dropping duplicates"""
+    symbols: List[str] = []
+    seen = set()
+    is_crypto = False
+    with open(path, 'r') as f:
+        for line in f:
+            text, _, comment = line.partition("#")
+            key, _, value = comment.partition(":")
+            if key.strip().lower() == "crypto" and not text.strip():
+                is_crypto = value.strip().lower() in ("true", "yes", "1")
+            sym = text.strip().upper()
+            if sym and sym not in seen:
+                seen.add(sym)
+                symbols.append(sym)
+    return symbols, is_crypto
+
+def discover_universes() -> Dict[str, Tuple[List[str], bool]]:
+    """Load every universe file from universe_dirs(); name -> (symbols, is_crypto)"""
+    found: Dict[str, Tuple[List[str], bool]] = {}
+    for directory in universe_dirs():
+        if not os.path.isdir(directory):
+            continue
+        for fname in sorted(os.listdir(directory)):
+            name, ext = os.path.splitext(fname)
+            if ext.lower() == ".txt":
+                found[name.lower()] = load_universe_file(os.path.join(directory, fname))
+    return found
+
+# Named universes for headless scans: name -> (symbols, is_crypto)
+UNIVERSES = discover_universes()
+
+# Built-in lists used by the app sidebar
+TOP_100_EQUITIES = UNIVERSES["top100"][0]
+MID_CAP_STOCKS = UNIVERSES["midcap"][0]
+SMALL_CAP_STOCKS = UNIVERSES["smallcap"][0]
+TOP_100_CRYPTO = UNIVERSES["crypto-top100"][0]
+CRYPTO_100_300 = UNIVERSES["crypto-100-300"][0]
+COMMODITIES = UNIVERSES["commodities"][0]
+
+def get_universe(name: str):
+    """Return (symbols, is_crypto) for a named universe or a path to a universe file"""
+    key = name.lower().strip()
+    if key not in UNIVERSES and os.path.isfile(name):
+        return load_universe_file(name)
+    if key not in UNIVERSES:
+        raise KeyError(f"Unknown universe '{name}' (available: {', '.join(sorted(UNIVERSES))}; "
+                       f"add <name>.txt to MARKET_SCANNER_UNIVERSE_DIR or pass a file path)")
+    symbols, is_crypto = UNIVERSES[key]
+    return list(symbols), is_crypto
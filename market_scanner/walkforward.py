@@ -0,0 +1,261 @@
+# market_scanner/walkforward.py
+# Walk-forward optimization of scoring weights/thresholds: rolling in-sample
+# windows pick the best custom_scanner_settings, the following out-of-sample
+# window trades them (flat at both ends), and the out-of-sample pieces are
+# stitched into one equity curve. Features are computed once - weights only
+# change the score.
+
+import random
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .backtest import (
+    BacktestPanel, align_frames, load_backtest_data, simulate_panel, summarize_backtest,
+    validate_backtest_range,
+)
+from .features import FEATURE_COLUMNS
+from .scanner import run_cancellable
+from .scoring import _score_params, score_frame
+
+# Search ranges for random candidates: (low, high); integer bounds draw integers
+DEFAULT_SEARCH_SPACE = {
+    'weights': {
+        'regime': (5, 40), 'structure': (5, 40), 'rsi': (0, 20), 'macd': (0, 20),
+        'volume': (0, 15), 'volatility': (0, 15), 'tradability': (0, 10), 'overextension_penalty': (0, 20),
+    },
+    'thresholds': {
+        'rsi_bull': (40, 60), 'rsi_overbought': (70, 90), 'rsi_oversold': (10, 30),
+        'volume_z': (0.0, 1.5), 'atr_pct': (0.02, 0.08),
+    },
+}
+OBJECTIVES = ("sharpe_ratio", "total_return", "profit_factor")
+
+@dataclass
+class FeaturePanel:
+    """Unscored feature arrays (dates x symbols) - scored per candidate settings without recomputing features"""
+    dates: pd.DatetimeIndex
+    symbols: List[str]
+    features: Dict[str, np.ndarray]
+    valid: np.ndarray
+
+def build_feature_panel(symbol_data: Dict[str, pd.DataFrame]) -> FeaturePanel:
+    dates, arrays, valid = align_frames(symbol_data, FEATURE_COLUMNS)
+    return FeaturePanel(dates=dates, symbols=list(symbol_data), features=arrays, valid=valid)
+
+def slice_features(fp: FeaturePanel, start=None, end=None) -> FeaturePanel:
+    """Rows with start <= date < end"""
+    rows = np.ones(len(fp.dates), dtype=bool)
+    if start is not None:
+        rows &= fp.dates >= start
+    if end is not None:
+        rows &= fp.dates < end
+    return FeaturePanel(dates=fp.dates[rows], symbols=fp.symbols,
+                        features={c: a[rows] for c, a in fp.features.items()}, valid=fp.valid[rows])
+
+def score_panel(fp: FeaturePanel, custom_settings: Optional[dict] = None) -> BacktestPanel:
+    """Score every valid bar with the given weights/thresholds (vectorized score_row)"""
+    frame = pd.DataFrame({c: a[fp.valid] for c, a in fp.features.items()})
+    score = np.full(fp.valid.shape, np.nan)
+    if len(frame):
+        score[fp.valid] = score_frame(frame, custom_settings)
+    f = fp.features
+    return BacktestPanel(dates=fp.dates, symbols=fp.symbols, close=f["close"], high=f["high"],
+                         low=f["low"], atr=f["atr"], score=score, valid=fp.valid)
+
+# ================= Candidates & windows =================
+def default_settings() -> dict:
+    """The built-in weights/thresholds in custom_scanner_settings form"""
+    p = _score_params(None)
+    return {
+        'enabled': True,
+        'weights': {'regime': p['regime_weight'], 'structure': p['structure_weight'], 'rsi': p['rsi_weight'],
+                    'macd': p['macd_weight'], 'volume': p['volume_weight'], 'volatility': p['volatility_weight'],
+                    'tradability': p['tradability_weight'], 'overextension_penalty': p['overextension_penalty']},
+        'thresholds': {'rsi_bull': p['rsi_bull'], 'rsi_overbought': p['rsi_overbought'],
+                       'rsi_oversold': p['rsi_oversold'], 'volume_z': p['volume_z'], 'atr_pct': p['atr_pct_max']},
+    }
+
+def sample_settings(n: int, space: Optional[dict] = None, seed: Optional[int] = None) -> List[dict]:
+    """The default settings plus n - 1 random candidates drawn from the search space"""
+    space = space or DEFAULT_SEARCH_SPACE
+    rng = random.Random(seed)
+    candidates = [default_settings()]
+    for _ in range(max(n - 1, 0)):
+        settings = default_settings()
+        for group in ('weights', 'thresholds'):
+            for key, (low, high) in space.get(group, {}).items():
+                if isinstance(low, int) and isinstance(high, int):
+                    settings[group][key] = rng.randint(low, high)
+                else:
+                    settings[group][key] = round(rng.uniform(low, high), 4)
+        candidates.append(settings)
+    return candidates
+
+def walk_forward_windows(dates: pd.DatetimeIndex, in_sample_days: int,
+                         out_sample_days: int) -> List[Tuple[pd.Timestamp, pd.Timestamp, pd.Timestamp]]:
+    """Rolling (in_sample_start, out_sample_start, out_sample_end) windows stepping by the out-of-sample length"""
+    if len(dates) == 0:
+        return []
+    windows = []
+    is_start = dates[0]
+    while True:
+        oos_start = is_start + pd.Timedelta(days=in_sample_days)
+        if oos_start > dates[-1]:
+            break
+        oos_end = oos_start + pd.Timedelta(days=out_sample_days)
+        windows.append((is_start, oos_start, min(oos_end, dates[-1] + pd.Timedelta(days=1))))
+        is_start += pd.Timedelta(days=out_sample_days)
+    return windows
+
+# ================= Optimization =================
+_FEATURES: Optional[FeaturePanel] = None
+_PARAMS: Dict[str, Any] = {}
+
+def _init_worker(fp: FeaturePanel, params: Dict[str, Any]) -> None:
+    global _FEATURES, _PARAMS
+    _FEATURES, _PARAMS = fp, params
+
+def _evaluate(fp: FeaturePanel, settings: dict, params: Dict[str, Any],
+              close_at_end: bool = False) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    sim = simulate_panel(score_panel(fp, settings), params['initial_equity'], params['risk_per_trade'],
+                         params['stop_atr_mult'], params['min_score'], close_at_end=close_at_end)
+    metrics, _ = summarize_backtest(fp.symbols, sim['trades'], sim['daily_returns'], params['initial_equity'],
+                                    sim['final_equity'], sim['max_drawdown'], params['timeframe'], len(fp.symbols))
+    return sim, metrics
+
+def optimize_window(fp: FeaturePanel, window: Tuple[pd.Timestamp, pd.Timestamp, pd.Timestamp],
+                    candidates: List[dict], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick the best candidate on the in-sample slice and trade it on the out-of-sample slice"""
+    is_start, oos_start, oos_end = window
+    in_sample = slice_features(fp, is_start, oos_start)
+    objective = params['objective']
+
+    best, best_value, best_metrics = candidates[0], None, None
+    for settings in candidates:
+        _, metrics = _evaluate(in_sample, settings, params)
+        value = metrics[objective]
+        if metrics['total_trades'] and (best_value is None or value > best_value):
+            best, best_value, best_metrics = settings, value, metrics
+
+    # Positions still open when the window ends are closed on its last bar, so the window's
+    # equity and trade count are complete before the next window starts from flat
+    sim, oos_metrics = _evaluate(slice_features(fp, oos_start, oos_end), best, params, close_at_end=True)
+    return {
+        'in_sample_start': is_start, 'out_sample_start': oos_start, 'out_sample_end': oos_end,
+        'settings': best, 'in_sample_metrics': best_metrics or {}, 'out_sample_metrics': oos_metrics,
+        'trades': sim['trades'], 'equity_curve': sim['equity_curve'], 'daily_returns': sim['daily_returns'],
+        'final_equity': sim['final_equity'],
+    }
+
+def _optimize_in_worker(window: Tuple[pd.Timestamp, pd.Timestamp, pd.Timestamp]) -> Dict[str, Any]:
+    return optimize_window(_FEATURES, window, _PARAMS['candidates'], _PARAMS)
+
+def completed_prefix(windows: List[Tuple[pd.Timestamp, pd.Timestamp, pd.Timestamp]],
+                     results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Results for the leading run of windows that all finished (a cancelled run can leave gaps)"""
+    by_start = {res['out_sample_start']: res for res in results}
+    prefix = []
+    for _, oos_start, _ in windows:
+        if oos_start not in by_start:
+            break
+        prefix.append(by_start[oos_start])
+    return prefix
+
+def stitch_windows(results: List[Dict[str, Any]], symbols: List[str], initial_equity: float,
+                   timeframe: str) -> Dict[str, Any]:
+    """
+    Chain out-of-sample windows into one equity curve.
+
+    Each window is simulated from initial_equity, so its curve is rescaled by
+    the equity carried over from the previous windows; per-bar returns are
+    scale-free and are concatenated as-is.
+    """
+    carry = initial_equity
+    curve = [{'date': results[0]['out_sample_start'], 'equity': initial_equity, 'window': 0}] if results else []
+    trades, daily_returns = [], []
+    for n, res in enumerate(results, 1):
+        factor = carry / initial_equity
+        for point in res['equity_curve']:
+            curve.append({'date': point['date'], 'equity': point['equity'] * factor, 'window': n})
+        for trade in res['trades']:
+            trades.append({**trade, 'window': n, 'trade_pnl': trade['trade_pnl'] * factor,
+                           'position_size': trade['position_size'] * factor})
+        daily_returns.extend(res['daily_returns'])
+        carry = res['final_equity'] * factor
+
+    equity = pd.DataFrame(curve, columns=['date', 'equity', 'window'])
+    peak = equity['equity'].cummax()
+    max_drawdown = float(((peak - equity['equity']) / peak).max()) if len(equity) else 0.0
+    metrics, symbol_performance = summarize_backtest(symbols, trades, daily_returns, initial_equity, carry,
+                                                     max_drawdown, timeframe, len(symbols))
+    return {'equity_curve': equity, 'trades': trades, 'metrics': metrics, 'symbol_performance': symbol_performance}
+
+def window_table(results: List[Dict[str, Any]], objective: str) -> pd.DataFrame:
+    """One row per window: dates, in/out-of-sample objective and the chosen weights/thresholds"""
+    rows = []
+    for n, res in enumerate(results, 1):
+        row = {
+            'window': n,
+            'in_sample_start': res['in_sample_start'], 'out_sample_start': res['out_sample_start'],
+            'out_sample_end': res['out_sample_end'],
+            f'is_{objective}': res['in_sample_metrics'].get(objective),
+            f'oos_{objective}': res['out_sample_metrics'].get(objective),
+            'oos_return': res['out_sample_metrics'].get('total_return'),
+            'oos_trades': res['out_sample_metrics'].get('total_trades'),
+        }
+        row.update({f'w_{k}': v for k, v in res['settings']['weights'].items()})
+        row.update({f't_{k}': v for k, v in res['settings']['thresholds'].items()})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def walk_forward(symbols: List[str], start_date: str, end_date: str, timeframe: str = "1D",
+                 in_sample_days: int = 365, out_sample_days: int = 90, n_candidates: int = 50,
+                 min_score: float = 10, stop_atr_mult: float = 1.5, risk_per_trade: float = 0.01,
+                 initial_equity: float = 10000, objective: str = "sharpe_ratio",
+                 space: Optional[dict] = None, seed: Optional[int] = None,
+                 workers: int = 1, executor: str = "process",
+                 progress: Optional[Callable[[int, int], Any]] = None, cancel_event=None) -> Dict[str, Any]:
+    """
+    Walk-forward optimization of the scoring weights and thresholds.
+
+    Returns {'windows': per-window table, 'window_settings': chosen settings per
+    window, 'equity_curve': stitched out-of-sample curve, 'trades', 'metrics',
+    'symbol_performance', 'cancelled', 'errors'} or {'error': message}.
+    Windows run in parallel; every window scores the same candidate list.
+    Each out-of-sample window closes its open positions on its last bar, and
+    a cancelled run stitches only the windows completed from the start.
+    """
+    if objective not in OBJECTIVES:
+        return {'error': f"Unknown objective '{objective}' (expected one of {', '.join(OBJECTIVES)})"}
+    error = validate_backtest_range(start_date, end_date, timeframe)
+    if error:
+        return {'error': error}
+
+    symbol_data, errors = load_backtest_data(symbols, timeframe, start_date, end_date)
+    if not symbol_data:
+        return {'error': 'No valid symbol data loaded', 'errors': errors}
+    fp = build_feature_panel(symbol_data)
+    windows = walk_forward_windows(fp.dates, in_sample_days, out_sample_days)
+    if not windows:
+        return {'error': f'History too short for a {in_sample_days}-day in-sample window', 'errors': errors}
+
+    params = {
+        'candidates': sample_settings(n_candidates, space, seed), 'objective': objective, 'timeframe': timeframe,
+        'initial_equity': initial_equity, 'risk_per_trade': risk_per_trade, 'stop_atr_mult': stop_atr_mult,
+        'min_score': min_score,
+    }
+    results, cancelled = run_cancellable(_optimize_in_worker, windows, workers, executor, _init_worker,
+                                         (fp, params), progress, cancel_event)
+    # Only a gap-free run of windows makes one out-of-sample curve
+    results = completed_prefix(windows, results)
+    out = stitch_windows(results, fp.symbols, initial_equity, timeframe)
+    out.update({
+        'windows': window_table(results, objective),
+        'window_settings': [res['settings'] for res in results],
+        'cancelled': cancelled,
+        'errors': errors,
+    })
+    return out
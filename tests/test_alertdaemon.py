@@ -0,0 +1,107 @@
+# tests/test_alertdaemon.py
+# One price alert pass against a scripted connection: only the alerts the
+# guarded UPDATE returned are counted and notified, every crossed alert leaves
+# the index, and a pass that can't take the advisory lock does nothing.
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from market_scanner import alertdaemon
+from market_scanner.pricealerts import AlertIndex
+
+class ScriptedConn:
+    """Answers the daemon's statements; `returned` is which ids the flip UPDATE gets back"""
+
+    closed = False
+
+    def __init__(self, alerts, returned, locked=True):
+        self.alerts, self.returned, self.locked = alerts, returned, locked
+        self.statements = []
+        self.update_params = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def cursor(self, cursor_factory=None):
+        conn = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def execute(self, sql, params=None):
+                conn.statements.append(" ".join(sql.split()))
+                if "pg_try_advisory_lock" in sql:
+                    self.rows = [{'locked': conn.locked}]
+                elif sql.lstrip().startswith("SELECT * FROM price_alerts"):
+                    self.rows = [dict(a) for a in conn.alerts]
+                elif "UPDATE price_alerts" in sql:
+                    conn.update_params = params
+                    self.rows = [{'id': i} for i in params[0] if i in conn.returned]
+                else:
+                    self.rows = []
+
+            def fetchone(self):
+                return self.rows[0]
+
+            def fetchall(self):
+                return self.rows
+
+        return Cursor()
+
+ALERTS = [
+    {'id': 1, 'symbol': "AAPL", 'alert_type': "above", 'target_price': 150.0},
+    {'id': 2, 'symbol': "AAPL", 'alert_type': "above", 'target_price': 155.0},
+    {'id': 3, 'symbol': "MSFT", 'alert_type': "below", 'target_price': 300.0},
+    {'id': 4, 'symbol': "MSFT", 'alert_type': "above", 'target_price': 400.0},   # not crossed
+]
+
+@pytest.fixture(autouse=True)
+def prices(monkeypatch):
+    monkeypatch.setattr(alertdaemon, "latest_prices", lambda symbols, fallback=None, board=None:
+                        {'AAPL': 160.0, 'MSFT': 290.0})
+
+def test_notifies_only_the_rows_the_update_returned():
+    # Alert 2 was flipped by another instance between the SELECT and the UPDATE
+    conn = ScriptedConn(ALERTS, returned={1, 3})
+    notified = []
+    index = AlertIndex()
+    fired = alertdaemon.check_all_alerts(conn, lambda alert, price: notified.append((alert['id'], price)),
+                                         index=index, board=None)
+
+    assert fired == 2
+    assert sorted(notified) == [(1, 160.0), (3, 290.0)]
+    ids, flip_prices = conn.update_params
+    assert sorted(ids) == [1, 2, 3]
+    assert dict(zip(ids, flip_prices)) == {1: 160.0, 2: 160.0, 3: 290.0}
+    assert [a['id'] for a in index.crossed("MSFT", 450.0)] == [4] and len(index) == 1
+    assert conn.statements[-1] == "SELECT pg_advisory_unlock(%s)"
+
+def test_failed_notification_does_not_stop_the_others():
+    conn = ScriptedConn(ALERTS, returned={1, 2, 3})
+    notified = []
+
+    def notify(alert, price):
+        if alert['id'] == 1:
+            raise RuntimeError("smtp down")
+        notified.append(alert['id'])
+
+    assert alertdaemon.check_all_alerts(conn, notify, board=None) == 3
+    assert sorted(notified) == [2, 3]
+
+def test_nothing_crossed_skips_the_update():
+    conn = ScriptedConn([ALERTS[3]], returned={4})
+    assert alertdaemon.check_all_alerts(conn, lambda *a: pytest.fail("notified"), board=None) == 0
+    assert not any("UPDATE" in s for s in conn.statements)
+
+def test_pass_held_elsewhere_is_skipped():
+    conn = ScriptedConn(ALERTS, returned={1, 2, 3}, locked=False)
+    assert alertdaemon.check_all_alerts(conn, lambda *a: pytest.fail("notified"), board=None) == 0
+    assert len(conn.statements) == 1 and "pg_try_advisory_lock" in conn.statements[0]
@@ -0,0 +1,75 @@
+# tests/test_alerts.py
+# Backtest signal digests: collected signals are split into numbered batches,
+# and the background sender spaces its emails at least min_interval apart.
+
+import queue
+import threading
+import time
+
+from market_scanner.alerts import collect_signals, digest_messages, enqueue_digest, sender_loop, start_alert_sender
+
+def _signals(n: int) -> list:
+    signals = []
+    hook = collect_signals(signals)
+    for i in range(n):
+        if i % 2 == 0:
+            hook("BUY", f"S{i}", 10.0 + i, {'date': f"2024-01-{i % 28 + 1:02d}", 'score': 12.5, 'stop_price': 9.0})
+        else:
+            hook("SELL", f"S{i - 1}", 11.0 + i, {'date': "2024-02-01", 'exit_reason': "time_exit",
+                                                 'trade_pnl': 5.0, 'holding_days': 3})
+    return signals
+
+def test_collect_signals_records_instead_of_sending():
+    signals = _signals(2)
+    assert [s['signal_type'] for s in signals] == ["BUY", "SELL"]
+    assert signals[0]['symbol'] == "S0" and signals[0]['score'] == 12.5
+
+def test_digest_batches_are_numbered_and_cover_every_signal():
+    signals = _signals(250)
+    messages = digest_messages(signals, digest_size=100)
+    assert len(messages) == 3
+    assert all(subject.endswith(f"({n}/3)") for n, (subject, _) in enumerate(messages, 1))
+    lines = [line for _, body in messages for line in body.splitlines() if " BUY " in line or " SELL " in line]
+    assert len(lines) == 250
+    assert "25 BUY / 25 SELL (3/3)" in messages[2][0]
+    assert "Realised P&L of the exits below: $+250.00" in messages[0][1]
+
+def test_single_batch_and_no_signals():
+    (subject, body), = digest_messages(_signals(4), title="Swing")
+    assert subject == "📊 Swing Signals: 2 BUY / 2 SELL" and "part" not in body
+    assert digest_messages([]) == []
+    jobs = queue.Queue()
+    assert enqueue_digest(jobs, [], "a@example.com") == 0 and jobs.empty()
+
+def test_sender_rate_limits_and_survives_send_errors():
+    sent = []
+
+    def send(subject, body, to_email, workspace_id):
+        sent.append((time.monotonic(), subject, to_email, workspace_id))
+        if len(sent) == 2:
+            raise RuntimeError("smtp down")
+
+    jobs, stop = start_alert_sender(send, min_interval=0.2)
+    assert enqueue_digest(jobs, _signals(30), "a@example.com", "ws1", digest_size=10) == 3
+    assert enqueue_digest(jobs, _signals(2), "b@example.com") == 1
+    jobs.join()
+    stop.set()
+
+    assert [s[2] for s in sent] == ["a@example.com"] * 3 + ["b@example.com"]
+    assert sent[0][3] == "ws1" and sent[3][3] is None
+    gaps = [b[0] - a[0] for a, b in zip(sent, sent[1:])]
+    assert min(gaps) >= 0.2 - 0.01
+
+def test_stop_interrupts_the_wait_between_batches():
+    sent, stop = [], threading.Event()
+    jobs = queue.Queue()
+    enqueue_digest(jobs, _signals(20), "a@example.com", digest_size=10)
+    thread = threading.Thread(target=sender_loop, args=(jobs, lambda *a: sent.append(a), stop, 30.0))
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stop.set()
+    thread.join(timeout=5)
+    assert not thread.is_alive() and len(sent) == 1
+    assert jobs.unfinished_tasks == 0
@@ -0,0 +1,175 @@
+# tests/test_backtest.py
+# The array engine (build_panel + simulate_panel) against a port of the
+# run_backtest date/symbol loop from app.py, on synthetic scored bars, and
+# mark_to_market against a bar-by-bar revaluation of the same trades.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_scanner.backtest import build_panel, mark_to_market, score_bars, simulate_panel
+from market_scanner.scoring import score_row
+
+def _bars(seed: int, n: int = 300, drop: float = 0.0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2022-01-03", periods=n)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    df = pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.005, n)),
+        'high': close * (1 + np.abs(rng.normal(0, 0.01, n))),
+        'low': close * (1 - np.abs(rng.normal(0, 0.01, n))),
+        'close': close,
+        'volume': rng.uniform(1e5, 1e6, n),
+    }, index=idx)
+    if drop:
+        df = df[rng.random(n) >= drop]   # holes, so symbols don't share every date
+    return df
+
+def _symbol_data() -> dict:
+    return {sym: score_bars(_bars(seed, drop=drop))
+            for sym, seed, drop in [("AAA", 1, 0.0), ("BBB", 2, 0.1), ("CCC", 3, 0.0), ("DDD", 4, 0.2),
+                                    ("EEE", 5, 0.0), ("FFF", 6, 0.05)]}
+
+def _reference_loop(symbol_data, initial_equity=10000, risk_per_trade=0.01, stop_atr_mult=1.5, min_score=10):
+    """run_backtest's main loop from app.py, minus data loading, alerts and metrics"""
+    current_equity = initial_equity
+    trades, equity_curve = [], []
+    active_positions = {}
+    all_dates = set()
+    for df in symbol_data.values():
+        all_dates.update(df.index)
+
+    for current_date in sorted(all_dates):
+        day_start_equity = current_equity
+        for symbol, df_features in symbol_data.items():
+            if current_date not in df_features.index:
+                continue
+            row = df_features.loc[current_date]
+
+            if symbol in active_positions:
+                position = active_positions[symbol]
+                exit_triggered = False
+                exit_reason = ""
+                exit_price = row['close']
+                if position['direction'] == "long":
+                    if row['low'] <= position['stop_price']:
+                        exit_triggered, exit_reason, exit_price = True, "stop_loss", position['stop_price']
+                    elif row['score'] < min_score / 2:
+                        exit_triggered, exit_reason, exit_price = True, "score_exit", row['close']
+                else:
+                    if row['high'] >= position['stop_price']:
+                        exit_triggered, exit_reason, exit_price = True, "stop_loss", position['stop_price']
+                    elif row['score'] < min_score / 2:
+                        exit_triggered, exit_reason, exit_price = True, "score_exit", row['close']
+                if (current_date - position['entry_date']).days >= 20:
+                    exit_triggered, exit_reason, exit_price = True, "time_exit", row['close']
+
+                if exit_triggered:
+                    if position['direction'] == "long":
+                        trade_return = (exit_price - position['entry_price']) / position['entry_price']
+                    else:
+                        trade_return = (position['entry_price'] - exit_price) / position['entry_price']
+                    trade_pnl = trade_return * position['position_value']
+                    current_equity += trade_pnl
+                    trades.append({
+                        'symbol': symbol,
+                        'direction': position['direction'],
+                        'entry_date': position['entry_date'],
+                        'exit_date': current_date,
+                        'entry_price': position['entry_price'],
+                        'exit_price': exit_price,
+                        'position_size': position['position_size'],
+                        'trade_return': trade_return,
+                        'trade_pnl': trade_pnl,
+                        'exit_reason': exit_reason,
+                        'holding_days': (current_date - position['entry_date']).days
+                    })
+                    del active_positions[symbol]
+
+            if (symbol not in active_positions and len(active_positions) < 5
+                    and row['score'] >= min_score and current_equity > 0):
+                entry_price = row['close']
+                direction = "long" if row['score'] > 0 else "short"
+                stop_distance = stop_atr_mult * row['atr']
+                stop_price = entry_price - stop_distance if direction == "long" else entry_price + stop_distance
+                position_size = current_equity * risk_per_trade / abs(entry_price - stop_price)
+                position_value = position_size * entry_price
+                if position_value > current_equity * 0.2:
+                    position_value = current_equity * 0.2
+                    position_size = position_value / entry_price
+                active_positions[symbol] = {
+                    'direction': direction, 'entry_price': entry_price, 'entry_date': current_date,
+                    'stop_price': stop_price, 'position_size': position_size, 'position_value': position_value,
+                }
+
+        if current_equity != day_start_equity:
+            equity_curve.append({'date': current_date, 'equity': current_equity,
+                                 'trade_pnl': current_equity - day_start_equity})
+
+    return {'trades': trades, 'equity_curve': equity_curve, 'final_equity': current_equity,
+            'open_positions': sorted(active_positions)}
+
+def test_score_frame_matches_score_row():
+    # The app loop scored row by row; the engine scores the whole frame at once
+    scored = score_bars(_bars(11))
+    assert list(scored['score']) == [score_row(r) for _, r in scored.iterrows()]
+
+@pytest.mark.parametrize("min_score", [10, 40, -15])
+def test_simulate_panel_matches_run_backtest_loop(min_score):
+    symbol_data = _symbol_data()
+    expected = _reference_loop(symbol_data, min_score=min_score)
+    got = simulate_panel(build_panel(symbol_data), min_score=min_score)
+
+    assert len(expected['trades']) > 10
+    assert len(got['trades']) == len(expected['trades'])
+    for mine, ref in zip(got['trades'], expected['trades']):
+        assert mine.keys() == ref.keys()
+        for key, value in ref.items():
+            if isinstance(value, float):
+                assert mine[key] == pytest.approx(value, rel=1e-12), key
+            else:
+                assert mine[key] == value, key
+    assert {t['exit_reason'] for t in expected['trades']} >= {"stop_loss", "time_exit"}
+
+    assert [p['date'] for p in got['equity_curve']] == [p['date'] for p in expected['equity_curve']]
+    assert [p['equity'] for p in got['equity_curve']] == pytest.approx([p['equity'] for p in expected['equity_curve']])
+    assert got['final_equity'] == pytest.approx(expected['final_equity'], rel=1e-12)
+    assert sorted(p['symbol'] for p in got['open_positions']) == expected['open_positions']
+
+def test_short_side_is_exercised():
+    trades = _reference_loop(_symbol_data(), min_score=-15)['trades']
+    assert any(t['direction'] == "short" for t in trades)
+
+def _mark_each_bar(panel, trades, open_positions, initial_equity=10000):
+    """Per-bar revaluation: realised P&L to date plus every open leg at the latest close seen"""
+    last_close, curve = {}, []
+    for i, date in enumerate(panel.dates):
+        for j, sym in enumerate(panel.symbols):
+            if not np.isnan(panel.close[i, j]):
+                last_close[sym] = panel.close[i, j]
+        equity, gross = initial_equity, 0.0
+        for t in trades + open_positions:
+            closed = 'exit_date' in t and t['exit_date'] <= date
+            if closed:
+                equity += t['trade_pnl']
+            elif t['entry_date'] <= date:
+                qty = t['position_size'] if t['direction'] == "long" else -t['position_size']
+                equity += qty * (last_close[t['symbol']] - t['entry_price'])
+                gross += abs(qty * last_close[t['symbol']])
+        curve.append((equity, gross / equity))
+    return curve
+
+@pytest.mark.parametrize("min_score", [10, -15])
+def test_mark_to_market_matches_per_bar_loop(min_score):
+    panel = build_panel(_symbol_data())
+    sim = simulate_panel(panel, min_score=min_score)
+    assert sim['open_positions']   # exercise legs still open at the end
+    mtm = mark_to_market(panel, sim['trades'], sim['open_positions'])
+
+    expected = _mark_each_bar(panel, sim['trades'], sim['open_positions'])
+    assert [p['date'] for p in mtm['equity_curve']] == list(panel.dates)
+    assert [p['equity'] for p in mtm['equity_curve']] == pytest.approx([e for e, _ in expected], rel=1e-9)
+    assert [p['exposure'] for p in mtm['equity_curve']] == pytest.approx([x for _, x in expected], rel=1e-9, abs=1e-12)
+    assert mtm['metrics']['final_equity'] == pytest.approx(expected[-1][0])
+    assert mtm['metrics']['open_positions'] == len(sim['open_positions'])
+    assert 0 < mtm['metrics']['time_in_market'] <= 1
@@ -0,0 +1,47 @@
+# tests/test_barstore.py
+# Bar store files: save/load round trip, and concurrent writers of one symbol
+# each publish a whole file.
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from market_scanner.barstore import bar_path, load_bars, save_bars
+
+def _bars(n: int, offset: float = 0.0) -> pd.DataFrame:
+    index = pd.date_range("2024-01-01", periods=n, freq="h", tz="UTC").as_unit("ns")
+    values = np.arange(n, dtype=float)[:, None] + offset + np.arange(5)
+    return pd.DataFrame(values, index=index, columns=["open", "high", "low", "close", "volume"])
+
+def test_round_trip(tmp_path):
+    bars = _bars(50)
+    save_bars("BRK.B", "1h", bars, fetched_at=123.0, root=str(tmp_path))
+    loaded, fetched_at = load_bars("BRK.B", "1h", root=str(tmp_path))
+    pd.testing.assert_frame_equal(loaded, bars, check_freq=False)
+    assert fetched_at == 123.0
+
+def test_concurrent_writers_of_one_symbol(tmp_path):
+    root = str(tmp_path)
+    frames = [_bars(20000, offset=1000.0 * i) for i in range(8)]
+    barrier = threading.Barrier(len(frames))
+    errors = []
+
+    def write(bars):
+        barrier.wait()
+        try:
+            for _ in range(3):
+                save_bars("AAPL", "1h", bars, root=root)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(f,)) for f in frames]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    loaded, _ = load_bars("AAPL", "1h", root=root)
+    assert any(loaded.equals(f) for f in frames)
+    assert os.listdir(os.path.dirname(bar_path("AAPL", "1h", root))) == ["AAPL.npz"]
@@ -0,0 +1,80 @@
+# tests/test_btcache.py
+# Backtest cache keys and eviction: scored frames are tied to CACHE_FORMAT and
+# prune_backtest_cache() removes outdated, old and least recently used files;
+# concurrent writers of one key each publish a whole file.
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from market_scanner import btcache
+
+def _frame() -> pd.DataFrame:
+    index = pd.date_range("2024-01-01", periods=5, freq="D", tz="UTC")
+    return pd.DataFrame({'close': np.arange(5.0), 'score': np.ones(5)}, index=index)
+
+def test_scored_frames_do_not_survive_format_bump(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path)
+    btcache.save_scored(cache_dir, "abc", btcache.settings_key(None), _frame())
+    assert btcache.load_scored(cache_dir, "abc", "default") is not None
+    monkeypatch.setattr(btcache, "CACHE_FORMAT", btcache.CACHE_FORMAT + 1)
+    assert btcache.load_scored(cache_dir, "abc", "default") is None
+    removed, _ = btcache.prune_backtest_cache(cache_dir)
+    assert removed == 1
+    assert not os.listdir(os.path.join(cache_dir, "scored", f"v{btcache.CACHE_FORMAT - 1}"))
+
+def test_prune_by_age_and_size(tmp_path):
+    cache_dir = str(tmp_path)
+    now = time.time()
+    for i in range(4):
+        btcache.save_result(cache_dir, f"k{i}", {'payload': b"x" * 100_000})
+        os.utime(btcache._result_path(cache_dir, f"k{i}"), (now - i * 60, now - i * 60))
+    old = btcache._result_path(cache_dir, "old")
+    btcache.save_result(cache_dir, "old", {'payload': b""})
+    os.utime(old, (now - 40 * 86400, now - 40 * 86400))
+
+    btcache.prune_backtest_cache(cache_dir, max_days=30, max_mb=0.25)   # room for two results
+    kept = sorted(os.listdir(os.path.join(cache_dir, "results")))
+    assert kept == ["k0.pkl", "k1.pkl"]   # old by age, then k3/k2 as least recently used
+
+def test_load_marks_entry_as_used(tmp_path):
+    cache_dir = str(tmp_path)
+    btcache.save_result(cache_dir, "k", {'trades': []})
+    path = btcache._result_path(cache_dir, "k")
+    os.utime(path, (0, 0))
+    assert btcache.load_result(cache_dir, "k") == {'trades': []}
+    assert os.path.getmtime(path) > 0
+
+def test_concurrent_writers_of_one_key(tmp_path):
+    cache_dir = str(tmp_path)
+    payloads = [{'writer': i, 'trades': list(range(20000))} for i in range(8)]
+    barrier = threading.Barrier(len(payloads))
+    errors = []
+
+    def write(payload):
+        barrier.wait()
+        try:
+            for _ in range(5):
+                btcache.save_result(cache_dir, "same", payload)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(p,)) for p in payloads]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert btcache.load_result(cache_dir, "same") in payloads
+    assert os.listdir(os.path.join(cache_dir, "results")) == ["same.pkl"]
+
+def test_failed_write_leaves_no_temp_file(tmp_path):
+    cache_dir = str(tmp_path)
+    try:
+        btcache.save_result(cache_dir, "broken", {'fn': lambda: None})   # lambdas don't pickle
+    except Exception:
+        pass
+    assert os.listdir(os.path.join(cache_dir, "results")) == []
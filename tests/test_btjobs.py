@@ -0,0 +1,85 @@
+# tests/test_btjobs.py
+# Background backtest jobs on synthetic bars: cancelling while the simulation
+# runs, save errors reported through the job instead of the worker thread, and
+# finished_at published before the terminal status.
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_scanner import btcache, btjobs
+
+def _bars(symbol, timeframe, start=None, end=None):
+    rng = np.random.default_rng(sum(map(ord, symbol)))
+    index = pd.date_range("2023-01-02", periods=300, freq="D", tz="UTC")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(index))))
+    return pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+                         'volume': np.full(len(index), 1e6)}, index=index)
+
+CONFIG = {'symbols': ["AAA", "BBB", "CCC"], 'start_date': "2023-01-02", 'end_date': "2023-10-30",
+          'timeframe': "1D", 'min_score': -1e9}
+
+@pytest.fixture(autouse=True)
+def synthetic_bars(monkeypatch, tmp_path):
+    monkeypatch.setattr(btcache, "get_ohlcv", _bars)
+    monkeypatch.setattr(btcache, "BACKTEST_CACHE_DIR", str(tmp_path))
+
+def _wait(job, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.finished
+
+def test_job_completes_and_records_save_error():
+    def on_finish(job):
+        raise RuntimeError("database down")
+
+    job = btjobs.submit_backtest("t", CONFIG, on_finish, reuse_results=False)
+    _wait(job)
+    assert job.status == "done" and job.result['trades']
+    assert job.save_error == "database down" and job.saved is None
+
+def test_cancel_during_simulation():
+    holder = {}
+    first_signal = threading.Event()
+
+    def on_signal(*args):
+        if not first_signal.is_set():
+            first_signal.set()
+            holder['job'].cancel_event.set()   # cancel from inside the simulating phase
+
+    job = btjobs.BacktestJob(id="cancel", name="t", config=CONFIG)
+    holder['job'] = job
+    btjobs._run(job, None, on_signal=on_signal, reuse_results=False)
+    assert first_signal.is_set()
+    assert job.status == "cancelled" and job.result.get('cancelled')
+
+def test_finished_at_is_set_before_the_terminal_status():
+    seen = []
+
+    class Watched(btjobs.BacktestJob):
+        def __setattr__(self, name, value):
+            if name == "status" and value in ("done", "failed", "cancelled"):
+                seen.append(self.finished_at)
+            super().__setattr__(name, value)
+
+    for config in (CONFIG, {**CONFIG, 'symbols': []}):
+        job = Watched(id="order", name="t", config=config)
+        btjobs._run(job, None, reuse_results=False)
+        assert job.finished
+    cancelled = Watched(id="early", name="t", config=CONFIG)
+    cancelled.cancel_event.set()
+    btjobs._run(cancelled, None)
+    assert len(seen) == 3 and None not in seen
+
+def test_prune_skips_jobs_without_finished_at():
+    job = btjobs.BacktestJob(id="racing", name="t", config=CONFIG, status="done")
+    btjobs._JOBS[job.id] = job
+    try:
+        btjobs._prune(time.time())
+        assert "racing" in btjobs._JOBS
+    finally:
+        btjobs._JOBS.pop("racing", None)
@@ -0,0 +1,76 @@
+# tests/test_btstore.py
+# Columnar result storage: pack_results/unpack_results give back the same
+# result, empty tables included, and the summary carries none of the tables.
+
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_scanner.backtest import backtest_panel, build_panel, score_bars
+from market_scanner.btstore import pack_results, unpack_results
+
+def _bars(seed: int, n: int = 260) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({
+        'open': close, 'high': close * (1 + np.abs(rng.normal(0, 0.01, n))),
+        'low': close * (1 - np.abs(rng.normal(0, 0.01, n))), 'close': close,
+        'volume': rng.uniform(1e5, 1e6, n),
+    }, index=pd.bdate_range("2022-01-03", periods=n))
+
+def _result() -> dict:
+    symbol_data = {s: score_bars(_bars(seed)) for s, seed in [("A", 1), ("B", 2), ("C", 3)]}
+    return backtest_panel(build_panel(symbol_data), list(symbol_data), min_score=-15, errors=["D: no data"])
+
+def _assert_rows_equal(got: list, expected: list) -> None:
+    assert len(got) == len(expected)
+    for mine, ref in zip(got, expected):
+        assert list(mine) == list(ref)
+        for key, value in ref.items():
+            assert mine[key] == value, key
+
+def test_round_trip_restores_every_table():
+    results = _result()
+    assert results['trades'] and results['mark_to_market']['equity_curve']
+    summary, payload = pack_results(results)
+
+    assert 'trades' not in summary and 'equity_curve' not in summary
+    assert set(summary['mark_to_market']) == {'metrics'}
+    assert 'equity_curve' in results['mark_to_market']   # packing doesn't modify the result
+    restored = unpack_results(summary, payload)
+    assert set(restored) == set(results)
+    _assert_rows_equal(restored['trades'], results['trades'])
+    _assert_rows_equal(restored['equity_curve'], results['equity_curve'])
+    _assert_rows_equal(restored['mark_to_market']['equity_curve'], results['mark_to_market']['equity_curve'])
+    assert restored['metrics'] == results['metrics'] and restored['errors'] == ["D: no data"]
+    assert isinstance(restored['trades'][0]['entry_date'], pd.Timestamp)
+
+def test_empty_tables_round_trip():
+    results = {'trades': [], 'equity_curve': [], 'metrics': {'total_trades': 0},
+               'mark_to_market': {'equity_curve': [], 'metrics': {}}}
+    restored = unpack_results(*pack_results(results))
+    assert restored == results
+    # Tables the result never had stay absent
+    assert unpack_results(*pack_results({'metrics': {}})) == {'metrics': {}}
+
+def test_text_gaps_and_timezones_survive():
+    rows = [{'date': pd.Timestamp("2024-03-01 15:00", tz="America/New_York"), 'note': "entry", 'flag': True},
+            {'date': pd.Timestamp("2024-03-04 15:00", tz="America/New_York"), 'note': None, 'flag': False}]
+    restored = unpack_results(*pack_results({'trades': rows}))['trades']
+    assert restored == rows
+    assert str(restored[0]['date'].tz) == "America/New_York"
+
+def test_unknown_payload_format_is_rejected():
+    summary, payload = pack_results({'trades': []})
+    with np.load(io.BytesIO(payload)) as arrays:
+        contents = dict(arrays)
+    manifest = json.loads(contents['manifest'].tobytes().decode())
+    manifest['format'] += 1
+    contents['manifest'] = np.frombuffer(json.dumps(manifest).encode(), dtype=np.uint8)
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **contents)
+    with pytest.raises(ValueError):
+        unpack_results(summary, buf.getvalue())
@@ -0,0 +1,68 @@
+# tests/test_confluence.py
+# Confluence from one base download: higher timeframes resampled locally score
+# the same as bars fetched at those timeframes, and only the base is fetched.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_scanner import confluence, scanner
+from market_scanner.data import resample_ohlcv
+from market_scanner.features import compute_features
+
+HOURS = 24 * 260
+
+def _hourly() -> pd.DataFrame:
+    rng = np.random.default_rng(8)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, HOURS)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.002, HOURS))),
+        'low': np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.002, HOURS))),
+        'close': close,
+        'volume': rng.uniform(1e4, 1e5, HOURS),
+    }, index=pd.date_range("2024-01-01", periods=HOURS, freq="h", tz="UTC"))
+
+def _native(hourly: pd.DataFrame, hours: int) -> pd.DataFrame:
+    """Bars as a provider would serve them at a coarser timeframe, aggregated without pandas resample"""
+    rows, index = [], []
+    for start in range(0, len(hourly), hours):
+        chunk = hourly.iloc[start:start + hours]
+        rows.append({'open': chunk['open'].iloc[0], 'high': chunk['high'].max(), 'low': chunk['low'].min(),
+                     'close': chunk['close'].iloc[-1], 'volume': chunk['volume'].sum()})
+        index.append(chunk.index[0])
+    return pd.DataFrame(rows, index=pd.DatetimeIndex(index))
+
+@pytest.fixture(scope="module")
+def bars():
+    hourly = _hourly()
+    return {"1h": hourly, "4h": _native(hourly, 4), "1D": _native(hourly, 24)}
+
+@pytest.mark.parametrize("tf", ["4h", "1D"])
+def test_resampled_bars_match_native_bars(bars, tf):
+    resampled = resample_ohlcv(bars["1h"], tf)
+    pd.testing.assert_frame_equal(resampled, bars[tf], check_freq=False, check_index_type=False)
+    pd.testing.assert_frame_equal(compute_features(resampled), compute_features(bars[tf]),
+                                  check_freq=False, check_index_type=False)
+
+def test_confluence_scores_equal_per_timeframe_scans(bars, monkeypatch):
+    fetched = []
+
+    def get_ohlcv(sym, tf, *args, **kwargs):
+        fetched.append(tf)
+        return bars[tf]
+
+    monkeypatch.setattr(confluence, "get_ohlcv", get_ohlcv)
+    monkeypatch.setattr(scanner, "get_ohlcv", get_ohlcv)
+
+    row, err = confluence.confluence_symbol("BTC-USD", ["1D", "1h", "4h"], True, 10_000, 0.01, 1.5, 0)
+    assert err is None and fetched == ["1h"]   # one download, fastest timeframe
+
+    for tf in ("1h", "4h", "1D"):
+        single, single_err = scanner.scan_symbol("BTC-USD", tf, True, 10_000, 0.01, 1.5, 0)
+        assert single_err is None
+        assert row[f"score_{tf}"] == pytest.approx(single['score'], abs=0.01)
+    expected = np.mean([row[f"score_{tf}"] for tf in ("1h", "4h", "1D")])
+    assert row['score'] == pytest.approx(expected, abs=0.02)
+    assert row['timeframe'] == "1h/4h/1D"
@@ -0,0 +1,75 @@
+# tests/test_indicatoralerts.py
+# IndicatorState: a bar at a time it reproduces compute_features() and the
+# scanner score, re-polling a forming bar replaces it, and crossings compare
+# against the previous bar.
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_scanner.features import FEATURE_COLUMNS, compute_features
+from market_scanner.indicatoralerts import IndicatorState, condition_met
+from market_scanner.scoring import score_row
+
+def _bars(seed: int = 5, n: int = 260) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    return pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.004, n)),
+        'high': close * (1 + np.abs(rng.normal(0, 0.01, n))),
+        'low': close * (1 - np.abs(rng.normal(0, 0.01, n))),
+        'close': close,
+        'volume': rng.uniform(1e5, 1e6, n),
+    }, index=pd.bdate_range("2023-01-02", periods=n))
+
+def _assert_row_matches(values, expected, where):
+    for col in FEATURE_COLUMNS:
+        want = float(expected[col])
+        if math.isnan(want):
+            assert math.isnan(values[col]), (where, col)
+        else:
+            assert values[col] == pytest.approx(want, rel=1e-9, abs=1e-9), (where, col)
+
+CUSTOM = {'enabled': True, 'periods': {'rsi': 9, 'ema_long': 100, 'bb': 10, 'breakout': 30}}
+
+@pytest.mark.parametrize("settings", [None, CUSTOM])
+def test_incremental_matches_compute_features(settings):
+    bars = _bars()
+    features = compute_features(bars, settings)
+    state = IndicatorState(settings)
+    for i, (ts, row) in enumerate(bars.iterrows()):
+        state.update(ts, row['open'], row['high'], row['low'], row['close'], row['volume'])
+        _assert_row_matches(state.values, features.iloc[i], ts)
+        if i > 0:
+            _assert_row_matches(state.prev, features.iloc[i - 1], ts)
+        if not features.iloc[i][FEATURE_COLUMNS].isna().any():
+            assert state.values['score'] == score_row(features.iloc[i], settings)
+
+def test_update_frame_only_applies_new_bars():
+    bars = _bars()
+    state = IndicatorState()
+    assert state.update_frame(bars.iloc[:200]) == 200
+    assert state.update_frame(bars) == 60
+    _assert_row_matches(state.values, compute_features(bars).iloc[-1], "last")
+    assert not state.update(bars.index[10], 1, 1, 1, 1, 1)
+
+def test_forming_bar_is_replaced_not_stacked():
+    bars = _bars()
+    state = IndicatorState()
+    state.update_frame(bars.iloc[:-1])
+    last_ts = bars.index[-1]
+    state.update(last_ts, 1.0, 2.0, 0.5, 1.5, 10.0)   # an early, since-revised poll of the open bar
+    state.update_frame(bars)
+    assert state.bars == len(bars)
+    _assert_row_matches(state.values, compute_features(bars).iloc[-1], "revised")
+
+def test_condition_met():
+    prev, values = {'rsi': 32.0, 'close': 10.0}, {'rsi': 28.0, 'close': 11.0}
+    assert condition_met({'indicator': 'rsi', 'condition': 'crosses_below', 'target_value': 30}, values, prev)
+    assert not condition_met({'indicator': 'rsi', 'condition': 'crosses_below', 'target_value': 30}, prev, prev)
+    assert condition_met({'indicator': 'rsi', 'condition': 'below', 'target_value': 30}, values, prev)
+    assert not condition_met({'indicator': 'rsi', 'condition': 'below', 'target_value': float('nan')}, values, prev)
+    cross_field = {'indicator': 'close', 'condition': 'crosses_above', 'target_field': 'rsi'}
+    assert not condition_met(cross_field, values, prev)
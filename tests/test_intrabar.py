@@ -0,0 +1,64 @@
+# tests/test_intrabar.py
+# IntrabarResolver on synthetic hourly bars: stop reached or not, gaps
+# through the stop filled at the stop (same rule as plain stop bars), and bars
+# older than the hourly history skipped instead of breaking the fetch.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_scanner import intrabar
+
+DAY = pd.Timestamp.now(tz="UTC").normalize() - pd.Timedelta(days=30)
+
+def _hourly(opens, lows, highs):
+    index = pd.date_range(DAY, periods=len(opens), freq="h")
+    return pd.DataFrame({'open': opens, 'high': highs, 'low': lows, 'close': opens,
+                         'volume': np.ones(len(opens))}, index=index)
+
+@pytest.fixture
+def resolver(monkeypatch):
+    bars = {
+        "GAP": _hourly([100, 100, 90], [99, 99, 89], [101, 101, 91]),   # third hour opens below the 95 stop
+        "TOUCH": _hourly([100, 96, 97], [99, 94, 96], [101, 97, 98]),   # trades through 95 intrabar
+        "SAFE": _hourly([100, 100, 100], [98, 98, 98], [101, 101, 101]),
+    }
+    monkeypatch.setattr(intrabar, "cached_bars", lambda sym, *args: bars[sym])
+    return intrabar.IntrabarResolver("1D", str((DAY - pd.Timedelta(days=60)).date()), str(DAY.date()))
+
+def test_stop_fills_at_stop_price_even_through_a_gap(resolver):
+    assert resolver("GAP", DAY, "long", 95.0) == (True, 95.0)
+    assert resolver("TOUCH", DAY, "long", 95.0) == (True, 95.0)
+    assert resolver.stats['gapped_through'] == 1 and resolver.stats['stop_first'] == 2
+
+def test_stop_not_reached(resolver):
+    assert resolver("SAFE", DAY, "long", 95.0) == (False, 95.0)
+    assert resolver("SAFE", DAY, "short", 105.0) == (False, 105.0)
+    assert resolver.stats['stop_not_reached'] == 2
+
+def test_missing_day_is_unresolved(resolver):
+    assert resolver("SAFE", DAY + pd.Timedelta(days=3), "long", 95.0) is None
+    assert resolver.stats['unresolved'] == 1
+
+def test_bars_before_the_hourly_history_are_skipped(monkeypatch):
+    fetches = []
+
+    def cached_bars(sym, timeframe, start, end, *args):
+        fetches.append(start)
+        return _hourly([100, 96], [99, 94], [101, 97])
+
+    monkeypatch.setattr(intrabar, "cached_bars", cached_bars)
+    resolver = intrabar.IntrabarResolver("1D", "2019-01-01", str(DAY.date()))
+    old_day = DAY - pd.Timedelta(days=900)
+    assert resolver("TOUCH", old_day, "long", 95.0) is None
+    assert not fetches   # no fetch for a bar that can't be resolved anyway
+    assert resolver("TOUCH", DAY, "long", 95.0) == (True, 95.0)
+    # ... and the fetch starts where the history does, so recent bars still resolve
+    assert fetches == [resolver.stats['history_start']]
+    assert resolver.stats['outside_history'] == 1 and resolver.stats['unresolved'] == 1
+
+def test_history_gap():
+    now = pd.Timestamp("2026-06-01")
+    assert intrabar.history_gap("1D", "2025-01-01", now) is None
+    assert "before 2024-06-02" in intrabar.history_gap("1D", "2023-01-01", now)
+    assert intrabar.history_gap("4h", "2000-01-01", now) is None
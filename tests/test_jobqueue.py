@@ -0,0 +1,138 @@
+# tests/test_jobqueue.py
+# Shard lease heartbeat: a shard that runs longer than the heartbeat interval
+# keeps renewing its lease, and the heartbeat stops when the lease is lost.
+# Abandoned shards finish their job, and a timed-out scan cancels its shards.
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from market_scanner import jobqueue
+
+class FakeConn:
+    """Answers the renew UPDATE; holder says whether the worker still owns the shard"""
+
+    def __init__(self):
+        self.renewals = 0
+        self.holds = True
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def cursor(self, cursor_factory=None):
+        conn = self
+
+        class Cursor:
+            rowcount = 0
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def execute(self, sql, params=None):
+                assert "SET claimed_at = NOW()" in sql
+                with conn.lock:
+                    conn.renewals += 1
+                    self.rowcount = 1 if conn.holds else 0
+
+        return Cursor()
+
+SHARD = {'id': 7, 'job_id': 1, 'symbols': ["AAPL"]}
+
+def test_heartbeat_renews_while_shard_runs():
+    conn = FakeConn()
+    with jobqueue.lease_heartbeat(conn, SHARD, "w1", interval=0.02):
+        time.sleep(0.15)
+    renewed = conn.renewals
+    assert renewed >= 3
+    time.sleep(0.05)
+    assert conn.renewals == renewed   # stopped on exit
+
+def test_heartbeat_stops_when_lease_lost():
+    conn = FakeConn()
+    conn.holds = False
+    with jobqueue.lease_heartbeat(conn, SHARD, "w1", interval=0.02):
+        time.sleep(0.15)
+    assert conn.renewals == 1
+
+class ScriptedConn:
+    """Records every statement per transaction; fetch results come from a queue"""
+
+    def __init__(self, fetches=(), rowcount=0):
+        self.fetches = list(fetches)
+        self.rowcount = rowcount
+        self.transactions = []
+
+    def __enter__(self):
+        self.transactions.append([])
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def cursor(self, cursor_factory=None):
+        conn = self
+
+        class Cursor:
+            rowcount = conn.rowcount
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def execute(self, sql, params=None):
+                conn.transactions[-1].append((" ".join(sql.split()), params))
+
+            def fetchall(self):
+                return conn.fetches.pop(0)
+
+            def fetchone(self):
+                return conn.fetches.pop(0)
+
+        return Cursor()
+
+def test_claim_finishes_jobs_whose_last_shard_was_abandoned():
+    conn = ScriptedConn(fetches=[[{'job_id': 5}, {'job_id': 5}, {'job_id': 9}], None])
+    assert jobqueue.claim_shard(conn, "w1") is None
+    [statements] = conn.transactions
+    assert "RETURNING job_id" in statements[0][0]
+    finished = [params for sql, params in statements if sql.startswith("UPDATE scan_jobs SET status = 'done'")]
+    assert finished == [(5, 5), (9, 9)]
+    assert "SET status = 'running'" in statements[-1][0]
+
+def test_cancel_unfinished_shards():
+    conn = ScriptedConn(rowcount=3)
+    assert jobqueue.cancel_unfinished_shards(conn, 4, "scan timed out") == 3
+    [statements] = conn.transactions
+    assert "status IN ('queued', 'running')" in statements[0][0] and statements[0][1] == ("scan timed out", 4)
+    assert statements[1][0].startswith("UPDATE scan_jobs SET status = 'done'")
+
+def test_timed_out_scan_cancels_its_shards(monkeypatch):
+    calls = []
+
+    class Conn:
+        def close(self):
+            calls.append("close")
+
+    monkeypatch.setattr(jobqueue, "connect", lambda dsn=None: Conn())
+    monkeypatch.setattr(jobqueue, "_ensure_schema_once", lambda conn: None)
+    monkeypatch.setattr(jobqueue, "submit_scan", lambda *a, **k: 4)
+    monkeypatch.setattr(jobqueue, "job_progress", lambda conn, job_id: {'total': 2, 'finished': 0})
+    monkeypatch.setattr(jobqueue, "process_one", lambda *a: False)
+    monkeypatch.setattr(jobqueue, "cancel_unfinished_shards",
+                        lambda conn, job_id, error: calls.append(("cancel", job_id, error)))
+    monkeypatch.setattr(jobqueue, "collect_job", lambda conn, job_id: ("results", "errors"))
+
+    assert jobqueue.run_sharded_scan(["AAPL"], {}, timeout=0.0, poll_interval=0.0) == ("results", "errors")
+    assert calls == [("cancel", 4, "scan timed out after 0s"), "close"]
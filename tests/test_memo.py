@@ -0,0 +1,78 @@
+# tests/test_memo.py
+# WorkspaceMemo: hits and invalidation, TTL, failures not memoised, copies per
+# caller, and loads that race an invalidate() not being stored.
+
+import threading
+import time
+
+from market_scanner.memo import Uncacheable, WorkspaceMemo
+
+def test_hits_until_invalidated():
+    memo = WorkspaceMemo(ttl=60)
+    db = {'tier': 'free'}
+    reads = []
+
+    @memo.memoize
+    def tier(ws):
+        reads.append(ws)
+        return db['tier']
+
+    assert [tier("w1") for _ in range(10)] == ["free"] * 10
+    assert len(reads) == 1
+    db['tier'] = 'pro'
+    memo.invalidate("w1")
+    assert tier("w1") == "pro"
+    assert memo.hit_rate() == 9 / 11
+
+def test_ttl_expires():
+    memo = WorkspaceMemo(ttl=0.05)
+    calls = []
+    load = memo.memoize(lambda ws: calls.append(ws) or len(calls))
+    assert load("w") == 1 and load("w") == 1
+    time.sleep(0.06)
+    assert load("w") == 2
+
+def test_uncacheable_fallback_is_not_stored():
+    memo = WorkspaceMemo(ttl=60)
+    state = {'down': True}
+
+    @memo.memoize
+    def subscription(ws):
+        if state['down']:
+            raise Uncacheable(None)
+        return {'plan_code': 'pro'}
+
+    assert subscription("w") is None
+    state['down'] = False
+    assert subscription("w") == {'plan_code': 'pro'}
+    assert subscription("") == {'plan_code': 'pro'}   # no workspace: not memoised at all
+
+def test_callers_get_copies():
+    memo = WorkspaceMemo(ttl=60)
+    devices = memo.memoize(lambda ws: [{'device_name': 'phone'}])
+    first = devices("w")
+    first[0]['device_name'] = 'edited'
+    first.append({})
+    assert devices("w") == [{'device_name': 'phone'}]
+
+def test_load_racing_invalidate_is_dropped():
+    memo = WorkspaceMemo(ttl=60)
+    db = {'tier': 'free'}
+    gate = threading.Event()
+
+    @memo.memoize
+    def slow(ws):
+        value = db['tier']
+        gate.wait(2)
+        return value
+
+    out = []
+    t = threading.Thread(target=lambda: out.append(slow("w")))
+    t.start()
+    time.sleep(0.05)
+    db['tier'] = 'pro'
+    memo.invalidate("w")
+    gate.set()
+    t.join()
+    assert out == ["free"]
+    assert slow("w") == "pro"
@@ -0,0 +1,53 @@
+# tests/test_montecarlo.py
+# Monte Carlo resampling: a fixed seed reproduces the same simulations,
+# trades_seed is stable per trade list, and the percentiles are ordered and
+# consistent with the realised trades.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_scanner.montecarlo import equity_paths, monte_carlo, resample_returns, trade_returns, trades_seed
+
+def _trades(n: int = 40, seed: int = 2) -> list:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2023-01-02", periods=n + 1)
+    return [{'symbol': f"S{i % 5}", 'entry_date': dates[i], 'exit_date': dates[i + 1],
+             'trade_pnl': float(rng.normal(20, 150))} for i in range(n)]
+
+def test_fixed_seed_is_deterministic():
+    trades = _trades()
+    a = monte_carlo(trades, 10000, 2000, seed=42)
+    b = monte_carlo(trades, 10000, 2000, seed=42)
+    np.testing.assert_array_equal(a['final_returns'], b['final_returns'])
+    pd.testing.assert_frame_equal(a['bands'], b['bands'])
+    assert a['summary'] == b['summary']
+    c = monte_carlo(trades, 10000, 2000, seed=43)
+    assert not np.array_equal(a['final_returns'], c['final_returns'])
+
+def test_trades_seed_depends_only_on_the_trades():
+    trades = _trades()
+    assert trades_seed(trades) == trades_seed([dict(t) for t in trades])
+    assert trades_seed(trades) != trades_seed(trades[:-1])
+    assert trades_seed(trades, 10000) != trades_seed(trades, 20000)
+
+def test_percentiles_are_sane():
+    trades = _trades()
+    mc = monte_carlo(trades, 10000, 5000, seed=1)
+    s = mc['summary']
+    assert s['return_p5'] <= s['return_p50'] <= s['return_p95']
+    assert 0 <= s['max_drawdown_p50'] <= s['max_drawdown_p95'] <= s['max_drawdown_p99'] < 1
+    assert 0 <= s['prob_loss'] <= 1 and 0 <= s['prob_ruin'] <= 1
+    bands = mc['bands'][['p5', 'p25', 'p50', 'p75', 'p95']].to_numpy()
+    assert (np.diff(bands, axis=1) >= 0).all()
+    assert (bands[0] == 10000).all() and len(bands) == len(trades) + 1
+    # The realised path compounds the actual trade returns back to the realised P&L
+    assert s['actual_return'] == pytest.approx(sum(t['trade_pnl'] for t in trades) / 10000)
+
+def test_shuffle_keeps_the_final_return():
+    returns = trade_returns(_trades())
+    paths = equity_paths(resample_returns(returns, 200, "shuffle", seed=3))
+    assert paths[:, -1] == pytest.approx(np.full(200, paths[0, -1]))
+
+def test_no_trades():
+    assert 'error' in monte_carlo([], 10000, 10)
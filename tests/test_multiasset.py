@@ -0,0 +1,65 @@
+# tests/test_multiasset.py
+# One-pass multi-asset scan: items are interleaved across asset classes, and
+# splitting the tagged output by class gives what a per-class scan returns.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_scanner import scanner
+from market_scanner.multiasset import (
+    asset_class_for, interleave_items, scan_item, scan_multi_asset, split_by_asset_class,
+)
+
+def test_interleave_round_robins_and_dedupes():
+    items = [("A", "1D", "equity"), ("B", "1D", "equity"), ("C", "1D", "equity"),
+             ("BTC-USD", "1h", "crypto"), ("GC=F", "1D", "commodity"), ("A", "1D", "equity")]
+    assert interleave_items(items) == [
+        ("A", "1D", "equity"), ("BTC-USD", "1h", "crypto"), ("GC=F", "1D", "commodity"),
+        ("B", "1D", "equity"), ("C", "1D", "equity"),
+    ]
+    assert interleave_items([]) == []
+
+def test_asset_class_for():
+    assert asset_class_for("ETH-USD", True) == "crypto"
+    assert asset_class_for("cl=f") == "commodity"
+    assert asset_class_for("AAPL") == "equity"
+
+def _bars(sym, timeframe, *args, **kwargs):
+    if sym == "BAD":
+        raise RuntimeError("no data")
+    rng = np.random.default_rng(sum(map(ord, sym + timeframe)))
+    n = 400   # enough for 1h (350 bars) as well as 1D
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    volume = rng.uniform(1e3, 1e4, n) if sym == "THIN" else rng.uniform(1e6, 2e6, n)
+    return pd.DataFrame({'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+                         'volume': volume}, index=pd.date_range("2023-01-01", periods=n, freq="D"))
+
+def _symbols(df: pd.DataFrame) -> list:
+    return sorted(df['symbol']) if len(df) else []
+
+def test_split_matches_per_class_scans(monkeypatch):
+    monkeypatch.setattr(scanner, "get_ohlcv", _bars)
+    equities, crypto, commodities = ["AAPL", "MSFT", "THIN", "BAD"], ["BTC-USD", "THIN-USD"], ["GC=F"]
+    items = ([(s, "1D", "equity") for s in equities] + [(s, "1h", "crypto") for s in crypto]
+             + [(s, "1D", "commodity") for s in commodities])
+    results, errors = scan_multi_asset(items, min_vol=1_000_000, workers=3)
+    assert set(results['asset_class']) == {"equity", "crypto", "commodity"}
+
+    for cls, syms, tf, is_crypto in [("equity", equities, "1D", False), ("crypto", crypto, "1h", True),
+                                     ("commodity", commodities, "1D", False)]:
+        expected, expected_errors = scanner.scan_universe(syms, tf, is_crypto, 10_000.0, 0.01, 1.5, 1_000_000)
+        got = split_by_asset_class(results, cls)
+        pd.testing.assert_frame_equal(got.sort_values("symbol").reset_index(drop=True),
+                                      expected.sort_values("symbol").reset_index(drop=True))
+        assert _symbols(split_by_asset_class(errors, cls)) == _symbols(expected_errors)
+    # Crypto and futures skip the dollar-volume filter; a thin equity doesn't
+    assert "THIN-USD" in set(results['symbol']) and "THIN" in set(errors['symbol'])
+
+def test_split_of_untagged_or_empty_frame():
+    assert split_by_asset_class(pd.DataFrame(), "equity").empty
+    assert split_by_asset_class(pd.DataFrame({'symbol': ["A"]}), "equity").empty
+
+def test_unknown_asset_class():
+    with pytest.raises(ValueError):
+        scan_item(("AAPL", "1D", "bond"), 10_000, 0.01, 1.5, 0)
@@ -0,0 +1,61 @@
+# tests/test_outbound.py
+# HttpClient against a local HTTP server: pooled sessions must not carry one
+# caller's cookies into another caller's requests.
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from market_scanner.outbound import CredentialCache, HttpClient
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    seen = []
+
+    def do_GET(self):
+        _Handler.seen.append((self.headers.get('Authorization'), self.headers.get('Cookie')))
+        body = b"ok"
+        head = (f"HTTP/1.1 200 OK\r\nContent-Length: {len(body)}\r\n"
+                f"Set-Cookie: sid=secret-{self.headers.get('Authorization')}; Path=/\r\n\r\n").encode()
+        self.wfile.write(head + body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    _Handler.seen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_cookies_not_shared_between_callers(server):
+    client = HttpClient()
+    client.get(f"{server}/entitlements", headers={'Authorization': 'Bearer userA'})
+    client.get(f"{server}/entitlements", headers={'Authorization': 'Bearer userB'})
+    client.get(f"{server}/entitlements")
+    assert [cookie for _, cookie in _Handler.seen] == [None, None, None]
+    assert len(client.session(server.split("//")[1]).cookies) == 0
+    client.close()
+
+def test_metrics_count_requests(server):
+    client = HttpClient()
+    for _ in range(3):
+        assert client.get(f"{server}/x").status_code == 200
+    m = client.metrics()[server.split("//")[1]]
+    assert m['requests'] == 3 and m['2xx'] == 3 and m['errors'] == 0
+    client.close()
+
+def test_credential_cache_ttl_and_invalidate():
+    calls = []
+    cache = CredentialCache(ttl=60, missing_ttl=60)
+    loader = lambda: calls.append(1) or "key"
+    assert cache.get("resend", loader) == "key"
+    assert cache.get("resend", loader) == "key"
+    assert len(calls) == 1
+    cache.invalidate("resend")
+    cache.get("resend", loader)
+    assert len(calls) == 2
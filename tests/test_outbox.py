@@ -0,0 +1,190 @@
+# tests/test_outbox.py
+# Outbox worker logic against an in-memory stand-in for the outbox table:
+# per-row recording, lease heartbeats, rows lost to another worker, retries,
+# digest formatting, and how coalesce_digests groups held rows into in-app
+# summaries and email digests.
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from market_scanner import outbox
+
+class FakeOutbox:
+    """Just enough of notification_outbox for claim / renew / record"""
+
+    def __init__(self, rows):
+        self.rows = {r['id']: dict(r, status='pending', claimed_by=None) for r in rows}
+        self.statements = []
+        self.stolen = set()   # ids another worker takes over at the next heartbeat
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def cursor(self, cursor_factory=None):
+        return _Cursor(self)
+
+class _Cursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, params=None):
+        db = self.db
+        kind = ("claim" if "SET status = 'sending'" in sql else "renew" if "SET claimed_at = NOW()" in sql
+                else "record" if "unnest(%s::bigint[], %s::text[], %s::text[]" in sql
+                else "digest" if "digest_group IN" in sql else "other")
+        db.statements.append(kind)
+        if kind == "claim":
+            worker, _, limit = params
+            claimed = [r for r in db.rows.values() if r['status'] == 'pending'][:limit]
+            for r in claimed:
+                r.update(status='sending', claimed_by=worker, attempts=r.get('attempts', 0) + 1)
+            self.result = [dict(r) for r in claimed]
+        elif kind == "renew":
+            ids, worker = params
+            for i in db.stolen:
+                db.rows[i]['claimed_by'] = 'other'
+            self.result = [{'id': i} for i in ids if db.rows[i]['claimed_by'] == worker]
+        elif kind == "record":
+            ids, statuses, _, _, _, worker = params
+            self.result = []
+            for i, status in zip(ids, statuses):
+                row = db.rows[i]
+                if row['claimed_by'] == worker and row['status'] == 'sending':
+                    row.update(status=status, claimed_by=None)
+                    self.result.append({'notification_id': None, 'status': status})
+        else:
+            self.result = []
+
+    def fetchall(self):
+        return self.result
+
+def _rows(n):
+    return [{'id': i, 'idempotency_key': f"k{i}", 'to_email': "a@b.c", 'subject': "s", 'body': "b",
+             'attempts': 0} for i in range(1, n + 1)]
+
+def test_each_row_recorded_as_it_is_sent():
+    db = FakeOutbox(_rows(3))
+    sent = []
+    assert outbox.process_batch(db, "w1", lambda row: sent.append(row['id']) or "pid", digest_window=0) == 3
+    assert sent == [1, 2, 3]
+    assert db.statements.count("record") == 3
+    assert all(r['status'] == 'sent' for r in db.rows.values())
+
+def test_heartbeat_renews_and_skips_rows_taken_over():
+    db = FakeOutbox(_rows(4))
+    db.stolen = {3}
+    sent = []
+    outbox.process_batch(db, "w1", lambda row: sent.append(row['id']) or "pid", digest_window=0, heartbeat=0)
+    assert "renew" in db.statements
+    assert sent == [1, 2, 4]
+    assert db.rows[3]['status'] == 'sending' and db.rows[3]['claimed_by'] == 'other'
+
+def test_transient_failure_goes_back_to_pending():
+    db = FakeOutbox(_rows(1))
+
+    def send(row):
+        raise RuntimeError("503")
+
+    outbox.process_batch(db, "w1", send, digest_window=0)
+    assert db.rows[1]['status'] == 'pending'
+
+def test_format_digest_collapses_identical_messages():
+    rows = [{'id': i, 'subject': "AAPL above 200", 'body': "Price 201"} for i in range(3)]
+    assert outbox.format_digest(rows) == ("AAPL above 200 (x3)", "Price 201")
+    rows.append({'id': 9, 'subject': "MSFT below 300", 'body': "Price 299"})
+    subject, body = outbox.format_digest(rows)
+    assert subject.startswith("🔔 2 alerts: AAPL above 200, MSFT below 300")
+    assert body.startswith("4 notifications") and "AAPL above 200 (x3)" in body
+
+class DigestConn:
+    """Serves held rows to coalesce_digests and records what it writes"""
+
+    def __init__(self, held, duplicate_digests=False):
+        self.held = held
+        self.duplicate_digests = duplicate_digests
+        self.notifications, self.emails, self.coalesced = [], [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def cursor(self, cursor_factory=None):
+        conn = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def execute(self, sql, params=None):
+                if "digest_group IN" in sql:
+                    self.rows = [dict(r) for r in conn.held]
+                elif "INSERT INTO notifications" in sql:
+                    conn.notifications.append(params)
+                    self.rows = [{'id': 100 + len(conn.notifications)}]
+                elif "INSERT INTO notification_outbox" in sql:
+                    conn.emails.append(params)
+                    self.rows = [] if conn.duplicate_digests else [{'id': 200 + len(conn.emails)}]
+                elif "SET status = 'coalesced'" in sql:
+                    conn.coalesced.append(params)
+                    self.rows = []
+
+            def fetchone(self):
+                return self.rows[0] if self.rows else None
+
+            def fetchall(self):
+                return self.rows
+
+        return Cursor()
+
+def _held(i, to_email, subject, send_email=True, workspace_id="ws1"):
+    return {'id': i, 'idempotency_key': f"k{i}", 'workspace_id': workspace_id, 'to_email': to_email,
+            'subject': subject, 'body': f"{subject} now", 'send_email': send_email,
+            'digest_group': outbox.digest_group(to_email, workspace_id)}
+
+def test_coalesce_groups_per_recipient_and_splits_email_from_in_app():
+    conn = DigestConn([
+        _held(1, "a@x.y", "AAPL above 200"), _held(2, "b@x.y", "TSLA below 150", send_email=False),
+        _held(3, "a@x.y", "MSFT below 300", send_email=False), _held(4, "a@x.y", "AAPL above 200"),
+        _held(5, "b@x.y", "TSLA below 150", send_email=False),
+    ])
+    assert outbox.coalesce_digests(conn, window=60) == 2
+
+    (ws_a, to_a, subject_a, body_a, status_a), (ws_b, to_b, subject_b, body_b, status_b) = conn.notifications
+    # The in-app summary lists every held message, including in-app-only ones
+    assert (ws_a, to_a, status_a) == ("ws1", "a@x.y", 'pending')
+    assert subject_a.startswith("🔔 2 alerts") and "MSFT below 300" in body_a and "AAPL above 200 (x2)" in body_a
+    assert (to_b, subject_b, body_b, status_b) == ("b@x.y", "TSLA below 150 (x2)", "TSLA below 150 now", None)
+
+    # Only a@x.y asked for email, and its digest leaves the in-app-only message out
+    (key, notification_id, _, to_email, subject, body), = conn.emails
+    assert (key, notification_id, to_email) == ("digest-k1", 101, "a@x.y")
+    assert (subject, body) == ("AAPL above 200 (x2)", "AAPL above 200 now")
+
+    assert conn.coalesced == [(201, [1, 3, 4]), (None, [2, 5])]
+
+def test_coalesce_without_workspace_or_with_a_repeated_digest():
+    conn = DigestConn([_held(1, "a@x.y", "AAPL above 200", workspace_id=None)])
+    assert outbox.coalesce_digests(conn) == 1
+    assert conn.notifications == []
+    assert conn.emails[0][1] is None and conn.coalesced == [(201, [1])]
+
+    again = DigestConn([_held(1, "a@x.y", "AAPL above 200")], duplicate_digests=True)
+    assert outbox.coalesce_digests(again) == 1
+    assert again.coalesced == [(None, [1])]
+    assert outbox.coalesce_digests(DigestConn([])) == 0
@@ -0,0 +1,36 @@
+# tests/test_pricealerts.py
+# AlertIndex: bisect lookups match a brute-force check, add/remove keep the
+# books sorted, and sync picks up edits to any column.
+
+import random
+
+from market_scanner.pricealerts import AlertIndex, alert_triggered
+
+def _alert(i, symbol, kind, target, **extra):
+    return {'id': i, 'symbol': symbol, 'alert_type': kind, 'target_price': target, **extra}
+
+def test_crossed_matches_brute_force():
+    rng = random.Random(7)
+    alerts = [_alert(i, rng.choice("AB"), rng.choice(["above", "below"]), rng.uniform(50, 150)) for i in range(300)]
+    index = AlertIndex.from_alerts(alerts)
+    for price in [49.0, 75.5, 100.0, 149.9, 151.0]:
+        for sym in "AB":
+            expected = {a['id'] for a in alerts if a['symbol'] == sym and alert_triggered(a, price)}
+            assert {a['id'] for a in index.crossed(sym, price)} == expected
+
+def test_add_and_remove():
+    index = AlertIndex()
+    index.add(_alert(1, "aapl", "above", 200))
+    index.add(_alert(2, "AAPL", "above", 190))
+    assert [a['id'] for a in index.crossed("AAPL", 195)] == [2]
+    assert index.remove(2)['id'] == 2 and index.remove(2) is None
+    assert index.crossed("AAPL", 195) == [] and len(index) == 1
+
+def test_sync_picks_up_non_price_edits():
+    index = AlertIndex()
+    index.sync([_alert(1, "AAPL", "above", 100, user_email="old@x.y"), _alert(2, "MSFT", "below", 300)])
+    added, removed = index.sync([_alert(1, "TSLA", "above", 100, user_email="new@x.y")])
+    assert (added, removed) == (1, 1)
+    assert index.crossed("AAPL", 150) == []
+    assert index.crossed("TSLA", 150)[0]['user_email'] == "new@x.y"
+    assert index.sync([_alert(1, "TSLA", "above", 100, user_email="new@x.y")]) == (0, 0)
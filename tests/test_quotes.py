@@ -0,0 +1,56 @@
+# tests/test_quotes.py
+# QuoteBoard freshness and listeners, and the REST fallback cache kept apart from it.
+
+import threading
+
+from market_scanner.quotes import QuoteBoard, RestQuoteCache
+
+def test_board_get_respects_max_age():
+    board = QuoteBoard()
+    board.update("aapl", 190.5)
+    assert board.get("AAPL") == 190.5
+    board.update("msft", 400.0, ts=0.0)
+    assert board.get("MSFT") is None
+    assert board.get_many(["AAPL", "MSFT", "X"]) == {"AAPL": 190.5}
+
+def test_listeners_see_ticks_and_errors_are_contained():
+    board = QuoteBoard()
+    seen = []
+    board.add_listener(lambda sym, price: 1 / 0)
+    board.add_listener(lambda sym, price: seen.append((sym, price)))
+    board.update("btc-usd", 1.0)
+    assert seen == [("BTC-USD", 1.0)]
+
+def test_watch_reports_new_symbols():
+    board = QuoteBoard()
+    assert board.watch(["aapl", "MSFT"]) == {"AAPL", "MSFT"}
+    assert board.watch(["AAPL"]) == set()
+    assert board.watch_changed.is_set()
+
+def test_rest_cache_does_not_touch_board_or_cache_failures():
+    board = QuoteBoard()
+    ticks = []
+    board.add_listener(lambda sym, price: ticks.append(sym))
+    cache = RestQuoteCache(ttl=60)
+    calls = []
+
+    def fetch(sym):
+        calls.append(sym)
+        return None if sym == "BAD" else 42.0
+
+    assert cache.get("aapl", fetch) == 42.0
+    assert cache.get("AAPL", fetch) == 42.0
+    assert cache.get("BAD", fetch) is None
+    assert cache.get("BAD", fetch) is None
+    assert calls == ["aapl", "BAD", "BAD"]
+    assert ticks == [] and board.get("AAPL") is None
+
+def test_board_concurrent_updates():
+    board = QuoteBoard()
+    threads = [threading.Thread(target=lambda i=i: [board.update(f"S{i}", float(n)) for n in range(200)])
+               for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert board.get_many([f"S{i}" for i in range(8)]) == {f"S{i}": 199.0 for i in range(8)}
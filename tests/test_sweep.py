@@ -0,0 +1,75 @@
+# tests/test_sweep.py
+# Parameter sweeps: the grid and random configurations, rows that match a
+# direct simulation of each config, ranking, and cancellation mid-sweep.
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_scanner.backtest import build_panel, score_bars
+from market_scanner.sweep import (
+    SWEEP_DEFAULTS, evaluate_config, parameter_grid, random_configs, rank_results, sweep_panel,
+)
+
+def _bars(seed: int, n: int = 320) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({
+        'open': close, 'high': close * (1 + np.abs(rng.normal(0, 0.01, n))),
+        'low': close * (1 - np.abs(rng.normal(0, 0.01, n))), 'close': close,
+        'volume': rng.uniform(1e5, 1e6, n),
+    }, index=pd.bdate_range("2022-01-03", periods=n))
+
+@pytest.fixture(scope="module")
+def panel():
+    return build_panel({s: score_bars(_bars(seed)) for s, seed in [("A", 1), ("B", 2), ("C", 3)]})
+
+def test_grid_covers_every_combination():
+    configs = parameter_grid({"min_score": [0, 10, 20], "stop_atr_mult": [1.0, 2.0]})
+    assert len(configs) == 6
+    assert {(c["min_score"], c["stop_atr_mult"]) for c in configs} == {(m, s) for m in (0, 10, 20) for s in (1.0, 2.0)}
+    assert all(c["risk_per_trade"] == SWEEP_DEFAULTS["risk_per_trade"] for c in configs)
+    assert parameter_grid({}) == [SWEEP_DEFAULTS]
+    with pytest.raises(ValueError):
+        parameter_grid({"lookback": [1, 2]})
+
+def test_random_configs_stay_in_range_and_repeat_with_a_seed():
+    ranges = {"min_score": (0, 30), "stop_atr_mult": (1.0, 3.0)}
+    configs = random_configs(ranges, 50, seed=9)
+    assert configs == random_configs(ranges, 50, seed=9)
+    assert all(isinstance(c["min_score"], int) and 0 <= c["min_score"] <= 30 for c in configs)
+    assert all(1.0 <= c["stop_atr_mult"] <= 3.0 for c in configs)
+
+def test_sweep_rows_match_direct_evaluation(panel):
+    configs = parameter_grid({"min_score": [0, 20, 40], "stop_atr_mult": [1.0, 2.5]})
+    table, cancelled = sweep_panel(panel, configs, workers=2, executor="thread")
+    assert not cancelled and len(table) == len(configs)
+    assert list(table["rank"]) == list(range(1, len(configs) + 1))
+    assert list(table["sharpe_ratio"]) == sorted(table["sharpe_ratio"], reverse=True)
+    for config in configs:
+        direct = evaluate_config(panel, config)
+        row = table[(table["min_score"] == config["min_score"])
+                    & (table["stop_atr_mult"] == config["stop_atr_mult"])].iloc[0]
+        assert row["final_equity"] == pytest.approx(direct["final_equity"])
+        assert row["total_trades"] == direct["total_trades"]
+
+def test_rank_breaks_ties_by_return_then_drawdown():
+    rows = [{"min_score": i, "stop_atr_mult": 1.5, "risk_per_trade": 0.01, "sharpe_ratio": 1.0,
+             "total_return": r, "max_drawdown": d, "total_trades": 1, "win_rate": 1.0, "profit_factor": 1.0,
+             "final_equity": 1.0} for i, (r, d) in enumerate([(0.1, 0.2), (0.2, 0.3), (0.2, 0.1)])]
+    assert list(rank_results(rows)["min_score"]) == [2, 1, 0]
+    assert rank_results([]).empty
+
+def test_cancel_returns_the_configs_finished_so_far(panel):
+    configs = parameter_grid({"min_score": [0, 10, 20, 30, 40, 50]})
+    cancel = threading.Event()
+
+    def progress(done, total):
+        if done == 2:
+            cancel.set()
+
+    table, cancelled = sweep_panel(panel, configs, progress=progress, cancel_event=cancel)
+    assert cancelled and len(table) == 2
+    assert set(table["min_score"]) == {0, 10}
@@ -0,0 +1,70 @@
+# tests/test_swrcache.py
+# StaleWhileRevalidateCache: fresh hits, background refresh of stale entries,
+# keeping the last good value through failures, and the bounded first wait.
+
+import threading
+import time
+
+from market_scanner.swrcache import StaleWhileRevalidateCache
+
+def _wait_idle(cache, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while cache._inflight and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+def test_fresh_entries_load_once():
+    calls = []
+    cache = StaleWhileRevalidateCache("t", ttl=60)
+    for _ in range(100):
+        assert cache.get("tok", lambda: calls.append(1) or "pro") == "pro"
+    assert len(calls) == 1
+    assert cache.stats['fresh'] == 99 and cache.stats['miss'] == 1
+
+def test_stale_served_immediately_with_single_refresh():
+    cache = StaleWhileRevalidateCache("t", ttl=0.05)
+    cache.get("tok", lambda: "v1")
+    time.sleep(0.06)
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(2)
+        return "v2"
+
+    started = time.perf_counter()
+    assert [cache.get("tok", slow) for _ in range(20)] == ["v1"] * 20
+    assert time.perf_counter() - started < 0.5
+    release.set()
+    _wait_idle(cache)
+    assert len(calls) == 1
+    assert cache.get("tok", slow) == "v2"
+
+def test_failed_refresh_keeps_last_good_value():
+    cache = StaleWhileRevalidateCache("t", ttl=0.01, retry_after=60)
+    cache.get("tok", lambda: "good")
+    time.sleep(0.02)
+
+    def down():
+        raise RuntimeError("503")
+
+    assert cache.get("tok", down) == "good"
+    _wait_idle(cache)
+    assert cache.get("tok", down) == "good"
+    assert cache.stats['errors'] == 1   # retry_after stops a retry on every get
+
+def test_first_lookup_bounded_by_first_wait():
+    release = threading.Event()
+    cache = StaleWhileRevalidateCache("t", first_wait=0.1)
+    started = time.perf_counter()
+    assert cache.get("tok", lambda: release.wait(2) and "late", default="free") == "free"
+    assert time.perf_counter() - started < 0.5
+    release.set()
+    _wait_idle(cache)
+    assert cache.get("tok", lambda: "unused") == "late"
+
+def test_invalidate_forces_reload():
+    cache = StaleWhileRevalidateCache("t", ttl=60)
+    cache.get("tok", lambda: "free")
+    cache.invalidate("tok")
+    assert cache.get("tok", lambda: "pro") == "pro"
@@ -0,0 +1,97 @@
+# tests/test_walkforward.py
+# Walk-forward windows: boundaries tile the history, in-sample choices can't
+# see out-of-sample bars, out-of-sample windows end flat, and only a gap-free
+# prefix of finished windows is stitched.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_scanner.backtest import build_panel, score_bars, simulate_panel
+from market_scanner.features import compute_features
+from market_scanner.walkforward import (
+    FeaturePanel, build_feature_panel, completed_prefix, optimize_window, sample_settings, walk_forward_windows,
+)
+
+def _bars(seed: int, n: int = 700) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.005, n)),
+        'high': close * (1 + np.abs(rng.normal(0, 0.01, n))),
+        'low': close * (1 - np.abs(rng.normal(0, 0.01, n))),
+        'close': close,
+        'volume': rng.uniform(1e5, 1e6, n),
+    }, index=pd.date_range("2021-01-01", periods=n, freq="D"))
+
+@pytest.fixture(scope="module")
+def feature_panel() -> FeaturePanel:
+    return build_feature_panel({s: compute_features(_bars(seed)).dropna() for s, seed in [("A", 1), ("B", 2), ("C", 3)]})
+
+PARAMS = {'objective': "total_return", 'timeframe': "1D", 'initial_equity': 10000,
+          'risk_per_trade': 0.01, 'stop_atr_mult': 1.5, 'min_score': 10}
+
+def test_windows_tile_the_history():
+    dates = pd.date_range("2020-01-01", "2022-12-31", freq="D")
+    windows = walk_forward_windows(dates, 365, 90)
+    assert windows[0][0] == dates[0]
+    for is_start, oos_start, oos_end in windows:
+        assert oos_start - is_start == pd.Timedelta(days=365)
+        assert oos_start < oos_end <= oos_start + pd.Timedelta(days=90)
+    for (_, _, end), (_, start, _) in zip(windows, windows[1:]):
+        assert end == start   # out-of-sample windows are back to back
+    assert windows[-1][2] == dates[-1] + pd.Timedelta(days=1)
+    assert walk_forward_windows(dates[:100], 365, 90) == []
+
+def _perturbed_after(fp: FeaturePanel, cutoff) -> FeaturePanel:
+    later = fp.dates >= cutoff
+    rng = np.random.default_rng(0)
+    features = {c: a.copy() for c, a in fp.features.items()}
+    for a in features.values():
+        a[later] *= rng.uniform(0.5, 1.5, size=a[later].shape)
+    return FeaturePanel(dates=fp.dates, symbols=fp.symbols, features=features, valid=fp.valid)
+
+def test_no_look_ahead(feature_panel):
+    candidates = sample_settings(6, seed=4)
+    window = walk_forward_windows(feature_panel.dates, 300, 120)[0]
+    _, oos_start, oos_end = window
+    base = optimize_window(feature_panel, window, candidates, PARAMS)
+
+    # Changing the out-of-sample bars can't change what the in-sample slice picked
+    blind = optimize_window(_perturbed_after(feature_panel, oos_start), window, candidates, PARAMS)
+    assert blind['settings'] == base['settings']
+    assert blind['in_sample_metrics'] == base['in_sample_metrics']
+
+    # ... and bars after the window can't change how it traded
+    later = optimize_window(_perturbed_after(feature_panel, oos_end), window, candidates, PARAMS)
+    assert later['trades'] == base['trades'] and later['final_equity'] == base['final_equity']
+    assert all(oos_start <= t['entry_date'] <= t['exit_date'] < oos_end for t in base['trades'])
+
+def test_out_of_sample_window_ends_flat(feature_panel):
+    window = walk_forward_windows(feature_panel.dates, 300, 120)[0]
+    res = optimize_window(feature_panel, window, sample_settings(3, seed=1), PARAMS)
+    assert res['trades']
+    assert res['final_equity'] == pytest.approx(10000 + sum(t['trade_pnl'] for t in res['trades']))
+    assert res['equity_curve'][-1]['equity'] == pytest.approx(res['final_equity'])
+
+def test_close_at_end_only_adds_end_of_data_exits():
+    symbol_data = {s: score_bars(_bars(seed, 260)) for s, seed in [("A", 5), ("B", 6), ("C", 7)]}
+    panel = build_panel(symbol_data)
+    plain = simulate_panel(panel, min_score=-1e9)
+    closed = simulate_panel(panel, min_score=-1e9, close_at_end=True)
+    assert plain['open_positions'] and not closed['open_positions']
+    forced = [t for t in closed['trades'] if t['exit_reason'] == "end_of_data"]
+    assert sorted(t['symbol'] for t in forced) == sorted(p['symbol'] for p in plain['open_positions'])
+    assert [t for t in closed['trades'] if t['exit_reason'] != "end_of_data"] == plain['trades']
+    for t in forced:
+        assert t['exit_date'] == symbol_data[t['symbol']].index[-1]
+        assert t['exit_price'] == symbol_data[t['symbol']]['close'].iloc[-1]
+    assert closed['final_equity'] == pytest.approx(10000 + sum(t['trade_pnl'] for t in closed['trades']))
+
+def test_completed_prefix_stops_at_the_first_gap():
+    day = pd.Timestamp("2024-01-01")
+    windows = [(day, day + pd.Timedelta(days=10 * i), day + pd.Timedelta(days=10 * i + 10)) for i in range(1, 5)]
+    results = [{'out_sample_start': w[1]} for w in windows]
+    assert completed_prefix(windows, results) == results
+    assert completed_prefix(windows, [results[0], results[1], results[3]]) == results[:2]
+    assert completed_prefix(windows, results[1:]) == []